@@ -6,601 +6,4652 @@
 // -----------------------------------------------------------
 // Definições e limites
 // -----------------------------------------------------------
-#define MAX_MEM_SIZE   10         // 10 posições de memória
-#define CACHE_LINES    4          // 4 linhas de cache
-#define MAX_INSTR      100        // Máximo de instruções
-#define MAX_STR_SIZE   512        // Tamanho máximo de cada instrução
+#define DEFAULT_MEM_SIZE     10   // 10 posições de memória
+#define DEFAULT_CACHE_LINES  4    // 4 linhas de cache
+#define DEFAULT_BLOCK_WORDS  1    // 1 palavra por linha
+#define MAX_STR_SIZE   512        // Textos de operação/explicação; linhas maiores são montadas até aqui
+#define NUM_REGS       4          // R1..R4
+#define MAX_LABEL_LEN  32         // Tamanho máximo de um rótulo (com o '\0')
+#define DEFAULT_EVENT_CAPACITY 1024   // Eventos guardados no log de execução
+#define WORD_BYTES     ((long long)sizeof(int))   // Bytes de uma palavra no barramento
+
+// Volta no tempo: checkpoints periódicos e registro de desfazer por passo
+#define MAX_CHECKPOINTS       64                 // Ao encher, fica um a cada dois e o intervalo dobra
+#define CHECKPOINT_MAX_BYTES  ((size_t)256 << 20) // Idem, pelo total de bytes guardados
+#define CHECKPOINT_VERSION    3
+#define UNDO_MAX_SETS         16                 // Conjuntos de cache lembrados por passo (cópia única)
+
+// Prefetcher da L1
+#define PREFETCH_RPT_SIZE     64     // Entradas da tabela de passos (indexada pela instrução)
+#define PREFETCH_STREAMS      8      // Sequências acompanhadas ao mesmo tempo
+#define PREFETCH_VICTIMS      256    // Filtro das linhas tiradas da L1 por prefetch
+#define PREFETCH_CONFIDENT    2      // Confiança mínima do passo para buscar
+
+// Programa: crescem sob demanda (dobrando)
+#define PROGRAM_TEXT_INITIAL   4096      // Bytes de texto
+#define PROGRAM_LINES_INITIAL  64        // Linhas
+#define PROGRAM_READ_BLOCK     65536     // Bloco de leitura de loadProgramFile
+
+// Modelo de temporização padrão (ciclos). Acerto = hitLatency; falta =
+// hitLatency + missLatency + memLatency (5 e 10 com os valores padrão).
+#define DEFAULT_HIT_LATENCY   5
+#define DEFAULT_MISS_LATENCY  0
+#define DEFAULT_MEM_LATENCY   5
+#define DEFAULT_ALU_LATENCY   2
+
+// Pipeline clássico de 5 estágios
+enum { ST_IF = 0, ST_ID, ST_EX, ST_MEM, ST_WB, NUM_STAGES };
 
 // -----------------------------------------------------------
-// Variáveis globais (originais)
+// Instruções decodificadas (montadas uma única vez no carregamento)
 // -----------------------------------------------------------
-static int memoryData[MAX_MEM_SIZE];   // Memória principal
-static int regR1, regR2, regR3, regR4; // Registradores
+typedef enum {
+    OP_INVALID = 0,
+    OP_LOAD,
+    OP_STORE,
+    OP_ADD,
+    OP_SUB,
+    OP_ADDI,
+    OP_LI,
+    OP_BEQ,
+    OP_BNE,
+    OP_JMP,
+    OP_COUNT,
+    OP_NONE = OP_COUNT     // Linha sem instrução (vazia, só rótulo ou comentário)
+} Opcode;
 
-// Buffer estático para guardar as instruções (cada linha tem até MAX_STR_SIZE)
-static char instructionBuffer[MAX_INSTR][MAX_STR_SIZE];
+static const char* opcodeNames[OP_COUNT] = {
+    "INVALID", "LOAD", "STORE", "ADD", "SUB", "ADDI", "LI", "BEQ", "BNE", "JMP"
+};
 
-// Array de ponteiros para cada instrução
-static char* instructionSet[MAX_INSTR];
+// Tipos de erro de montagem (guardados em rd quando opcode == OP_INVALID)
+typedef enum {
+    ERR_LOADSTORE = 0,
+    ERR_ALU,
+    ERR_IMMEDIATE,
+    ERR_BRANCH,
+    ERR_LABEL_NAME,
+    ERR_LABEL_DUP,
+    ERR_LABEL_UNDEF,
+    ERR_UNKNOWN
+} DecodeError;
 
-static int   instructionCount   = 0;
-static int   currentInstrIndex  = 0;
+static const char* decodeErrorText[] = {
+    "Instrução LOAD/STORE inválida.",
+    "Instrução ADD/SUB inválida.",
+    "Instrução ADDI/LI inválida.",
+    "Instrução de desvio (BEQ/BNE/JMP) inválida.",
+    "Nome de rótulo inválido.",
+    "Rótulo definido mais de uma vez.",
+    "Rótulo não definido.",
+    "Instrução não reconhecida."
+};
 
-static char lastOperationText[MAX_STR_SIZE]   = "";
-static char lastExplanationText[MAX_STR_SIZE] = "";
+#define DI_INDIRECT 1      // LOAD/STORE com endereço no registrador rs1 ([Rn])
 
-// Histórico
-static char historyBuffer[4096] = "";
+typedef struct {
+    unsigned char opcode;  // Opcode
+    unsigned char rd;      // LOAD/ADD/SUB/ADDI/LI: destino | STORE: fonte
+    unsigned char rs1;     // ADD/SUB/ADDI/desvios: primeiro operando | [Rn] de LOAD/STORE
+    unsigned char rs2;     // ADD/SUB/desvios: segundo operando
+    unsigned char flags;   // DI_*
+    int imm;               // LOAD/STORE: endereço | ADDI/LI: imediato | desvios: linha de destino
+} DecodedInstr;
 
-// Modo Explicação
-static int explanationMode = 0;
+// -----------------------------------------------------------
+// Cache (a estrutura CacheLine está em cpu_backend.h)
+// -----------------------------------------------------------
+// As linhas são agrupadas em conjuntos de "ways" linhas consecutivas:
+// o conjunto s ocupa as linhas [s*ways, (s+1)*ways). Mapeamento direto é
+// o caso ways = 1 e o totalmente associativo é ways = numLines.
+// Cada nível da hierarquia (L1, L2, ...) é uma Cache com seus próprios dados.
+typedef struct {
+    CacheLine* lines;       // numLines linhas
+    int*  data;             // numLines * blockWords palavras
+    int   numLines;
+    int   blockWords;       // Palavras por linha (bloco)
+    int   ways;             // Linhas por conjunto
+    int   numSets;
+    int   policy;           // REPL_*
+    int   writePolicy;      // WRITE_THROUGH / WRITE_BACK
+    int   writeAllocate;    // STORE com falta traz o bloco para a cache
+    int   latency;          // Níveis abaixo da L1: ciclos de uma consulta
+    int   inclusion;        // Níveis abaixo da L1: INCL_*
 
-// Ciclos
-static int totalCycles    = 0;
-static int lastInstrCost  = 0;
+    // 0 = Mapeamento Direto (original), 1 = Associativo, 2 = Associativo por conjunto
+    int   mappingMode;
+    int   setWays;          // Vias usadas no modo 2
+
+    // Índice de tags: hash aberto (sondagem linear) bloco -> linha
+    int*  tagKeys;
+    int*  tagLines;
+    unsigned tagMask;
+
+    // Lista intrusiva por conjunto (cabeça = mais recente / último a entrar)
+    int*  prev;
+    int*  next;
+    int*  head;             // numSets
+    int*  tail;             // numSets
+
+    // Linhas livres por conjunto (pilha encadeada)
+    int*  freeHead;         // numSets
+    int*  freeNext;
+
+    // Bits da árvore PLRU (ways-1 por conjunto)
+    unsigned char* plru;
+
+    unsigned rngState;
+    unsigned rngSeed;
+
+    long long hits;         // 64 bits: traces longos passam de 2^31 acessos
+    long long misses;
+    long long writeBacks;   // Linhas modificadas enviadas ao nível de baixo
+    int useCounter;
+
+    // Linhas trazidas por prefetch e ainda não usadas: ciclo em que o bloco
+    // chega (-1 = linha comum ou já usada)
+    long long* prefetchReady;
+
+    // Estado de coerência de cada linha (COH_*; só no modo multinúcleo)
+    unsigned char* coherence;
+} Cache;
+
+// -----------------------------------------------------------
+// Estado do pipeline de 5 estágios (IF, ID, EX, MEM, WB), em ordem, sem
+// emissão múltipla. Guarda os ciclos de entrada/saída de cada estágio da
+// instrução anterior e quando o valor de cada registrador fica pronto.
+// -----------------------------------------------------------
+typedef struct {
+    long long prevStart[NUM_STAGES];
+    long long prevEnd[NUM_STAGES];
+    long long regForward[NUM_REGS];   // Ciclo em que o valor pode ser adiantado (forwarding)
+    long long regWriteBack[NUM_REGS]; // Ciclo em que o valor é escrito no banco (WB)
+    long long fetchReady;             // Desvio tomado: próxima busca não antes deste ciclo
+    PipelineStats stats;
+} Pipeline;
+
+// -----------------------------------------------------------
+// Conjunto de índices alterados (sem repetição) desde o último consumeDirty
+// -----------------------------------------------------------
+typedef struct {
+    unsigned char* flags;   // flags[i] = 1 se i já está na lista
+    int*  list;
+    int   count;
+    int   size;
+    int   all;              // Tudo mudou (reset, reconfiguração, ...)
+} DirtySet;
+
+// -----------------------------------------------------------
+// Volta no tempo: checkpoints (estado completo a cada N passos) e registro
+// de desfazer (o que cada passo alterou, numa pilha de bytes)
+// -----------------------------------------------------------
+typedef struct {
+    int    step;               // Passo em que foi tirado (antes de executá-lo)
+    size_t size;
+    unsigned char* data;       // Blob no formato de saveCheckpoint
+} Checkpoint;
+
+// Campos de um nível de cache fora das linhas
+typedef struct {
+    int mappingMode, setWays, ways, numSets, policy;
+    int writePolicy, writeAllocate, latency, inclusion, useCounter;
+    unsigned rngState, rngSeed;
+    long long hits, misses, writeBacks;
+} CacheScalars;
+
+// Estado "pequeno" da máquina (tudo menos memória e linhas de cache),
+// guardado nos checkpoints e no início de cada registro de desfazer
+typedef struct {
+    int  pc;
+    int  stepCount;
+    long long totalCycles;
+    int  lastInstrCost;
+    int  regs[NUM_REGS];
+    int  lastWriteBack, lastServedLevel, lastAccessLatency;
+    long long eventNext;
+    MemoryTraffic traffic;
+    Pipeline pipe;
+    long long opcodeCounts[OP_COUNT];
+    long long opcodeCycles[OP_COUNT];
+    CacheScalars levels[MAX_CACHE_LEVELS];
+    PrefetchStats prefetchStats;
+    int  prefetchUse;
+} MachineState;
+
+// -----------------------------------------------------------
+// Perfil: contadores por instrução e por endereço e classificação 3C das
+// faltas da L1 com uma cache sombra totalmente associativa (LRU) com o
+// mesmo número de linhas
+// -----------------------------------------------------------
+typedef struct {
+    int  enabled;
+    PcProfile*      pcs;              // pcCapacity entradas (cresce com o programa)
+    int             pcCapacity;
+    AddressProfile* addrs;            // Uma entrada por palavra de memória
+    int             addrCount;
+    MissClassStats  classes;
+
+    // Cache sombra: lista LRU (mais recente em shadowHead) e posição de cada bloco
+    int  shadowLines;
+    int  shadowUsed;
+    int  shadowHead, shadowTail;
+    int* shadowBlock;
+    int* shadowPrev;
+    int* shadowNext;
+    int* slotOfBlock;                 // Entrada do bloco na sombra, -1 = ausente
+    unsigned char* seen;              // Bitmap: bloco já referenciado
+    int  numBlocks;
+} Profile;
 
 // -----------------------------------------------------------
-// Estrutura da Cache
+// Prefetcher da L1: tabela de passos por instrução (RPT), sequências de
+// blocos acompanhadas e filtro das linhas que os prefetches tiraram da L1
 // -----------------------------------------------------------
 typedef struct {
-    int valid;   
-    int tag;     
-    int data;    
-    int lastUse; 
-} CacheLine;
+    int pc;                 // Instrução dona da entrada (-1 = trace, -2 = livre)
+    int lastAddress;
+    int stride;
+    int confidence;         // 0..3: sobe quando o passo se repete, desce quando muda
+} StrideEntry;
+
+typedef struct {
+    int lastBlock;          // -1 = livre
+    int direction;          // +1, -1 ou 0 (ainda sem direção)
+    int lastUse;
+} StreamEntry;
+
+typedef struct {
+    PrefetchConfig config;
+    PrefetchStats  stats;
+    int useCounter;                        // Relógio LRU das sequências
+    StrideEntry rpt[PREFETCH_RPT_SIZE];
+    StreamEntry streams[PREFETCH_STREAMS];
+    int victims[PREFETCH_VICTIMS];         // Bloco tirado da L1 por um prefetch (-1 = vazio)
+    int pending[PREFETCH_MAX_DEGREE];      // Blocos a buscar quando o acesso terminar
+    int pendingCount;
+} Prefetcher;
+
+// -----------------------------------------------------------
+// Contexto da CPU: todo o estado de uma máquina simulada
+// -----------------------------------------------------------
+struct CPUContext {
+    int* memoryData;                  // Memória principal (memSize palavras)
+    int  memSize;
+    int  regs[NUM_REGS];              // Registradores (regs[0] = R1, ..., regs[3] = R4)
+
+    // Programa: texto de todas as linhas num único bloco (cada uma terminada
+    // em '\0', a linha i começa em lineStart[i]) e instruções decodificadas
+    char*   programText;
+    size_t  programTextSize;
+    size_t  programTextCapacity;
+    size_t* lineStart;
+    DecodedInstr* decodedProgram;
+    int     instructionCapacity;
+
+    // Erros encontrados na última montagem
+    int  assembleErrorCount;
+    char assembleErrors[4096];
+
+    int  instructionCount;
+    int  currentInstrIndex;
+
+    char lastOperationText[MAX_STR_SIZE];
+    char lastExplanationText[MAX_STR_SIZE];
+    int  batchRunning;                // Execução em lote: instruções sem textos
+    ExecEvent batchEvent;             // Última instrução executada no lote
+
+    // Histórico: log circular de eventos de execução. events[seq % capacity]
+    // guarda o evento seq; ficam disponíveis os de [eventOldest, eventNext).
+    ExecEvent* events;
+    int        eventCapacity;
+    long long  eventNext;
+    long long  eventOldest;
+    int        stepCount;             // Instruções executadas desde o reset
+    char*      historyText;           // Montado sob demanda por getHistoryString
+    size_t     historyTextSize;
+
+    // Modo Explicação
+    int explanationMode;
+
+    // Ciclos (64 bits: execuções longas passam de 2^31)
+    long long totalCycles;
+    int lastInstrCost;
+
+    // Modelo de temporização e pipeline
+    TimingModel timing;
+    int pipelineMode;                 // 0 = sequencial (custo = latência), 1 = pipeline
+    int forwarding;                   // Adiantamento de operandos no pipeline
+    Pipeline pipe;
+
+    // Estatísticas por opcode (execuções e ciclos acumulados)
+    long long opcodeCounts[OP_COUNT];
+    long long opcodeCycles[OP_COUNT];
+
+    // Reprodução de traces de endereços (acumulado desde o último reset)
+    TraceStats traceStats;
+
+    // Registradores, endereços e linhas de cache alterados (consumeDirty)
+    DirtySet dirtyRegs;
+    DirtySet dirtyMem;
+    DirtySet dirtyLines;
+
+    // Hierarquia de cache: cache é a L1 (exibida e editável na interface);
+    // lower[0..numLevels-2] são os níveis abaixo dela
+    Cache cache;
+    Cache lower[MAX_CACHE_LEVELS - 1];
+    int   numLevels;
+    MemoryTraffic traffic;            // Entre o último nível e a memória principal
+    int   lastWriteBack;              // O último acesso substituiu uma linha modificada da L1
+    int   lastServedLevel;            // Nível que atendeu o último acesso (numLevels = memória)
+    int   lastAccessLatency;          // Ciclos do último acesso à memória via cache
+
+    // Perfil (setProfiling); desligado não custa nada na execução
+    Profile profile;
+
+    // Prefetch na L1 (setPrefetcher) e instrução do acesso em andamento (-1 = trace)
+    Prefetcher prefetcher;
+    int   accessPc;
+
+    // Modo multinúcleo: sistema dono do núcleo (NULL = CPU isolada)
+    struct MultiCore* system;
+    int   coreId;
+    CoherenceStats coherence;
+    unsigned char* coherenceLost;     // Bitmap: bloco invalidado por outro núcleo desde a última falta
+    int   lastInvalidations;          // Cópias invalidadas em outros núcleos pelo último acesso
+    int   lastFlush;                  // O último acesso fez outro núcleo escrever uma cópia modificada
+
+    // Pontos de parada (avaliados só dentro de runUntilBreak)
+    Breakpoint breakpoints[MAX_BREAKPOINTS];
+    int   breakSlots;                 // Posições abaixo desta podem estar em uso
+    int   breakRunning;               // runUntilBreak em andamento
+    int   breakRegs[NUM_REGS];        // Registradores antes da instrução em andamento
+    BreakInfo breakInfo;              // Por que a última runUntilBreak parou
 
-static CacheLine cacheLines[CACHE_LINES];
-static int cacheHits   = 0;
-static int cacheMisses = 0;
-static int globalUseCounter = 0;
+    // Volta no tempo (setCheckpointInterval / setUndoLogCapacity)
+    Checkpoint checkpoints[MAX_CHECKPOINTS];   // Em ordem crescente de passo
+    int    checkpointCount;
+    size_t checkpointBytes;
+    int    checkpointBase;            // Intervalo configurado (0 = sem checkpoints)
+    int    checkpointInterval;        // Intervalo atual (dobra quando a lista enche)
+    unsigned char* undoLog;           // Pilha de registros, o mais recente no fim
+    size_t undoSize;
+    size_t undoCapacity;              // Bytes (0 = sem registro de desfazer)
+    size_t undoRecord;                // Início do registro do passo em andamento
+    int    undoRecording;             // O passo em andamento está sendo registrado
+    int    undoSets[UNDO_MAX_SETS];   // Conjuntos já copiados neste passo
+    int    undoSetCount;
 
-// 0 = Mapeamento Direto (original), 1 = Associativo
-static int mappingMode = 0;
+    // Buffers devolvidos pelas funções get*String
+    char registersStr[128];
+    char memoryStr[256];
+    char cacheLineStr[256];
+    char eventStr[MAX_STR_SIZE + 64];
+};
+
+// Vários núcleos (cada um um CPUContext) sobre uma memória compartilhada
+struct MultiCore {
+    CPUContext* cores[MAX_CORES];
+    int   numCores;
+    int   protocol;                   // PROTOCOL_MSI / PROTOCOL_MESI
+    int   interleave;                 // Instruções de cada núcleo por vez
+    int   current;                    // Núcleo da vez
+    int   slice;                      // Instruções já executadas na vez atual
+    int*  memory;                     // Compartilhada: memoryData de todos os núcleos
+};
+
+// Contexto usado pelas funções sem parâmetro de contexto
+static CPUContext defaultContext;
 
 
 // -----------------------------------------------------------
 // Funções internas para a cache
 // -----------------------------------------------------------
-static void invalidateCache() {
-    for(int i = 0; i < CACHE_LINES; i++){
-        cacheLines[i].valid   = 0;
-        cacheLines[i].tag     = -1;
-        cacheLines[i].data    = 0;
-        cacheLines[i].lastUse = 0;
-    }
-    cacheHits     = 0;
-    cacheMisses   = 0;
-    globalUseCounter = 0;
+static int isPowerOfTwo(int n) {
+    return n > 0 && (n & (n - 1)) == 0;
 }
 
-static void touchLine(CacheLine* line) {
-    globalUseCounter++;
-    line->lastUse = globalUseCounter;
+static unsigned hashBlock(int block) {
+    return (unsigned)block * 2654435761u;
 }
 
-static int getDirectMappingIndex(int addr) {
-    return (addr % CACHE_LINES);
+// Linha que contém o bloco, ou -1
+static int tagFind(const Cache* c, int block) {
+    unsigned i = hashBlock(block) & c->tagMask;
+    while (c->tagKeys[i] != -1) {
+        if (c->tagKeys[i] == block) return c->tagLines[i];
+        i = (i + 1) & c->tagMask;
+    }
+    return -1;
 }
 
-static int getAssociativeLineIndex(int addr, int* isHit) {
-    *isHit = 0;
-    int indexToReplace = -1;
-    int oldestUse      = 999999999;
+static void tagInsert(Cache* c, int block, int line) {
+    unsigned i = hashBlock(block) & c->tagMask;
+    while (c->tagKeys[i] != -1) {
+        i = (i + 1) & c->tagMask;
+    }
+    c->tagKeys[i]  = block;
+    c->tagLines[i] = line;
+}
 
-    for (int i = 0; i < CACHE_LINES; i++) {
-        if (cacheLines[i].valid && cacheLines[i].tag == addr) {
-            *isHit = 1;
-            return i;
-        }
+// Remoção com deslocamento para trás (mantém as sequências de sondagem sem lápides)
+static void tagRemove(Cache* c, int block) {
+    unsigned i = hashBlock(block) & c->tagMask;
+    while (c->tagKeys[i] != block) {
+        if (c->tagKeys[i] == -1) return;
+        i = (i + 1) & c->tagMask;
     }
-    // Não achou -> MISS
-    for (int i = 0; i < CACHE_LINES; i++) {
-        if (!cacheLines[i].valid) {
-            return i; // linha livre
-        }
-        if (cacheLines[i].lastUse < oldestUse) {
-            oldestUse = cacheLines[i].lastUse;
-            indexToReplace = i;
+    unsigned j = i;
+    for (;;) {
+        c->tagKeys[i] = -1;
+        for (;;) {
+            j = (j + 1) & c->tagMask;
+            if (c->tagKeys[j] == -1) return;
+            unsigned home = hashBlock(c->tagKeys[j]) & c->tagMask;
+            // Move j para i se a posição "home" de j não estiver em (i, j]
+            if (i <= j ? (i < home && home <= j) : (i < home || home <= j)) continue;
+            break;
         }
+        c->tagKeys[i]  = c->tagKeys[j];
+        c->tagLines[i] = c->tagLines[j];
+        i = j;
     }
-    return indexToReplace;
 }
 
-static int accessCache(int address, int* outIndex) {
-    int isHit = 0;
-    int idx   = 0;
+static void listRemove(Cache* c, int set, int line) {
+    int p = c->prev[line], n = c->next[line];
+    if (p != -1) c->next[p] = n; else c->head[set] = n;
+    if (n != -1) c->prev[n] = p; else c->tail[set] = p;
+    c->prev[line] = c->next[line] = -1;
+}
 
-    if (mappingMode == 0) {
-        // Mapeamento Direto
-        idx = getDirectMappingIndex(address);
-        if (cacheLines[idx].valid && cacheLines[idx].tag == address) {
-            isHit = 1;
-        } else {
-            // MISS => carrega da memória
-            cacheLines[idx].valid = 1;
-            cacheLines[idx].tag   = address;
-            cacheLines[idx].data  = memoryData[address];
-        }
-        touchLine(&cacheLines[idx]);
-    }
-    else {
-        // Associativo
-        idx = getAssociativeLineIndex(address, &isHit);
-        if (!isHit) {
-            // MISS => carrega da memória
-            cacheLines[idx].valid = 1;
-            cacheLines[idx].tag   = address;
-            cacheLines[idx].data  = memoryData[address];
-        }
-        touchLine(&cacheLines[idx]);
+static void listPushFront(Cache* c, int set, int line) {
+    c->prev[line] = -1;
+    c->next[line] = c->head[set];
+    if (c->head[set] != -1) c->prev[c->head[set]] = line; else c->tail[set] = line;
+    c->head[set] = line;
+}
+
+// Aponta os bits da árvore para longe da via acessada
+static void plruTouch(Cache* c, int set, int way) {
+    unsigned char* t = &c->plru[(size_t)set * (c->ways - 1)];
+    int levels = 0;
+    while ((1 << levels) < c->ways) levels++;
+    int node = 0;
+    for (int l = levels - 1; l >= 0; l--) {
+        int b = (way >> l) & 1;
+        t[node] = (unsigned char)!b;
+        node = 2 * node + 1 + b;
     }
+}
 
-    if (isHit) cacheHits++; else cacheMisses++;
-    if (outIndex) {
-        *outIndex = idx;
+static int plruVictim(const Cache* c, int set) {
+    const unsigned char* t = &c->plru[(size_t)set * (c->ways - 1)];
+    int node = 0, way = 0;
+    while (node < c->ways - 1) {
+        int b = t[node];
+        way  = (way << 1) | b;
+        node = 2 * node + 1 + b;
     }
-    return isHit;
+    return way;
 }
 
-// -----------------------------------------------------------
-// LOAD/STORE (usado internamente)
-// -----------------------------------------------------------
-static int cacheLoad(int address, char* opTxt, char* expTxt) {
-    if (address < 0 || address >= MAX_MEM_SIZE) {
-        if (opTxt)  snprintf(opTxt,  MAX_STR_SIZE, "LOAD (addr=%d inválido)", address);
-        if (expTxt) snprintf(expTxt, MAX_STR_SIZE, "Endereço fora da memória!");
-        return -999;
+static unsigned nextRandom(Cache* c) {
+    // xorshift32
+    unsigned x = c->rngState;
+    x ^= x << 13;
+    x ^= x >> 17;
+    x ^= x << 5;
+    c->rngState = x;
+    return x;
+}
+
+static void touchLine(Cache* c, int set, int line, int filled) {
+    c->useCounter++;
+    c->lines[line].lastUse = c->useCounter;
+    // LRU reordena a cada acesso; FIFO só quando a linha é preenchida
+    if (filled) {
+        listPushFront(c, set, line);
+    } else if (c->policy == REPL_LRU) {
+        listRemove(c, set, line);
+        listPushFront(c, set, line);
     }
-    int idx;
-    int hit = accessCache(address, &idx);
+    if (c->policy == REPL_PLRU && isPowerOfTwo(c->ways) && c->ways > 1) {
+        plruTouch(c, set, line - set * c->ways);
+    }
+}
 
-    if (opTxt) {
-        snprintf(opTxt, MAX_STR_SIZE, "LOAD: Memória[%d]", address);
+// Escolhe a linha a ser (re)preenchida no conjunto: livre, senão pela política
+static int chooseVictim(Cache* c, int set) {
+    int line = c->freeHead[set];
+    if (line != -1) {
+        c->freeHead[set] = c->freeNext[line];
+        return line;
     }
-    if (expTxt) {
-        if (hit) {
-            snprintf(expTxt, MAX_STR_SIZE, "LOAD via Cache (HIT). Valor=%d", cacheLines[idx].data);
-        } else {
-            snprintf(expTxt, MAX_STR_SIZE, "LOAD via Memória (MISS). Valor=%d", cacheLines[idx].data);
+    int base = set * c->ways;
+    switch (c->policy) {
+    case REPL_RANDOM:
+        line = base + (int)(nextRandom(c) % (unsigned)c->ways);
+        break;
+    case REPL_PLRU:
+        // A árvore exige potência de dois; caso contrário, LRU
+        if (isPowerOfTwo(c->ways) && c->ways > 1) {
+            line = base + plruVictim(c, set);
+            break;
         }
+        /* fallthrough */
+    default:
+        // LRU e FIFO: a cauda da lista
+        line = c->tail[set];
+        break;
     }
-    return cacheLines[idx].data;
+    tagRemove(c, c->lines[line].tag);
+    listRemove(c, set, line);
+    return line;
 }
 
-static void cacheStore(int address, int value, char* opTxt, char* expTxt) {
-    if (address < 0 || address >= MAX_MEM_SIZE) {
-        if (opTxt)  snprintf(opTxt, MAX_STR_SIZE, "STORE (addr=%d inválido)", address);
-        if (expTxt) snprintf(expTxt,MAX_STR_SIZE, "Endereço fora da memória!");
-        return;
+static void invalidateCache(Cache* c) {
+    c->ways    = (c->mappingMode == 0) ? 1 : (c->mappingMode == 1) ? c->numLines : c->setWays;
+    if (c->ways <= 0 || c->ways > c->numLines || c->numLines % c->ways != 0) {
+        c->ways = c->numLines;
     }
-    int idx;
-    int hit = accessCache(address, &idx);
-
-    cacheLines[idx].data = value;
-    memoryData[address]  = value;
+    c->numSets = c->ways > 0 ? c->numLines / c->ways : 0;
 
-    if (opTxt) {
-        snprintf(opTxt, MAX_STR_SIZE, "STORE: Memória[%d]", address);
+    for(int i = 0; i < c->numLines; i++){
+        c->lines[i].valid   = 0;
+        c->lines[i].tag     = -1;
+        c->lines[i].lastUse = 0;
+        c->lines[i].dirty   = 0;
+        c->prev[i] = c->next[i] = -1;
+        c->prefetchReady[i] = -1;
+        c->coherence[i]     = COH_INVALID;
     }
-    if (expTxt) {
-        if (hit) {
-            snprintf(expTxt, MAX_STR_SIZE, "STORE com HIT. Valor %d escrito na cache e memória.", value);
-        } else {
-            snprintf(expTxt, MAX_STR_SIZE, "STORE com MISS. Valor %d escrito na cache e memória.", value);
+    if (c->data) {
+        memset(c->data, 0, (size_t)c->numLines * c->blockWords * sizeof(int));
+        memset(c->plru, 0, (size_t)c->numLines);
+        for (unsigned i = 0; i <= c->tagMask; i++) c->tagKeys[i] = -1;
+    }
+    // Linhas livres em ordem crescente de índice dentro de cada conjunto
+    for (int s = 0; s < c->numSets; s++) {
+        c->head[s] = c->tail[s] = -1;
+        int base = s * c->ways;
+        c->freeHead[s] = base;
+        for (int w = 0; w < c->ways; w++) {
+            c->freeNext[base + w] = (w + 1 < c->ways) ? base + w + 1 : -1;
         }
     }
+    c->rngState   = c->rngSeed ? c->rngSeed : 1;
+    c->hits       = 0;
+    c->misses     = 0;
+    c->useCounter = 0;
+    c->writeBacks = 0;
 }
 
 // -----------------------------------------------------------
-// Implementações exportadas
+// Rastreamento de alterações
 // -----------------------------------------------------------
-DLL_EXPORT void initCPU(void) {
-    // Inicializa a memória principal:
-    // mem[0] = 0, mem[1] = 10, mem[2] = 20, ..., mem[9] = 90
-    for (int i=0; i<MAX_MEM_SIZE; i++){
-        memoryData[i] = i * 10;
+static void dirtyFree(DirtySet* d) {
+    free(d->flags);
+    free(d->list);
+    memset(d, 0, sizeof(*d));
+}
+
+static int dirtyAlloc(DirtySet* d, int size) {
+    memset(d, 0, sizeof(*d));
+    d->flags = (unsigned char*)calloc((size_t)size, 1);
+    d->list  = (int*)malloc((size_t)size * sizeof(int));
+    if (!d->flags || !d->list) {
+        dirtyFree(d);
+        return 0;
     }
-    // Zera registradores
-    regR1 = regR2 = regR3 = regR4 = 0;
+    d->size = size;
+    d->all  = 1;
+    return 1;
+}
 
-    // Invalida cache
-    invalidateCache();
+static int dirtyClone(DirtySet* dst, const DirtySet* src) {
+    if (!dirtyAlloc(dst, src->size)) return 0;
+    memcpy(dst->flags, src->flags, (size_t)src->size);
+    memcpy(dst->list,  src->list,  (size_t)src->count * sizeof(int));
+    dst->count = src->count;
+    dst->all   = src->all;
+    return 1;
+}
 
-    // Zera histórico
-    strcpy(historyBuffer, "");
-    // Zera instruções (count e índice)
-    instructionCount   = 0;
-    currentInstrIndex  = 0;
+static void dirtyMark(DirtySet* d, int i) {
+    // Contexto sem conjuntos alocados (defaultContext antes de initCPU): tudo mudou
+    if (!d->flags) {
+        d->all = 1;
+        return;
+    }
+    if (d->all || d->flags[i]) return;
+    d->flags[i] = 1;
+    d->list[d->count++] = i;
+}
 
-    // Zera textos
-    strcpy(lastOperationText, "");
-    strcpy(lastExplanationText, "");
+static void dirtyMarkAll(DirtySet* d) {
+    d->all = 1;
+}
 
-    totalCycles   = 0;
-    lastInstrCost = 0;
-    explanationMode = 0;
+// Copia até max índices para out e limpa o conjunto; retorna a quantidade,
+// ou -1 se tudo mudou ou não coube em out
+static int dirtyConsume(DirtySet* d, int* out, int max) {
+    int n = d->all ? -1 : d->count;
+    if (n > max || (n > 0 && !out)) n = -1;
+    for (int k = 0; k < d->count; k++) {
+        if (n > 0) out[k] = d->list[k];
+        d->flags[d->list[k]] = 0;
+    }
+    d->count = 0;
+    d->all   = 0;
+    return n;
+}
 
-    // Mapeamento Direto por padrão
-    mappingMode = 0;
+static void markAllDirty(CPUContext* ctx) {
+    dirtyMarkAll(&ctx->dirtyRegs);
+    dirtyMarkAll(&ctx->dirtyMem);
+    dirtyMarkAll(&ctx->dirtyLines);
 }
 
-DLL_EXPORT void resetCPU(void) {
-    // Mantém instruções, mas reinicia memória, regs, cache, ciclos, histórico
-    for (int i=0; i<MAX_MEM_SIZE; i++){
-        memoryData[i] = i * 10;  // Reaplica i*10
+// Nível k da hierarquia (0 = L1)
+static Cache* cacheLevel(CPUContext* ctx, int k) {
+    return k == 0 ? &ctx->cache : &ctx->lower[k - 1];
+}
+
+static int* lineData(Cache* c, int idx) {
+    return &c->data[(size_t)idx * c->blockWords];
+}
+
+// Palavra do endereço dentro da linha idx
+static int* cacheWord(Cache* c, int idx, int address) {
+    return &c->data[(size_t)idx * c->blockWords + address % c->blockWords];
+}
+
+// Linha que contém o bloco, ou -1
+static int findLine(const Cache* c, int block) {
+    if (c->ways == 1) {
+        // Mapeamento Direto: a única linha candidata é a do conjunto
+        int idx = block % c->numSets;
+        return (c->lines[idx].valid && c->lines[idx].tag == block) ? idx : -1;
     }
-    regR1 = regR2 = regR3 = regR4 = 0;
+    return tagFind(c, block);
+}
 
-    invalidateCache();
+// -----------------------------------------------------------
+// Registro de desfazer: cada passo guarda, antes de alterá-los, as palavras
+// de memória e os conjuntos de cache que muda. Registro = [UndoHeader]
+// [textos] [entradas...] [tamanho]; entrada = [UndoEntry] [dados] [bytes].
+// -----------------------------------------------------------
+enum { UNDO_MEM = 0, UNDO_SET, UNDO_PREFETCH };
 
-    strcpy(historyBuffer, "");
-    currentInstrIndex = 0;
+typedef struct {
+    int kind;       // UNDO_MEM: a = endereço, b = palavras; UNDO_SET: a = nível, b = conjunto;
+    int a, b;       // UNDO_PREFETCH: a = deslocamento no prefetcher, b = bytes
+} UndoEntry;
 
-    totalCycles   = 0;
-    lastInstrCost = 0;
+typedef struct {
+    size_t size;              // Bytes do registro inteiro
+    int    textBytes;         // Textos de operação/explicação logo após o cabeçalho
+    MachineState state;       // Antes do passo
+} UndoHeader;
 
-    strcpy(lastOperationText, "");
-    strcpy(lastExplanationText, "");
+// Reserva n bytes no fim do log; sem espaço, descarta os registros mais
+// antigos (pelo menos 1/4 da capacidade de uma vez). Se nem assim couber, o
+// log é esvaziado e o passo deixa de ser registrado.
+static unsigned char* undoReserve(CPUContext* ctx, size_t n) {
+    if (!ctx->undoRecording) return NULL;
+    if (ctx->undoSize + n > ctx->undoCapacity) {
+        size_t drop = 0;
+        while (drop < ctx->undoRecord &&
+               (ctx->undoSize - drop + n > ctx->undoCapacity || drop < ctx->undoCapacity / 4)) {
+            size_t size;
+            memcpy(&size, ctx->undoLog + drop, sizeof(size));
+            drop += size;
+        }
+        if (ctx->undoSize - drop + n > ctx->undoCapacity) {
+            ctx->undoRecording = 0;
+            ctx->undoSize      = 0;
+            return NULL;
+        }
+        memmove(ctx->undoLog, ctx->undoLog + drop, ctx->undoSize - drop);
+        ctx->undoSize   -= drop;
+        ctx->undoRecord -= drop;
+    }
+    unsigned char* p = ctx->undoLog + ctx->undoSize;
+    ctx->undoSize += n;
+    return p;
 }
 
-// Carrega instruções-padrão
-DLL_EXPORT void loadDefaultInstructions(void) {
-    // NOVA LISTA de 7 instruções
-    static const char* defaultInstructs[] = {
-        "LOAD R1, 5",
-        "LOAD R2, 9",
-        "ADD R3, R1, R2",
-        "STORE R3, 2",
-        "LOAD R4, 4",
-        "SUB R1, R4, R2",
-        "STORE R1, 3"
+// Acrescenta uma entrada com "bytes" de dados; retorna onde gravá-los
+static unsigned char* undoPushEntry(CPUContext* ctx, int kind, int a, int b, size_t bytes) {
+    int total = (int)(sizeof(UndoEntry) + bytes + sizeof(int));
+    unsigned char* p = undoReserve(ctx, (size_t)total);
+    if (!p) return NULL;
+    UndoEntry e = { kind, a, b };
+    memcpy(p, &e, sizeof(e));
+    memcpy(p + sizeof(e) + bytes, &total, sizeof(total));
+    return p + sizeof(e);
+}
+
+static size_t setSnapshotBytes(const Cache* c) {
+    size_t w = (size_t)c->ways;
+    return w * (sizeof(CacheLine) + (size_t)c->blockWords * sizeof(int) + 3 * sizeof(int)
+                + sizeof(long long))
+         + 3 * sizeof(int) + (w - 1);
+}
+
+// Copia o estado do conjunto para p (save = 1) ou de p para a cache
+static void transferSet(Cache* c, int set, unsigned char* p, int save) {
+    size_t w    = (size_t)c->ways;
+    size_t base = (size_t)set * w;
+    struct { void* field; size_t bytes; } parts[] = {
+        { &c->lines[base],                w * sizeof(CacheLine) },
+        { lineData(c, (int)base),         w * (size_t)c->blockWords * sizeof(int) },
+        { &c->prev[base],                 w * sizeof(int) },
+        { &c->next[base],                 w * sizeof(int) },
+        { &c->freeNext[base],             w * sizeof(int) },
+        { &c->prefetchReady[base],        w * sizeof(long long) },
+        { &c->head[set],                  sizeof(int) },
+        { &c->tail[set],                  sizeof(int) },
+        { &c->freeHead[set],              sizeof(int) },
+        { &c->plru[(size_t)set * (w - 1)], w - 1 },
     };
-    const int defaultCount = 7;
+    for (size_t i = 0; i < sizeof(parts) / sizeof(parts[0]); i++) {
+        if (save) memcpy(p, parts[i].field, parts[i].bytes);
+        else      memcpy(parts[i].field, p, parts[i].bytes);
+        p += parts[i].bytes;
+    }
+}
 
-    for (int i=0; i<defaultCount; i++) {
-        strncpy(instructionBuffer[i], defaultInstructs[i], MAX_STR_SIZE-1);
-        instructionBuffer[i][MAX_STR_SIZE-1] = '\0';
-        instructionSet[i] = instructionBuffer[i];
+// Guarda o conjunto do nível k antes da primeira alteração dele no passo
+static void journalSet(CPUContext* ctx, int k, int set) {
+    if (!ctx->undoRecording) return;
+    int key = set * MAX_CACHE_LEVELS + k;
+    for (int i = 0; i < ctx->undoSetCount; i++) {
+        if (ctx->undoSets[i] == key) return;
     }
-    instructionCount   = defaultCount;
-    currentInstrIndex  = 0;
+    if (ctx->undoSetCount < UNDO_MAX_SETS) {
+        ctx->undoSets[ctx->undoSetCount++] = key;
+    }
+    Cache* c = cacheLevel(ctx, k);
+    unsigned char* p = undoPushEntry(ctx, UNDO_SET, k, set, setSnapshotBytes(c));
+    if (p) transferSet(c, set, p, 1);
 }
 
-DLL_EXPORT void setInstructions(char* instructions[], int count) {
-    if (count > MAX_INSTR) {
-        count = MAX_INSTR;
+// Volta o conjunto ao estado guardado, refazendo suas entradas no índice de tags
+static void restoreSet(CPUContext* ctx, int k, int set, unsigned char* data) {
+    Cache* c = cacheLevel(ctx, k);
+    int base = set * c->ways;
+    for (int i = base; i < base + c->ways; i++) {
+        if (c->lines[i].valid) tagRemove(c, c->lines[i].tag);
     }
-    // Copia cada instrução do array passado para nosso buffer local
-    for (int i=0; i<count; i++){
-        if (instructions[i]) {
-            strncpy(instructionBuffer[i], instructions[i], MAX_STR_SIZE-1);
-            instructionBuffer[i][MAX_STR_SIZE-1] = '\0';
-            instructionSet[i] = instructionBuffer[i];
-        } else {
-            // Se for nulo, considera string vazia
-            instructionBuffer[i][0] = '\0';
-            instructionSet[i] = instructionBuffer[i];
-        }
+    transferSet(c, set, data, 0);
+    for (int i = base; i < base + c->ways; i++) {
+        if (c->lines[i].valid) tagInsert(c, c->lines[i].tag, i);
+        if (k == 0) dirtyMark(&ctx->dirtyLines, i);
     }
-    instructionCount  = count;
-    currentInstrIndex = 0;
 }
 
-DLL_EXPORT int getInstructionCount(void) {
-    return instructionCount;
+// Guarda "count" palavras de memória a partir de address antes de escrevê-las
+static void journalMemory(CPUContext* ctx, int address, int count) {
+    if (!ctx->undoRecording) return;
+    unsigned char* p = undoPushEntry(ctx, UNDO_MEM, address, count, (size_t)count * sizeof(int));
+    if (p) memcpy(p, &ctx->memoryData[address], (size_t)count * sizeof(int));
 }
 
-DLL_EXPORT const char* getInstructionLine(int index) {
-    if (index < 0 || index >= instructionCount) {
-        return "";
-    }
-    return instructionSet[index];
+// Guarda um trecho do prefetcher (entrada de tabela) antes de alterá-lo
+static void journalPrefetch(CPUContext* ctx, const void* field, size_t bytes) {
+    if (!ctx->undoRecording) return;
+    int offset = (int)((const unsigned char*)field - (const unsigned char*)&ctx->prefetcher);
+    unsigned char* p = undoPushEntry(ctx, UNDO_PREFETCH, offset, (int)bytes, bytes);
+    if (p) memcpy(p, field, bytes);
 }
 
-// -----------------------------------------------------------
-// nextInstruction - Parsing robusto
-// -----------------------------------------------------------
-DLL_EXPORT void nextInstruction(void) {
-    if (currentInstrIndex >= instructionCount) {
-        strcpy(lastOperationText, "Fim das instruções");
-        strcpy(lastExplanationText, "Não há mais instruções para executar.");
-        lastInstrCost = 0;
-        return;
+// Tira a vítima do conjunto (índice de tags e listas) e devolve a linha;
+// o conteúdo fica intacto para quem chama despejá-lo
+static int takeVictim(Cache* c, int set) {
+    if (c->ways == 1) {
+        if (c->lines[set].valid) {
+            tagRemove(c, c->lines[set].tag);
+            listRemove(c, set, set);
+        }
+        c->freeHead[set] = -1;
+        return set;
     }
-    const char* instr = instructionSet[currentInstrIndex];
-    currentInstrIndex++;
+    return chooseVictim(c, set);
+}
 
-    // Limpa textos
-    strcpy(lastOperationText,   "");
-    strcpy(lastExplanationText, "");
+// Invalida a linha idx do nível k e a devolve às livres do conjunto
+static void dropLine(CPUContext* ctx, int k, int idx) {
+    Cache* c = cacheLevel(ctx, k);
+    int set  = idx / c->ways;
+    journalSet(ctx, k, set);
+    tagRemove(c, c->lines[idx].tag);
+    listRemove(c, set, idx);
+    c->lines[idx].valid = 0;
+    c->lines[idx].dirty = 0;
+    c->lines[idx].tag   = -1;
+    c->prefetchReady[idx] = -1;
+    c->coherence[idx]     = COH_INVALID;
+    c->freeNext[idx] = c->freeHead[set];
+    c->freeHead[set] = idx;
+    if (k == 0) dirtyMark(&ctx->dirtyLines, idx);
+}
 
-    // Parsing passo a passo
-    char line[MAX_STR_SIZE];
-    strncpy(line, instr, MAX_STR_SIZE-1);
-    line[MAX_STR_SIZE - 1] = '\0';
+static void memoryReadBlock(CPUContext* ctx, int block, int* dst) {
+    int words = ctx->cache.blockWords;
+    memcpy(dst, &ctx->memoryData[(size_t)block * words], (size_t)words * sizeof(int));
+    ctx->traffic.reads++;
+    ctx->traffic.busBytes += words * WORD_BYTES;
+}
+
+static void memoryWriteBlock(CPUContext* ctx, int block, const int* src) {
+    int words = ctx->cache.blockWords;
+    int base  = block * words;
+    journalMemory(ctx, base, words);
+    memcpy(&ctx->memoryData[base], src, (size_t)words * sizeof(int));
+    for (int w = 0; w < words; w++) {
+        dirtyMark(&ctx->dirtyMem, base + w);
+    }
+    ctx->traffic.writes++;
+    ctx->traffic.writeBacks++;
+    ctx->traffic.busBytes += words * WORD_BYTES;
+}
 
-    char op[16];
-    op[0] = '\0';
+static int allocLine(CPUContext* ctx, int k, int block);
 
-    char* token = strtok(line, " \t");
-    if (!token) {
-        strcpy(lastOperationText, instr);
-        strcpy(lastExplanationText, "Instrução inválida ou não reconhecida.");
-        lastInstrCost = 0;
+// O bloco (dados em data) sai do nível k-1 e desce para o nível k
+// (k == numLevels: memória). dirty = dados mais novos que os de baixo.
+static void evictBlock(CPUContext* ctx, int k, int block, const int* data, int dirty) {
+    if (k == ctx->numLevels) {
+        if (dirty) memoryWriteBlock(ctx, block, data);
         return;
     }
-    strncpy(op, token, sizeof(op)-1);
-    op[sizeof(op)-1] = '\0';
-
-    // Pega resto da linha
-    char* rest = strtok(NULL, "\n");
-    if (!rest) rest = "";
+    Cache* c = cacheLevel(ctx, k);
+    int idx  = findLine(c, block);
+    if (idx >= 0) {
+        if (dirty) {
+            journalSet(ctx, k, idx / c->ways);
+            memcpy(lineData(c, idx), data, (size_t)c->blockWords * sizeof(int));
+            c->lines[idx].dirty = 1;
+        }
+        return;
+    }
+    if (c->inclusion != INCL_EXCLUSIVE) {
+        // Sem a cópia aqui: só o que está modificado continua descendo
+        if (dirty) evictBlock(ctx, k + 1, block, data, dirty);
+        return;
+    }
+    // Exclusiva: a vítima de cima passa a morar neste nível
+    idx = allocLine(ctx, k, block);
+    memcpy(lineData(c, idx), data, (size_t)c->blockWords * sizeof(int));
+    c->lines[idx].dirty = dirty;
+}
 
-    // 1) LOAD / STORE
-    if (strcmp(op, "LOAD") == 0 || strcmp(op, "STORE") == 0) {
-        char regStr[8] = "";
-        int  address    = 0;
+// A linha idx do nível k (já fora do índice de tags) deixa o nível
+static void evictLine(CPUContext* ctx, int k, int idx) {
+    Cache* c  = cacheLevel(ctx, k);
+    int block = c->lines[idx].tag;
+    int* data = lineData(c, idx);
+    int dirty = c->lines[idx].dirty;
 
-        int ok = sscanf(rest, " %[^, \t], %d", regStr, &address);
-        if (ok < 2) {
-            // tenta sem vírgula
-            ok = sscanf(rest, " %[^, \t] %d", regStr, &address);
+    // Inclusiva: as cópias de cima saem junto; as modificadas trazem os
+    // dados mais novos (a L1, a mais nova de todas, é copiada por último)
+    if (k > 0 && c->inclusion == INCL_INCLUSIVE) {
+        for (int j = k - 1; j >= 0; j--) {
+            Cache* u = cacheLevel(ctx, j);
+            int ui   = findLine(u, block);
+            if (ui < 0) continue;
+            if (u->lines[ui].dirty) {
+                memcpy(data, lineData(u, ui), (size_t)c->blockWords * sizeof(int));
+                dirty = 1;
+            }
+            dropLine(ctx, j, ui);
         }
-        if (ok < 2) {
-            strcpy(lastOperationText, instr);
-            strcpy(lastExplanationText, "Instrução LOAD/STORE inválida.");
-            lastInstrCost = 0;
-            return;
+    }
+    if (dirty) c->writeBacks++;
+    evictBlock(ctx, k + 1, block, data, dirty);
+    c->lines[idx].valid = 0;
+    c->lines[idx].dirty = 0;
+}
+
+// Reserva no nível k uma linha para o bloco (despejando a vítima) e a
+// registra como recém-preenchida; os dados ficam por conta de quem chama
+static int allocLine(CPUContext* ctx, int k, int block) {
+    Cache* c = cacheLevel(ctx, k);
+    int set  = block % c->numSets;
+    journalSet(ctx, k, set);
+    int idx  = takeVictim(c, set);
+    if (c->lines[idx].valid) {
+        evictLine(ctx, k, idx);
+    }
+    c->lines[idx].valid = 1;
+    c->lines[idx].tag   = block;
+    c->lines[idx].dirty = 0;
+    c->prefetchReady[idx] = -1;
+    tagInsert(c, block, idx);
+    touchLine(c, set, idx, 1);
+    if (k == 0) dirtyMark(&ctx->dirtyLines, idx);
+    return idx;
+}
+
+// Busca o bloco a partir do nível k (k == numLevels: memória) e copia os
+// dados para dst. *served recebe o nível que tinha o bloco. Retorna 1 se
+// os dados sobem modificados (vindos de um nível exclusivo).
+static int fetchBlock(CPUContext* ctx, int k, int block, int* dst, int* served) {
+    if (k == ctx->numLevels) {
+        memoryReadBlock(ctx, block, dst);
+        *served = k;
+        return 0;
+    }
+    Cache* c     = cacheLevel(ctx, k);
+    size_t bytes = (size_t)c->blockWords * sizeof(int);
+    int idx      = findLine(c, block);
+    if (idx >= 0) {
+        c->hits++;
+        *served = k;
+        memcpy(dst, lineData(c, idx), bytes);
+        if (c->inclusion == INCL_EXCLUSIVE) {
+            // O bloco sobe e deixa este nível
+            int dirty = c->lines[idx].dirty;
+            dropLine(ctx, k, idx);
+            return dirty;
         }
+        journalSet(ctx, k, idx / c->ways);
+        touchLine(c, block % c->numSets, idx, 0);
+        return 0;
+    }
+    c->misses++;
+    if (c->inclusion == INCL_EXCLUSIVE) {
+        return fetchBlock(ctx, k + 1, block, dst, served);
+    }
+    idx = allocLine(ctx, k, block);
+    c->lines[idx].dirty = fetchBlock(ctx, k + 1, block, lineData(c, idx), served);
+    memcpy(dst, lineData(c, idx), bytes);
+    return 0;
+}
 
-        int regNum = 0;
-        if (regStr[0] == 'R') {
-            regNum = regStr[1] - '0';
+// Escrita de uma palavra que não fica na L1 (write-through ou sem alocação):
+// vai para o primeiro nível de baixo com o bloco, senão para a memória.
+// value = NULL só contabiliza (traces). Retorna o nível que recebeu.
+static int writeBelow(CPUContext* ctx, int address, const int* value) {
+    int block = address / ctx->cache.blockWords;
+    for (int k = 1; k < ctx->numLevels; k++) {
+        Cache* c = cacheLevel(ctx, k);
+        int idx  = findLine(c, block);
+        if (idx >= 0) {
+            journalSet(ctx, k, idx / c->ways);
+            if (value) *cacheWord(c, idx, address) = *value;
+            c->lines[idx].dirty = 1;
+            return k;
         }
+    }
+    if (value) {
+        journalMemory(ctx, address, 1);
+        ctx->memoryData[address] = *value;
+        dirtyMark(&ctx->dirtyMem, address);
+    }
+    ctx->traffic.writes++;
+    ctx->traffic.busBytes += WORD_BYTES;
+    return ctx->numLevels;
+}
+
+// Ciclos de um acesso atendido pelo nível served (0 = acerto na L1,
+// numLevels = memória): a latência de cada nível consultado até ele
+static int pathLatency(CPUContext* ctx, int served) {
+    const TimingModel* t = &ctx->timing;
+    if (served == 0) return t->hitLatency;
+    int cycles = t->hitLatency + t->missLatency;
+    for (int k = 1; k <= served && k < ctx->numLevels; k++) {
+        cycles += cacheLevel(ctx, k)->latency;
+    }
+    if (served == ctx->numLevels) cycles += t->memLatency;
+    return cycles;
+}
 
-        if (strcmp(op, "LOAD") == 0) {
-            int val = cacheLoad(address, lastOperationText, lastExplanationText);
-            switch(regNum){
-                case 1: regR1 = val; break;
-                case 2: regR2 = val; break;
-                case 3: regR3 = val; break;
-                case 4: regR4 = val; break;
-                default: break;
+// Escreve para baixo todas as linhas modificadas, nível a nível, até a
+// memória (a residência nos níveis não muda); retorna quantas escreveu
+static int writeBackAll(CPUContext* ctx) {
+    int count = 0;
+    for (int k = 0; k < ctx->numLevels; k++) {
+        Cache* c = cacheLevel(ctx, k);
+        for (int i = 0; i < c->numLines; i++) {
+            if (!c->lines[i].valid || !c->lines[i].dirty) continue;
+            int block = c->lines[i].tag;
+            int dest  = k + 1;
+            int idx   = -1;
+            while (dest < ctx->numLevels && (idx = findLine(cacheLevel(ctx, dest), block)) < 0) {
+                dest++;
             }
-            if (strstr(lastExplanationText, "HIT")) {
-                lastInstrCost = 5;
+            if (dest < ctx->numLevels) {
+                Cache* d = cacheLevel(ctx, dest);
+                memcpy(lineData(d, idx), lineData(c, i), (size_t)c->blockWords * sizeof(int));
+                d->lines[idx].dirty = 1;
             } else {
-                lastInstrCost = 10;
+                memoryWriteBlock(ctx, block, lineData(c, i));
             }
-            totalCycles += lastInstrCost;
-
-            char temp[64];
-            snprintf(temp, sizeof(temp), "%s -> %s", lastOperationText, regStr);
-            strcpy(lastOperationText, temp);
-        }
-        else {
-            // STORE
-            int val = 0;
-            switch(regNum){
-                case 1: val = regR1; break;
-                case 2: val = regR2; break;
-                case 3: val = regR3; break;
-                case 4: val = regR4; break;
-                default: val = 0;    break;
+            c->lines[i].dirty = 0;
+            c->writeBacks++;
+            if (k == 0) {
+                // Com vários núcleos a cópia continua só nesta L1, agora limpa
+                if (ctx->system) {
+                    c->coherence[i] = ctx->system->protocol == PROTOCOL_MESI ? COH_EXCLUSIVE : COH_SHARED;
+                }
+                dirtyMark(&ctx->dirtyLines, i);
             }
-            cacheStore(address, val, lastOperationText, lastExplanationText);
+            count++;
+        }
+    }
+    return count;
+}
 
-            if (strstr(lastExplanationText, "HIT")) {
-                lastInstrCost = 5;
-            } else {
-                lastInstrCost = 10;
-            }
-            totalCycles += lastInstrCost;
+// -----------------------------------------------------------
+// Perfil
+// -----------------------------------------------------------
+static void profileFree(Profile* p) {
+    free(p->pcs);
+    free(p->addrs);
+    free(p->shadowBlock);
+    free(p->shadowPrev);
+    free(p->shadowNext);
+    free(p->slotOfBlock);
+    free(p->seen);
+    memset(p, 0, sizeof(*p));
+}
 
-            char temp[64];
-            snprintf(temp, sizeof(temp), "%s (valor=%d) <- %s", lastOperationText, val, regStr);
-            strcpy(lastOperationText, temp);
-        }
+// Aloca os vetores (perfil ligado e vazio); retorna 0 sem memória,
+// mantendo p como estava
+static int profileAlloc(Profile* p, int memWords, int lines, int blocks) {
+    Profile q;
+    memset(&q, 0, sizeof(q));
+    q.enabled     = 1;
+    q.addrCount   = memWords;
+    q.shadowLines = lines;
+    q.numBlocks   = blocks;
+    q.addrs       = (AddressProfile*)calloc((size_t)q.addrCount, sizeof(AddressProfile));
+    q.shadowBlock = (int*)malloc((size_t)q.shadowLines * sizeof(int));
+    q.shadowPrev  = (int*)malloc((size_t)q.shadowLines * sizeof(int));
+    q.shadowNext  = (int*)malloc((size_t)q.shadowLines * sizeof(int));
+    q.slotOfBlock = (int*)malloc((size_t)q.numBlocks * sizeof(int));
+    q.seen        = (unsigned char*)malloc(((size_t)q.numBlocks + 7) / 8);
+    if (!q.addrs || !q.shadowBlock || !q.shadowPrev || !q.shadowNext || !q.slotOfBlock || !q.seen) {
+        profileFree(&q);
+        return 0;
+    }
+    profileFree(p);
+    *p = q;
+    return 1;
+}
 
-    // 2) ADD / SUB
-    } else if (strcmp(op, "ADD") == 0 || strcmp(op, "SUB") == 0) {
-        char rDest[8] = "", rSrc1[8] = "", rSrc2[8] = "";
-        int ok = sscanf(rest, " %[^,], %[^,], %s", rDest, rSrc1, rSrc2);
-        if (ok < 3) {
-            // tenta sem vírgula
-            ok = sscanf(rest, " %s %s %s", rDest, rSrc1, rSrc2);
-        }
-        if (ok < 3) {
-            strcpy(lastOperationText, instr);
-            strcpy(lastExplanationText, "Instrução ADD/SUB inválida.");
-            lastInstrCost = 0;
-            return;
-        }
+// Esvazia a cache sombra (a L1 foi invalidada)
+static void shadowClear(Profile* p) {
+    p->shadowUsed = 0;
+    p->shadowHead = -1;
+    p->shadowTail = -1;
+    for (int b = 0; b < p->numBlocks; b++) p->slotOfBlock[b] = -1;
+    memset(p->seen, 0, ((size_t)p->numBlocks + 7) / 8);
+}
 
-        int d  = (rDest[1] - '0');
-        int s1 = (rSrc1[1] - '0');
-        int s2 = (rSrc2[1] - '0');
+// Zera os contadores do perfil (a cache sombra é mantida)
+static void profileZero(Profile* p) {
+    if (p->pcs) memset(p->pcs, 0, (size_t)p->pcCapacity * sizeof(PcProfile));
+    memset(p->addrs, 0, (size_t)p->addrCount * sizeof(AddressProfile));
+    memset(&p->classes, 0, sizeof(p->classes));
+}
 
-        int val1=0, val2=0;
-        switch(s1){
-            case 1: val1=regR1; break;
-            case 2: val1=regR2; break;
-            case 3: val1=regR3; break;
-            case 4: val1=regR4; break;
-        }
-        switch(s2){
-            case 1: val2=regR1; break;
-            case 2: val2=regR2; break;
-            case 3: val2=regR3; break;
-            case 4: val2=regR4; break;
+// Chamado a cada invalidação da L1: recomeça o perfil, realocando se a
+// geometria mudou (sem memória o perfil é desligado)
+static void profileReset(CPUContext* ctx) {
+    Profile* p = &ctx->profile;
+    if (!p->enabled) return;
+    int blocks = ctx->memSize / ctx->cache.blockWords;
+    if (p->addrCount != ctx->memSize || p->shadowLines != ctx->cache.numLines || p->numBlocks != blocks) {
+        if (!profileAlloc(p, ctx->memSize, ctx->cache.numLines, blocks)) {
+            profileFree(p);
+            return;
         }
+    }
+    shadowClear(p);
+    profileZero(p);
+}
 
-        int result=0;
-        if (strcmp(op, "ADD") == 0) {
-            result = val1 + val2;
-            snprintf(lastOperationText,   MAX_STR_SIZE, "ADD: %s + %s -> %s", rSrc1, rSrc2, rDest);
-            snprintf(lastExplanationText, MAX_STR_SIZE, "Soma de %d + %d = %d", val1, val2, result);
-        } else {
-            // SUB
-            result = val1 - val2;
-            snprintf(lastOperationText,   MAX_STR_SIZE, "SUB: %s - %s -> %s", rSrc1, rSrc2, rDest);
-            snprintf(lastExplanationText, MAX_STR_SIZE, "Subtração de %d - %d = %d", val1, val2, result);
-        }
+static void shadowUnlink(Profile* p, int slot) {
+    int prev = p->shadowPrev[slot], next = p->shadowNext[slot];
+    if (prev >= 0) p->shadowNext[prev] = next; else p->shadowHead = next;
+    if (next >= 0) p->shadowPrev[next] = prev; else p->shadowTail = prev;
+}
 
-        switch(d){
-            case 1: regR1=result; break;
-            case 2: regR2=result; break;
-            case 3: regR3=result; break;
-            case 4: regR4=result; break;
-        }
-        // ADD/SUB => custo 2
-        lastInstrCost = 2;
-        totalCycles  += lastInstrCost;
+static void shadowPushFront(Profile* p, int slot) {
+    p->shadowPrev[slot] = -1;
+    p->shadowNext[slot] = p->shadowHead;
+    if (p->shadowHead >= 0) p->shadowPrev[p->shadowHead] = slot; else p->shadowTail = slot;
+    p->shadowHead = slot;
+}
 
+// Acesso na cache sombra; retorna 1 se o bloco estava nela
+static int shadowAccess(Profile* p, int block, int allocate) {
+    int slot = p->slotOfBlock[block];
+    if (slot >= 0) {
+        shadowUnlink(p, slot);
+        shadowPushFront(p, slot);
+        return 1;
+    }
+    if (!allocate) return 0;
+    if (p->shadowUsed < p->shadowLines) {
+        slot = p->shadowUsed++;
     } else {
-        // Nenhum dos 4 opcodes
-        strcpy(lastOperationText, instr);
-        strcpy(lastExplanationText, "Instrução não reconhecida.");
-        lastInstrCost = 0;
+        slot = p->shadowTail;
+        p->slotOfBlock[p->shadowBlock[slot]] = -1;
+        shadowUnlink(p, slot);
     }
+    p->shadowBlock[slot]  = block;
+    p->slotOfBlock[block] = slot;
+    shadowPushFront(p, slot);
+    return 0;
+}
 
-    // Atualiza histórico se houver algo em lastOperationText
-    if (strlen(lastOperationText) > 0) {
-        strcat(historyBuffer, lastOperationText);
-        strcat(historyBuffer, "\n");
+// Um acesso à L1: contadores do endereço e classe da falta
+static void profileAccess(Profile* p, int address, int block, int isWrite, int hit, int allocate) {
+    AddressProfile* a = &p->addrs[address];
+    if (isWrite) a->writes++; else a->reads++;
+    int inShadow = shadowAccess(p, block, allocate);
+    int first    = !(p->seen[block >> 3] & (1u << (block & 7)));
+    p->seen[block >> 3] |= (unsigned char)(1u << (block & 7));
+    if (hit) {
+        a->hits++;
+        return;
     }
+    a->misses++;
+    if (first)          p->classes.compulsory++;
+    else if (!inShadow) p->classes.capacity++;
+    else                p->classes.conflict++;
 }
 
-// -----------------------------------------------------------
-// Registradores
-// -----------------------------------------------------------
-DLL_EXPORT const char* getRegistersString(void) {
-    static char buf[128];
-    snprintf(buf, sizeof(buf),
-             "R1=%d, R2=%d, R3=%d, R4=%d",
-             regR1, regR2, regR3, regR4);
-    return buf;
+// Garante entradas para as instruções 0..count-1; retorna 0 sem memória
+static int profileReservePcs(Profile* p, int count) {
+    if (count <= p->pcCapacity) return 1;
+    PcProfile* pcs = (PcProfile*)realloc(p->pcs, (size_t)count * sizeof(PcProfile));
+    if (!pcs) return 0;
+    memset(pcs + p->pcCapacity, 0, (size_t)(count - p->pcCapacity) * sizeof(PcProfile));
+    p->pcs        = pcs;
+    p->pcCapacity = count;
+    return 1;
 }
 
-DLL_EXPORT void setRegisterValue(const char* regName, int value) {
-    if (!regName) return;
-    if (strcmp(regName, "R1") == 0) regR1 = value;
-    else if (strcmp(regName, "R2") == 0) regR2 = value;
-    else if (strcmp(regName, "R3") == 0) regR3 = value;
-    else if (strcmp(regName, "R4") == 0) regR4 = value;
+static int profileClone(Profile* dst, const Profile* src) {
+    memset(dst, 0, sizeof(*dst));
+    if (!src->enabled) return 1;
+    if (!profileAlloc(dst, src->addrCount, src->shadowLines, src->numBlocks) ||
+        !profileReservePcs(dst, src->pcCapacity)) {
+        return 0;
+    }
+    // Guarda os ponteiros recém-alocados e copia os campos escalares
+    Profile fresh = *dst;
+    *dst = *src;
+    dst->pcs         = fresh.pcs;
+    dst->addrs       = fresh.addrs;
+    dst->shadowBlock = fresh.shadowBlock;
+    dst->shadowPrev  = fresh.shadowPrev;
+    dst->shadowNext  = fresh.shadowNext;
+    dst->slotOfBlock = fresh.slotOfBlock;
+    dst->seen        = fresh.seen;
+
+    size_t lines = (size_t)src->shadowLines;
+    if (src->pcCapacity) memcpy(dst->pcs, src->pcs, (size_t)src->pcCapacity * sizeof(PcProfile));
+    memcpy(dst->addrs,       src->addrs,       (size_t)src->addrCount * sizeof(AddressProfile));
+    memcpy(dst->shadowBlock, src->shadowBlock, lines * sizeof(int));
+    memcpy(dst->shadowPrev,  src->shadowPrev,  lines * sizeof(int));
+    memcpy(dst->shadowNext,  src->shadowNext,  lines * sizeof(int));
+    memcpy(dst->slotOfBlock, src->slotOfBlock, (size_t)src->numBlocks * sizeof(int));
+    memcpy(dst->seen,        src->seen,        ((size_t)src->numBlocks + 7) / 8);
+    return 1;
+}
+
+// Uma instrução executada: hit como em ExecEvent (-1 = sem acesso)
+static void profileStep(CPUContext* ctx, int pc, int hit, int cost) {
+    Profile* p = &ctx->profile;
+    if (!profileReservePcs(p, ctx->instructionCount)) return;
+    PcProfile* e = &p->pcs[pc];
+    e->count++;
+    e->cycles += cost;
+    if (hit == 1) e->hits++;
+    if (hit == 0) e->misses++;
 }
 
 // -----------------------------------------------------------
-// Memória
+// Coerência entre núcleos (snooping no barramento compartilhado)
 // -----------------------------------------------------------
-DLL_EXPORT const char* getMemoryString(void) {
-    static char buf[256];
-    buf[0] = '\0';
-
-    char tmp[32];
-    for (int i=0; i<MAX_MEM_SIZE; i++){
-        snprintf(tmp, sizeof(tmp), "[%d]: %d", i, memoryData[i]);
-        strcat(buf, tmp);
-        if (i < MAX_MEM_SIZE-1) {
-            strcat(buf, ",");
-        }
+static void coherenceClear(CPUContext* ctx) {
+    memset(&ctx->coherence, 0, sizeof(ctx->coherence));
+    if (ctx->coherenceLost) {
+        memset(ctx->coherenceLost, 0, ((size_t)(ctx->memSize / ctx->cache.blockWords) + 7) / 8);
     }
-    return buf;
 }
 
-DLL_EXPORT int getMemorySize(void) {
-    return MAX_MEM_SIZE;
+// Marca (lost = 1) ou consulta e desmarca (lost = 0) o bloco como perdido
+// para uma invalidação; retorna se estava marcado
+static int coherenceLostBlock(CPUContext* ctx, int block, int lost) {
+    unsigned char bit = (unsigned char)(1u << (block & 7));
+    unsigned char* p  = &ctx->coherenceLost[block >> 3];
+    int was = (*p & bit) != 0;
+    if (lost) *p |= bit;
+    else      *p &= (unsigned char)~bit;
+    return was;
 }
 
-DLL_EXPORT void setMemoryValue(int address, int value) {
-    if (address < 0 || address >= MAX_MEM_SIZE) return;
-    memoryData[address] = value;
+// Os outros núcleos observam uma transação sobre o bloco: cópias
+// modificadas são escritas na memória (flush) e, com invalidate, todas as
+// cópias saem das L1; senão passam a compartilhadas. Retorna quantos
+// núcleos tinham o bloco; *flushed indica se houve flush.
+static int snoopOthers(CPUContext* ctx, int block, int invalidate, int* flushed) {
+    MultiCore* mc = ctx->system;
+    int holders = 0;
+    *flushed = 0;
+    for (int i = 0; i < mc->numCores; i++) {
+        CPUContext* o = mc->cores[i];
+        Cache* c = &o->cache;
+        int idx;
+        if (o == ctx || (idx = findLine(c, block)) < 0) continue;
+        holders++;
+        if (c->coherence[idx] == COH_MODIFIED) {
+            memoryWriteBlock(o, block, lineData(c, idx));
+            c->lines[idx].dirty = 0;
+            o->coherence.flushes++;
+            *flushed = 1;
+        }
+        if (invalidate) {
+            dropLine(o, 0, idx);
+            coherenceLostBlock(o, block, 1);
+            o->coherence.invalidations++;
+        } else {
+            c->coherence[idx] = COH_SHARED;
+            dirtyMark(&o->dirtyLines, idx);
+        }
+    }
+    return holders;
 }
 
-DLL_EXPORT int getMemoryValue(int address) {
-    if (address < 0 || address >= MAX_MEM_SIZE) return 0;
-    return memoryData[address];
+// Falta na L1 de um núcleo, antes de buscar o bloco na memória: BusRd
+// (leitura) ou BusRdX (escrita). Retorna o estado da linha preenchida.
+static int coherenceMiss(CPUContext* ctx, int block, int isWrite) {
+    if (coherenceLostBlock(ctx, block, 0)) ctx->coherence.coherenceMisses++;
+    if (isWrite) ctx->coherence.busReadX++;
+    else         ctx->coherence.busReads++;
+    int holders = snoopOthers(ctx, block, isWrite, &ctx->lastFlush);
+    if (isWrite) {
+        ctx->lastInvalidations = holders;
+        return COH_MODIFIED;
+    }
+    return holders || ctx->system->protocol == PROTOCOL_MSI ? COH_SHARED : COH_EXCLUSIVE;
 }
 
-// -----------------------------------------------------------
-// Modo Explicação
-// -----------------------------------------------------------
-DLL_EXPORT int getExplanationMode(void) {
-    return explanationMode;
-}
-DLL_EXPORT void setExplanationMode(int mode) {
-    explanationMode = mode;
+// Escrita com acerto: E passa a M em silêncio; S emite BusUpgr e invalida
+// as outras cópias. Retorna os ciclos da transação no barramento.
+static int coherenceWriteHit(CPUContext* ctx, int idx) {
+    Cache* c = &ctx->cache;
+    int cycles = 0;
+    if (c->coherence[idx] == COH_SHARED) {
+        int flushed;
+        ctx->coherence.busUpgrades++;
+        ctx->lastInvalidations = snoopOthers(ctx, c->lines[idx].tag, 1, &flushed);
+        cycles = ctx->timing.memLatency;
+    }
+    c->coherence[idx] = COH_MODIFIED;
+    return cycles;
 }
 
 // -----------------------------------------------------------
-// Última operação / explicação
+// Prefetch na L1
 // -----------------------------------------------------------
-DLL_EXPORT const char* getLastOperationText(void) {
-    return lastOperationText;
-}
-DLL_EXPORT const char* getLastExplanationText(void) {
-    return lastExplanationText;
+// Ciclo atual: início da instrução em andamento (ou ciclos do trace)
+static long long prefetchClock(const CPUContext* ctx) {
+    return (long long)ctx->totalCycles + ctx->traceStats.cycles;
 }
 
-// -----------------------------------------------------------
+// Tabelas vazias e totais zerados (a configuração fica)
+static void prefetchReset(CPUContext* ctx) {
+    Prefetcher* pf = &ctx->prefetcher;
+    memset(&pf->stats, 0, sizeof(pf->stats));
+    pf->useCounter   = 0;
+    pf->pendingCount = 0;
+    for (int i = 0; i < PREFETCH_RPT_SIZE; i++) {
+        pf->rpt[i].pc         = -2;
+        pf->rpt[i].stride     = 0;
+        pf->rpt[i].confidence = 0;
+    }
+    for (int i = 0; i < PREFETCH_STREAMS; i++) {
+        pf->streams[i].lastBlock = -1;
+        pf->streams[i].direction = 0;
+        pf->streams[i].lastUse   = 0;
+    }
+    for (int i = 0; i < PREFETCH_VICTIMS; i++) {
+        pf->victims[i] = -1;
+    }
+}
+
+static void prefetchQueue(Prefetcher* pf, int block) {
+    for (int i = 0; i < pf->pendingCount; i++) {
+        if (pf->pending[i] == block) return;
+    }
+    if (pf->pendingCount < PREFETCH_MAX_DEGREE) pf->pending[pf->pendingCount++] = block;
+}
+
+// Tabela de passos: cada instrução lembra o último endereço e o passo; com
+// o passo confirmado, busca os endereços distance..distance+degree-1 passos à frente
+static void prefetchStride(CPUContext* ctx, int address) {
+    Prefetcher* pf = &ctx->prefetcher;
+    int pc = ctx->accessPc;
+    StrideEntry* e = &pf->rpt[(unsigned)(pc < 0 ? 0 : pc) % PREFETCH_RPT_SIZE];
+    journalPrefetch(ctx, e, sizeof(*e));
+    if (e->pc != pc) {
+        e->pc          = pc;
+        e->lastAddress = address;
+        e->stride      = 0;
+        e->confidence  = 0;
+        return;
+    }
+    int stride = address - e->lastAddress;
+    if (stride == e->stride) {
+        if (e->confidence < 3) e->confidence++;
+    } else {
+        if (e->confidence > 0) e->confidence--;
+        if (e->confidence == 0) e->stride = stride;
+    }
+    e->lastAddress = address;
+    if (e->confidence < PREFETCH_CONFIDENT || e->stride == 0) return;
+
+    int words = ctx->cache.blockWords;
+    for (int i = 0; i < pf->config.degree; i++) {
+        long long target = address + (long long)e->stride * (pf->config.distance + i);
+        if (target < 0 || target >= ctx->memSize) break;
+        if (target / words != address / words) prefetchQueue(pf, (int)(target / words));
+    }
+}
+
+// Sequências: uma falta perto do último bloco de uma sequência (até
+// distance+degree blocos adiante, na direção dela) a continua e busca
+// degree blocos a partir de distance à frente; as outras abrem uma sequência nova
+static void prefetchStream(CPUContext* ctx, int block) {
+    Prefetcher* pf = &ctx->prefetcher;
+    int window = pf->config.distance + pf->config.degree;
+    StreamEntry* found  = NULL;
+    StreamEntry* victim = NULL;
+    for (int i = 0; i < PREFETCH_STREAMS && !found; i++) {
+        StreamEntry* e = &pf->streams[i];
+        if (e->lastBlock < 0) {
+            if (!victim || victim->lastBlock >= 0) victim = e;
+            continue;
+        }
+        int delta = block - e->lastBlock;
+        if (e->direction != 0 ? (delta * e->direction >= 0 && delta * e->direction <= window)
+                              : (delta >= -1 && delta <= 1)) {
+            found = e;
+        } else if (!victim || (victim->lastBlock >= 0 && e->lastUse < victim->lastUse)) {
+            victim = e;
+        }
+    }
+    pf->useCounter++;
+    if (!found) {
+        journalPrefetch(ctx, victim, sizeof(*victim));
+        victim->lastBlock = block;
+        victim->direction = 0;
+        victim->lastUse   = pf->useCounter;
+        return;
+    }
+    journalPrefetch(ctx, found, sizeof(*found));
+    found->lastUse = pf->useCounter;
+    if (block == found->lastBlock) return;
+    if (found->direction == 0) found->direction = block > found->lastBlock ? 1 : -1;
+    found->lastBlock = block;
+    for (int i = 0; i < pf->config.degree; i++) {
+        prefetchQueue(pf, block + found->direction * (pf->config.distance + i));
+    }
+}
+
+// Treina o prefetcher com um acesso à L1 e enfileira os blocos a buscar.
+// trigger = falta ou primeiro uso de um bloco trazido por prefetch.
+static void prefetchTrain(CPUContext* ctx, int address, int block, int trigger) {
+    Prefetcher* pf = &ctx->prefetcher;
+    switch (pf->config.kind) {
+    case PREFETCH_NEXT_LINE:
+        if (!trigger) break;
+        for (int i = 0; i < pf->config.degree; i++) {
+            prefetchQueue(pf, block + pf->config.distance + i);
+        }
+        break;
+    case PREFETCH_STRIDE:
+        prefetchStride(ctx, address);
+        break;
+    case PREFETCH_STREAM:
+        if (trigger) prefetchStream(ctx, block);
+        break;
+    }
+}
+
+// Falta na L1: se um prefetch tirou este bloco de lá, a falta é culpa dele
+static void prefetchCheckVictim(CPUContext* ctx, int block) {
+    int* slot = &ctx->prefetcher.victims[(unsigned)block % PREFETCH_VICTIMS];
+    if (*slot != block) return;
+    journalPrefetch(ctx, slot, sizeof(*slot));
+    *slot = -1;
+    ctx->prefetcher.stats.polluting++;
+}
+
+// Traz o bloco para a L1 sem acesso de demanda (nada a fazer se ele já
+// estiver lá ou passar do fim da memória)
+static void prefetchBlock(CPUContext* ctx, int block) {
+    Cache* c       = &ctx->cache;
+    Prefetcher* pf = &ctx->prefetcher;
+    if (block < 0 || (long long)(block + 1) * c->blockWords > ctx->memSize || findLine(c, block) >= 0) {
+        return;
+    }
+    int set = block % c->numSets;
+    journalSet(ctx, 0, set);
+    int idx = takeVictim(c, set);
+    if (c->lines[idx].valid) {
+        if (c->prefetchReady[idx] < 0) {
+            // Linha de demanda: lembrada para contar a falta se ela voltar
+            int* slot = &pf->victims[(unsigned)c->lines[idx].tag % PREFETCH_VICTIMS];
+            journalPrefetch(ctx, slot, sizeof(*slot));
+            *slot = c->lines[idx].tag;
+        }
+        evictLine(ctx, 0, idx);
+    }
+    int state = COH_INVALID;
+    if (ctx->system) {
+        // Leitura no barramento como uma falta, mas sem contar falta de coerência
+        int flushed;
+        coherenceLostBlock(ctx, block, 0);
+        ctx->coherence.busReads++;
+        state = snoopOthers(ctx, block, 0, &flushed) || ctx->system->protocol == PROTOCOL_MSI
+              ? COH_SHARED : COH_EXCLUSIVE;
+    }
+    int served;
+    int dirty = fetchBlock(ctx, 1, block, lineData(c, idx), &served);
+    c->lines[idx].valid = 1;
+    c->lines[idx].tag   = block;
+    c->lines[idx].dirty = dirty;
+    c->coherence[idx]   = (unsigned char)state;
+    c->prefetchReady[idx] = prefetchClock(ctx) + pathLatency(ctx, served);
+    tagInsert(c, block, idx);
+    touchLine(c, set, idx, 1);
+    dirtyMark(&ctx->dirtyLines, idx);
+    pf->stats.issued++;
+
+    int* slot = &pf->victims[(unsigned)block % PREFETCH_VICTIMS];
+    if (*slot == block) {
+        journalPrefetch(ctx, slot, sizeof(*slot));
+        *slot = -1;
+    }
+}
+
+// Busca os blocos enfileirados pelo último acesso; chamada depois que o
+// acesso terminou de usar a linha (o prefetch pode substituí-la)
+static void issuePrefetches(CPUContext* ctx) {
+    Prefetcher* pf = &ctx->prefetcher;
+    for (int i = 0; i < pf->pendingCount; i++) {
+        prefetchBlock(ctx, pf->pending[i]);
+    }
+    pf->pendingCount = 0;
+}
+
+// Acessa o endereço pela L1; retorna 1 se acertou. Faltas buscam o bloco
+// nos níveis de baixo. Em escritas com value != NULL o valor é gravado
+// (value = NULL só contabiliza: traces); em write-back a linha fica
+// modificada. Com falta numa escrita sem alocação a L1 não muda e
+// *outIndex = -1. Os ciclos do acesso ficam em ctx->lastAccessLatency.
+static int accessCache(CPUContext* ctx, int address, int isWrite, const int* value, int* outIndex) {
+    Cache* c  = &ctx->cache;
+    int block = address / c->blockWords;
+    int idx   = findLine(c, block);
+    int isHit = (idx != -1);
+    int prefetch = ctx->prefetcher.config.kind != PREFETCH_NONE;
+    int trigger  = !isHit;
+    if (ctx->profile.enabled) {
+        profileAccess(&ctx->profile, address, block, isWrite, isHit, !isWrite || c->writeAllocate);
+    }
+    journalSet(ctx, 0, block % c->numSets);
+    ctx->lastWriteBack   = 0;
+    ctx->lastServedLevel = 0;
+    ctx->lastInvalidations = 0;
+    ctx->lastFlush         = 0;
+
+    if (isHit) {
+        c->hits++;
+        touchLine(c, block % c->numSets, idx, 0);
+        ctx->lastAccessLatency = pathLatency(ctx, 0);
+        if (c->prefetchReady[idx] >= 0) {
+            // Primeiro uso de um bloco trazido por prefetch; se ele ainda
+            // não chegou, o acesso espera o resto da busca
+            long long wait = c->prefetchReady[idx] - prefetchClock(ctx);
+            ctx->prefetcher.stats.useful++;
+            if (wait > 0) {
+                ctx->prefetcher.stats.late++;
+                if (wait > ctx->lastAccessLatency) ctx->lastAccessLatency = (int)wait;
+            }
+            c->prefetchReady[idx] = -1;
+            trigger = 1;
+        }
+        if (isWrite && ctx->system) ctx->lastAccessLatency += coherenceWriteHit(ctx, idx);
+    } else if (isWrite && !c->writeAllocate) {
+        // Escrita sem alocação: vai direto para baixo
+        c->misses++;
+        ctx->lastServedLevel   = writeBelow(ctx, address, value);
+        ctx->lastAccessLatency = pathLatency(ctx, ctx->lastServedLevel);
+        if (prefetch) {
+            prefetchCheckVictim(ctx, block);
+            prefetchTrain(ctx, address, block, trigger);
+        }
+        if (outIndex) *outIndex = -1;
+        return 0;
+    } else {
+        // MISS => traz o bloco de baixo; a vítima modificada desce antes
+        c->misses++;
+        if (prefetch) prefetchCheckVictim(ctx, block);
+        int set = block % c->numSets;
+        idx = takeVictim(c, set);
+        if (c->lines[idx].valid) {
+            ctx->lastWriteBack = c->lines[idx].dirty;
+            evictLine(ctx, 0, idx);
+        }
+        // Com vários núcleos a falta vira BusRd/BusRdX: as outras L1
+        // entregam cópias modificadas à memória antes da busca
+        int state = ctx->system ? coherenceMiss(ctx, block, isWrite) : COH_INVALID;
+        int served;
+        int dirty = fetchBlock(ctx, 1, block, lineData(c, idx), &served);
+        c->lines[idx].valid = 1;
+        c->lines[idx].tag   = block;
+        c->lines[idx].dirty = dirty;
+        c->prefetchReady[idx] = -1;
+        c->coherence[idx]     = (unsigned char)state;
+        tagInsert(c, block, idx);
+        touchLine(c, set, idx, 1);
+        dirtyMark(&ctx->dirtyLines, idx);
+        ctx->lastServedLevel   = served;
+        ctx->lastAccessLatency = pathLatency(ctx, served);
+        if (ctx->lastWriteBack) {
+            ctx->lastAccessLatency += ctx->numLevels > 1 ? ctx->lower[0].latency : ctx->timing.memLatency;
+        }
+        if (ctx->lastFlush) ctx->lastAccessLatency += ctx->timing.memLatency;
+    }
+
+    if (isWrite) {
+        if (value) {
+            *cacheWord(c, idx, address) = *value;
+            dirtyMark(&ctx->dirtyLines, idx);
+        }
+        if (c->writePolicy == WRITE_BACK) {
+            c->lines[idx].dirty = 1;
+        } else {
+            writeBelow(ctx, address, value);
+        }
+    }
+    if (prefetch) prefetchTrain(ctx, address, block, trigger);
+    if (outIndex) *outIndex = idx;
+    return isHit;
+}
+
+// Invalida todos os níveis e zera o tráfego com a memória
+static void invalidateCaches(CPUContext* ctx) {
+    for (int k = 0; k < ctx->numLevels; k++) {
+        invalidateCache(cacheLevel(ctx, k));
+    }
+    memset(&ctx->traffic, 0, sizeof(ctx->traffic));
+    ctx->lastWriteBack = 0;
+    profileReset(ctx);
+    prefetchReset(ctx);
+    coherenceClear(ctx);
+}
+
+// 1 = direto, 0 (ou >= linhas) = associativo, 1 < ways < linhas = por
+// conjunto (ways precisa dividir o número de linhas). Retorna 1 em sucesso.
+static int applyAssociativity(Cache* c, int ways) {
+    if (ways == 1) {
+        c->mappingMode = 0;
+    } else if (ways == 0 || ways >= c->numLines) {
+        c->mappingMode = 1;
+    } else if (ways > 1 && c->numLines % ways == 0) {
+        c->mappingMode = 2;
+        c->setWays     = ways;
+    } else {
+        return 0;
+    }
+    return 1;
+}
+
+// Configurações que sobrevivem à realocação de uma cache
+static void copyCacheSettings(Cache* dst, const Cache* src) {
+    dst->mappingMode   = src->mappingMode;
+    dst->setWays       = src->setWays;
+    dst->policy        = src->policy;
+    dst->rngSeed       = src->rngSeed;
+    dst->writePolicy   = src->writePolicy;
+    dst->writeAllocate = src->writeAllocate;
+    dst->latency       = src->latency;
+    dst->inclusion     = src->inclusion;
+}
+
+static void freeCache(Cache* c) {
+    free(c->lines);
+    free(c->data);
+    free(c->tagKeys);
+    free(c->tagLines);
+    free(c->prev);
+    free(c->next);
+    free(c->head);
+    free(c->tail);
+    free(c->freeHead);
+    free(c->freeNext);
+    free(c->plru);
+    free(c->prefetchReady);
+    free(c->coherence);
+    memset(c, 0, sizeof(*c));
+}
+
+// Aloca uma cache de "lines" linhas com "words" palavras por linha
+static int allocCache(Cache* c, int lines, int words) {
+    memset(c, 0, sizeof(*c));
+    unsigned tagSize = 4;
+    while (tagSize < 2u * (unsigned)lines) tagSize <<= 1;
+
+    c->numLines   = lines;
+    c->blockWords = words;
+    c->tagMask    = tagSize - 1;
+    c->lines    = (CacheLine*)calloc((size_t)lines, sizeof(CacheLine));
+    c->data     = (int*)calloc((size_t)lines * words, sizeof(int));
+    c->tagKeys  = (int*)malloc(tagSize * sizeof(int));
+    c->tagLines = (int*)malloc(tagSize * sizeof(int));
+    c->prev     = (int*)malloc((size_t)lines * sizeof(int));
+    c->next     = (int*)malloc((size_t)lines * sizeof(int));
+    c->head     = (int*)malloc((size_t)lines * sizeof(int));
+    c->tail     = (int*)malloc((size_t)lines * sizeof(int));
+    c->freeHead = (int*)malloc((size_t)lines * sizeof(int));
+    c->freeNext = (int*)malloc((size_t)lines * sizeof(int));
+    c->plru     = (unsigned char*)calloc((size_t)lines, 1);
+    c->prefetchReady = (long long*)malloc((size_t)lines * sizeof(long long));
+    c->coherence     = (unsigned char*)calloc((size_t)lines, 1);
+    if (!c->lines || !c->data || !c->tagKeys || !c->tagLines || !c->prev || !c->next ||
+        !c->head || !c->tail || !c->freeHead || !c->freeNext || !c->plru || !c->prefetchReady ||
+        !c->coherence) {
+        freeCache(c);
+        return 0;
+    }
+    return 1;
+}
+
+// Cópia profunda de uma cache (mesma geometria e conteúdo)
+static int cloneCache(Cache* dst, const Cache* src) {
+    if (!allocCache(dst, src->numLines, src->blockWords)) {
+        return 0;
+    }
+    // Guarda os ponteiros recém-alocados e copia os campos escalares
+    Cache fresh = *dst;
+    *dst = *src;
+    dst->lines    = fresh.lines;
+    dst->data     = fresh.data;
+    dst->tagKeys  = fresh.tagKeys;
+    dst->tagLines = fresh.tagLines;
+    dst->prev     = fresh.prev;
+    dst->next     = fresh.next;
+    dst->head     = fresh.head;
+    dst->tail     = fresh.tail;
+    dst->freeHead = fresh.freeHead;
+    dst->freeNext = fresh.freeNext;
+    dst->plru     = fresh.plru;
+    dst->prefetchReady = fresh.prefetchReady;
+    dst->coherence     = fresh.coherence;
+
+    size_t lines = (size_t)src->numLines;
+    size_t tags  = (size_t)src->tagMask + 1;
+    memcpy(dst->lines,    src->lines,    lines * sizeof(CacheLine));
+    memcpy(dst->data,     src->data,     lines * src->blockWords * sizeof(int));
+    memcpy(dst->tagKeys,  src->tagKeys,  tags * sizeof(int));
+    memcpy(dst->tagLines, src->tagLines, tags * sizeof(int));
+    memcpy(dst->prev,     src->prev,     lines * sizeof(int));
+    memcpy(dst->next,     src->next,     lines * sizeof(int));
+    memcpy(dst->head,     src->head,     lines * sizeof(int));
+    memcpy(dst->tail,     src->tail,     lines * sizeof(int));
+    memcpy(dst->freeHead, src->freeHead, lines * sizeof(int));
+    memcpy(dst->freeNext, src->freeNext, lines * sizeof(int));
+    memcpy(dst->plru,     src->plru,     lines);
+    memcpy(dst->prefetchReady, src->prefetchReady, lines * sizeof(long long));
+    memcpy(dst->coherence,     src->coherence,     lines);
+    return 1;
+}
+
+// -----------------------------------------------------------
+// LOAD/STORE (usado internamente)
+// -----------------------------------------------------------
+static void appendWriteBackNote(const CPUContext* ctx, char* expTxt) {
+    if (!ctx->lastWriteBack) return;
+    size_t used = strlen(expTxt);
+    snprintf(expTxt + used, MAX_STR_SIZE - used,
+             " A linha substituída estava modificada e foi escrita %s.",
+             ctx->numLevels > 1 ? "na L2" : "na memória");
+}
+
+// Transações de coerência do último acesso (só com vários núcleos)
+static void appendCoherenceNote(const CPUContext* ctx, char* expTxt) {
+    size_t used = strlen(expTxt);
+    if (ctx->lastFlush) {
+        used += snprintf(expTxt + used, MAX_STR_SIZE - used,
+                         " Outro núcleo tinha o bloco modificado e o escreveu na memória.");
+    }
+    if (ctx->lastInvalidations && used < MAX_STR_SIZE) {
+        snprintf(expTxt + used, MAX_STR_SIZE - used,
+                 " %d cópia(s) em outros núcleos invalidada(s).", ctx->lastInvalidations);
+    }
+}
+
+// Endereço fora da memória: sem acesso à cache, custa como uma falta até a memória
+static void invalidAccess(CPUContext* ctx) {
+    ctx->lastInvalidations = 0;
+    ctx->lastFlush         = 0;
+    ctx->lastWriteBack     = 0;
+    ctx->lastServedLevel   = ctx->numLevels;
+    ctx->lastAccessLatency = pathLatency(ctx, ctx->numLevels);
+}
+
+static int cacheLoad(CPUContext* ctx, int address, int* hitOut, char* opTxt, char* expTxt) {
+    if (hitOut) *hitOut = 0;
+    if (address < 0 || address >= ctx->memSize) {
+        invalidAccess(ctx);
+        if (opTxt)  snprintf(opTxt,  MAX_STR_SIZE, "LOAD (addr=%d inválido)", address);
+        if (expTxt) snprintf(expTxt, MAX_STR_SIZE, "Endereço fora da memória!");
+        return -999;
+    }
+    int idx;
+    int hit = accessCache(ctx, address, 0, NULL, &idx);
+    if (hitOut) *hitOut = hit;
+    int value = *cacheWord(&ctx->cache, idx, address);
+    issuePrefetches(ctx);
+
+    if (opTxt) {
+        snprintf(opTxt, MAX_STR_SIZE, "LOAD: Memória[%d]", address);
+    }
+    if (expTxt) {
+        if (hit) {
+            snprintf(expTxt, MAX_STR_SIZE, "LOAD via Cache (HIT). Valor=%d", value);
+        } else if (ctx->lastServedLevel < ctx->numLevels) {
+            snprintf(expTxt, MAX_STR_SIZE, "LOAD com MISS na L1 e HIT na L%d. Valor=%d",
+                     ctx->lastServedLevel + 1, value);
+        } else {
+            snprintf(expTxt, MAX_STR_SIZE, "LOAD via Memória (MISS). Valor=%d", value);
+        }
+        appendWriteBackNote(ctx, expTxt);
+        appendCoherenceNote(ctx, expTxt);
+    }
+    return value;
+}
+
+static void cacheStore(CPUContext* ctx, int address, int value, int* hitOut, char* opTxt, char* expTxt) {
+    if (hitOut) *hitOut = 0;
+    if (address < 0 || address >= ctx->memSize) {
+        invalidAccess(ctx);
+        if (opTxt)  snprintf(opTxt, MAX_STR_SIZE, "STORE (addr=%d inválido)", address);
+        if (expTxt) snprintf(expTxt,MAX_STR_SIZE, "Endereço fora da memória!");
+        return;
+    }
+    int idx;
+    int hit = accessCache(ctx, address, 1, &value, &idx);
+    if (hitOut) *hitOut = hit;
+    issuePrefetches(ctx);
+
+    if (opTxt) {
+        snprintf(opTxt, MAX_STR_SIZE, "STORE: Memória[%d]", address);
+    }
+    if (expTxt) {
+        // Write-back só atualiza a cache; a memória recebe o bloco na substituição
+        int levels = ctx->numLevels > 1;
+        const char* where = idx < 0 ? (levels ? "abaixo da L1 (sem alocação)" : "só na memória (sem alocação)")
+                          : ctx->cache.writePolicy == WRITE_THROUGH
+                                    ? (levels ? "na L1 e no nível de baixo" : "na cache e memória")
+                                    : "só na cache (linha modificada)";
+        snprintf(expTxt, MAX_STR_SIZE, "STORE com %s. Valor %d escrito %s.",
+                 hit ? "HIT" : "MISS", value, where);
+        appendWriteBackNote(ctx, expTxt);
+        appendCoherenceNote(ctx, expTxt);
+    }
+}
+
+// -----------------------------------------------------------
+// Geometria da máquina (memória e cache alocadas dinamicamente)
+// -----------------------------------------------------------
+// mem[0] = 0, mem[1] = 10, mem[2] = 20, ...
+static void fillDefaultMemory(CPUContext* ctx) {
+    for (int i=0; i<ctx->memSize; i++){
+        ctx->memoryData[i] = i * 10;
+    }
+}
+
+// Realoca memória e cache. Retorna 1 em sucesso; em caso de parâmetros
+// inválidos ou falta de memória mantém a configuração anterior e retorna 0.
+static int allocateMachine(CPUContext* ctx, int memWords, int lines, int words) {
+    // Núcleos de um multinúcleo dividem a memória: a geometria é fixa
+    if (ctx->system) return 0;
+    if (memWords <= 0 || lines <= 0 || words <= 0 || memWords % words != 0) {
+        return 0;
+    }
+    int*  newMem = (int*)malloc((size_t)memWords * sizeof(int));
+    Cache newCache;
+    Cache newLower[MAX_CACHE_LEVELS - 1];
+    DirtySet newRegs, newMemDirty, newLines;
+    int levels = 0;
+    if (!newMem || !allocCache(&newCache, lines, words)) {
+        free(newMem);
+        return 0;
+    }
+    // Níveis de baixo: mesmas linhas, novo tamanho de bloco
+    while (levels < ctx->numLevels - 1 &&
+           allocCache(&newLower[levels], ctx->lower[levels].numLines, words)) {
+        levels++;
+    }
+    if (levels < ctx->numLevels - 1 ||
+        !dirtyAlloc(&newRegs, NUM_REGS) || !dirtyAlloc(&newMemDirty, memWords) ||
+        !dirtyAlloc(&newLines, lines)) {
+        dirtyFree(&newRegs);
+        dirtyFree(&newMemDirty);
+        dirtyFree(&newLines);
+        free(newMem);
+        freeCache(&newCache);
+        while (levels > 0) freeCache(&newLower[--levels]);
+        return 0;
+    }
+    // Mapeamento, políticas, semente, latência e inclusão sobrevivem à realocação
+    copyCacheSettings(&newCache, &ctx->cache);
+    for (int k = 0; k < levels; k++) {
+        copyCacheSettings(&newLower[k], &ctx->lower[k]);
+        freeCache(&ctx->lower[k]);
+        ctx->lower[k] = newLower[k];
+    }
+
+    free(ctx->memoryData);
+    freeCache(&ctx->cache);
+    ctx->memoryData = newMem;
+    ctx->memSize    = memWords;
+    ctx->cache      = newCache;
+    invalidateCaches(ctx);
+
+    dirtyFree(&ctx->dirtyRegs);
+    dirtyFree(&ctx->dirtyMem);
+    dirtyFree(&ctx->dirtyLines);
+    ctx->dirtyRegs  = newRegs;
+    ctx->dirtyMem   = newMemDirty;
+    ctx->dirtyLines = newLines;
+    return 1;
+}
+
+// -----------------------------------------------------------
+// Checkpoints: o estado completo num blob binário (formato nativo da
+// máquina): [CheckpointHeader] [memória] [por nível: linhas, dados, listas,
+// PLRU]. O índice de tags não é guardado: é refeito a partir das linhas.
+// -----------------------------------------------------------
+typedef struct {
+    char magic[8];                    // "CPUCKPT"
+    int  version;
+    int  memSize;
+    int  blockWords;
+    int  numLevels;
+    int  numLines[MAX_CACHE_LEVELS];
+    TimingModel timing;
+    int  pipelineMode;
+    int  forwarding;
+    TraceStats traceStats;
+    Prefetcher prefetcher;            // Configuração e tabelas (os totais estão em state)
+    MachineState state;
+    char lastOperationText[MAX_STR_SIZE];
+    char lastExplanationText[MAX_STR_SIZE];
+} CheckpointHeader;
+
+static const char checkpointMagic[8] = "CPUCKPT";
+
+static void saveCacheScalars(const Cache* c, CacheScalars* s) {
+    s->mappingMode   = c->mappingMode;
+    s->setWays       = c->setWays;
+    s->ways          = c->ways;
+    s->numSets       = c->numSets;
+    s->policy        = c->policy;
+    s->writePolicy   = c->writePolicy;
+    s->writeAllocate = c->writeAllocate;
+    s->latency       = c->latency;
+    s->inclusion     = c->inclusion;
+    s->useCounter    = c->useCounter;
+    s->rngState      = c->rngState;
+    s->rngSeed       = c->rngSeed;
+    s->hits          = c->hits;
+    s->misses        = c->misses;
+    s->writeBacks    = c->writeBacks;
+}
+
+static void loadCacheScalars(Cache* c, const CacheScalars* s) {
+    c->mappingMode   = s->mappingMode;
+    c->setWays       = s->setWays;
+    c->ways          = s->ways;
+    c->numSets       = s->numSets;
+    c->policy        = s->policy;
+    c->writePolicy   = s->writePolicy;
+    c->writeAllocate = s->writeAllocate;
+    c->latency       = s->latency;
+    c->inclusion     = s->inclusion;
+    c->useCounter    = s->useCounter;
+    c->rngState      = s->rngState;
+    c->rngSeed       = s->rngSeed;
+    c->hits          = s->hits;
+    c->misses        = s->misses;
+    c->writeBacks    = s->writeBacks;
+}
+
+static void saveState(CPUContext* ctx, MachineState* s) {
+    memset(s, 0, sizeof(*s));
+    s->pc                = ctx->currentInstrIndex;
+    s->stepCount         = ctx->stepCount;
+    s->totalCycles       = ctx->totalCycles;
+    s->lastInstrCost     = ctx->lastInstrCost;
+    s->lastWriteBack     = ctx->lastWriteBack;
+    s->lastServedLevel   = ctx->lastServedLevel;
+    s->lastAccessLatency = ctx->lastAccessLatency;
+    s->eventNext         = ctx->eventNext;
+    s->traffic           = ctx->traffic;
+    s->pipe              = ctx->pipe;
+    memcpy(s->regs, ctx->regs, sizeof(s->regs));
+    memcpy(s->opcodeCounts, ctx->opcodeCounts, sizeof(s->opcodeCounts));
+    memcpy(s->opcodeCycles, ctx->opcodeCycles, sizeof(s->opcodeCycles));
+    for (int k = 0; k < ctx->numLevels; k++) {
+        saveCacheScalars(cacheLevel(ctx, k), &s->levels[k]);
+    }
+    s->prefetchStats     = ctx->prefetcher.stats;
+    s->prefetchUse       = ctx->prefetcher.useCounter;
+}
+
+static void loadState(CPUContext* ctx, const MachineState* s) {
+    ctx->currentInstrIndex = s->pc;
+    ctx->stepCount         = s->stepCount;
+    ctx->totalCycles       = s->totalCycles;
+    ctx->lastInstrCost     = s->lastInstrCost;
+    ctx->lastWriteBack     = s->lastWriteBack;
+    ctx->lastServedLevel   = s->lastServedLevel;
+    ctx->lastAccessLatency = s->lastAccessLatency;
+    ctx->traffic           = s->traffic;
+    ctx->pipe              = s->pipe;
+    memcpy(ctx->regs, s->regs, sizeof(ctx->regs));
+    memcpy(ctx->opcodeCounts, s->opcodeCounts, sizeof(ctx->opcodeCounts));
+    memcpy(ctx->opcodeCycles, s->opcodeCycles, sizeof(ctx->opcodeCycles));
+    for (int k = 0; k < ctx->numLevels; k++) {
+        loadCacheScalars(cacheLevel(ctx, k), &s->levels[k]);
+    }
+    ctx->prefetcher.stats      = s->prefetchStats;
+    ctx->prefetcher.useCounter = s->prefetchUse;
+    // Os eventos dos passos desfeitos saem do log e a numeração volta junto;
+    // se o log não alcança o estado restaurado ele fica vazio
+    if (s->eventNext < ctx->eventOldest || s->eventNext > ctx->eventNext) {
+        ctx->eventOldest = s->eventNext;
+    }
+    ctx->eventNext = s->eventNext;
+    dirtyMarkAll(&ctx->dirtyRegs);
+}
+
+// Copia linhas, dados, listas e PLRU do nível para p (save = 1) ou de p
+// para a cache; p = NULL só mede. Retorna os bytes.
+static size_t transferLevel(Cache* c, unsigned char* p, int save) {
+    size_t n = (size_t)c->numLines;
+    struct { void* field; size_t bytes; } parts[] = {
+        { c->lines,    n * sizeof(CacheLine) },
+        { c->data,     n * (size_t)c->blockWords * sizeof(int) },
+        { c->prev,     n * sizeof(int) },
+        { c->next,     n * sizeof(int) },
+        { c->head,     n * sizeof(int) },
+        { c->tail,     n * sizeof(int) },
+        { c->freeHead, n * sizeof(int) },
+        { c->freeNext, n * sizeof(int) },
+        { c->plru,     n },
+        { c->prefetchReady, n * sizeof(long long) },
+    };
+    size_t total = 0;
+    for (size_t i = 0; i < sizeof(parts) / sizeof(parts[0]); i++) {
+        if (p && save)  memcpy(p + total, parts[i].field, parts[i].bytes);
+        else if (p)     memcpy(parts[i].field, p + total, parts[i].bytes);
+        total += parts[i].bytes;
+    }
+    return total;
+}
+
+static size_t checkpointSize(CPUContext* ctx) {
+    size_t size = sizeof(CheckpointHeader) + (size_t)ctx->memSize * sizeof(int);
+    for (int k = 0; k < ctx->numLevels; k++) {
+        size += transferLevel(cacheLevel(ctx, k), NULL, 1);
+    }
+    return size;
+}
+
+// Grava checkpointSize(ctx) bytes em p
+static void writeCheckpoint(CPUContext* ctx, unsigned char* p) {
+    CheckpointHeader h;
+    memset(&h, 0, sizeof(h));
+    memcpy(h.magic, checkpointMagic, sizeof(h.magic));
+    h.version      = CHECKPOINT_VERSION;
+    h.memSize      = ctx->memSize;
+    h.blockWords   = ctx->cache.blockWords;
+    h.numLevels    = ctx->numLevels;
+    for (int k = 0; k < ctx->numLevels; k++) {
+        h.numLines[k] = cacheLevel(ctx, k)->numLines;
+    }
+    h.timing       = ctx->timing;
+    h.pipelineMode = ctx->pipelineMode;
+    h.forwarding   = ctx->forwarding;
+    h.traceStats   = ctx->traceStats;
+    h.prefetcher   = ctx->prefetcher;
+    memset(h.prefetcher.pending, 0, sizeof(h.prefetcher.pending));   // Fila vazia entre os passos
+    saveState(ctx, &h.state);
+    // Só o texto: o que sobra depois do '\0' fica zerado
+    memcpy(h.lastOperationText, ctx->lastOperationText, strlen(ctx->lastOperationText) + 1);
+    memcpy(h.lastExplanationText, ctx->lastExplanationText, strlen(ctx->lastExplanationText) + 1);
+
+    memcpy(p, &h, sizeof(h));
+    p += sizeof(h);
+    memcpy(p, ctx->memoryData, (size_t)ctx->memSize * sizeof(int));
+    p += (size_t)ctx->memSize * sizeof(int);
+    for (int k = 0; k < ctx->numLevels; k++) {
+        p += transferLevel(cacheLevel(ctx, k), p, 1);
+    }
+}
+
+// Aplica um checkpoint da mesma geometria (memória, bloco, níveis e
+// linhas); retorna 0 sem alterar nada se ele for inválido ou de outra geometria
+static int readCheckpoint(CPUContext* ctx, const unsigned char* p, size_t size) {
+    CheckpointHeader h;
+    if (size < sizeof(h)) return 0;
+    memcpy(&h, p, sizeof(h));
+    if (memcmp(h.magic, checkpointMagic, sizeof(h.magic)) != 0 || h.version != CHECKPOINT_VERSION ||
+        h.memSize != ctx->memSize || h.blockWords != ctx->cache.blockWords ||
+        h.numLevels != ctx->numLevels || size != checkpointSize(ctx) ||
+        h.state.pc < 0 || h.state.pc > ctx->instructionCount || h.state.stepCount < 0 ||
+        h.prefetcher.config.kind < PREFETCH_NONE || h.prefetcher.config.kind > PREFETCH_STREAM ||
+        h.prefetcher.config.degree < 1 || h.prefetcher.config.degree > PREFETCH_MAX_DEGREE ||
+        h.prefetcher.config.distance < 1 || h.prefetcher.config.distance > PREFETCH_MAX_DISTANCE) {
+        return 0;
+    }
+    for (int k = 0; k < ctx->numLevels; k++) {
+        const CacheScalars* s = &h.state.levels[k];
+        if (h.numLines[k] != cacheLevel(ctx, k)->numLines || s->ways < 1 ||
+            s->numSets * s->ways != h.numLines[k]) {
+            return 0;
+        }
+    }
+
+    ctx->timing       = h.timing;
+    ctx->pipelineMode = h.pipelineMode;
+    ctx->forwarding   = h.forwarding;
+    ctx->traceStats   = h.traceStats;
+    ctx->prefetcher   = h.prefetcher;
+    ctx->prefetcher.pendingCount = 0;
+    loadState(ctx, &h.state);
+    memcpy(ctx->lastOperationText, h.lastOperationText, MAX_STR_SIZE);
+    memcpy(ctx->lastExplanationText, h.lastExplanationText, MAX_STR_SIZE);
+    ctx->lastOperationText[MAX_STR_SIZE - 1]   = '\0';
+    ctx->lastExplanationText[MAX_STR_SIZE - 1] = '\0';
+
+    p += sizeof(h);
+    memcpy(ctx->memoryData, p, (size_t)ctx->memSize * sizeof(int));
+    p += (size_t)ctx->memSize * sizeof(int);
+    for (int k = 0; k < ctx->numLevels; k++) {
+        Cache* c = cacheLevel(ctx, k);
+        p += transferLevel(c, (unsigned char*)p, 0);
+        for (unsigned i = 0; i <= c->tagMask; i++) c->tagKeys[i] = -1;
+        for (int i = 0; i < c->numLines; i++) {
+            if (c->lines[i].valid) tagInsert(c, c->lines[i].tag, i);
+        }
+    }
+    markAllDirty(ctx);
+    return 1;
+}
+
+// Descarta checkpoints e registro de desfazer: o estado mudou por fora da
+// execução (edição, reconfiguração, reset, novo programa)
+static void forgetHistory(CPUContext* ctx) {
+    for (int i = 0; i < ctx->checkpointCount; i++) {
+        free(ctx->checkpoints[i].data);
+    }
+    ctx->checkpointCount    = 0;
+    ctx->checkpointBytes    = 0;
+    ctx->checkpointInterval = ctx->checkpointBase;
+    ctx->undoSize           = 0;
+    ctx->undoRecording      = 0;
+}
+
+// -----------------------------------------------------------
+// Contextos: criação, cópia e destruição
+// -----------------------------------------------------------
+DLL_EXPORT CPUContext* createCPUContext(void) {
+    CPUContext* ctx = (CPUContext*)calloc(1, sizeof(CPUContext));
+    if (!ctx) return NULL;
+    ctxInitCPU(ctx);
+    if (!ctx->memoryData || !ctx->events) {
+        destroyCPUContext(ctx);
+        return NULL;
+    }
+    return ctx;
+}
+
+DLL_EXPORT void destroyCPUContext(CPUContext* ctx) {
+    if (!ctx) return;
+    free(ctx->memoryData);
+    freeCache(&ctx->cache);
+    for (int k = 0; k < MAX_CACHE_LEVELS - 1; k++) {
+        freeCache(&ctx->lower[k]);
+    }
+    free(ctx->programText);
+    free(ctx->lineStart);
+    free(ctx->decodedProgram);
+    free(ctx->events);
+    free(ctx->historyText);
+    dirtyFree(&ctx->dirtyRegs);
+    dirtyFree(&ctx->dirtyMem);
+    dirtyFree(&ctx->dirtyLines);
+    forgetHistory(ctx);
+    free(ctx->undoLog);
+    profileFree(&ctx->profile);
+    free(ctx->coherenceLost);
+    if (ctx == &defaultContext) {
+        memset(ctx, 0, sizeof(*ctx));
+        return;
+    }
+    free(ctx);
+}
+
+// Cópia independente do estado completo (memória, cache, programa, contadores)
+DLL_EXPORT CPUContext* cloneCPUContext(const CPUContext* src) {
+    if (!src) return NULL;
+    CPUContext* ctx = (CPUContext*)malloc(sizeof(CPUContext));
+    if (!ctx) return NULL;
+    *ctx = *src;
+    ctx->memoryData      = NULL;
+    ctx->programText     = NULL;
+    ctx->lineStart       = NULL;
+    ctx->decodedProgram  = NULL;
+    ctx->events          = NULL;
+    ctx->historyText     = NULL;
+    ctx->historyTextSize = 0;
+    // A cópia é uma máquina isolada, com memória própria
+    ctx->system          = NULL;
+    ctx->coreId          = 0;
+    ctx->coherenceLost   = NULL;
+    // A cópia começa sem checkpoints nem registro de desfazer (mesmas configurações)
+    memset(ctx->checkpoints, 0, sizeof(ctx->checkpoints));
+    ctx->checkpointCount    = 0;
+    ctx->checkpointBytes    = 0;
+    ctx->checkpointInterval = src->checkpointBase;
+    ctx->undoLog            = NULL;
+    ctx->undoSize           = 0;
+    ctx->undoRecording      = 0;
+    memset(&ctx->cache, 0, sizeof(ctx->cache));
+    memset(ctx->lower, 0, sizeof(ctx->lower));
+    memset(&ctx->profile, 0, sizeof(ctx->profile));
+    memset(&ctx->dirtyRegs,  0, sizeof(DirtySet));
+    memset(&ctx->dirtyMem,   0, sizeof(DirtySet));
+    memset(&ctx->dirtyLines, 0, sizeof(DirtySet));
+    if (!dirtyClone(&ctx->dirtyRegs, &src->dirtyRegs) || !dirtyClone(&ctx->dirtyMem, &src->dirtyMem) ||
+        !dirtyClone(&ctx->dirtyLines, &src->dirtyLines)) {
+        destroyCPUContext(ctx);
+        return NULL;
+    }
+
+    if (src->programTextCapacity) {
+        ctx->programText = (char*)malloc(src->programTextCapacity);
+        if (!ctx->programText) {
+            destroyCPUContext(ctx);
+            return NULL;
+        }
+        memcpy(ctx->programText, src->programText, src->programTextSize);
+    }
+    if (src->instructionCapacity) {
+        size_t cap = (size_t)src->instructionCapacity;
+        ctx->lineStart      = (size_t*)malloc(cap * sizeof(size_t));
+        ctx->decodedProgram = (DecodedInstr*)malloc(cap * sizeof(DecodedInstr));
+        if (!ctx->lineStart || !ctx->decodedProgram) {
+            destroyCPUContext(ctx);
+            return NULL;
+        }
+        memcpy(ctx->lineStart, src->lineStart, (size_t)src->instructionCount * sizeof(size_t));
+        memcpy(ctx->decodedProgram, src->decodedProgram, (size_t)src->instructionCount * sizeof(DecodedInstr));
+    }
+
+    if (src->events) {
+        size_t bytes = (size_t)src->eventCapacity * sizeof(ExecEvent);
+        ctx->events = (ExecEvent*)malloc(bytes);
+        if (!ctx->events) {
+            destroyCPUContext(ctx);
+            return NULL;
+        }
+        memcpy(ctx->events, src->events, bytes);
+    }
+
+    if (src->memSize > 0) {
+        ctx->memoryData = (int*)malloc((size_t)src->memSize * sizeof(int));
+        if (!ctx->memoryData || !cloneCache(&ctx->cache, &src->cache)) {
+            destroyCPUContext(ctx);
+            return NULL;
+        }
+        memcpy(ctx->memoryData, src->memoryData, (size_t)src->memSize * sizeof(int));
+        for (int k = 0; k < src->numLevels - 1; k++) {
+            if (!cloneCache(&ctx->lower[k], &src->lower[k])) {
+                destroyCPUContext(ctx);
+                return NULL;
+            }
+        }
+    }
+    if (!profileClone(&ctx->profile, &src->profile)) {
+        destroyCPUContext(ctx);
+        return NULL;
+    }
+    return ctx;
+}
+
+DLL_EXPORT CPUContext* getDefaultCPUContext(void) {
+    return &defaultContext;
+}
+
+// Nenhuma parada registrada (antes de runUntilBreak e depois de um reset)
+static void clearBreakInfo(CPUContext* ctx) {
+    memset(&ctx->breakInfo, 0, sizeof(ctx->breakInfo));
+    ctx->breakInfo.id      = -1;
+    ctx->breakInfo.pc      = -1;
+    ctx->breakInfo.address = -1;
+}
+
+// -----------------------------------------------------------
+// Implementações exportadas
+// -----------------------------------------------------------
+DLL_EXPORT void ctxInitCPU(CPUContext* ctx) {
+    if (ctx->system) return;
+    // Mapeamento Direto e LRU por padrão
+    ctx->cache.mappingMode = 0;
+    ctx->cache.setWays     = 2;
+    ctx->cache.policy      = REPL_LRU;
+    ctx->cache.rngSeed     = 0;
+    ctx->cache.writePolicy   = WRITE_THROUGH;
+    ctx->cache.writeAllocate = 1;
+
+    // Só a L1
+    for (int k = 0; k < MAX_CACHE_LEVELS - 1; k++) {
+        freeCache(&ctx->lower[k]);
+    }
+    ctx->numLevels = 1;
+
+    // Temporização padrão, execução sequencial
+    ctx->timing.hitLatency  = DEFAULT_HIT_LATENCY;
+    ctx->timing.missLatency = DEFAULT_MISS_LATENCY;
+    ctx->timing.memLatency  = DEFAULT_MEM_LATENCY;
+    ctx->timing.aluLatency  = DEFAULT_ALU_LATENCY;
+    ctx->pipelineMode = 0;
+    ctx->forwarding   = 1;
+
+    // Sem prefetch
+    ctx->prefetcher.config.kind     = PREFETCH_NONE;
+    ctx->prefetcher.config.degree   = 1;
+    ctx->prefetcher.config.distance = 1;
+
+    // Sem pontos de parada
+    ctxClearBreakpoints(ctx);
+    clearBreakInfo(ctx);
+
+    // Geometria padrão: 10 palavras de memória, 4 linhas de 1 palavra
+    allocateMachine(ctx, DEFAULT_MEM_SIZE, DEFAULT_CACHE_LINES, DEFAULT_BLOCK_WORDS);
+    fillDefaultMemory(ctx);
+
+    // Zera registradores
+    memset(ctx->regs, 0, sizeof(ctx->regs));
+
+    // Invalida cache
+    invalidateCaches(ctx);
+
+    // Zera histórico (mantém a capacidade configurada)
+    if (!ctx->events) {
+        ctx->events = (ExecEvent*)malloc(DEFAULT_EVENT_CAPACITY * sizeof(ExecEvent));
+        ctx->eventCapacity = ctx->events ? DEFAULT_EVENT_CAPACITY : 0;
+    }
+    ctx->eventOldest = ctx->eventNext;
+    ctx->stepCount   = 0;
+    // Zera instruções (count e índice; os buffers do programa são reaproveitados)
+    ctx->programTextSize    = 0;
+    ctx->instructionCount   = 0;
+    ctx->currentInstrIndex  = 0;
+    ctx->assembleErrorCount = 0;
+    ctx->assembleErrors[0]  = '\0';
+
+    // Zera textos
+    strcpy(ctx->lastOperationText, "");
+    strcpy(ctx->lastExplanationText, "");
+
+    ctx->totalCycles     = 0;
+    ctx->lastInstrCost   = 0;
+    ctx->explanationMode = 0;
+    memset(&ctx->pipe, 0, sizeof(ctx->pipe));
+    memset(ctx->opcodeCounts, 0, sizeof(ctx->opcodeCounts));
+    memset(ctx->opcodeCycles, 0, sizeof(ctx->opcodeCycles));
+    memset(&ctx->traceStats, 0, sizeof(ctx->traceStats));
+    forgetHistory(ctx);
+}
+
+static void resetContext(CPUContext* ctx) {
+    // Mantém instruções, mas reinicia memória, regs, cache, ciclos, histórico
+    fillDefaultMemory(ctx);  // Reaplica i*10
+    memset(ctx->regs, 0, sizeof(ctx->regs));
+
+    invalidateCaches(ctx);
+    markAllDirty(ctx);
+
+    ctx->eventOldest       = ctx->eventNext;
+    ctx->stepCount         = 0;
+    ctx->currentInstrIndex = 0;
+
+    ctx->totalCycles   = 0;
+    ctx->lastInstrCost = 0;
+    memset(&ctx->pipe, 0, sizeof(ctx->pipe));
+    memset(ctx->opcodeCounts, 0, sizeof(ctx->opcodeCounts));
+    memset(ctx->opcodeCycles, 0, sizeof(ctx->opcodeCycles));
+    memset(&ctx->traceStats, 0, sizeof(ctx->traceStats));
+    forgetHistory(ctx);
+    clearBreakInfo(ctx);
+
+    strcpy(ctx->lastOperationText, "");
+    strcpy(ctx->lastExplanationText, "");
+}
+
+DLL_EXPORT void ctxResetCPU(CPUContext* ctx) {
+    // A memória é compartilhada: reiniciar um núcleo reinicia todos
+    if (ctx->system) {
+        mcReset(ctx->system);
+        return;
+    }
+    resetContext(ctx);
+}
+
+// -----------------------------------------------------------
+// Montagem: decodifica o texto das instruções uma única vez
+// -----------------------------------------------------------
+// Converte "R1".."R4" no índice do registrador (0..NUM_REGS-1), ou -1
+static int parseRegister(const char* s) {
+    if (!s || s[0] != 'R' || s[1] < '1' || s[1] > '0' + NUM_REGS || s[2] != '\0') {
+        return -1;
+    }
+    return s[1] - '1';
+}
+
+static int parseAddress(const char* s, int* out) {
+    if (!s) return 0;
+    char* end;
+    long v = strtol(s, &end, 10);
+    if (end == s || *end != '\0') return 0;
+    *out = (int)v;
+    return 1;
+}
+
+// "[Rn]": registrador com o endereço (endereçamento indireto), ou -1
+static int parseIndirect(const char* s) {
+    char reg[4];
+    size_t len = s ? strlen(s) : 0;
+    if (len < 3 || len > 4 || s[0] != '[' || s[len - 1] != ']') return -1;
+    memcpy(reg, s + 1, len - 2);
+    reg[len - 2] = '\0';
+    return parseRegister(reg);
+}
+
+static int isSeparator(char ch) {
+    return ch == ' ' || ch == '\t' || ch == '\r' || ch == '\n' || ch == ',';
+}
+
+static int isLabelChar(char ch, int first) {
+    return ch == '_' || (ch >= 'a' && ch <= 'z') || (ch >= 'A' && ch <= 'Z') ||
+           (!first && ch >= '0' && ch <= '9');
+}
+
+static int validLabel(const char* s) {
+    size_t len = strlen(s);
+    if (len == 0 || len >= MAX_LABEL_LEN || !isLabelChar(s[0], 1)) return 0;
+    for (size_t i = 1; i < len; i++) {
+        if (!isLabelChar(s[i], 0)) return 0;
+    }
+    return 1;
+}
+
+// Remove o comentário (';' até o fim) e o rótulo inicial ("nome:") da linha,
+// in-place. *label recebe o rótulo ou NULL; retorna o resto da linha, ou
+// NULL se o rótulo tiver nome inválido.
+static char* splitLabel(char* line, char** label) {
+    char* comment = strchr(line, ';');
+    if (comment) *comment = '\0';
+    *label = NULL;
+
+    char* p = line;
+    while (*p && isSeparator(*p)) p++;
+    char* start = p;
+    while (*p && !isSeparator(*p) && *p != ':') p++;
+    if (*p != ':') return start;
+
+    *p = '\0';
+    if (!validLabel(start)) return NULL;
+    *label = start;
+    return p + 1;
+}
+
+// -----------------------------------------------------------
+// Tabela de rótulos (hash aberto, só durante a montagem)
+// -----------------------------------------------------------
+typedef struct {
+    char name[MAX_LABEL_LEN];
+    int  line;              // -1 = posição livre
+} LabelEntry;
+
+typedef struct {
+    LabelEntry* slots;
+    unsigned    mask;
+    int         count;
+} LabelTable;
+
+static unsigned hashName(const char* s) {
+    unsigned h = 2166136261u;   // FNV-1a
+    while (*s) {
+        h = (h ^ (unsigned char)*s++) * 16777619u;
+    }
+    return h;
+}
+
+static int labelTableInit(LabelTable* t, int count) {
+    unsigned size = 16;
+    while (size < 2u * (unsigned)count) size <<= 1;
+    t->slots = (LabelEntry*)malloc(size * sizeof(LabelEntry));
+    t->mask  = size - 1;
+    t->count = 0;
+    if (!t->slots) return 0;
+    for (unsigned i = 0; i < size; i++) t->slots[i].line = -1;
+    return 1;
+}
+
+// Posição do rótulo na tabela (ocupada por ele ou a primeira livre)
+static LabelEntry* labelSlot(const LabelTable* t, const char* name) {
+    unsigned i = hashName(name) & t->mask;
+    while (t->slots[i].line != -1 && strcmp(t->slots[i].name, name) != 0) {
+        i = (i + 1) & t->mask;
+    }
+    return &t->slots[i];
+}
+
+// Linha do rótulo, ou -1
+static int labelFind(const LabelTable* t, const char* name) {
+    if (!t->slots) return -1;
+    return labelSlot(t, name)->line;
+}
+
+// Insere um rótulo ainda não existente (a tabela dobra ao passar de metade cheia).
+// Retorna 0 sem memória.
+static int labelInsert(LabelTable* t, const char* name, int line) {
+    if (!t->slots) return 0;
+    if (2u * (unsigned)(t->count + 1) > t->mask + 1) {
+        LabelTable grown;
+        if (!labelTableInit(&grown, t->count + 1)) return 0;
+        for (unsigned i = 0; i <= t->mask; i++) {
+            if (t->slots[i].line != -1) *labelSlot(&grown, t->slots[i].name) = t->slots[i];
+        }
+        grown.count = t->count;
+        free(t->slots);
+        *t = grown;
+    }
+    LabelEntry* e = labelSlot(t, name);
+    strcpy(e->name, name);
+    e->line = line;
+    t->count++;
+    return 1;
+}
+
+// Divide a linha (in-place) em até maxTok tokens; retorna quantos encontrou.
+// Ao contrário de strtok, não guarda estado global (seguro entre threads).
+static int splitTokens(char* line, char* tok[], int maxTok) {
+    int n = 0;
+    char* p = line;
+    while (*p && n < maxTok) {
+        while (*p && isSeparator(*p)) p++;
+        if (!*p) break;
+        tok[n++] = p;
+        while (*p && !isSeparator(*p)) p++;
+        if (*p) *p++ = '\0';
+    }
+    return n;
+}
+
+// Decodifica a linha lineIndex. Um rótulo novo na linha entra na tabela;
+// rótulos dos desvios são resolvidos por ela (ainda não definido: erro
+// ERR_LABEL_UNDEF, que a montagem refaz no fim).
+// Retorna 1 se válida; senão marca OP_INVALID e retorna 0.
+static int decodeLine(const char* text, LabelTable* labels, int lineIndex, DecodedInstr* out) {
+    char line[MAX_STR_SIZE];
+    size_t len = text ? strlen(text) : 0;
+    if (len > MAX_STR_SIZE - 1) len = MAX_STR_SIZE - 1;
+    if (len) memcpy(line, text, len);
+    line[len] = '\0';
+
+    memset(out, 0, sizeof(*out));
+    out->opcode = OP_INVALID;
+
+    char* label;
+    char* code = splitLabel(line, &label);
+    if (!code) {
+        out->rd = ERR_LABEL_NAME;
+        return 0;
+    }
+    if (label) {
+        int at = labelFind(labels, label);
+        if (at < 0) {
+            labelInsert(labels, label, lineIndex);   // Sem memória: desvios para ele falham
+        } else if (at != lineIndex) {
+            out->rd = ERR_LABEL_DUP;   // Já definido numa linha anterior
+            return 0;
+        }
+    }
+
+    // Vírgulas são opcionais: "LOAD R1, 5" e "LOAD R1 5" são equivalentes
+    char* tok[5] = { NULL };
+    int   n      = splitTokens(code, tok, 5);
+
+    if (n == 0) {
+        // Linha vazia, só com rótulo ou só com comentário: não executa
+        out->opcode = OP_NONE;
+        return 1;
+    }
+
+    if (strcmp(tok[0], "LOAD") == 0 || strcmp(tok[0], "STORE") == 0) {
+        int reg  = parseRegister(tok[1]);
+        int base = parseIndirect(tok[2]);
+        int address = 0;
+        if (n != 3 || reg < 0 || (base < 0 && !parseAddress(tok[2], &address))) {
+            out->rd = ERR_LOADSTORE;
+            return 0;
+        }
+        out->opcode = (strcmp(tok[0], "LOAD") == 0) ? OP_LOAD : OP_STORE;
+        out->rd     = (unsigned char)reg;
+        out->imm    = address;
+        if (base >= 0) {
+            out->rs1   = (unsigned char)base;
+            out->flags = DI_INDIRECT;
+        }
+        return 1;
+    }
+
+    if (strcmp(tok[0], "ADD") == 0 || strcmp(tok[0], "SUB") == 0) {
+        int d  = parseRegister(tok[1]);
+        int s1 = parseRegister(tok[2]);
+        int s2 = parseRegister(tok[3]);
+        if (n != 4 || d < 0 || s1 < 0 || s2 < 0) {
+            out->rd = ERR_ALU;
+            return 0;
+        }
+        out->opcode = (strcmp(tok[0], "ADD") == 0) ? OP_ADD : OP_SUB;
+        out->rd     = (unsigned char)d;
+        out->rs1    = (unsigned char)s1;
+        out->rs2    = (unsigned char)s2;
+        return 1;
+    }
+
+    if (strcmp(tok[0], "ADDI") == 0 || strcmp(tok[0], "LI") == 0) {
+        int isAddi = strcmp(tok[0], "ADDI") == 0;
+        int d  = parseRegister(tok[1]);
+        int s1 = isAddi ? parseRegister(tok[2]) : 0;
+        int imm;
+        if (n != (isAddi ? 4 : 3) || d < 0 || s1 < 0 || !parseAddress(tok[n - 1], &imm)) {
+            out->rd = ERR_IMMEDIATE;
+            return 0;
+        }
+        out->opcode = isAddi ? OP_ADDI : OP_LI;
+        out->rd     = (unsigned char)d;
+        out->rs1    = (unsigned char)s1;
+        out->imm    = imm;
+        return 1;
+    }
+
+    if (strcmp(tok[0], "BEQ") == 0 || strcmp(tok[0], "BNE") == 0 || strcmp(tok[0], "JMP") == 0) {
+        int isJump = strcmp(tok[0], "JMP") == 0;
+        int s1 = isJump ? 0 : parseRegister(tok[1]);
+        int s2 = isJump ? 0 : parseRegister(tok[2]);
+        if (n != (isJump ? 2 : 4) || s1 < 0 || s2 < 0 || !validLabel(tok[n - 1])) {
+            out->rd = ERR_BRANCH;
+            return 0;
+        }
+        int target = labelFind(labels, tok[n - 1]);
+        if (target < 0) {
+            out->rd = ERR_LABEL_UNDEF;
+            return 0;
+        }
+        out->opcode = isJump ? OP_JMP : (strcmp(tok[0], "BEQ") == 0 ? OP_BEQ : OP_BNE);
+        out->rs1    = (unsigned char)s1;
+        out->rs2    = (unsigned char)s2;
+        out->imm    = target;
+        return 1;
+    }
+
+    out->rd = ERR_UNKNOWN;
+    return 0;
+}
+
+// -----------------------------------------------------------
+// Armazenamento do programa e montagem em uma passagem
+// -----------------------------------------------------------
+static const char* programLine(const CPUContext* ctx, int index) {
+    return ctx->programText + ctx->lineStart[index];
+}
+
+// Garante espaço para mais extra bytes de texto
+static int reserveText(CPUContext* ctx, size_t extra) {
+    size_t needed = ctx->programTextSize + extra;
+    if (needed <= ctx->programTextCapacity) return 1;
+    size_t cap = ctx->programTextCapacity ? ctx->programTextCapacity : PROGRAM_TEXT_INITIAL;
+    while (cap < needed) cap *= 2;
+    char* grown = (char*)realloc(ctx->programText, cap);
+    if (!grown) return 0;
+    ctx->programText         = grown;
+    ctx->programTextCapacity = cap;
+    return 1;
+}
+
+// Garante espaço para mais uma linha
+static int reserveLine(CPUContext* ctx) {
+    if (ctx->instructionCount < ctx->instructionCapacity) return 1;
+    int cap = ctx->instructionCapacity ? ctx->instructionCapacity * 2 : PROGRAM_LINES_INITIAL;
+    size_t* starts = (size_t*)realloc(ctx->lineStart, (size_t)cap * sizeof(size_t));
+    if (!starts) return 0;
+    ctx->lineStart = starts;
+    DecodedInstr* decoded = (DecodedInstr*)realloc(ctx->decodedProgram, (size_t)cap * sizeof(DecodedInstr));
+    if (!decoded) return 0;
+    ctx->decodedProgram      = decoded;
+    ctx->instructionCapacity = cap;
+    return 1;
+}
+
+// Estado da montagem: rótulos vistos até agora e linhas com desvio para
+// rótulos ainda não definidos (decodificadas de novo no fim)
+typedef struct {
+    LabelTable labels;
+    int* pending;
+    int  pendingCount;
+    int  pendingCapacity;
+} Assembler;
+
+static void beginProgram(CPUContext* ctx, Assembler* as) {
+    ctx->programTextSize   = 0;
+    ctx->instructionCount  = 0;
+    ctx->currentInstrIndex = 0;
+    forgetHistory(ctx);
+    // Novo programa: os contadores por instrução recomeçam
+    if (ctx->profile.pcs) {
+        memset(ctx->profile.pcs, 0, (size_t)ctx->profile.pcCapacity * sizeof(PcProfile));
+    }
+    memset(as, 0, sizeof(*as));
+    labelTableInit(&as->labels, 0);
+}
+
+// Fecha a linha cujo texto está em programText[start, programTextSize) e a monta
+static int finishLine(CPUContext* ctx, Assembler* as, size_t start) {
+    if (ctx->programTextSize > start && ctx->programText[ctx->programTextSize - 1] == '\r') {
+        ctx->programTextSize--;
+    }
+    if (!reserveText(ctx, 1) || !reserveLine(ctx)) return 0;
+    ctx->programText[ctx->programTextSize++] = '\0';
+
+    int i = ctx->instructionCount++;
+    ctx->lineStart[i] = start;
+    DecodedInstr* out = &ctx->decodedProgram[i];
+    if (!decodeLine(programLine(ctx, i), &as->labels, i, out) && out->rd == ERR_LABEL_UNDEF) {
+        if (as->pendingCount == as->pendingCapacity) {
+            int cap = as->pendingCapacity ? as->pendingCapacity * 2 : 64;
+            int* grown = (int*)realloc(as->pending, (size_t)cap * sizeof(int));
+            if (!grown) return 0;
+            as->pending         = grown;
+            as->pendingCapacity = cap;
+        }
+        as->pending[as->pendingCount++] = i;
+    }
+    return 1;
+}
+
+static int appendLine(CPUContext* ctx, Assembler* as, const char* text) {
+    size_t len   = text ? strlen(text) : 0;
+    size_t start = ctx->programTextSize;
+    if (!reserveText(ctx, len)) return 0;
+    if (len) memcpy(ctx->programText + start, text, len);
+    ctx->programTextSize += len;
+    return finishLine(ctx, as, start);
+}
+
+// Resolve os desvios para frente e registra os erros, na ordem das linhas.
+// ok = 0 (falta de memória durante a leitura) descarta o programa.
+static void endProgram(CPUContext* ctx, Assembler* as, int ok) {
+    for (int k = 0; ok && k < as->pendingCount; k++) {
+        int i = as->pending[k];
+        decodeLine(programLine(ctx, i), &as->labels, i, &ctx->decodedProgram[i]);
+    }
+    free(as->pending);
+    free(as->labels.slots);
+
+    ctx->assembleErrorCount = 0;
+    ctx->assembleErrors[0]  = '\0';
+    if (!ok) {
+        ctx->instructionCount = 0;
+        ctx->programTextSize  = 0;
+        return;
+    }
+    size_t used = 0;
+    for (int i = 0; i < ctx->instructionCount; i++) {
+        const DecodedInstr* in = &ctx->decodedProgram[i];
+        if (in->opcode != OP_INVALID) continue;
+        ctx->assembleErrorCount++;
+        if (used < sizeof(ctx->assembleErrors)) {
+            int w = snprintf(ctx->assembleErrors + used, sizeof(ctx->assembleErrors) - used,
+                             "Linha %d (%.*s): %s\n", i, MAX_STR_SIZE - 1, programLine(ctx, i),
+                             decodeErrorText[in->rd]);
+            if (w > 0) used += (size_t)w;
+        }
+    }
+}
+
+// Carrega instruções-padrão
+DLL_EXPORT void ctxLoadDefaultInstructions(CPUContext* ctx) {
+    // NOVA LISTA de 7 instruções
+    static const char* defaultInstructs[] = {
+        "LOAD R1, 5",
+        "LOAD R2, 9",
+        "ADD R3, R1, R2",
+        "STORE R3, 2",
+        "LOAD R4, 4",
+        "SUB R1, R4, R2",
+        "STORE R1, 3"
+    };
+    const int defaultCount = 7;
+
+    Assembler as;
+    int ok = 1;
+    beginProgram(ctx, &as);
+    for (int i = 0; ok && i < defaultCount; i++) {
+        ok = appendLine(ctx, &as, defaultInstructs[i]);
+    }
+    endProgram(ctx, &as, ok);
+}
+
+// Retorna o número de linhas carregadas, ou -1 sem memória (programa vazio)
+DLL_EXPORT int ctxSetInstructions(CPUContext* ctx, char* instructions[], int count) {
+    Assembler as;
+    int ok = 1;
+    beginProgram(ctx, &as);
+    // Linhas nulas contam como vazias
+    for (int i = 0; ok && i < count; i++) {
+        ok = appendLine(ctx, &as, instructions[i]);
+    }
+    endProgram(ctx, &as, ok);
+    return ok ? ctx->instructionCount : -1;
+}
+
+// Lê e monta o arquivo em blocos, numa única passagem: cada linha é copiada
+// uma vez para programText e decodificada assim que termina.
+DLL_EXPORT int ctxLoadProgramFile(CPUContext* ctx, const char* path) {
+    FILE* f = path ? fopen(path, "rb") : NULL;
+    if (!f) return -1;
+
+    char buf[PROGRAM_READ_BLOCK];
+    Assembler as;
+    beginProgram(ctx, &as);
+    size_t start = 0;
+    size_t n;
+    int ok = 1, first = 1;
+    while (ok && (n = fread(buf, 1, sizeof(buf), f)) > 0) {
+        const char* p   = buf;
+        const char* end = buf + n;
+        if (first && n >= 3 && memcmp(p, "\xEF\xBB\xBF", 3) == 0) p += 3;   // BOM UTF-8
+        first = 0;
+        while (ok && p < end) {
+            const char* nl = (const char*)memchr(p, '\n', (size_t)(end - p));
+            size_t len = (size_t)((nl ? nl : end) - p);
+            if (!reserveText(ctx, len)) {
+                ok = 0;
+                break;
+            }
+            memcpy(ctx->programText + ctx->programTextSize, p, len);
+            ctx->programTextSize += len;
+            if (!nl) break;   // Linha continua no próximo bloco
+            ok    = finishLine(ctx, &as, start);
+            start = ctx->programTextSize;
+            p     = nl + 1;
+        }
+    }
+    // Última linha sem '\n'
+    if (ok && ctx->programTextSize > start) ok = finishLine(ctx, &as, start);
+    if (ferror(f)) ok = 0;
+    fclose(f);
+
+    endProgram(ctx, &as, ok);
+    return ok ? ctx->instructionCount : -1;
+}
+
+DLL_EXPORT int ctxGetInstructionCount(CPUContext* ctx) {
+    return ctx->instructionCount;
+}
+
+DLL_EXPORT const char* ctxGetInstructionLine(CPUContext* ctx, int index) {
+    if (index < 0 || index >= ctx->instructionCount) {
+        return "";
+    }
+    return programLine(ctx, index);
+}
+
+DLL_EXPORT int ctxGetAssembleErrorCount(CPUContext* ctx) {
+    return ctx->assembleErrorCount;
+}
+
+DLL_EXPORT const char* ctxGetAssembleErrors(CPUContext* ctx) {
+    return ctx->assembleErrors;
+}
+
+// -----------------------------------------------------------
+// Execução - executa a instrução já decodificada
+// -----------------------------------------------------------
+// Executa uma instrução. Retorna 1 se executou, 0 se o programa acabou.
+// -----------------------------------------------------------
+// Alterações desde a última consulta
+// -----------------------------------------------------------
+// Copia os índices alterados (registradores, endereços de memória, linhas
+// de cache) e limpa os conjuntos. counts[0..2] recebe a quantidade de cada
+// um, ou -1 quando tudo deve ser redesenhado (reset, reconfiguração, ou
+// mais alterações do que cabem no buffer). Retorna 1 se algo mudou.
+DLL_EXPORT int ctxConsumeDirty(CPUContext* ctx, int* regsOut, int maxRegs, int* memOut, int maxMem,
+                               int* linesOut, int maxLines, int* countsOut) {
+    int counts[3];
+    counts[0] = dirtyConsume(&ctx->dirtyRegs,  regsOut,  maxRegs);
+    counts[1] = dirtyConsume(&ctx->dirtyMem,   memOut,   maxMem);
+    counts[2] = dirtyConsume(&ctx->dirtyLines, linesOut, maxLines);
+    if (countsOut) memcpy(countsOut, counts, sizeof(counts));
+    return counts[0] != 0 || counts[1] != 0 || counts[2] != 0;
+}
+
+// Grava um evento no log circular (sobrescreve o mais antigo quando cheio)
+static void logEvent(CPUContext* ctx, ExecEvent* ev) {
+    if (ctx->eventCapacity <= 0) return;
+    ev->seq = ctx->eventNext++;
+    ctx->events[ev->seq % ctx->eventCapacity] = *ev;
+    if (ctx->eventNext - ctx->eventOldest > ctx->eventCapacity) {
+        ctx->eventOldest = ctx->eventNext - ctx->eventCapacity;
+    }
+}
+
+static int validAddress(const CPUContext* ctx, int address) {
+    return address >= 0 && address < ctx->memSize;
+}
+
+static int writeEventText(const CPUContext* ctx, const ExecEvent* ev, char* out, size_t size);
+
+// Latência da instrução executada sozinha (modo sequencial). LOAD/STORE
+// custam o que o acesso à cache acabou de medir (lastAccessLatency).
+static int instructionLatency(const CPUContext* ctx, const DecodedInstr* in) {
+    switch (in->opcode) {
+    case OP_LOAD:
+    case OP_STORE: return ctx->lastAccessLatency;
+    case OP_ADD:
+    case OP_SUB:
+    case OP_ADDI:
+    case OP_LI:
+    case OP_BEQ:
+    case OP_BNE:   return ctx->timing.aluLatency;
+    case OP_JMP:   return 1;
+    default:       return 0;
+    }
+}
+
+// Ciclo a partir do qual a instrução pode entrar no estágio que consome o
+// operando reg. Com forwarding, o valor é adiantado assim que produzido.
+// Sem forwarding, a leitura é no ID, que pode terminar no mesmo ciclo do WB
+// do produtor (escrita na primeira metade do ciclo, leitura na segunda):
+// a instrução só sai do ID para o EX no fim desse WB.
+static long long operandReady(const CPUContext* ctx, int reg) {
+    if (reg < 0) return 0;
+    return ctx->forwarding ? ctx->pipe.regForward[reg] : ctx->pipe.regWriteBack[reg] + 1;
+}
+
+static long long maxReady(long long a, long long b) {
+    return a > b ? a : b;
+}
+
+// Passa a instrução pelo pipeline; retorna os ciclos acrescentados ao total
+// (fim do WB desta instrução menos o fim do WB da anterior). Desvios são
+// previstos como não tomados: BEQ/BNE resolvem no EX e JMP no ID, e um
+// desvio tomado atrasa a busca da instrução seguinte até esse ponto.
+static int pipelineIssue(CPUContext* ctx, const DecodedInstr* in, int hit, int taken) {
+    Pipeline* p  = &ctx->pipe;
+    int op       = in->opcode;
+    int isMem    = op == OP_LOAD || op == OP_STORE;
+    int indirect = isMem && (in->flags & DI_INDIRECT);
+    int first    = p->stats.instructions == 0;
+
+    int lat[NUM_STAGES] = { 1, 1, 1, 1, 1 };
+    if (isMem)            lat[ST_MEM] = ctx->lastAccessLatency;
+    else if (op != OP_JMP) lat[ST_EX]  = ctx->timing.aluLatency;
+
+    // Operandos lidos no EX (ULA, comparação, endereço [Rn]); STORE lê rd (o dado) no MEM
+    long long exReady = 0, memReady = 0;
+    if (op == OP_ADD || op == OP_SUB || op == OP_BEQ || op == OP_BNE) {
+        exReady = maxReady(operandReady(ctx, in->rs1), operandReady(ctx, in->rs2));
+    } else if (op == OP_ADDI || indirect) {
+        exReady = operandReady(ctx, in->rs1);
+    }
+    if (op == OP_STORE) {
+        memReady = operandReady(ctx, in->rd);
+    }
+    if (!ctx->forwarding) {
+        // Sem forwarding todos os operandos são lidos no ID
+        exReady  = maxReady(exReady, memReady);
+        memReady = 0;
+    }
+
+    long long start[NUM_STAGES], end[NUM_STAGES];
+    long long rawStall = 0, controlStall = 0;
+    for (int s = 0; s < NUM_STAGES; s++) {
+        // Entra no estágio quando sai do anterior e a instrução anterior já o liberou
+        long long t = s == 0 ? 0 : end[s - 1];
+        if (!first) {
+            long long freed = s + 1 < NUM_STAGES ? p->prevStart[s + 1] : p->prevEnd[s];
+            if (freed > t) t = freed;
+        }
+        // Desvio tomado na instrução anterior: busca só depois de resolvido
+        if (s == ST_IF && t < p->fetchReady) {
+            controlStall += p->fetchReady - t;
+            t = p->fetchReady;
+        }
+        // Dependências RAW seguram a instrução no estágio anterior (bolhas)
+        long long ready = s == ST_EX ? exReady : s == ST_MEM ? memReady : 0;
+        if (t < ready) {
+            rawStall += ready - t;
+            t = ready;
+        }
+        start[s] = t;
+        end[s]   = t + lat[s];
+    }
+
+    // Registrador escrito: LOAD tem o valor no fim do MEM; operações da ULA no fim do EX
+    if (op == OP_LOAD || op == OP_ADD || op == OP_SUB || op == OP_ADDI || op == OP_LI) {
+        p->regForward[in->rd]   = op == OP_LOAD ? end[ST_MEM] : end[ST_EX];
+        p->regWriteBack[in->rd] = start[ST_WB];
+    }
+    p->fetchReady = !taken ? 0 : op == OP_JMP ? end[ST_ID] : end[ST_EX];
+
+    int cost = (int)(end[ST_WB] - (first ? 0 : p->prevEnd[ST_WB]));
+    memcpy(p->prevStart, start, sizeof(start));
+    memcpy(p->prevEnd, end, sizeof(end));
+    p->stats.instructions++;
+    p->stats.cycles         = end[ST_WB];
+    p->stats.rawStalls     += rawStall;
+    p->stats.controlStalls += controlStall;
+    p->stats.memStalls     += lat[ST_MEM] - 1;
+    p->stats.exStalls      += lat[ST_EX] - 1;
+    if (isMem && !hit) p->stats.missStalls += lat[ST_MEM] - ctx->timing.hitLatency;
+    return cost;
+}
+
+// Custo da instrução conforme o modo (sequencial ou pipeline)
+static int instructionCost(CPUContext* ctx, const DecodedInstr* in, int hit, int taken) {
+    if (in->opcode == OP_INVALID) return 0;
+    if (ctx->pipelineMode) return pipelineIssue(ctx, in, hit, taken);
+    return instructionLatency(ctx, in);
+}
+
+// -----------------------------------------------------------
+// Histórico de execução: checkpoints periódicos e registro de desfazer
+// -----------------------------------------------------------
+// Fica um checkpoint a cada dois (o primeiro e os múltiplos do novo intervalo)
+static void thinCheckpoints(CPUContext* ctx) {
+    ctx->checkpointInterval *= 2;
+    ctx->checkpointBytes = 0;
+    int kept = 0;
+    for (int i = 0; i < ctx->checkpointCount; i++) {
+        Checkpoint* cp = &ctx->checkpoints[i];
+        if (i == 0 || cp->step % ctx->checkpointInterval == 0) {
+            ctx->checkpointBytes += cp->size;
+            ctx->checkpoints[kept++] = *cp;
+        } else {
+            free(cp->data);
+        }
+    }
+    ctx->checkpointCount = kept;
+}
+
+static void addCheckpoint(CPUContext* ctx) {
+    size_t size = checkpointSize(ctx);
+    if (ctx->checkpointCount == MAX_CHECKPOINTS ||
+        (ctx->checkpointCount > 1 && ctx->checkpointBytes + size > CHECKPOINT_MAX_BYTES)) {
+        thinCheckpoints(ctx);
+        if (ctx->stepCount % ctx->checkpointInterval != 0) return;
+    }
+    if (ctx->checkpointCount > 0 && ctx->checkpointBytes + size > CHECKPOINT_MAX_BYTES) return;
+    unsigned char* data = (unsigned char*)malloc(size);
+    if (!data) return;
+    writeCheckpoint(ctx, data);
+    Checkpoint* cp = &ctx->checkpoints[ctx->checkpointCount++];
+    cp->step = ctx->stepCount;
+    cp->size = size;
+    cp->data = data;
+    ctx->checkpointBytes += size;
+}
+
+// Descarta os checkpoints posteriores a step (execução desfeita)
+static void dropCheckpointsAfter(CPUContext* ctx, int step) {
+    while (ctx->checkpointCount > 0 && ctx->checkpoints[ctx->checkpointCount - 1].step > step) {
+        Checkpoint* cp = &ctx->checkpoints[--ctx->checkpointCount];
+        ctx->checkpointBytes -= cp->size;
+        free(cp->data);
+    }
+}
+
+// Antes de cada passo: checkpoint periódico e abertura do registro de desfazer
+// (cabeçalho com o estado escalar e os textos da última operação)
+static void beginStep(CPUContext* ctx) {
+    if (ctx->checkpointInterval > 0 && ctx->stepCount % ctx->checkpointInterval == 0 &&
+        (ctx->checkpointCount == 0 || ctx->checkpoints[ctx->checkpointCount - 1].step < ctx->stepCount)) {
+        addCheckpoint(ctx);
+    }
+    if (ctx->undoCapacity == 0) return;
+    if (!ctx->undoLog) {
+        ctx->undoLog = (unsigned char*)malloc(ctx->undoCapacity);
+        if (!ctx->undoLog) return;
+    }
+    size_t opLen  = strlen(ctx->lastOperationText) + 1;
+    size_t expLen = strlen(ctx->lastExplanationText) + 1;
+    ctx->undoRecording = 1;
+    ctx->undoSetCount  = 0;
+    ctx->undoRecord    = ctx->undoSize;
+    unsigned char* p = undoReserve(ctx, sizeof(UndoHeader) + opLen + expLen);
+    if (!p) return;
+    UndoHeader h;
+    memset(&h, 0, sizeof(h));
+    h.textBytes = (int)(opLen + expLen);
+    saveState(ctx, &h.state);
+    memcpy(p, &h, sizeof(h));
+    memcpy(p + sizeof(h), ctx->lastOperationText, opLen);
+    memcpy(p + sizeof(h) + opLen, ctx->lastExplanationText, expLen);
+}
+
+// Depois do passo: fecha o registro com o tamanho no início e no fim
+static void endStep(CPUContext* ctx) {
+    if (!ctx->undoRecording) return;
+    unsigned char* p = undoReserve(ctx, sizeof(size_t));
+    if (!p) return;
+    size_t size = ctx->undoSize - ctx->undoRecord;
+    memcpy(p, &size, sizeof(size));
+    memcpy(ctx->undoLog + ctx->undoRecord, &size, sizeof(size));
+    ctx->undoRecording = 0;
+}
+
+// Desfaz o último passo registrado; retorna 0 se o registro estiver vazio
+static int popUndoRecord(CPUContext* ctx) {
+    if (ctx->undoSize == 0) return 0;
+    size_t size;
+    memcpy(&size, ctx->undoLog + ctx->undoSize - sizeof(size), sizeof(size));
+    unsigned char* rec = ctx->undoLog + ctx->undoSize - size;
+    UndoHeader h;
+    memcpy(&h, rec, sizeof(h));
+
+    // Entradas da última para a primeira: a cópia mais antiga prevalece
+    unsigned char* first = rec + sizeof(h) + h.textBytes;
+    unsigned char* end   = rec + size - sizeof(size_t);
+    while (end > first) {
+        int total;
+        memcpy(&total, end - sizeof(int), sizeof(total));
+        end -= total;
+        UndoEntry e;
+        memcpy(&e, end, sizeof(e));
+        unsigned char* data = end + sizeof(e);
+        if (e.kind == UNDO_MEM) {
+            memcpy(&ctx->memoryData[e.a], data, (size_t)e.b * sizeof(int));
+            for (int w = 0; w < e.b; w++) dirtyMark(&ctx->dirtyMem, e.a + w);
+        } else if (e.kind == UNDO_PREFETCH) {
+            memcpy((unsigned char*)&ctx->prefetcher + e.a, data, (size_t)e.b);
+        } else {
+            restoreSet(ctx, e.a, e.b, data);
+        }
+    }
+    loadState(ctx, &h.state);
+    const char* text = (const char*)(rec + sizeof(h));
+    strcpy(ctx->lastOperationText, text);
+    strcpy(ctx->lastExplanationText, text + strlen(text) + 1);
+    ctx->undoSize -= size;
+    return 1;
+}
+
+// Primeiro passo alcançável pelo registro de desfazer (stepCount se vazio)
+static int undoFirstStep(CPUContext* ctx) {
+    if (ctx->undoSize == 0) return ctx->stepCount;
+    UndoHeader h;
+    memcpy(&h, ctx->undoLog, sizeof(h));
+    return h.state.stepCount;
+}
+
+// Depois de cada instrução de runUntilBreak: conta os pontos de parada
+// satisfeitos e guarda em breakInfo o de menor id
+static void checkBreakpoints(CPUContext* ctx, const ExecEvent* ev) {
+    // Próxima instrução de fato: BREAK_PC num rótulo vale pela linha seguinte
+    int next = ctx->currentInstrIndex;
+    int real = next;
+    while (real < ctx->instructionCount && ctx->decodedProgram[real].opcode == OP_NONE) {
+        real++;
+    }
+    for (int id = 0; id < ctx->breakSlots; id++) {
+        Breakpoint* b = &ctx->breakpoints[id];
+        if (!b->kind || !b->enabled) continue;
+        int fired    = 0;
+        int oldValue = 0;
+        int newValue = ev->value;
+        switch (b->kind) {
+        case BREAK_PC:
+            fired = b->value >= next && b->value <= real;
+            break;
+        case BREAK_READ:
+            fired = ev->opcode == OP_LOAD && ev->address == b->value;
+            break;
+        case BREAK_WRITE:
+            fired = ev->opcode == OP_STORE && ev->address == b->value;
+            break;
+        case BREAK_REGISTER:
+            oldValue = ctx->breakRegs[b->value];
+            newValue = ctx->regs[b->value];
+            fired    = oldValue != newValue;
+            break;
+        case BREAK_MISS:
+            // A falta traz o bloco inteiro: vale qualquer endereço do bloco de value
+            fired = ev->hit == 0 && (b->value < 0 || ev->address / ctx->cache.blockWords ==
+                                                     b->value / ctx->cache.blockWords);
+            break;
+        case BREAK_CYCLES:
+            fired = ctx->totalCycles > b->value && ctx->totalCycles - ev->cost <= b->value;
+            break;
+        }
+        if (!fired) continue;
+        b->hits++;
+        if (ctx->breakInfo.id < 0) {
+            BreakInfo* info = &ctx->breakInfo;
+            info->id       = id;
+            info->kind     = b->kind;
+            info->step     = ctx->stepCount;
+            info->pc       = ev->pc;
+            info->address  = ev->address;
+            info->oldValue = oldValue;
+            info->newValue = newValue;
+            info->cycles   = ctx->totalCycles;
+        }
+    }
+    memcpy(ctx->breakRegs, ctx->regs, sizeof(ctx->breakRegs));
+}
+
+static int stepInstruction(CPUContext* ctx) {
+    // Linhas sem instrução (rótulos, comentários) são puladas
+    int pc = ctx->currentInstrIndex;
+    while (pc < ctx->instructionCount && ctx->decodedProgram[pc].opcode == OP_NONE) {
+        pc++;
+    }
+    if (pc >= ctx->instructionCount) {
+        ctx->currentInstrIndex = pc;
+        return 0;
+    }
+    beginStep(ctx);
+    ctx->currentInstrIndex = pc;
+    const DecodedInstr* in = &ctx->decodedProgram[ctx->currentInstrIndex];
+    const char* instr = programLine(ctx, ctx->currentInstrIndex);
+
+    ExecEvent ev;
+    ev.step    = ctx->stepCount++;
+    ev.pc      = ctx->currentInstrIndex;
+    ctx->accessPc = ev.pc;
+    ev.opcode  = in->opcode;
+    ev.rd      = -1;
+    ev.rs1     = -1;
+    ev.rs2     = -1;
+    ev.address = -1;
+    ev.hit     = -1;
+    ev.value   = 0;
+    ev.imm     = 0;
+    ev.target  = -1;
+    ctx->currentInstrIndex++;
+
+    char* opText  = ctx->lastOperationText;
+    char* expText = ctx->lastExplanationText;
+    int*  regs    = ctx->regs;
+    int   hit     = 0;
+    int   taken   = 0;
+    // Em lote os textos só são montados no fim, para a última instrução
+    int   texts   = !ctx->batchRunning;
+
+    // Limpa textos
+    strcpy(opText,  "");
+    strcpy(expText, "");
+
+    // Endereço de LOAD/STORE: imediato ou conteúdo de [Rn]
+    int address = in->imm;
+    if ((in->opcode == OP_LOAD || in->opcode == OP_STORE) && (in->flags & DI_INDIRECT)) {
+        address = regs[in->rs1];
+        ev.rs1  = in->rs1;
+    }
+
+    switch (in->opcode) {
+    case OP_LOAD: {
+        regs[in->rd] = cacheLoad(ctx, address, &hit, texts ? opText : NULL, texts ? expText : NULL);
+        dirtyMark(&ctx->dirtyRegs, in->rd);
+        ev.rd      = in->rd;
+        ev.address = address;
+        ev.hit     = validAddress(ctx, address) ? hit : -1;
+        ev.value   = regs[in->rd];
+
+        if (texts) {
+            char temp[MAX_STR_SIZE];
+            writeEventText(ctx, &ev, temp, sizeof(temp));
+            strcpy(opText, temp);
+        }
+        break;
+    }
+    case OP_STORE: {
+        int val = regs[in->rd];
+        cacheStore(ctx, address, val, &hit, texts ? opText : NULL, texts ? expText : NULL);
+        ev.rd      = in->rd;
+        ev.address = address;
+        ev.hit     = validAddress(ctx, address) ? hit : -1;
+        ev.value   = val;
+
+        if (texts) {
+            char temp[MAX_STR_SIZE];
+            writeEventText(ctx, &ev, temp, sizeof(temp));
+            strcpy(opText, temp);
+        }
+        break;
+    }
+    case OP_ADD:
+    case OP_SUB: {
+        int val1 = regs[in->rs1];
+        int val2 = regs[in->rs2];
+        int result;
+        if (in->opcode == OP_ADD) {
+            result = val1 + val2;
+            if (texts) {
+                snprintf(opText,  MAX_STR_SIZE, "ADD: R%d + R%d -> R%d", in->rs1 + 1, in->rs2 + 1, in->rd + 1);
+                snprintf(expText, MAX_STR_SIZE, "Soma de %d + %d = %d", val1, val2, result);
+            }
+        } else {
+            result = val1 - val2;
+            if (texts) {
+                snprintf(opText,  MAX_STR_SIZE, "SUB: R%d - R%d -> R%d", in->rs1 + 1, in->rs2 + 1, in->rd + 1);
+                snprintf(expText, MAX_STR_SIZE, "Subtração de %d - %d = %d", val1, val2, result);
+            }
+        }
+        regs[in->rd] = result;
+        dirtyMark(&ctx->dirtyRegs, in->rd);
+        ev.rd    = in->rd;
+        ev.rs1   = in->rs1;
+        ev.rs2   = in->rs2;
+        ev.value = result;
+        break;
+    }
+    case OP_ADDI:
+    case OP_LI: {
+        int result = in->imm;
+        ev.rd  = in->rd;
+        ev.imm = in->imm;
+        if (in->opcode == OP_ADDI) {
+            int val = regs[in->rs1];
+            result  = val + in->imm;
+            ev.rs1  = in->rs1;
+            if (texts) {
+                snprintf(expText, MAX_STR_SIZE, "Soma de %d + %d (imediato) = %d", val, in->imm, result);
+            }
+        } else if (texts) {
+            snprintf(expText, MAX_STR_SIZE, "R%d recebe o imediato %d", in->rd + 1, in->imm);
+        }
+        regs[in->rd] = result;
+        dirtyMark(&ctx->dirtyRegs, in->rd);
+        ev.value = result;
+        if (texts) writeEventText(ctx, &ev, opText, MAX_STR_SIZE);
+        break;
+    }
+    case OP_BEQ:
+    case OP_BNE: {
+        int val1 = regs[in->rs1];
+        int val2 = regs[in->rs2];
+        taken = (in->opcode == OP_BEQ) == (val1 == val2);
+        ev.rs1    = in->rs1;
+        ev.rs2    = in->rs2;
+        ev.target = in->imm;
+        ev.value  = taken;
+        if (texts) {
+            snprintf(expText, MAX_STR_SIZE, "R%d (%d) e R%d (%d) são %s: desvio %s.",
+                     in->rs1 + 1, val1, in->rs2 + 1, val2, val1 == val2 ? "iguais" : "diferentes",
+                     taken ? "tomado" : "não tomado");
+            writeEventText(ctx, &ev, opText, MAX_STR_SIZE);
+        }
+        break;
+    }
+    case OP_JMP:
+        taken     = 1;
+        ev.target = in->imm;
+        ev.value  = 1;
+        if (texts) {
+            snprintf(expText, MAX_STR_SIZE, "Desvio incondicional para a linha %d.", in->imm);
+            writeEventText(ctx, &ev, opText, MAX_STR_SIZE);
+        }
+        break;
+    default:
+        // Erro já detectado na montagem
+        if (texts) {
+            strncpy(opText, instr, MAX_STR_SIZE-1);
+            opText[MAX_STR_SIZE-1] = '\0';
+            strcpy(expText, decodeErrorText[in->rd]);
+        }
+        break;
+    }
+    if (taken) {
+        ctx->currentInstrIndex = in->imm;
+    }
+    ctx->lastInstrCost = instructionCost(ctx, in, hit, taken);
+    ctx->totalCycles  += ctx->lastInstrCost;
+    ctx->opcodeCounts[in->opcode]++;
+    ctx->opcodeCycles[in->opcode] += ctx->lastInstrCost;
+
+    ev.cost = ctx->lastInstrCost;
+    logEvent(ctx, &ev);
+    if (ctx->profile.enabled) {
+        profileStep(ctx, ev.pc, ev.hit, ev.cost);
+    }
+    if (ctx->batchRunning) {
+        ctx->batchEvent = ev;
+        if (ctx->breakRunning) checkBreakpoints(ctx, &ev);
+    }
+    endStep(ctx);
+    return 1;
+}
+
+DLL_EXPORT void ctxNextInstruction(CPUContext* ctx) {
+    if (!stepInstruction(ctx)) {
+        strcpy(ctx->lastOperationText, "Fim das instruções");
+        strcpy(ctx->lastExplanationText, "Não há mais instruções para executar.");
+        ctx->lastInstrCost = 0;
+    }
+}
+
+// 1 se a próxima instrução é a última do programa: depois dela (e do
+// desvio, avaliado antes) só há linhas sem instrução
+static int lastStepAhead(const CPUContext* ctx) {
+    int pc = ctx->currentInstrIndex;
+    while (pc < ctx->instructionCount && ctx->decodedProgram[pc].opcode == OP_NONE) {
+        pc++;
+    }
+    if (pc >= ctx->instructionCount) return 0;
+    const DecodedInstr* in = &ctx->decodedProgram[pc];
+    int next = pc + 1;
+    if (in->opcode == OP_JMP ||
+        (in->opcode == OP_BEQ && ctx->regs[in->rs1] == ctx->regs[in->rs2]) ||
+        (in->opcode == OP_BNE && ctx->regs[in->rs1] != ctx->regs[in->rs2])) {
+        next = in->imm;
+    }
+    while (next < ctx->instructionCount && ctx->decodedProgram[next].opcode == OP_NONE) {
+        next++;
+    }
+    return next >= ctx->instructionCount;
+}
+
+// Lote de até maxSteps instruções (maxSteps <= 0: sem limite), parando
+// também num ponto de parada se breakRunning estiver ligado. Só a última
+// instrução (pelo limite ou pelo fim do programa) monta os textos; numa
+// parada por ponto de parada a operação vem do evento e a explicação diz
+// qual ponto disparou
+static int runBatch(CPUContext* ctx, int maxSteps) {
+    int steps = 0;
+    int quiet = 0;                    // A última instrução executada ficou sem textos
+    while (maxSteps <= 0 || steps < maxSteps) {
+        ctx->batchRunning = !(steps + 1 == maxSteps || lastStepAhead(ctx));
+        if (!stepInstruction(ctx)) break;
+        quiet = ctx->batchRunning;
+        steps++;
+        if (ctx->breakRunning && ctx->breakInfo.id >= 0) break;
+    }
+    ctx->batchRunning = 0;
+    if (quiet) {
+        writeEventText(ctx, &ctx->batchEvent, ctx->lastOperationText, MAX_STR_SIZE);
+        if (ctx->breakRunning && ctx->breakInfo.id >= 0) {
+            snprintf(ctx->lastExplanationText, MAX_STR_SIZE,
+                     "Ponto de parada %d atingido após %d instruções.", ctx->breakInfo.id, steps);
+        }
+    }
+    return steps;
+}
+
+// Executa até maxSteps instruções numa única chamada; retorna quantas executou
+DLL_EXPORT int ctxRunInstructions(CPUContext* ctx, int maxSteps) {
+    return maxSteps > 0 ? runBatch(ctx, maxSteps) : 0;
+}
+
+// Executa até o fim do programa; retorna quantas instruções executou
+DLL_EXPORT int ctxRunUntilEnd(CPUContext* ctx) {
+    return runBatch(ctx, 0);
+}
+
+// 1 se o programa terminou: depois do PC só há linhas sem instrução
+DLL_EXPORT int ctxIsProgramFinished(CPUContext* ctx) {
+    int pc = ctx->currentInstrIndex;
+    while (pc < ctx->instructionCount && ctx->decodedProgram[pc].opcode == OP_NONE) {
+        pc++;
+    }
+    return pc >= ctx->instructionCount;
+}
+
+// -----------------------------------------------------------
+// Checkpoints e volta no tempo
+// -----------------------------------------------------------
+// Tamanho do checkpoint em bytes; grava em buf só se size for suficiente
+DLL_EXPORT size_t ctxSaveCheckpoint(CPUContext* ctx, void* buf, size_t size) {
+    if (ctx->system) return 0;
+    size_t needed = checkpointSize(ctx);
+    if (buf && size >= needed) writeCheckpoint(ctx, (unsigned char*)buf);
+    return needed;
+}
+
+// Restaura um checkpoint da mesma geometria; o histórico é descartado
+DLL_EXPORT int ctxRestoreCheckpoint(CPUContext* ctx, const void* buf, size_t size) {
+    if (ctx->system || !buf || !readCheckpoint(ctx, (const unsigned char*)buf, size)) return 0;
+    // Os eventos no log podem ser de outra execução
+    ctx->eventOldest = ctx->eventNext;
+    forgetHistory(ctx);
+    return 1;
+}
+
+// Checkpoint automático a cada "steps" passos (0 = desligado). Quando o
+// limite de checkpoints ou de memória é atingido o intervalo dobra.
+DLL_EXPORT int ctxSetCheckpointInterval(CPUContext* ctx, int steps) {
+    if (steps < 0 || ctx->system) return 0;
+    ctx->checkpointBase = steps;
+    forgetHistory(ctx);
+    return 1;
+}
+
+DLL_EXPORT int ctxGetCheckpointInterval(CPUContext* ctx) {
+    return ctx->checkpointInterval;
+}
+
+// Bytes do registro de desfazer (0 = desligado); os passos mais antigos
+// são descartados quando ele enche
+DLL_EXPORT int ctxSetUndoLogCapacity(CPUContext* ctx, int bytes) {
+    if (bytes < 0 || ctx->system) return 0;
+    free(ctx->undoLog);
+    ctx->undoLog       = NULL;
+    ctx->undoCapacity  = (size_t)bytes;
+    ctx->undoSize      = 0;
+    ctx->undoRecording = 0;
+    return 1;
+}
+
+DLL_EXPORT int ctxGetUndoLogCapacity(CPUContext* ctx) {
+    return (int)ctx->undoCapacity;
+}
+
+DLL_EXPORT int ctxGetStepCount(CPUContext* ctx) {
+    return ctx->stepCount;
+}
+
+// Menor passo ao qual ctxGotoStep consegue voltar
+DLL_EXPORT int ctxGetFirstReachableStep(CPUContext* ctx) {
+    int first = undoFirstStep(ctx);
+    if (ctx->checkpointCount > 0 && ctx->checkpoints[0].step < first) {
+        first = ctx->checkpoints[0].step;
+    }
+    return first;
+}
+
+// Leva a máquina ao estado de antes do passo "step": para trás pelo
+// registro de desfazer ou, se ele não alcança, pelo checkpoint anterior
+// mais próximo, reexecutando o restante. Retorna o passo atingido (menor
+// que step se o programa terminar antes; inalterado se step for inalcançável).
+DLL_EXPORT int ctxGotoStep(CPUContext* ctx, int step) {
+    if (step < 0) return ctx->stepCount;
+    if (step < ctx->stepCount) {
+        if (undoFirstStep(ctx) <= step) {
+            while (ctx->stepCount > step && popUndoRecord(ctx)) {}
+        } else {
+            int i = ctx->checkpointCount - 1;
+            while (i >= 0 && ctx->checkpoints[i].step > step) i--;
+            if (i < 0) return ctx->stepCount;
+            readCheckpoint(ctx, ctx->checkpoints[i].data, ctx->checkpoints[i].size);
+            ctx->undoSize = 0;
+        }
+        dropCheckpointsAfter(ctx, ctx->stepCount);
+    }
+    while (ctx->stepCount < step && stepInstruction(ctx)) {}
+    return ctx->stepCount;
+}
+
+// Desfaz a última instrução; retorna 1 se voltou
+DLL_EXPORT int ctxStepBack(CPUContext* ctx) {
+    int before = ctx->stepCount;
+    return before > 0 && ctxGotoStep(ctx, before - 1) < before;
+}
+
+// -----------------------------------------------------------
+// Pontos de parada
+// -----------------------------------------------------------
+DLL_EXPORT int ctxAddBreakpoint(CPUContext* ctx, int kind, long long value) {
+    int valid;
+    switch (kind) {
+    case BREAK_PC:
+    case BREAK_READ:
+    case BREAK_WRITE:
+    case BREAK_CYCLES:   valid = value >= 0; break;
+    case BREAK_REGISTER: valid = value >= 0 && value < NUM_REGS; break;
+    case BREAK_MISS:     valid = value >= -1; break;
+    default:             valid = 0; break;
+    }
+    if (!valid) return -1;
+    for (int id = 0; id < MAX_BREAKPOINTS; id++) {
+        Breakpoint* b = &ctx->breakpoints[id];
+        if (b->kind) continue;
+        b->kind    = kind;
+        b->enabled = 1;
+        b->value   = value;
+        b->hits    = 0;
+        if (id >= ctx->breakSlots) ctx->breakSlots = id + 1;
+        return id;
+    }
+    return -1;
+}
+
+DLL_EXPORT int ctxRemoveBreakpoint(CPUContext* ctx, int id) {
+    if (id < 0 || id >= ctx->breakSlots || !ctx->breakpoints[id].kind) return 0;
+    memset(&ctx->breakpoints[id], 0, sizeof(Breakpoint));
+    while (ctx->breakSlots > 0 && !ctx->breakpoints[ctx->breakSlots - 1].kind) {
+        ctx->breakSlots--;
+    }
+    return 1;
+}
+
+DLL_EXPORT void ctxClearBreakpoints(CPUContext* ctx) {
+    memset(ctx->breakpoints, 0, sizeof(ctx->breakpoints));
+    ctx->breakSlots = 0;
+}
+
+DLL_EXPORT int ctxSetBreakpointEnabled(CPUContext* ctx, int id, int enabled) {
+    if (id < 0 || id >= ctx->breakSlots || !ctx->breakpoints[id].kind) return 0;
+    ctx->breakpoints[id].enabled = enabled ? 1 : 0;
+    return 1;
+}
+
+DLL_EXPORT int ctxGetBreakpoint(CPUContext* ctx, int id, Breakpoint* out) {
+    if (id < 0 || id >= ctx->breakSlots || !ctx->breakpoints[id].kind) return 0;
+    if (out) *out = ctx->breakpoints[id];
+    return 1;
+}
+
+// Executa até um ponto de parada, o fim do programa ou maxSteps instruções
+// (maxSteps <= 0: sem limite); retorna quantas executou
+DLL_EXPORT int ctxRunUntilBreak(CPUContext* ctx, int maxSteps) {
+    clearBreakInfo(ctx);
+    memcpy(ctx->breakRegs, ctx->regs, sizeof(ctx->breakRegs));
+    ctx->breakRunning = 1;
+    int steps = runBatch(ctx, maxSteps);
+    ctx->breakRunning = 0;
+    return steps;
+}
+
+DLL_EXPORT int ctxGetBreakInfo(CPUContext* ctx, BreakInfo* out) {
+    if (out) *out = ctx->breakInfo;
+    return ctx->breakInfo.id >= 0;
+}
+
+// -----------------------------------------------------------
+// Reprodução de traces: acessos direto na cache, sem instruções
+// -----------------------------------------------------------
+// Endereços fora da memória são contados em traceStats.invalid e não
+// acessam a cache (bit 0 no bitmap). Escritas seguem a política de escrita
+// (os dados não mudam: só a contabilidade de tráfego e linhas modificadas).
+// Retorna os acertos deste bloco.
+DLL_EXPORT size_t ctxReplayTrace(CPUContext* ctx, const int32_t* addrs, const uint8_t* isWrite,
+                                 size_t n, uint8_t* hitBitmap) {
+    TraceStats* st = &ctx->traceStats;
+    size_t hits = 0, invalid = 0;
+
+    forgetHistory(ctx);
+    ctx->accessPc = -1;
+    if (hitBitmap) memset(hitBitmap, 0, (n + 7) / 8);
+    for (size_t i = 0; i < n; i++) {
+        int address = addrs[i];
+        if (address < 0 || address >= ctx->memSize) {
+            invalid++;
+            continue;
+        }
+        int hit = accessCache(ctx, address, isWrite ? isWrite[i] : 0, NULL, NULL);
+        issuePrefetches(ctx);
+        // Somados a cada acesso: o relógio dos prefetches anda durante o trace
+        st->cycles += ctx->lastAccessLatency;
+        if (hit) {
+            hits++;
+            if (hitBitmap) hitBitmap[i >> 3] |= (uint8_t)(1u << (i & 7));
+        }
+    }
+    size_t misses = n - invalid - hits;
+    st->accesses += (long long)(n - invalid);
+    st->hits     += (long long)hits;
+    st->misses   += (long long)misses;
+    st->invalid  += (long long)invalid;
+    return hits;
+}
+
+DLL_EXPORT void ctxGetTraceStats(CPUContext* ctx, TraceStats* out) {
+    if (out) *out = ctx->traceStats;
+}
+
+DLL_EXPORT void ctxResetTraceStats(CPUContext* ctx) {
+    memset(&ctx->traceStats, 0, sizeof(ctx->traceStats));
+}
+
+// -----------------------------------------------------------
+// Perfil: por instrução, por endereço e faltas 3C
+// -----------------------------------------------------------
+// Liga (vazio) ou desliga e libera o perfil; retorna 0 sem memória
+DLL_EXPORT int ctxSetProfiling(CPUContext* ctx, int enabled) {
+    Profile* p = &ctx->profile;
+    if (!enabled) {
+        profileFree(p);
+        return 1;
+    }
+    if (p->enabled) return 1;
+    if (!profileAlloc(p, ctx->memSize, ctx->cache.numLines, ctx->memSize / ctx->cache.blockWords) ||
+        !profileReservePcs(p, ctx->instructionCount)) {
+        profileFree(p);
+        return 0;
+    }
+    shadowClear(p);
+    // A L1 já pode ter blocos: eles contam como referenciados e começam na
+    // sombra (a ordem LRU entre eles é a das linhas)
+    for (int i = 0; i < ctx->cache.numLines; i++) {
+        const CacheLine* line = &ctx->cache.lines[i];
+        if (!line->valid) continue;
+        p->seen[line->tag >> 3] |= (unsigned char)(1u << (line->tag & 7));
+        shadowAccess(p, line->tag, 1);
+    }
+    return 1;
+}
+
+DLL_EXPORT int ctxGetProfiling(CPUContext* ctx) {
+    return ctx->profile.enabled;
+}
+
+// Zera os contadores mantendo a cache sombra
+DLL_EXPORT void ctxResetProfile(CPUContext* ctx) {
+    if (ctx->profile.enabled) profileZero(&ctx->profile);
+}
+
+// getPcProfileSize() entradas, uma por linha do programa (NULL se desligado)
+DLL_EXPORT PcProfile* ctxGetPcProfileArray(CPUContext* ctx) {
+    Profile* p = &ctx->profile;
+    if (!p->enabled || !profileReservePcs(p, ctx->instructionCount)) return NULL;
+    return p->pcs;
+}
+
+DLL_EXPORT int ctxGetPcProfileSize(CPUContext* ctx) {
+    Profile* p = &ctx->profile;
+    return p->enabled && p->pcCapacity >= ctx->instructionCount ? ctx->instructionCount : 0;
+}
+
+// getAddressProfileSize() entradas, uma por palavra de memória (NULL se desligado)
+DLL_EXPORT AddressProfile* ctxGetAddressProfileArray(CPUContext* ctx) {
+    return ctx->profile.enabled ? ctx->profile.addrs : NULL;
+}
+
+DLL_EXPORT int ctxGetAddressProfileSize(CPUContext* ctx) {
+    return ctx->profile.enabled ? ctx->profile.addrCount : 0;
+}
+
+DLL_EXPORT void ctxGetMissClassStats(CPUContext* ctx, MissClassStats* out) {
+    if (!out) return;
+    if (ctx->profile.enabled) *out = ctx->profile.classes;
+    else memset(out, 0, sizeof(*out));
+}
+
+// -----------------------------------------------------------
+// Registradores
+// -----------------------------------------------------------
+DLL_EXPORT const char* ctxGetRegistersString(CPUContext* ctx) {
+    snprintf(ctx->registersStr, sizeof(ctx->registersStr),
+             "R1=%d, R2=%d, R3=%d, R4=%d",
+             ctx->regs[0], ctx->regs[1], ctx->regs[2], ctx->regs[3]);
+    return ctx->registersStr;
+}
+
+DLL_EXPORT int* ctxGetRegisterArray(CPUContext* ctx) {
+    return ctx->regs;
+}
+
+DLL_EXPORT int ctxGetRegisterCount(CPUContext* ctx) {
+    (void)ctx;
+    return NUM_REGS;
+}
+
+DLL_EXPORT void ctxSetRegisterValue(CPUContext* ctx, const char* regName, int value) {
+    int r = parseRegister(regName);
+    if (r < 0) return;
+    ctx->regs[r] = value;
+    dirtyMark(&ctx->dirtyRegs, r);
+    forgetHistory(ctx);
+}
+
+// -----------------------------------------------------------
+// Memória
+// -----------------------------------------------------------
+DLL_EXPORT const char* ctxGetMemoryString(CPUContext* ctx) {
+    char*  buf  = ctx->memoryStr;
+    size_t size = sizeof(ctx->memoryStr);
+    buf[0] = '\0';
+
+    // Texto truncado quando não couber no buffer; use getMemoryArray()
+    size_t used = 0;
+    for (int i=0; i<ctx->memSize && used < size; i++){
+        int w = snprintf(buf + used, size - used, "%s[%d]: %d",
+                         i > 0 ? "," : "", i, ctx->memoryData[i]);
+        if (w < 0) break;
+        used += (size_t)w;
+    }
+    return buf;
+}
+
+DLL_EXPORT int* ctxGetMemoryArray(CPUContext* ctx) {
+    return ctx->memoryData;
+}
+
+DLL_EXPORT int ctxGetMemorySize(CPUContext* ctx) {
+    return ctx->memSize;
+}
+
+DLL_EXPORT void ctxSetMemoryValue(CPUContext* ctx, int address, int value) {
+    if (address < 0 || address >= ctx->memSize) return;
+    ctx->memoryData[address] = value;
+    dirtyMark(&ctx->dirtyMem, address);
+    forgetHistory(ctx);
+}
+
+DLL_EXPORT int ctxGetMemoryValue(CPUContext* ctx, int address) {
+    if (address < 0 || address >= ctx->memSize) return 0;
+    return ctx->memoryData[address];
+}
+
+// Primeiro endereço a partir de start (voltando ao início) com o valor, ou -1
+DLL_EXPORT int ctxFindMemoryValue(CPUContext* ctx, int value, int start) {
+    int n = ctx->memSize;
+    if (n <= 0) return -1;
+    if (start < 0 || start >= n) start = 0;
+    for (int k = 0; k < n; k++) {
+        int i = start + k;
+        if (i >= n) i -= n;
+        if (ctx->memoryData[i] == value) return i;
+    }
+    return -1;
+}
+
+// -----------------------------------------------------------
+// Modo Explicação
+// -----------------------------------------------------------
+DLL_EXPORT int ctxGetExplanationMode(CPUContext* ctx) {
+    return ctx->explanationMode;
+}
+DLL_EXPORT void ctxSetExplanationMode(CPUContext* ctx, int mode) {
+    ctx->explanationMode = mode;
+}
+
+// -----------------------------------------------------------
+// Última operação / explicação
+// -----------------------------------------------------------
+DLL_EXPORT const char* ctxGetLastOperationText(CPUContext* ctx) {
+    return ctx->lastOperationText;
+}
+DLL_EXPORT const char* ctxGetLastExplanationText(CPUContext* ctx) {
+    return ctx->lastExplanationText;
+}
+
+// -----------------------------------------------------------
 // Histórico
 // -----------------------------------------------------------
-DLL_EXPORT void clearHistory(void) {
-    strcpy(historyBuffer, "");
+DLL_EXPORT void ctxClearHistory(CPUContext* ctx) {
+    // Descarta os eventos; a numeração (seq) continua crescendo
+    ctx->eventOldest = ctx->eventNext;
+}
+
+// Texto de um evento, no mesmo formato de getLastOperationText
+static int writeEventText(const CPUContext* ctx, const ExecEvent* ev, char* out, size_t size) {
+    int valid = validAddress(ctx, ev->address);
+    char via[24] = "";
+    if (ev->rs1 >= 0) snprintf(via, sizeof(via), " via [R%d]", ev->rs1 + 1);
+    switch (ev->opcode) {
+    case OP_LOAD:
+        if (valid) return snprintf(out, size, "LOAD: Memória[%d]%s -> R%d", ev->address, via, ev->rd + 1);
+        return snprintf(out, size, "LOAD (addr=%d inválido)%s -> R%d", ev->address, via, ev->rd + 1);
+    case OP_STORE:
+        if (valid) return snprintf(out, size, "STORE: Memória[%d]%s (valor=%d) <- R%d",
+                                   ev->address, via, ev->value, ev->rd + 1);
+        return snprintf(out, size, "STORE (addr=%d inválido)%s (valor=%d) <- R%d",
+                        ev->address, via, ev->value, ev->rd + 1);
+    case OP_ADD:
+        return snprintf(out, size, "ADD: R%d + R%d -> R%d", ev->rs1 + 1, ev->rs2 + 1, ev->rd + 1);
+    case OP_SUB:
+        return snprintf(out, size, "SUB: R%d - R%d -> R%d", ev->rs1 + 1, ev->rs2 + 1, ev->rd + 1);
+    case OP_ADDI:
+        return snprintf(out, size, "ADDI: R%d + %d -> R%d", ev->rs1 + 1, ev->imm, ev->rd + 1);
+    case OP_LI:
+        return snprintf(out, size, "LI: %d -> R%d", ev->imm, ev->rd + 1);
+    case OP_BEQ:
+    case OP_BNE:
+        return snprintf(out, size, "%s: R%d %s R%d -> linha %d (%s)", opcodeNames[ev->opcode],
+                        ev->rs1 + 1, ev->opcode == OP_BEQ ? "==" : "!=", ev->rs2 + 1, ev->target,
+                        ev->value ? "tomado" : "não tomado");
+    case OP_JMP:
+        return snprintf(out, size, "JMP: -> linha %d", ev->target);
+    default:
+        if (ev->pc >= 0 && ev->pc < ctx->instructionCount) {
+            return snprintf(out, size, "%s", programLine(ctx, ev->pc));
+        }
+        return snprintf(out, size, "?");
+    }
+}
+
+// Monta o texto do histórico a partir dos eventos guardados (uma linha por evento)
+DLL_EXPORT const char* ctxGetHistoryString(CPUContext* ctx) {
+    size_t used = 0;
+    for (long long s = ctx->eventOldest; s < ctx->eventNext; s++) {
+        const ExecEvent* ev = &ctx->events[s % ctx->eventCapacity];
+        char line[MAX_STR_SIZE + 64];
+        int len = writeEventText(ctx, ev, line, sizeof(line));
+        if (len <= 0) continue;
+        if ((size_t)len >= sizeof(line)) len = (int)sizeof(line) - 1;
+
+        if (used + (size_t)len + 2 > ctx->historyTextSize) {
+            size_t newSize = ctx->historyTextSize ? ctx->historyTextSize * 2 : 4096;
+            while (newSize < used + (size_t)len + 2) newSize *= 2;
+            char* grown = (char*)realloc(ctx->historyText, newSize);
+            if (!grown) break;
+            ctx->historyText     = grown;
+            ctx->historyTextSize = newSize;
+        }
+        memcpy(ctx->historyText + used, line, (size_t)len);
+        used += (size_t)len;
+        ctx->historyText[used++] = '\n';
+    }
+    if (!ctx->historyText) return "";
+    ctx->historyText[used] = '\0';
+    return ctx->historyText;
+}
+
+// -----------------------------------------------------------
+// Log de eventos de execução
+// -----------------------------------------------------------
+// Redimensiona o log (descarta os eventos guardados); retorna 1/0
+DLL_EXPORT int ctxSetEventLogCapacity(CPUContext* ctx, int capacity) {
+    if (capacity <= 0) return 0;
+    ExecEvent* events = (ExecEvent*)malloc((size_t)capacity * sizeof(ExecEvent));
+    if (!events) return 0;
+    free(ctx->events);
+    ctx->events        = events;
+    ctx->eventCapacity = capacity;
+    ctx->eventOldest   = ctx->eventNext;
+    return 1;
+}
+
+DLL_EXPORT int ctxGetEventLogCapacity(CPUContext* ctx) {
+    return ctx->eventCapacity;
+}
+
+// Número de sequência do próximo evento (= total de eventos já gravados)
+DLL_EXPORT long long ctxGetEventSequence(CPUContext* ctx) {
+    return ctx->eventNext;
+}
+
+// Copia até maxOut eventos com seq >= since (ou a partir do mais antigo
+// ainda guardado); retorna quantos copiou
+DLL_EXPORT int ctxGetEventsSince(CPUContext* ctx, long long since, ExecEvent* out, int maxOut) {
+    if (since < ctx->eventOldest) since = ctx->eventOldest;
+    int n = 0;
+    for (long long s = since; s < ctx->eventNext && n < maxOut; s++) {
+        out[n++] = ctx->events[s % ctx->eventCapacity];
+    }
+    return n;
 }
-DLL_EXPORT const char* getHistoryString(void) {
-    return historyBuffer;
+
+DLL_EXPORT int ctxGetLastEvent(CPUContext* ctx, ExecEvent* out) {
+    if (ctx->eventNext == ctx->eventOldest) return 0;
+    if (out) *out = ctx->events[(ctx->eventNext - 1) % ctx->eventCapacity];
+    return 1;
+}
+
+DLL_EXPORT const char* ctxFormatEvent(CPUContext* ctx, const ExecEvent* ev) {
+    writeEventText(ctx, ev, ctx->eventStr, sizeof(ctx->eventStr));
+    return ctx->eventStr;
 }
 
 // -----------------------------------------------------------
 // Ciclos
 // -----------------------------------------------------------
-DLL_EXPORT int getTotalCycles(void) {
-    return totalCycles;
+DLL_EXPORT long long ctxGetTotalCycles(CPUContext* ctx) {
+    return ctx->totalCycles;
+}
+DLL_EXPORT int ctxGetLastInstructionCost(CPUContext* ctx) {
+    return ctx->lastInstrCost;
+}
+
+// -----------------------------------------------------------
+// Modelo de temporização e pipeline
+// -----------------------------------------------------------
+// Retorna 1 em sucesso, 0 se alguma latência for inválida
+DLL_EXPORT int ctxSetTimingModel(CPUContext* ctx, const TimingModel* timing) {
+    if (!timing || timing->hitLatency < 1 || timing->aluLatency < 1 ||
+        timing->missLatency < 0 || timing->memLatency < 0) {
+        return 0;
+    }
+    ctx->timing = *timing;
+    forgetHistory(ctx);
+    return 1;
+}
+
+DLL_EXPORT void ctxGetTimingModel(CPUContext* ctx, TimingModel* out) {
+    if (out) *out = ctx->timing;
+}
+
+// Ligar ou desligar o pipeline recomeça a contagem dele (pipeline vazio)
+DLL_EXPORT void ctxSetPipelineMode(CPUContext* ctx, int enabled) {
+    enabled = enabled ? 1 : 0;
+    if (enabled != ctx->pipelineMode) {
+        memset(&ctx->pipe, 0, sizeof(ctx->pipe));
+    }
+    ctx->pipelineMode = enabled;
+    forgetHistory(ctx);
+}
+
+DLL_EXPORT int ctxGetPipelineMode(CPUContext* ctx) {
+    return ctx->pipelineMode;
+}
+
+DLL_EXPORT void ctxSetForwarding(CPUContext* ctx, int enabled) {
+    ctx->forwarding = enabled ? 1 : 0;
+    forgetHistory(ctx);
+}
+
+DLL_EXPORT int ctxGetForwarding(CPUContext* ctx) {
+    return ctx->forwarding;
+}
+
+DLL_EXPORT void ctxGetPipelineStats(CPUContext* ctx, PipelineStats* out) {
+    if (out) *out = ctx->pipe.stats;
+}
+
+// -----------------------------------------------------------
+// Estatísticas por opcode
+// -----------------------------------------------------------
+DLL_EXPORT int getNumOpcodes(void) {
+    return OP_COUNT;
+}
+
+DLL_EXPORT const char* getOpcodeName(int opcode) {
+    if (opcode < 0 || opcode >= OP_COUNT) return "";
+    return opcodeNames[opcode];
 }
-DLL_EXPORT int getLastInstructionCost(void) {
-    return lastInstrCost;
+
+// Copia até n contadores (índice = opcode); retorna quantos foram copiados
+DLL_EXPORT int ctxGetOpcodeStats(CPUContext* ctx, long long* countsOut, long long* cyclesOut, int n) {
+    if (n > OP_COUNT) n = OP_COUNT;
+    for (int i = 0; i < n; i++) {
+        if (countsOut) countsOut[i] = ctx->opcodeCounts[i];
+        if (cyclesOut) cyclesOut[i] = ctx->opcodeCycles[i];
+    }
+    return n < 0 ? 0 : n;
 }
 
 // -----------------------------------------------------------
 // Cache
 // -----------------------------------------------------------
-DLL_EXPORT int getCacheSize(void) {
-    return CACHE_LINES;
+DLL_EXPORT int ctxGetCacheSize(CPUContext* ctx) {
+    return ctx->cache.numLines;
 }
 
-DLL_EXPORT void getCacheStatus(int* hitsOut, int* missesOut) {
-    if (hitsOut)   *hitsOut   = cacheHits;
-    if (missesOut) *missesOut = cacheMisses;
+DLL_EXPORT int ctxGetBlockWords(CPUContext* ctx) {
+    return ctx->cache.blockWords;
 }
 
-DLL_EXPORT const char* getCacheLineString(int lineIndex) {
-    static char buf[256];
-    if (lineIndex < 0 || lineIndex >= CACHE_LINES) {
-        snprintf(buf, sizeof(buf), "Linha Inválida");
+DLL_EXPORT void ctxGetCacheStatus(CPUContext* ctx, long long* hitsOut, long long* missesOut) {
+    if (hitsOut)   *hitsOut   = ctx->cache.hits;
+    if (missesOut) *missesOut = ctx->cache.misses;
+}
+
+DLL_EXPORT void ctxGetMemoryTraffic(CPUContext* ctx, MemoryTraffic* out) {
+    if (out) *out = ctx->traffic;
+}
+
+DLL_EXPORT int ctxFlushCache(CPUContext* ctx) {
+    forgetHistory(ctx);
+    return writeBackAll(ctx);
+}
+
+DLL_EXPORT const char* ctxGetCacheLineString(CPUContext* ctx, int lineIndex) {
+    char*  buf  = ctx->cacheLineStr;
+    size_t size = sizeof(ctx->cacheLineStr);
+    const Cache* cache = &ctx->cache;
+    if (lineIndex < 0 || lineIndex >= cache->numLines) {
+        snprintf(buf, size, "Linha Inválida");
+        return buf;
+    }
+    const CacheLine* c = &cache->lines[lineIndex];
+    const int* d = &cache->data[(size_t)lineIndex * cache->blockWords];
+    // Em write-back mostra também o bit de modificada (M)
+    char flags[16] = "";
+    if (cache->writePolicy == WRITE_BACK) {
+        snprintf(flags, sizeof(flags), " M=%d", c->dirty);
+    }
+    if (cache->blockWords == 1) {
+        snprintf(buf, size, "V=%d%s T=%d D=%d", c->valid, flags, c->tag, d[0]);
         return buf;
     }
-    CacheLine* c = &cacheLines[lineIndex];
-    snprintf(buf, sizeof(buf), "V=%d T=%d D=%d", c->valid, c->tag, c->data);
+    // Blocos de várias palavras: D=[a b c ...] (truncado se não couber)
+    size_t used = (size_t)snprintf(buf, size, "V=%d%s T=%d D=[", c->valid, flags, c->tag);
+    for (int i = 0; i < cache->blockWords && used < size; i++) {
+        int w = snprintf(buf + used, size - used, i > 0 ? " %d" : "%d", d[i]);
+        if (w < 0) break;
+        used += (size_t)w;
+    }
+    if (used < size - 1) {
+        strcat(buf, "]");
+    }
     return buf;
 }
 
-DLL_EXPORT void setCacheLineData(int lineIndex, int newData) {
-    if (lineIndex < 0 || lineIndex >= CACHE_LINES) return;
-    cacheLines[lineIndex].data = newData;
+DLL_EXPORT CacheLine* ctxGetCacheLineArray(CPUContext* ctx) {
+    return ctx->cache.lines;
+}
+
+DLL_EXPORT int* ctxGetCacheDataArray(CPUContext* ctx) {
+    return ctx->cache.data;
+}
+
+// Copia até n linhas da cache para out; retorna quantas foram copiadas
+DLL_EXPORT int ctxGetCacheLines(CPUContext* ctx, CacheLine* out, int n) {
+    if (!out || n <= 0) return 0;
+    if (n > ctx->cache.numLines) n = ctx->cache.numLines;
+    memcpy(out, ctx->cache.lines, (size_t)n * sizeof(CacheLine));
+    return n;
+}
+
+// Linha da cache que contém o endereço, ou -1 se o bloco não estiver na cache
+DLL_EXPORT int ctxGetCacheLineOfAddress(CPUContext* ctx, int address) {
+    if (address < 0 || address >= ctx->memSize) return -1;
+    return findLine(&ctx->cache, address / ctx->cache.blockWords);
+}
+
+// Primeira linha válida a partir de start (voltando ao início) cujo bloco
+// contém o valor, ou -1
+DLL_EXPORT int ctxFindCacheValue(CPUContext* ctx, int value, int start) {
+    Cache* c = &ctx->cache;
+    int n = c->numLines;
+    if (n <= 0) return -1;
+    if (start < 0 || start >= n) start = 0;
+    for (int k = 0; k < n; k++) {
+        int i = start + k;
+        if (i >= n) i -= n;
+        if (!c->lines[i].valid) continue;
+        const int* words = &c->data[(size_t)i * c->blockWords];
+        for (int w = 0; w < c->blockWords; w++) {
+            if (words[w] == value) return i;
+        }
+    }
+    return -1;
+}
+
+DLL_EXPORT void ctxSetCacheWordData(CPUContext* ctx, int lineIndex, int offset, int newData) {
+    Cache* c = &ctx->cache;
+    if (lineIndex < 0 || lineIndex >= c->numLines) return;
+    if (offset < 0 || offset >= c->blockWords) return;
+    c->data[(size_t)lineIndex * c->blockWords + offset] = newData;
+    // Em write-back a edição chega à memória quando a linha for substituída
+    if (c->writePolicy == WRITE_BACK && c->lines[lineIndex].valid) {
+        c->lines[lineIndex].dirty = 1;
+    }
+    dirtyMark(&ctx->dirtyLines, lineIndex);
+    forgetHistory(ctx);
+}
+
+DLL_EXPORT void ctxSetCacheLineData(CPUContext* ctx, int lineIndex, int newData) {
+    ctxSetCacheWordData(ctx, lineIndex, 0, newData);
 }
 
 // -----------------------------------------------------------
-// Mapeamento (Direto / Associativo)
+// Mapeamento (Direto / Associativo / Associativo por conjunto)
 // -----------------------------------------------------------
-DLL_EXPORT void setCacheMappingMode(int mode) {
-    if (mode != 0 && mode != 1) {
+DLL_EXPORT void ctxSetCacheMappingMode(CPUContext* ctx, int mode) {
+    if (mode < 0 || mode > 2) {
         mode = 0; // fallback
     }
-    mappingMode = mode;
-    // Ao mudar, limpa a cache
-    invalidateCache();
+    ctx->cache.mappingMode = mode;
+    // Ao mudar, limpa a cache (linhas modificadas voltam antes para a memória)
+    writeBackAll(ctx);
+    invalidateCaches(ctx);
+    dirtyMarkAll(&ctx->dirtyLines);
+    forgetHistory(ctx);
+}
+DLL_EXPORT int ctxGetCacheMappingMode(CPUContext* ctx) {
+    return ctx->cache.mappingMode;
+}
+
+// 1 = direto, 0 (ou >= linhas) = associativo, 1 < ways < linhas = por conjunto
+// (ways precisa dividir o número de linhas). Retorna 1 em sucesso.
+DLL_EXPORT int ctxSetCacheAssociativity(CPUContext* ctx, int ways) {
+    if (!applyAssociativity(&ctx->cache, ways)) {
+        return 0;
+    }
+    writeBackAll(ctx);
+    invalidateCaches(ctx);
+    dirtyMarkAll(&ctx->dirtyLines);
+    forgetHistory(ctx);
+    return 1;
+}
+
+// Vias efetivas da configuração atual (linhas por conjunto)
+DLL_EXPORT int ctxGetCacheWays(CPUContext* ctx) {
+    return ctx->cache.ways;
+}
+
+// -----------------------------------------------------------
+// Política de substituição (REPL_LRU, REPL_FIFO, REPL_RANDOM, REPL_PLRU)
+// -----------------------------------------------------------
+DLL_EXPORT void ctxSetReplacementPolicy(CPUContext* ctx, int policy) {
+    if (policy < REPL_LRU || policy > REPL_PLRU) {
+        policy = REPL_LRU; // fallback
+    }
+    // A política vale para todos os níveis
+    for (int k = 0; k < ctx->numLevels; k++) {
+        cacheLevel(ctx, k)->policy = policy;
+    }
+    writeBackAll(ctx);
+    invalidateCaches(ctx);
+    dirtyMarkAll(&ctx->dirtyLines);
+    forgetHistory(ctx);
+}
+DLL_EXPORT int ctxGetReplacementPolicy(CPUContext* ctx) {
+    return ctx->cache.policy;
+}
+
+// Semente da política aleatória (reaplicada a cada invalidação da cache)
+DLL_EXPORT void ctxSetReplacementSeed(CPUContext* ctx, unsigned int seed) {
+    for (int k = 0; k < ctx->numLevels; k++) {
+        cacheLevel(ctx, k)->rngSeed = seed;
+    }
+    writeBackAll(ctx);
+    invalidateCaches(ctx);
+    dirtyMarkAll(&ctx->dirtyLines);
+    forgetHistory(ctx);
+}
+
+// -----------------------------------------------------------
+// Política de escrita
+// -----------------------------------------------------------
+DLL_EXPORT void ctxSetWritePolicy(CPUContext* ctx, int policy, int allocate) {
+    if (ctx->system) return;   // Núcleos: write-back com alocação, fixo
+    if (policy != WRITE_BACK) {
+        policy = WRITE_THROUGH; // fallback
+    }
+    // Linhas modificadas na política anterior voltam para a memória
+    writeBackAll(ctx);
+    ctx->cache.writePolicy   = policy;
+    ctx->cache.writeAllocate = allocate ? 1 : 0;
+    invalidateCaches(ctx);
+    dirtyMarkAll(&ctx->dirtyLines);
+    forgetHistory(ctx);
+}
+DLL_EXPORT int ctxGetWritePolicy(CPUContext* ctx) {
+    return ctx->cache.writePolicy;
+}
+DLL_EXPORT int ctxGetWriteAllocate(CPUContext* ctx) {
+    return ctx->cache.writeAllocate;
+}
+
+// -----------------------------------------------------------
+// Hierarquia de cache (L2, L3 abaixo da L1)
+// -----------------------------------------------------------
+DLL_EXPORT int ctxSetCacheLevels(CPUContext* ctx, const CacheLevelConfig* levels, int count) {
+    if (ctx->system) return 0;   // Núcleos: só a L1 privada
+    if (count < 0 || count > MAX_CACHE_LEVELS - 1 || (count > 0 && !levels)) {
+        return 0;
+    }
+    Cache fresh[MAX_CACHE_LEVELS - 1];
+    int made = 0, ok = 1;
+    while (ok && made < count) {
+        const CacheLevelConfig* cfg = &levels[made];
+        Cache* c = &fresh[made];
+        if (cfg->lines <= 0 || cfg->latency < 1 ||
+            cfg->inclusion < INCL_NINE || cfg->inclusion > INCL_EXCLUSIVE ||
+            !allocCache(c, cfg->lines, ctx->cache.blockWords)) {
+            ok = 0;
+            break;
+        }
+        made++;
+        c->policy    = ctx->cache.policy;
+        c->rngSeed   = ctx->cache.rngSeed;
+        c->latency   = cfg->latency;
+        c->inclusion = cfg->inclusion;
+        ok = applyAssociativity(c, cfg->associativity);
+    }
+    if (!ok) {
+        while (made > 0) freeCache(&fresh[--made]);
+        return 0;
+    }
+    // Linhas modificadas voltam para a memória antes da troca
+    writeBackAll(ctx);
+    for (int k = 0; k < MAX_CACHE_LEVELS - 1; k++) {
+        freeCache(&ctx->lower[k]);
+    }
+    for (int k = 0; k < count; k++) {
+        ctx->lower[k] = fresh[k];
+    }
+    ctx->numLevels = count + 1;
+    invalidateCaches(ctx);
+    dirtyMarkAll(&ctx->dirtyLines);
+    forgetHistory(ctx);
+    return 1;
+}
+
+DLL_EXPORT int ctxGetCacheLevelCount(CPUContext* ctx) {
+    return ctx->numLevels;
+}
+
+DLL_EXPORT int ctxGetCacheLevelConfig(CPUContext* ctx, int level, CacheLevelConfig* out) {
+    if (level < 0 || level >= ctx->numLevels || !out) return 0;
+    const Cache* c = cacheLevel(ctx, level);
+    out->lines         = c->numLines;
+    out->associativity = c->ways == 1 ? 1 : c->ways == c->numLines ? 0 : c->ways;
+    out->latency       = level == 0 ? ctx->timing.hitLatency : c->latency;
+    out->inclusion     = level == 0 ? INCL_NINE : c->inclusion;
+    return 1;
+}
+
+static double missRate(const Cache* c) {
+    long long accesses = c->hits + c->misses;
+    return accesses ? (double)c->misses / (double)accesses : 0.0;
+}
+
+// AMAT a partir do nível k: sua latência + taxa de falta * AMAT do nível de baixo
+static double levelAmat(CPUContext* ctx, int k) {
+    const TimingModel* t = &ctx->timing;
+    if (k == ctx->numLevels) return t->memLatency;
+    const Cache* c = cacheLevel(ctx, k);
+    if (k == 0) return t->hitLatency + missRate(c) * (t->missLatency + levelAmat(ctx, 1));
+    return c->latency + missRate(c) * levelAmat(ctx, k + 1);
+}
+
+DLL_EXPORT int ctxGetCacheLevelStats(CPUContext* ctx, int level, CacheLevelStats* out) {
+    if (level < 0 || level >= ctx->numLevels || !out) return 0;
+    const Cache* c = cacheLevel(ctx, level);
+    out->hits       = c->hits;
+    out->misses     = c->misses;
+    out->writeBacks = c->writeBacks;
+    out->amat       = levelAmat(ctx, level);
+    return 1;
+}
+
+DLL_EXPORT int ctxGetCacheLevelSize(CPUContext* ctx, int level) {
+    if (level < 0 || level >= ctx->numLevels) return 0;
+    return cacheLevel(ctx, level)->numLines;
+}
+
+DLL_EXPORT CacheLine* ctxGetCacheLevelLineArray(CPUContext* ctx, int level) {
+    if (level < 0 || level >= ctx->numLevels) return NULL;
+    return cacheLevel(ctx, level)->lines;
+}
+
+// -----------------------------------------------------------
+// Prefetch na L1
+// -----------------------------------------------------------
+DLL_EXPORT int ctxSetPrefetcher(CPUContext* ctx, const PrefetchConfig* config) {
+    if (!config || config->kind < PREFETCH_NONE || config->kind > PREFETCH_STREAM ||
+        config->degree < 1 || config->degree > PREFETCH_MAX_DEGREE ||
+        config->distance < 1 || config->distance > PREFETCH_MAX_DISTANCE) {
+        return 0;
+    }
+    // Recomeça com a cache vazia para os totais valerem só para este prefetcher
+    writeBackAll(ctx);
+    ctx->prefetcher.config = *config;
+    invalidateCaches(ctx);
+    dirtyMarkAll(&ctx->dirtyLines);
+    forgetHistory(ctx);
+    return 1;
+}
+
+DLL_EXPORT void ctxGetPrefetcher(CPUContext* ctx, PrefetchConfig* out) {
+    if (out) *out = ctx->prefetcher.config;
+}
+
+DLL_EXPORT void ctxGetPrefetchStats(CPUContext* ctx, PrefetchStats* out) {
+    if (out) *out = ctx->prefetcher.stats;
+}
+
+// -----------------------------------------------------------
+// Configuração da máquina
+// -----------------------------------------------------------
+// associativity: como em setCacheAssociativity.
+// Reinicia memória, registradores, cache, ciclos e histórico (mantém as
+// instruções). Retorna 1 em sucesso, 0 se a configuração for inválida.
+DLL_EXPORT int ctxConfigureMachine(CPUContext* ctx, int memWords, int numLines, int wordsPerBlock, int associativity) {
+    if (associativity < 0 || (associativity > 1 && associativity < numLines &&
+                              numLines % associativity != 0)) {
+        return 0;
+    }
+    if (!allocateMachine(ctx, memWords, numLines, wordsPerBlock)) {
+        return 0;
+    }
+    ctxSetCacheAssociativity(ctx, associativity);
+    ctxResetCPU(ctx);
+    return 1;
+}
+
+// -----------------------------------------------------------
+// Multinúcleo: núcleos com L1 privada sobre a memória compartilhada
+// -----------------------------------------------------------
+DLL_EXPORT MultiCore* createMultiCore(int cores, int memWords, int cacheLines, int blockWords,
+                                      int associativity, int protocol) {
+    if (cores < 1 || cores > MAX_CORES ||
+        (protocol != PROTOCOL_MSI && protocol != PROTOCOL_MESI)) {
+        return NULL;
+    }
+    MultiCore* mc = (MultiCore*)calloc(1, sizeof(MultiCore));
+    if (!mc) return NULL;
+    mc->protocol   = protocol;
+    mc->interleave = 1;
+    for (int i = 0; i < cores; i++) {
+        CPUContext* ctx = createCPUContext();
+        if (!ctx) break;
+        mc->cores[mc->numCores++] = ctx;
+        if (!ctxConfigureMachine(ctx, memWords, cacheLines, blockWords, associativity)) break;
+        ctxSetWritePolicy(ctx, WRITE_BACK, 1);
+        ctx->coherenceLost = (unsigned char*)calloc(((size_t)(memWords / blockWords) + 7) / 8, 1);
+        if (!ctx->coherenceLost) break;
+    }
+    if (mc->numCores < cores || !mc->cores[cores - 1]->coherenceLost) {
+        destroyMultiCore(mc);
+        return NULL;
+    }
+    // A memória do núcleo 0 passa a ser a de todos
+    mc->memory = mc->cores[0]->memoryData;
+    for (int i = 0; i < cores; i++) {
+        CPUContext* ctx = mc->cores[i];
+        if (ctx->memoryData != mc->memory) {
+            free(ctx->memoryData);
+            ctx->memoryData = mc->memory;
+        }
+        ctx->system = mc;
+        ctx->coreId = i;
+    }
+    return mc;
+}
+
+DLL_EXPORT void destroyMultiCore(MultiCore* mc) {
+    if (!mc) return;
+    for (int i = 0; i < mc->numCores; i++) {
+        CPUContext* ctx = mc->cores[i];
+        if (mc->memory && ctx->memoryData == mc->memory) ctx->memoryData = NULL;
+        ctx->system = NULL;
+        destroyCPUContext(ctx);
+    }
+    free(mc->memory);
+    free(mc);
+}
+
+DLL_EXPORT int mcGetCoreCount(MultiCore* mc) {
+    return mc->numCores;
+}
+
+DLL_EXPORT CPUContext* mcGetCore(MultiCore* mc, int core) {
+    if (core < 0 || core >= mc->numCores) return NULL;
+    return mc->cores[core];
+}
+
+DLL_EXPORT int mcGetProtocol(MultiCore* mc) {
+    return mc->protocol;
+}
+
+// Instruções seguidas de cada núcleo antes de passar a vez
+DLL_EXPORT int mcSetInterleave(MultiCore* mc, int steps) {
+    if (steps < 1) return 0;
+    mc->interleave = steps;
+    return 1;
+}
+
+DLL_EXPORT int mcGetInterleave(MultiCore* mc) {
+    return mc->interleave;
+}
+
+DLL_EXPORT int mcGetCurrentCore(MultiCore* mc) {
+    return mc->current;
+}
+
+// Uma instrução do núcleo da vez; núcleos que terminaram perdem a vez
+DLL_EXPORT int mcStep(MultiCore* mc) {
+    for (int tries = 0; tries < mc->numCores; tries++) {
+        int core = mc->current;
+        int ran  = stepInstruction(mc->cores[core]);
+        if (!ran || ++mc->slice >= mc->interleave) {
+            mc->current = (core + 1) % mc->numCores;
+            mc->slice   = 0;
+        }
+        if (ran) return core;
+    }
+    return -1;
+}
+
+DLL_EXPORT int mcRun(MultiCore* mc, int maxSteps) {
+    int steps = 0;
+    while (steps < maxSteps && mcStep(mc) >= 0) {
+        steps++;
+    }
+    return steps;
+}
+
+DLL_EXPORT int mcRunUntilEnd(MultiCore* mc) {
+    int steps = 0;
+    while (mcStep(mc) >= 0) {
+        steps++;
+    }
+    return steps;
+}
+
+DLL_EXPORT void mcReset(MultiCore* mc) {
+    for (int i = 0; i < mc->numCores; i++) {
+        resetContext(mc->cores[i]);
+    }
+    mc->current = 0;
+    mc->slice   = 0;
+}
+
+DLL_EXPORT int mcGetCoherenceStats(MultiCore* mc, int core, CoherenceStats* out) {
+    if (core < -1 || core >= mc->numCores || !out) return 0;
+    if (core >= 0) {
+        *out = mc->cores[core]->coherence;
+        return 1;
+    }
+    memset(out, 0, sizeof(*out));
+    for (int i = 0; i < mc->numCores; i++) {
+        const CoherenceStats* s = &mc->cores[i]->coherence;
+        out->busReads        += s->busReads;
+        out->busReadX        += s->busReadX;
+        out->busUpgrades     += s->busUpgrades;
+        out->flushes         += s->flushes;
+        out->invalidations   += s->invalidations;
+        out->coherenceMisses += s->coherenceMisses;
+    }
+    return 1;
+}
+
+DLL_EXPORT unsigned char* ctxGetCacheCoherenceArray(CPUContext* ctx) {
+    return ctx->cache.coherence;
+}
+
+// -----------------------------------------------------------
+// API sem contexto: opera sobre o contexto padrão
+// -----------------------------------------------------------
+DLL_EXPORT void initCPU(void)                 { ctxInitCPU(&defaultContext); }
+DLL_EXPORT void resetCPU(void)                { ctxResetCPU(&defaultContext); }
+
+DLL_EXPORT void loadDefaultInstructions(void) { ctxLoadDefaultInstructions(&defaultContext); }
+DLL_EXPORT int  setInstructions(char* instructions[], int count) {
+    return ctxSetInstructions(&defaultContext, instructions, count);
+}
+DLL_EXPORT int  getInstructionCount(void)     { return ctxGetInstructionCount(&defaultContext); }
+DLL_EXPORT int  loadProgramFile(const char* path) { return ctxLoadProgramFile(&defaultContext, path); }
+DLL_EXPORT const char* getInstructionLine(int index) {
+    return ctxGetInstructionLine(&defaultContext, index);
+}
+DLL_EXPORT int  getAssembleErrorCount(void)   { return ctxGetAssembleErrorCount(&defaultContext); }
+DLL_EXPORT const char* getAssembleErrors(void) { return ctxGetAssembleErrors(&defaultContext); }
+
+DLL_EXPORT void nextInstruction(void)         { ctxNextInstruction(&defaultContext); }
+DLL_EXPORT int  runInstructions(int maxSteps) { return ctxRunInstructions(&defaultContext, maxSteps); }
+DLL_EXPORT int  runUntilEnd(void)             { return ctxRunUntilEnd(&defaultContext); }
+DLL_EXPORT int  isProgramFinished(void)       { return ctxIsProgramFinished(&defaultContext); }
+
+DLL_EXPORT size_t saveCheckpoint(void* buf, size_t size) { return ctxSaveCheckpoint(&defaultContext, buf, size); }
+DLL_EXPORT int  restoreCheckpoint(const void* buf, size_t size) {
+    return ctxRestoreCheckpoint(&defaultContext, buf, size);
+}
+DLL_EXPORT int  setCheckpointInterval(int steps) { return ctxSetCheckpointInterval(&defaultContext, steps); }
+DLL_EXPORT int  getCheckpointInterval(void)   { return ctxGetCheckpointInterval(&defaultContext); }
+DLL_EXPORT int  setUndoLogCapacity(int bytes) { return ctxSetUndoLogCapacity(&defaultContext, bytes); }
+DLL_EXPORT int  getUndoLogCapacity(void)      { return ctxGetUndoLogCapacity(&defaultContext); }
+DLL_EXPORT int  getStepCount(void)            { return ctxGetStepCount(&defaultContext); }
+DLL_EXPORT int  getFirstReachableStep(void)   { return ctxGetFirstReachableStep(&defaultContext); }
+DLL_EXPORT int  gotoStep(int step)            { return ctxGotoStep(&defaultContext, step); }
+DLL_EXPORT int  stepBack(void)                { return ctxStepBack(&defaultContext); }
+DLL_EXPORT int  addBreakpoint(int kind, long long value) { return ctxAddBreakpoint(&defaultContext, kind, value); }
+DLL_EXPORT int  removeBreakpoint(int id)      { return ctxRemoveBreakpoint(&defaultContext, id); }
+DLL_EXPORT void clearBreakpoints(void)        { ctxClearBreakpoints(&defaultContext); }
+DLL_EXPORT int  setBreakpointEnabled(int id, int enabled) {
+    return ctxSetBreakpointEnabled(&defaultContext, id, enabled);
+}
+DLL_EXPORT int  getBreakpoint(int id, Breakpoint* out) { return ctxGetBreakpoint(&defaultContext, id, out); }
+DLL_EXPORT int  runUntilBreak(int maxSteps)   { return ctxRunUntilBreak(&defaultContext, maxSteps); }
+DLL_EXPORT int  getBreakInfo(BreakInfo* out)  { return ctxGetBreakInfo(&defaultContext, out); }
+DLL_EXPORT int  consumeDirty(int* regsOut, int maxRegs, int* memOut, int maxMem,
+                             int* linesOut, int maxLines, int* countsOut) {
+    return ctxConsumeDirty(&defaultContext, regsOut, maxRegs, memOut, maxMem, linesOut, maxLines, countsOut);
+}
+
+DLL_EXPORT size_t replayTrace(const int32_t* addrs, const uint8_t* isWrite, size_t n, uint8_t* hitBitmap) {
+    return ctxReplayTrace(&defaultContext, addrs, isWrite, n, hitBitmap);
+}
+DLL_EXPORT void getTraceStats(TraceStats* out) { ctxGetTraceStats(&defaultContext, out); }
+DLL_EXPORT void resetTraceStats(void)          { ctxResetTraceStats(&defaultContext); }
+
+DLL_EXPORT int  setProfiling(int enabled)      { return ctxSetProfiling(&defaultContext, enabled); }
+DLL_EXPORT int  getProfiling(void)             { return ctxGetProfiling(&defaultContext); }
+DLL_EXPORT void resetProfile(void)             { ctxResetProfile(&defaultContext); }
+DLL_EXPORT PcProfile* getPcProfileArray(void)  { return ctxGetPcProfileArray(&defaultContext); }
+DLL_EXPORT int  getPcProfileSize(void)         { return ctxGetPcProfileSize(&defaultContext); }
+DLL_EXPORT AddressProfile* getAddressProfileArray(void) { return ctxGetAddressProfileArray(&defaultContext); }
+DLL_EXPORT int  getAddressProfileSize(void)    { return ctxGetAddressProfileSize(&defaultContext); }
+DLL_EXPORT void getMissClassStats(MissClassStats* out) { ctxGetMissClassStats(&defaultContext, out); }
+
+DLL_EXPORT const char* getRegistersString(void) { return ctxGetRegistersString(&defaultContext); }
+DLL_EXPORT int* getRegisterArray(void)        { return ctxGetRegisterArray(&defaultContext); }
+DLL_EXPORT int  getRegisterCount(void)        { return ctxGetRegisterCount(&defaultContext); }
+DLL_EXPORT void setRegisterValue(const char* regName, int value) {
+    ctxSetRegisterValue(&defaultContext, regName, value);
+}
+
+DLL_EXPORT const char* getMemoryString(void)  { return ctxGetMemoryString(&defaultContext); }
+DLL_EXPORT int* getMemoryArray(void)          { return ctxGetMemoryArray(&defaultContext); }
+DLL_EXPORT int  getMemorySize(void)           { return ctxGetMemorySize(&defaultContext); }
+DLL_EXPORT void setMemoryValue(int address, int value) {
+    ctxSetMemoryValue(&defaultContext, address, value);
+}
+DLL_EXPORT int  getMemoryValue(int address)   { return ctxGetMemoryValue(&defaultContext, address); }
+DLL_EXPORT int  findMemoryValue(int value, int start) { return ctxFindMemoryValue(&defaultContext, value, start); }
+
+DLL_EXPORT int  getExplanationMode(void)      { return ctxGetExplanationMode(&defaultContext); }
+DLL_EXPORT void setExplanationMode(int mode)  { ctxSetExplanationMode(&defaultContext, mode); }
+
+DLL_EXPORT const char* getLastOperationText(void)   { return ctxGetLastOperationText(&defaultContext); }
+DLL_EXPORT const char* getLastExplanationText(void) { return ctxGetLastExplanationText(&defaultContext); }
+
+DLL_EXPORT void clearHistory(void)            { ctxClearHistory(&defaultContext); }
+DLL_EXPORT int  setEventLogCapacity(int capacity) { return ctxSetEventLogCapacity(&defaultContext, capacity); }
+DLL_EXPORT int  getEventLogCapacity(void)     { return ctxGetEventLogCapacity(&defaultContext); }
+DLL_EXPORT long long getEventSequence(void)   { return ctxGetEventSequence(&defaultContext); }
+DLL_EXPORT int  getEventsSince(long long since, ExecEvent* out, int maxOut) {
+    return ctxGetEventsSince(&defaultContext, since, out, maxOut);
+}
+DLL_EXPORT int  getLastEvent(ExecEvent* out)  { return ctxGetLastEvent(&defaultContext, out); }
+DLL_EXPORT const char* formatEvent(const ExecEvent* ev) { return ctxFormatEvent(&defaultContext, ev); }
+DLL_EXPORT const char* getHistoryString(void) { return ctxGetHistoryString(&defaultContext); }
+
+DLL_EXPORT long long getTotalCycles(void)    { return ctxGetTotalCycles(&defaultContext); }
+DLL_EXPORT int  getLastInstructionCost(void)  { return ctxGetLastInstructionCost(&defaultContext); }
+
+DLL_EXPORT int  setTimingModel(const TimingModel* timing) { return ctxSetTimingModel(&defaultContext, timing); }
+DLL_EXPORT void getTimingModel(TimingModel* out)      { ctxGetTimingModel(&defaultContext, out); }
+DLL_EXPORT void setPipelineMode(int enabled)          { ctxSetPipelineMode(&defaultContext, enabled); }
+DLL_EXPORT int  getPipelineMode(void)                 { return ctxGetPipelineMode(&defaultContext); }
+DLL_EXPORT void setForwarding(int enabled)            { ctxSetForwarding(&defaultContext, enabled); }
+DLL_EXPORT int  getForwarding(void)                   { return ctxGetForwarding(&defaultContext); }
+DLL_EXPORT void getPipelineStats(PipelineStats* out)  { ctxGetPipelineStats(&defaultContext, out); }
+DLL_EXPORT int  getOpcodeStats(long long* countsOut, long long* cyclesOut, int n) {
+    return ctxGetOpcodeStats(&defaultContext, countsOut, cyclesOut, n);
+}
+
+DLL_EXPORT int  getCacheSize(void)            { return ctxGetCacheSize(&defaultContext); }
+DLL_EXPORT int  getBlockWords(void)           { return ctxGetBlockWords(&defaultContext); }
+DLL_EXPORT void getCacheStatus(long long* hitsOut, long long* missesOut) {
+    ctxGetCacheStatus(&defaultContext, hitsOut, missesOut);
+}
+DLL_EXPORT void getMemoryTraffic(MemoryTraffic* out) { ctxGetMemoryTraffic(&defaultContext, out); }
+DLL_EXPORT int  flushCache(void)              { return ctxFlushCache(&defaultContext); }
+DLL_EXPORT const char* getCacheLineString(int lineIndex) {
+    return ctxGetCacheLineString(&defaultContext, lineIndex);
+}
+DLL_EXPORT CacheLine* getCacheLineArray(void) { return ctxGetCacheLineArray(&defaultContext); }
+DLL_EXPORT int* getCacheDataArray(void)       { return ctxGetCacheDataArray(&defaultContext); }
+DLL_EXPORT int  getCacheLines(CacheLine* out, int n) { return ctxGetCacheLines(&defaultContext, out, n); }
+DLL_EXPORT int  getCacheLineOfAddress(int address) { return ctxGetCacheLineOfAddress(&defaultContext, address); }
+DLL_EXPORT int  findCacheValue(int value, int start) { return ctxFindCacheValue(&defaultContext, value, start); }
+DLL_EXPORT void setCacheWordData(int lineIndex, int offset, int newData) {
+    ctxSetCacheWordData(&defaultContext, lineIndex, offset, newData);
+}
+DLL_EXPORT void setCacheLineData(int lineIndex, int newData) {
+    ctxSetCacheLineData(&defaultContext, lineIndex, newData);
+}
+
+DLL_EXPORT void setCacheMappingMode(int mode) { ctxSetCacheMappingMode(&defaultContext, mode); }
+DLL_EXPORT int  getCacheMappingMode(void)     { return ctxGetCacheMappingMode(&defaultContext); }
+DLL_EXPORT int  setCacheAssociativity(int ways) { return ctxSetCacheAssociativity(&defaultContext, ways); }
+DLL_EXPORT int  getCacheWays(void)            { return ctxGetCacheWays(&defaultContext); }
+
+DLL_EXPORT void setReplacementPolicy(int policy)     { ctxSetReplacementPolicy(&defaultContext, policy); }
+DLL_EXPORT int  getReplacementPolicy(void)           { return ctxGetReplacementPolicy(&defaultContext); }
+DLL_EXPORT void setReplacementSeed(unsigned int seed) { ctxSetReplacementSeed(&defaultContext, seed); }
+
+DLL_EXPORT void setWritePolicy(int policy, int allocate) { ctxSetWritePolicy(&defaultContext, policy, allocate); }
+DLL_EXPORT int  getWritePolicy(void)                 { return ctxGetWritePolicy(&defaultContext); }
+DLL_EXPORT int  getWriteAllocate(void)               { return ctxGetWriteAllocate(&defaultContext); }
+
+DLL_EXPORT int  setCacheLevels(const CacheLevelConfig* levels, int count) {
+    return ctxSetCacheLevels(&defaultContext, levels, count);
+}
+DLL_EXPORT int  getCacheLevelCount(void)             { return ctxGetCacheLevelCount(&defaultContext); }
+DLL_EXPORT int  getCacheLevelConfig(int level, CacheLevelConfig* out) {
+    return ctxGetCacheLevelConfig(&defaultContext, level, out);
 }
-DLL_EXPORT int getCacheMappingMode(void) {
-    return mappingMode;
+DLL_EXPORT int  getCacheLevelStats(int level, CacheLevelStats* out) {
+    return ctxGetCacheLevelStats(&defaultContext, level, out);
+}
+DLL_EXPORT int  getCacheLevelSize(int level)         { return ctxGetCacheLevelSize(&defaultContext, level); }
+DLL_EXPORT CacheLine* getCacheLevelLineArray(int level) { return ctxGetCacheLevelLineArray(&defaultContext, level); }
+
+DLL_EXPORT int  setPrefetcher(const PrefetchConfig* config) { return ctxSetPrefetcher(&defaultContext, config); }
+DLL_EXPORT void getPrefetcher(PrefetchConfig* out)    { ctxGetPrefetcher(&defaultContext, out); }
+DLL_EXPORT void getPrefetchStats(PrefetchStats* out)  { ctxGetPrefetchStats(&defaultContext, out); }
+
+DLL_EXPORT unsigned char* getCacheCoherenceArray(void) { return ctxGetCacheCoherenceArray(&defaultContext); }
+
+DLL_EXPORT int  configureMachine(int memWords, int numLines, int wordsPerBlock, int associativity) {
+    return ctxConfigureMachine(&defaultContext, memWords, numLines, wordsPerBlock, associativity);
 }
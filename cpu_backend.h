@@ -1,6 +1,9 @@
 #ifndef CPU_BACKEND_H
 #define CPU_BACKEND_H
 
+#include <stddef.h>
+#include <stdint.h>
+
 #ifdef __cplusplus
 extern "C" {
 #endif
@@ -11,34 +14,416 @@ extern "C" {
 #define DLL_EXPORT
 #endif
 
+// Políticas de substituição
+#define REPL_LRU     0
+#define REPL_FIFO    1
+#define REPL_RANDOM  2   // Semente em setReplacementSeed
+#define REPL_PLRU    3   // Árvore pseudo-LRU (vias potência de dois; senão LRU)
+
+// Políticas de escrita
+#define WRITE_THROUGH 0  // STORE escreve na cache e na memória
+#define WRITE_BACK    1  // STORE só marca a linha; a memória é atualizada ao substituí-la
+
+// Hierarquia de cache: a L1 (configureMachine) e até MAX_CACHE_LEVELS-1
+// níveis abaixo dela (setCacheLevels), todos com o mesmo tamanho de bloco
+#define MAX_CACHE_LEVELS 3
+
+// Inclusão de um nível abaixo da L1 em relação aos níveis acima dele
+#define INCL_NINE       0  // Não inclusiva: guarda o que busca; vítimas limpas de cima são descartadas
+#define INCL_INCLUSIVE  1  // Contém os níveis de cima: ao substituir, invalida as cópias de cima
+#define INCL_EXCLUSIVE  2  // Nunca repete os níveis de cima: recebe as vítimas e entrega o bloco ao subir
+
+// Prefetchers da L1 (setPrefetcher)
+#define PREFETCH_NONE      0
+#define PREFETCH_NEXT_LINE 1  // Falta (ou primeiro uso de um bloco de prefetch): busca os blocos seguintes
+#define PREFETCH_STRIDE    2  // Tabela de passos por instrução (RPT): segue o passo depois de confirmado
+#define PREFETCH_STREAM    3  // Detecta sequências de blocos (subindo ou descendo) e corre à frente delas
+#define PREFETCH_MAX_DEGREE   16
+#define PREFETCH_MAX_DISTANCE 64
+
+// Multinúcleo (createMultiCore): protocolo de coerência por snooping e
+// estado de cada linha das L1 (getCacheCoherenceArray)
+#define MAX_CORES      8
+#define PROTOCOL_MSI   0
+#define PROTOCOL_MESI  1
+#define COH_INVALID    0
+#define COH_SHARED     1
+#define COH_EXCLUSIVE  2  // Só no MESI: única cópia, igual à memória
+#define COH_MODIFIED   3
+
+// Pontos de parada (addBreakpoint): o que value significa em cada tipo
+#define MAX_BREAKPOINTS 64
+#define BREAK_PC        1  // Linha do programa: para antes de executá-la
+#define BREAK_READ      2  // Endereço: para depois de um LOAD nele
+#define BREAK_WRITE     3  // Endereço: para depois de um STORE nele
+#define BREAK_REGISTER  4  // Registrador (0 = R1): para depois de uma instrução que muda seu valor
+#define BREAK_MISS      5  // Endereço (-1 = qualquer): para depois de uma falta na L1 no bloco dele
+#define BREAK_CYCLES    6  // Ciclos: para quando getTotalCycles() passa de value
+
+// -----------------------------------------------------------
+// Estrutura da Cache (exposta para leitura direta via ctypes)
+// -----------------------------------------------------------
+// Os dados de cada linha ficam em getCacheDataArray(), blockWords palavras
+// por linha (linha i ocupa [i*blockWords, (i+1)*blockWords)).
+typedef struct {
+    int valid;
+    int tag;      // Número do bloco (endereço / blockWords)
+    int lastUse;
+    int dirty;    // Modificada em write-back (difere da memória)
+} CacheLine;
+
+// Evento do log de execução (um por instrução executada)
+typedef struct {
+    long long seq;      // Número de sequência (cresce sempre, mesmo após reset)
+    int step;           // Instrução executada desde o último reset (0, 1, ...)
+    int pc;             // Índice da instrução no programa
+    int opcode;         // Ver getOpcodeName
+    int rd, rs1, rs2;   // Registradores (0 = R1), -1 se não usados; LOAD/STORE [Rn]: rs1 = n-1
+    int address;        // Endereço acessado, -1 se não houver
+    int hit;            // 1 = acerto, 0 = falta, -1 = sem acesso à cache
+    int cost;           // Ciclos gastos
+    int value;          // Valor carregado, armazenado ou calculado; desvios: 1 = tomado
+    int imm;            // Imediato (ADDI/LI)
+    int target;         // Linha de destino (BEQ/BNE/JMP), -1 se não for desvio
+} ExecEvent;
+
+// Totais da reprodução de traces (acumulados desde o último reset)
+typedef struct {
+    long long accesses;   // Acessos válidos
+    long long hits;
+    long long misses;
+    long long cycles;
+    long long invalid;    // Endereços fora da memória (ignorados)
+} TraceStats;
+
+// Tráfego entre a cache (o último nível) e a memória principal (desde a última invalidação)
+typedef struct {
+    long long reads;        // Blocos lidos da memória (faltas com alocação)
+    long long writes;       // Escritas na memória: palavras (write-through, sem alocação) e blocos
+    long long writeBacks;   // Parte de writes: linhas modificadas devolvidas à memória
+    long long busBytes;     // Bytes transferidos no barramento, nos dois sentidos
+} MemoryTraffic;
+
+// Latências (ciclos). Acesso com acerto = hitLatency; com falta =
+// hitLatency + missLatency + a latência de cada nível consultado abaixo da
+// L1 + memLatency se nenhum tiver o bloco. ADD/SUB = aluLatency. Substituir
+// uma linha modificada (write-back) soma a latência do nível de baixo
+// (memLatency sem L2).
+typedef struct {
+    int hitLatency;     // Acesso à cache com acerto (>= 1)
+    int missLatency;    // Tratamento da falta na cache, além da memória
+    int memLatency;     // Leitura do bloco na memória principal
+    int aluLatency;     // Operação na ULA (>= 1)
+} TimingModel;
+
+// Configuração de um nível de cache
+typedef struct {
+    int lines;          // Linhas (múltiplo das vias)
+    int associativity;  // 1 = direto, 0 = totalmente associativo, N = N vias
+    int latency;        // Ciclos de uma consulta ao nível (>= 1); na L1 é hitLatency
+    int inclusion;      // INCL_* (não se aplica à L1)
+} CacheLevelConfig;
+
+// Totais de um nível de cache (desde a última invalidação)
+typedef struct {
+    long long hits;         // Na L1, acessos; abaixo, buscas de bloco vindas de cima
+    long long misses;
+    long long writeBacks;   // Linhas modificadas enviadas ao nível de baixo
+    double    amat;         // Tempo médio de acesso a partir deste nível (ciclos)
+} CacheLevelStats;
+
+// Totais do pipeline de 5 estágios (desde o reset ou desde que foi ligado)
+typedef struct {
+    long long instructions;
+    long long cycles;       // Fim do WB da última instrução; CPI = cycles / instructions
+    long long rawStalls;    // Ciclos esperando operandos (dependências RAW)
+    long long controlStalls;// Ciclos perdidos com desvios tomados
+    long long memStalls;    // Ciclos extras no estágio MEM (latência > 1)
+    long long missStalls;   // Parte de memStalls causada por faltas na cache
+    long long exStalls;     // Ciclos extras no estágio EX (aluLatency > 1)
+} PipelineStats;
+
+// Perfil de uma instrução (índice da linha no programa)
+typedef struct {
+    long long count;        // Execuções
+    long long cycles;
+    long long hits;         // Acessos à cache com acerto
+    long long misses;
+} PcProfile;
+
+// Perfil de um endereço de memória (acessos à L1, inclusive de traces)
+typedef struct {
+    long long reads;
+    long long writes;
+    long long hits;
+    long long misses;
+} AddressProfile;
+
+// Faltas da L1 classificadas (3C)
+typedef struct {
+    long long compulsory;   // Primeira referência ao bloco desde a última invalidação
+    long long capacity;     // Faltaria também numa cache totalmente associativa (LRU) do mesmo tamanho
+    long long conflict;     // A totalmente associativa acertaria: falta causada pelo mapeamento
+} MissClassStats;
+
+// Prefetcher da L1
+typedef struct {
+    int kind;               // PREFETCH_*
+    int degree;             // Blocos buscados a cada disparo (1..PREFETCH_MAX_DEGREE)
+    int distance;           // Blocos (ou passos) à frente do acesso (1..PREFETCH_MAX_DISTANCE)
+} PrefetchConfig;
+
+// Totais do prefetcher (desde a última invalidação da cache)
+typedef struct {
+    long long issued;       // Blocos trazidos para a L1 por prefetch
+    long long useful;       // Usados por um acesso antes de sair da L1 (inclui os atrasados)
+    long long late;         // Parte de useful: o acesso chegou antes do bloco e esperou o resto da busca
+    long long polluting;    // Faltas em blocos que um prefetch tinha tirado da L1
+} PrefetchStats;
+
+// Coerência entre núcleos (desde a última invalidação da cache do núcleo).
+// As transações no barramento são contadas no núcleo que as emite; as
+// invalidações, no núcleo que perde a cópia.
+typedef struct {
+    long long busReads;         // BusRd: falta de leitura
+    long long busReadX;         // BusRdX: falta de escrita (lê e invalida as outras cópias)
+    long long busUpgrades;      // BusUpgr: escrita em linha compartilhada
+    long long flushes;          // Linhas modificadas escritas na memória a pedido de outro núcleo
+    long long invalidations;    // Cópias desta L1 invalidadas por escritas de outros núcleos
+    long long coherenceMisses;  // Faltas em blocos que uma invalidação tirou desta L1
+} CoherenceStats;
+
+// Ponto de parada (id = posição, 0..MAX_BREAKPOINTS-1)
+typedef struct {
+    int kind;               // BREAK_*; 0 = posição livre
+    int enabled;
+    long long value;        // Linha, endereço, registrador ou ciclos, conforme kind
+    long long hits;         // Vezes que a condição foi satisfeita em runUntilBreak
+} Breakpoint;
+
+// Por que a última runUntilBreak parou
+typedef struct {
+    int id;                 // Ponto de parada que disparou (o de menor id, se vários); -1 = nenhum
+    int kind;               // BREAK_* do ponto (0 = nenhum: fim do programa ou limite de passos)
+    int step;               // getStepCount() na parada
+    int pc;                 // Linha da última instrução executada
+    int address;            // Endereço acessado por ela, -1 se nenhum
+    int oldValue;           // BREAK_REGISTER: valor anterior do registrador
+    int newValue;           // Valor novo do registrador, lido ou escrito
+    long long cycles;       // getTotalCycles() na parada
+} BreakInfo;
+
+// -----------------------------------------------------------
+// Contextos
+// Todo o estado de uma CPU simulada fica num CPUContext. Cada função
+// ctxXxx(ctx, ...) equivale a xxx(...) aplicada àquele contexto, e as
+// funções sem contexto operam sobre o contexto padrão. Contextos
+// distintos podem ser usados ao mesmo tempo em threads diferentes; um
+// mesmo contexto não deve ser usado por duas threads simultaneamente.
+// -----------------------------------------------------------
+typedef struct CPUContext CPUContext;
+
+DLL_EXPORT CPUContext* createCPUContext(void);            // Já inicializado (initCPU)
+DLL_EXPORT void        destroyCPUContext(CPUContext* ctx);
+DLL_EXPORT CPUContext* cloneCPUContext(const CPUContext* ctx);
+DLL_EXPORT CPUContext* getDefaultCPUContext(void);
+
 // -----------------------------------------------------------
 // Inicialização / Reset
 // -----------------------------------------------------------
 DLL_EXPORT void initCPU(void);
 DLL_EXPORT void resetCPU(void);
 
+DLL_EXPORT void ctxInitCPU(CPUContext* ctx);
+DLL_EXPORT void ctxResetCPU(CPUContext* ctx);
+
 // -----------------------------------------------------------
-// Instruções
+// Instruções (uma por linha, sem limite de linhas; o índice da linha é o
+// endereço da instrução)
+//   LOAD Rd, endereço | LOAD Rd, [Rn]     STORE Rs, endereço | STORE Rs, [Rn]
+//   ADD/SUB Rd, Ra, Rb                    ADDI Rd, Ra, imediato    LI Rd, imediato
+//   BEQ/BNE Ra, Rb, rótulo                JMP rótulo
+// "rótulo:" no início da linha marca a instrução; ';' inicia um comentário.
+// Rótulos são resolvidos na montagem. Linhas vazias, só com rótulo ou só
+// com comentário não executam.
 // -----------------------------------------------------------
 DLL_EXPORT void loadDefaultInstructions(void);
-DLL_EXPORT void setInstructions(char* instructions[], int count);
+DLL_EXPORT int  setInstructions(char* instructions[], int count);   // Linhas carregadas, -1 sem memória
+DLL_EXPORT int  loadProgramFile(const char* path);   // Lê e monta o arquivo; -1 se não puder ler
 DLL_EXPORT int  getInstructionCount(void);
 DLL_EXPORT const char* getInstructionLine(int index);
 DLL_EXPORT void nextInstruction(void);
 
+// Execução em lote: retornam o número de instruções executadas. Para ir
+// rápido, só a última instrução do lote monta os textos de operação e
+// explicação (as anteriores ficam sem eles, também no registro de desfazer)
+DLL_EXPORT int  runInstructions(int maxSteps);
+DLL_EXPORT int  runUntilEnd(void);
+DLL_EXPORT int  isProgramFinished(void);   // 1 = não há mais instruções a executar
+
+// Erros de montagem (detectados uma única vez ao carregar as instruções)
+DLL_EXPORT int  getAssembleErrorCount(void);
+DLL_EXPORT const char* getAssembleErrors(void);
+
+DLL_EXPORT void ctxLoadDefaultInstructions(CPUContext* ctx);
+DLL_EXPORT int  ctxSetInstructions(CPUContext* ctx, char* instructions[], int count);
+DLL_EXPORT int  ctxLoadProgramFile(CPUContext* ctx, const char* path);
+DLL_EXPORT int  ctxGetInstructionCount(CPUContext* ctx);
+DLL_EXPORT const char* ctxGetInstructionLine(CPUContext* ctx, int index);
+DLL_EXPORT void ctxNextInstruction(CPUContext* ctx);
+DLL_EXPORT int  ctxRunInstructions(CPUContext* ctx, int maxSteps);
+DLL_EXPORT int  ctxRunUntilEnd(CPUContext* ctx);
+DLL_EXPORT int  ctxIsProgramFinished(CPUContext* ctx);
+
+// Reprodução de traces: n acessos direto na cache, sem passar por instruções.
+// isWrite (n bytes, 0/1) e hitBitmap ((n+7)/8 bytes, bit i%8 do byte i/8 =
+// acesso i foi acerto) podem ser NULL. Escritas seguem a política de escrita.
+// Retorna os acertos deste bloco.
+DLL_EXPORT size_t replayTrace(const int32_t* addrs, const uint8_t* isWrite, size_t n, uint8_t* hitBitmap);
+DLL_EXPORT void getTraceStats(TraceStats* out);
+DLL_EXPORT void resetTraceStats(void);
+
+DLL_EXPORT size_t ctxReplayTrace(CPUContext* ctx, const int32_t* addrs, const uint8_t* isWrite,
+                                 size_t n, uint8_t* hitBitmap);
+DLL_EXPORT void ctxGetTraceStats(CPUContext* ctx, TraceStats* out);
+DLL_EXPORT void ctxResetTraceStats(CPUContext* ctx);
+
+// -----------------------------------------------------------
+// Perfil (desligado por padrão)
+// Com o perfil ligado cada instrução soma execuções, ciclos, acertos e
+// faltas na sua linha (PcProfile) e cada acesso à L1 — de instruções ou de
+// traces — soma leituras, escritas, acertos e faltas no endereço
+// (AddressProfile). As faltas da L1 são classificadas em compulsórias, de
+// capacidade e de conflito (MissClassStats) com uma cache sombra totalmente
+// associativa LRU com o mesmo número de linhas. O perfil recomeça a cada
+// invalidação da cache (reset, reconfiguração); os contadores por instrução
+// também recomeçam ao carregar um programa. Instruções desfeitas por
+// stepBack/gotoStep continuam contadas.
+// -----------------------------------------------------------
+DLL_EXPORT int  setProfiling(int enabled);        // 0 = sem memória
+DLL_EXPORT int  getProfiling(void);
+DLL_EXPORT void resetProfile(void);               // Zera os contadores
+DLL_EXPORT PcProfile* getPcProfileArray(void);    // NULL se desligado
+DLL_EXPORT int  getPcProfileSize(void);           // = getInstructionCount()
+DLL_EXPORT AddressProfile* getAddressProfileArray(void);
+DLL_EXPORT int  getAddressProfileSize(void);      // = getMemorySize()
+DLL_EXPORT void getMissClassStats(MissClassStats* out);
+
+DLL_EXPORT int  ctxSetProfiling(CPUContext* ctx, int enabled);
+DLL_EXPORT int  ctxGetProfiling(CPUContext* ctx);
+DLL_EXPORT void ctxResetProfile(CPUContext* ctx);
+DLL_EXPORT PcProfile* ctxGetPcProfileArray(CPUContext* ctx);
+DLL_EXPORT int  ctxGetPcProfileSize(CPUContext* ctx);
+DLL_EXPORT AddressProfile* ctxGetAddressProfileArray(CPUContext* ctx);
+DLL_EXPORT int  ctxGetAddressProfileSize(CPUContext* ctx);
+DLL_EXPORT void ctxGetMissClassStats(CPUContext* ctx, MissClassStats* out);
+
+// -----------------------------------------------------------
+// Checkpoints e volta no tempo
+// Um checkpoint é um blob binário com o estado completo (registradores,
+// memória, cache de todos os níveis, contadores, PC). saveCheckpoint
+// retorna o tamanho necessário e grava em buf só se couber;
+// restoreCheckpoint exige a mesma geometria (memória, bloco, níveis).
+// Durante a execução são tirados checkpoints a cada getCheckpointInterval()
+// passos (o intervalo dobra quando eles ocupam memória demais) e cada passo
+// grava no registro de desfazer o que altera. stepBack/gotoStep voltam por
+// esse registro ou pelo checkpoint anterior mais próximo; os eventos dos
+// passos desfeitos saem do log (getEventSequence diminui). Editar
+// registradores, memória ou cache e reconfigurar a máquina descartam o
+// histórico.
+// -----------------------------------------------------------
+DLL_EXPORT size_t saveCheckpoint(void* buf, size_t size);
+DLL_EXPORT int  restoreCheckpoint(const void* buf, size_t size);   // 1 = restaurado
+DLL_EXPORT int  setCheckpointInterval(int steps);   // 0 = desligado
+DLL_EXPORT int  getCheckpointInterval(void);
+DLL_EXPORT int  setUndoLogCapacity(int bytes);      // 0 = desligado
+DLL_EXPORT int  getUndoLogCapacity(void);
+DLL_EXPORT int  getStepCount(void);                 // Instruções executadas
+DLL_EXPORT int  getFirstReachableStep(void);
+DLL_EXPORT int  gotoStep(int step);                 // Retorna o passo atingido
+DLL_EXPORT int  stepBack(void);                     // 1 = voltou uma instrução
+
+DLL_EXPORT size_t ctxSaveCheckpoint(CPUContext* ctx, void* buf, size_t size);
+DLL_EXPORT int  ctxRestoreCheckpoint(CPUContext* ctx, const void* buf, size_t size);
+DLL_EXPORT int  ctxSetCheckpointInterval(CPUContext* ctx, int steps);
+DLL_EXPORT int  ctxGetCheckpointInterval(CPUContext* ctx);
+DLL_EXPORT int  ctxSetUndoLogCapacity(CPUContext* ctx, int bytes);
+DLL_EXPORT int  ctxGetUndoLogCapacity(CPUContext* ctx);
+DLL_EXPORT int  ctxGetStepCount(CPUContext* ctx);
+DLL_EXPORT int  ctxGetFirstReachableStep(CPUContext* ctx);
+DLL_EXPORT int  ctxGotoStep(CPUContext* ctx, int step);
+DLL_EXPORT int  ctxStepBack(CPUContext* ctx);
+
+// -----------------------------------------------------------
+// Pontos de parada
+// Avaliados no backend depois de cada instrução, só durante runUntilBreak
+// (nextInstruction e runInstructions os ignoram). BREAK_PC numa linha sem
+// instrução (rótulo, comentário) vale para a instrução seguinte. Os pontos
+// sobrevivem a reset e a novos programas; initCPU os remove.
+// runUntilBreak executa ao menos uma instrução, então chamá-la de novo
+// continua a partir de um ponto de parada. Como em runInstructions, só a
+// última instrução executada tem textos; numa parada por ponto de parada a
+// explicação diz qual ponto disparou.
+// -----------------------------------------------------------
+DLL_EXPORT int  addBreakpoint(int kind, long long value);   // id, -1 se inválido ou sem posição livre
+DLL_EXPORT int  removeBreakpoint(int id);                   // 1 = removido
+DLL_EXPORT void clearBreakpoints(void);
+DLL_EXPORT int  setBreakpointEnabled(int id, int enabled);  // 0 se a posição está livre
+DLL_EXPORT int  getBreakpoint(int id, Breakpoint* out);     // 0 se a posição está livre
+DLL_EXPORT int  runUntilBreak(int maxSteps);                // Instruções executadas; maxSteps <= 0: sem limite
+DLL_EXPORT int  getBreakInfo(BreakInfo* out);               // 1 se a última runUntilBreak parou num ponto
+
+DLL_EXPORT int  ctxAddBreakpoint(CPUContext* ctx, int kind, long long value);
+DLL_EXPORT int  ctxRemoveBreakpoint(CPUContext* ctx, int id);
+DLL_EXPORT void ctxClearBreakpoints(CPUContext* ctx);
+DLL_EXPORT int  ctxSetBreakpointEnabled(CPUContext* ctx, int id, int enabled);
+DLL_EXPORT int  ctxGetBreakpoint(CPUContext* ctx, int id, Breakpoint* out);
+DLL_EXPORT int  ctxRunUntilBreak(CPUContext* ctx, int maxSteps);
+DLL_EXPORT int  ctxGetBreakInfo(CPUContext* ctx, BreakInfo* out);
+
+// -----------------------------------------------------------
+// Alterações desde a última chamada (para redesenho incremental)
+// Copia os índices de registradores, endereços de memória e linhas de cache
+// alterados e limpa os conjuntos. countsOut[0..2] recebe a quantidade de
+// cada um, ou -1 se tudo deve ser redesenhado. Retorna 1 se algo mudou.
+// -----------------------------------------------------------
+DLL_EXPORT int  consumeDirty(int* regsOut, int maxRegs, int* memOut, int maxMem,
+                             int* linesOut, int maxLines, int* countsOut);
+
+DLL_EXPORT int  ctxConsumeDirty(CPUContext* ctx, int* regsOut, int maxRegs, int* memOut, int maxMem,
+                                int* linesOut, int maxLines, int* countsOut);
+DLL_EXPORT int  ctxGetAssembleErrorCount(CPUContext* ctx);
+DLL_EXPORT const char* ctxGetAssembleErrors(CPUContext* ctx);
+
 // -----------------------------------------------------------
 // Registradores
 // -----------------------------------------------------------
 DLL_EXPORT const char* getRegistersString(void);
+DLL_EXPORT int* getRegisterArray(void);   // regs[0] = R1, ..., regs[n-1]
+DLL_EXPORT int  getRegisterCount(void);
 DLL_EXPORT void setRegisterValue(const char* regName, int value);
 
+DLL_EXPORT const char* ctxGetRegistersString(CPUContext* ctx);
+DLL_EXPORT int* ctxGetRegisterArray(CPUContext* ctx);
+DLL_EXPORT int  ctxGetRegisterCount(CPUContext* ctx);
+DLL_EXPORT void ctxSetRegisterValue(CPUContext* ctx, const char* regName, int value);
+
 // -----------------------------------------------------------
 // Memória
 // -----------------------------------------------------------
 DLL_EXPORT const char* getMemoryString(void);
+DLL_EXPORT int* getMemoryArray(void);     // getMemorySize() palavras
 DLL_EXPORT int  getMemorySize(void);
 DLL_EXPORT void setMemoryValue(int address, int value);
 DLL_EXPORT int  getMemoryValue(int address);
+DLL_EXPORT int  findMemoryValue(int value, int start);   // Próximo endereço com o valor, ou -1
+
+DLL_EXPORT const char* ctxGetMemoryString(CPUContext* ctx);
+DLL_EXPORT int* ctxGetMemoryArray(CPUContext* ctx);
+DLL_EXPORT int  ctxGetMemorySize(CPUContext* ctx);
+DLL_EXPORT void ctxSetMemoryValue(CPUContext* ctx, int address, int value);
+DLL_EXPORT int  ctxGetMemoryValue(CPUContext* ctx, int address);
+DLL_EXPORT int  ctxFindMemoryValue(CPUContext* ctx, int value, int start);
 
 // -----------------------------------------------------------
 // Modo Explicação
@@ -46,37 +431,236 @@ DLL_EXPORT int  getMemoryValue(int address);
 DLL_EXPORT int  getExplanationMode(void);
 DLL_EXPORT void setExplanationMode(int mode);
 
+DLL_EXPORT int  ctxGetExplanationMode(CPUContext* ctx);
+DLL_EXPORT void ctxSetExplanationMode(CPUContext* ctx, int mode);
+
 // -----------------------------------------------------------
 // Última operação e explicação
 // -----------------------------------------------------------
 DLL_EXPORT const char* getLastOperationText(void);
 DLL_EXPORT const char* getLastExplanationText(void);
 
+DLL_EXPORT const char* ctxGetLastOperationText(CPUContext* ctx);
+DLL_EXPORT const char* ctxGetLastExplanationText(CPUContext* ctx);
+
 // -----------------------------------------------------------
-// Histórico
+// Histórico: log circular de eventos (ExecEvent) com capacidade configurável.
+// getEventsSince(seq, ...) devolve só os eventos novos desde seq; se o log
+// já descartou alguns, começa pelo mais antigo ainda guardado.
 // -----------------------------------------------------------
 DLL_EXPORT void clearHistory(void);
-DLL_EXPORT const char* getHistoryString(void);
+DLL_EXPORT const char* getHistoryString(void);   // Texto dos eventos guardados
+DLL_EXPORT int  setEventLogCapacity(int capacity);
+DLL_EXPORT int  getEventLogCapacity(void);
+DLL_EXPORT long long getEventSequence(void);     // seq do próximo evento
+DLL_EXPORT int  getEventsSince(long long since, ExecEvent* out, int maxOut);
+DLL_EXPORT int  getLastEvent(ExecEvent* out);    // 0 se o log estiver vazio
+DLL_EXPORT const char* formatEvent(const ExecEvent* ev);
+
+DLL_EXPORT void ctxClearHistory(CPUContext* ctx);
+DLL_EXPORT const char* ctxGetHistoryString(CPUContext* ctx);
+DLL_EXPORT int  ctxSetEventLogCapacity(CPUContext* ctx, int capacity);
+DLL_EXPORT int  ctxGetEventLogCapacity(CPUContext* ctx);
+DLL_EXPORT long long ctxGetEventSequence(CPUContext* ctx);
+DLL_EXPORT int  ctxGetEventsSince(CPUContext* ctx, long long since, ExecEvent* out, int maxOut);
+DLL_EXPORT int  ctxGetLastEvent(CPUContext* ctx, ExecEvent* out);
+DLL_EXPORT const char* ctxFormatEvent(CPUContext* ctx, const ExecEvent* ev);
 
 // -----------------------------------------------------------
 // Ciclos (Clock)
 // -----------------------------------------------------------
-DLL_EXPORT int  getTotalCycles(void);
+// Totais em 64 bits: execuções longas passam de 2^31
+DLL_EXPORT long long getTotalCycles(void);
 DLL_EXPORT int  getLastInstructionCost(void);
 
+DLL_EXPORT long long ctxGetTotalCycles(CPUContext* ctx);
+DLL_EXPORT int  ctxGetLastInstructionCost(CPUContext* ctx);
+
+// -----------------------------------------------------------
+// Modelo de temporização e pipeline
+// Modo sequencial (padrão): custo da instrução = sua latência.
+// Modo pipeline: IF, ID, EX, MEM, WB em ordem; estágios levam 1 ciclo,
+// exceto EX (aluLatency em ADD/SUB) e MEM (latência do acesso em
+// LOAD/STORE). O custo de cada instrução é o quanto ela atrasa o fim do
+// programa, incluindo bolhas por dependências RAW (menores com forwarding).
+// -----------------------------------------------------------
+DLL_EXPORT int  setTimingModel(const TimingModel* timing);   // 0 se inválido
+DLL_EXPORT void getTimingModel(TimingModel* out);
+DLL_EXPORT void setPipelineMode(int enabled);
+DLL_EXPORT int  getPipelineMode(void);
+DLL_EXPORT void setForwarding(int enabled);
+DLL_EXPORT int  getForwarding(void);
+DLL_EXPORT void getPipelineStats(PipelineStats* out);
+
+DLL_EXPORT int  ctxSetTimingModel(CPUContext* ctx, const TimingModel* timing);
+DLL_EXPORT void ctxGetTimingModel(CPUContext* ctx, TimingModel* out);
+DLL_EXPORT void ctxSetPipelineMode(CPUContext* ctx, int enabled);
+DLL_EXPORT int  ctxGetPipelineMode(CPUContext* ctx);
+DLL_EXPORT void ctxSetForwarding(CPUContext* ctx, int enabled);
+DLL_EXPORT int  ctxGetForwarding(CPUContext* ctx);
+DLL_EXPORT void ctxGetPipelineStats(CPUContext* ctx, PipelineStats* out);
+
+// -----------------------------------------------------------
+// Estatísticas por opcode (índice = opcode, nomes em getOpcodeName)
+// -----------------------------------------------------------
+DLL_EXPORT int  getNumOpcodes(void);
+DLL_EXPORT const char* getOpcodeName(int opcode);
+DLL_EXPORT int  getOpcodeStats(long long* countsOut, long long* cyclesOut, int n);
+
+DLL_EXPORT int  ctxGetOpcodeStats(CPUContext* ctx, long long* countsOut, long long* cyclesOut, int n);
+
 // -----------------------------------------------------------
 // Cache
 // -----------------------------------------------------------
 DLL_EXPORT int  getCacheSize(void);
-DLL_EXPORT void getCacheStatus(int* hitsOut, int* missesOut);
+DLL_EXPORT void getCacheStatus(long long* hitsOut, long long* missesOut);
+DLL_EXPORT void getMemoryTraffic(MemoryTraffic* out);
+DLL_EXPORT int  flushCache(void);                  // Escreve as linhas modificadas; retorna quantas
 DLL_EXPORT const char* getCacheLineString(int lineIndex);
+DLL_EXPORT CacheLine* getCacheLineArray(void);   // getCacheSize() linhas
+DLL_EXPORT int* getCacheDataArray(void);         // getCacheSize()*getBlockWords() palavras
+DLL_EXPORT int  getCacheLines(CacheLine* out, int n);
+DLL_EXPORT int  getBlockWords(void);
 DLL_EXPORT void setCacheLineData(int lineIndex, int newData);
+DLL_EXPORT void setCacheWordData(int lineIndex, int offset, int newData);
+DLL_EXPORT int  getCacheLineOfAddress(int address);      // -1 se o bloco não estiver na cache
+DLL_EXPORT int  findCacheValue(int value, int start);    // Próxima linha com o valor, ou -1
+
+DLL_EXPORT int  ctxGetCacheSize(CPUContext* ctx);
+DLL_EXPORT void ctxGetCacheStatus(CPUContext* ctx, long long* hitsOut, long long* missesOut);
+DLL_EXPORT void ctxGetMemoryTraffic(CPUContext* ctx, MemoryTraffic* out);
+DLL_EXPORT int  ctxFlushCache(CPUContext* ctx);
+DLL_EXPORT const char* ctxGetCacheLineString(CPUContext* ctx, int lineIndex);
+DLL_EXPORT CacheLine* ctxGetCacheLineArray(CPUContext* ctx);
+DLL_EXPORT int* ctxGetCacheDataArray(CPUContext* ctx);
+DLL_EXPORT int  ctxGetCacheLines(CPUContext* ctx, CacheLine* out, int n);
+DLL_EXPORT int  ctxGetBlockWords(CPUContext* ctx);
+DLL_EXPORT void ctxSetCacheLineData(CPUContext* ctx, int lineIndex, int newData);
+DLL_EXPORT void ctxSetCacheWordData(CPUContext* ctx, int lineIndex, int offset, int newData);
+DLL_EXPORT int  ctxGetCacheLineOfAddress(CPUContext* ctx, int address);
+DLL_EXPORT int  ctxFindCacheValue(CPUContext* ctx, int value, int start);
 
 // -----------------------------------------------------------
-// Mapeamento da Cache (0=direto, 1=associativo)
+// Mapeamento da Cache (0=direto, 1=associativo, 2=associativo por conjunto)
 // -----------------------------------------------------------
 DLL_EXPORT void setCacheMappingMode(int mode);
 DLL_EXPORT int  getCacheMappingMode(void);
+DLL_EXPORT int  setCacheAssociativity(int ways);   // 1=direto, 0=associativo, N=N vias
+DLL_EXPORT int  getCacheWays(void);
+
+DLL_EXPORT void ctxSetCacheMappingMode(CPUContext* ctx, int mode);
+DLL_EXPORT int  ctxGetCacheMappingMode(CPUContext* ctx);
+DLL_EXPORT int  ctxSetCacheAssociativity(CPUContext* ctx, int ways);
+DLL_EXPORT int  ctxGetCacheWays(CPUContext* ctx);
+
+// -----------------------------------------------------------
+// Política de substituição (REPL_*)
+// -----------------------------------------------------------
+DLL_EXPORT void setReplacementPolicy(int policy);
+DLL_EXPORT int  getReplacementPolicy(void);
+DLL_EXPORT void setReplacementSeed(unsigned int seed);
+
+DLL_EXPORT void ctxSetReplacementPolicy(CPUContext* ctx, int policy);
+DLL_EXPORT int  ctxGetReplacementPolicy(CPUContext* ctx);
+DLL_EXPORT void ctxSetReplacementSeed(CPUContext* ctx, unsigned int seed);
+
+// -----------------------------------------------------------
+// Política de escrita (WRITE_THROUGH / WRITE_BACK) e alocação na escrita
+// (allocate = 0: STORE com falta escreve só na memória, sem trazer o bloco).
+// Linhas modificadas são escritas na memória antes da troca.
+// -----------------------------------------------------------
+DLL_EXPORT void setWritePolicy(int policy, int allocate);
+DLL_EXPORT int  getWritePolicy(void);
+DLL_EXPORT int  getWriteAllocate(void);
+
+DLL_EXPORT void ctxSetWritePolicy(CPUContext* ctx, int policy, int allocate);
+DLL_EXPORT int  ctxGetWritePolicy(CPUContext* ctx);
+DLL_EXPORT int  ctxGetWriteAllocate(CPUContext* ctx);
+
+// -----------------------------------------------------------
+// Hierarquia de cache (nível 0 = L1, 1 = L2, 2 = L3)
+// setCacheLevels troca os níveis abaixo da L1 (count = 0 volta a ter só a
+// L1); retorna 1 em sucesso, 0 se a configuração for inválida. As funções
+// por nível retornam 0 (ou NULL) para níveis inexistentes.
+// -----------------------------------------------------------
+DLL_EXPORT int  setCacheLevels(const CacheLevelConfig* levels, int count);
+DLL_EXPORT int  getCacheLevelCount(void);                  // Níveis, contando a L1
+DLL_EXPORT int  getCacheLevelConfig(int level, CacheLevelConfig* out);
+DLL_EXPORT int  getCacheLevelStats(int level, CacheLevelStats* out);
+DLL_EXPORT int  getCacheLevelSize(int level);              // Linhas do nível
+DLL_EXPORT CacheLine* getCacheLevelLineArray(int level);
+
+DLL_EXPORT int  ctxSetCacheLevels(CPUContext* ctx, const CacheLevelConfig* levels, int count);
+DLL_EXPORT int  ctxGetCacheLevelCount(CPUContext* ctx);
+DLL_EXPORT int  ctxGetCacheLevelConfig(CPUContext* ctx, int level, CacheLevelConfig* out);
+DLL_EXPORT int  ctxGetCacheLevelStats(CPUContext* ctx, int level, CacheLevelStats* out);
+DLL_EXPORT int  ctxGetCacheLevelSize(CPUContext* ctx, int level);
+DLL_EXPORT CacheLine* ctxGetCacheLevelLineArray(CPUContext* ctx, int level);
+
+// -----------------------------------------------------------
+// Prefetch na L1 (PREFETCH_NONE por padrão)
+// O prefetcher treina com os acessos à L1 e, depois de cada acesso, traz
+// blocos de baixo sem custo para a instrução. O bloco chega depois da
+// latência da busca: um acesso antes disso espera o restante (prefetch
+// atrasado). As buscas contam nos níveis de baixo e no tráfego com a
+// memória. Nos traces não há instrução: o prefetcher de passo usa uma
+// única entrada. setPrefetcher zera as tabelas e os totais e retorna 0 se
+// a configuração for inválida; os totais também recomeçam a cada
+// invalidação da cache.
+// -----------------------------------------------------------
+DLL_EXPORT int  setPrefetcher(const PrefetchConfig* config);
+DLL_EXPORT void getPrefetcher(PrefetchConfig* out);
+DLL_EXPORT void getPrefetchStats(PrefetchStats* out);
+
+DLL_EXPORT int  ctxSetPrefetcher(CPUContext* ctx, const PrefetchConfig* config);
+DLL_EXPORT void ctxGetPrefetcher(CPUContext* ctx, PrefetchConfig* out);
+DLL_EXPORT void ctxGetPrefetchStats(CPUContext* ctx, PrefetchStats* out);
+
+// -----------------------------------------------------------
+// Configuração da máquina (memória e cache em tempo de execução)
+// associativity: 1 = direto, 0 = totalmente associativo, N = N vias
+// Retorna 1 em sucesso, 0 se a configuração for inválida
+// -----------------------------------------------------------
+DLL_EXPORT int  configureMachine(int memWords, int cacheLines, int blockWords, int associativity);
+
+DLL_EXPORT int  ctxConfigureMachine(CPUContext* ctx, int memWords, int cacheLines, int blockWords, int associativity);
+
+// -----------------------------------------------------------
+// Multinúcleo: N núcleos, cada um um CPUContext com seu programa,
+// registradores e L1 privada, sobre uma única memória compartilhada.
+// As L1 são write-back com alocação na escrita e ficam coerentes por
+// snooping (MSI ou MESI); não há níveis abaixo delas. Os núcleos se
+// revezam a cada "interleave" instruções (padrão 1), em rodízio.
+// Uma transação no barramento que não é falta (BusUpgr) custa a latência
+// da memória; uma falta atendida por uma cópia modificada de outro
+// núcleo custa também a escrita dessa cópia na memória.
+// Os núcleos (mcGetCore) aceitam as funções ctxXxx de programa, execução
+// passo a passo, leitura de estado, políticas de substituição e
+// prefetch; reconfigurar memória, bloco, níveis ou política de escrita
+// de um núcleo falha, e não há checkpoints nem volta no tempo nos núcleos.
+// -----------------------------------------------------------
+typedef struct MultiCore MultiCore;
+
+// Núcleos começam com a memória padrão (i*10) e sem programa; NULL se inválido
+DLL_EXPORT MultiCore*  createMultiCore(int cores, int memWords, int cacheLines, int blockWords,
+                                       int associativity, int protocol);
+DLL_EXPORT void        destroyMultiCore(MultiCore* mc);
+DLL_EXPORT int         mcGetCoreCount(MultiCore* mc);
+DLL_EXPORT CPUContext* mcGetCore(MultiCore* mc, int core);          // NULL fora do intervalo
+DLL_EXPORT int         mcGetProtocol(MultiCore* mc);
+DLL_EXPORT int         mcSetInterleave(MultiCore* mc, int steps);   // 0 se steps < 1
+DLL_EXPORT int         mcGetInterleave(MultiCore* mc);
+DLL_EXPORT int         mcGetCurrentCore(MultiCore* mc);             // Próximo a executar
+DLL_EXPORT int         mcStep(MultiCore* mc);      // Núcleo que executou, -1 se todos terminaram
+DLL_EXPORT int         mcRun(MultiCore* mc, int maxSteps);          // Instruções executadas
+DLL_EXPORT int         mcRunUntilEnd(MultiCore* mc);
+DLL_EXPORT void        mcReset(MultiCore* mc);     // Memória padrão, registradores, caches e contadores
+// core = -1: soma de todos os núcleos; retorna 0 se core for inválido
+DLL_EXPORT int         mcGetCoherenceStats(MultiCore* mc, int core, CoherenceStats* out);
+
+// Estado de coerência (COH_*) de cada linha da L1; fora do modo multinúcleo fica COH_INVALID
+DLL_EXPORT unsigned char* getCacheCoherenceArray(void);
+DLL_EXPORT unsigned char* ctxGetCacheCoherenceArray(CPUContext* ctx);
 
 #ifdef __cplusplus
 }
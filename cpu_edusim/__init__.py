@@ -0,0 +1 @@
+"""CPU EduSim: simulador didático de CPU com backend em C."""
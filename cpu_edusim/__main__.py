@@ -0,0 +1,169 @@
+"""Linha de comando do simulador.
+
+Executa um programa sem interface gráfica e mostra as estatísticas::
+
+    python -m cpu_edusim run prog.asm --mapping assoc --lines 8 --json
+
+ou abre a interface gráfica::
+
+    python -m cpu_edusim gui
+
+O modo ``run`` não carrega Tk nem matplotlib; serve para execuções em lote
+em máquinas sem tela.
+"""
+import argparse
+import json
+import os
+import sys
+
+# Modo de mapeamento -> associatividade (set usa --ways)
+MAPPINGS = {"direct": 1, "assoc": 0, "set": None}
+
+# Campos do resumo em texto: (chave do resultado, rótulo)
+SUMMARY_FIELDS = [
+    ("steps",        "Instruções"),
+    ("total_cycles", "Ciclos"),
+    ("cpi",          "CPI"),
+    ("hits",         "Acertos"),
+    ("misses",       "Faltas"),
+    ("hit_rate",     "Taxa de acerto"),
+    ("amat",         "AMAT"),
+    ("l2_hits",      "Acertos L2"),
+    ("l2_misses",    "Faltas L2"),
+    ("l3_hits",      "Acertos L3"),
+    ("l3_misses",    "Faltas L3"),
+    ("mem_reads",    "Leituras na memória"),
+    ("mem_writes",   "Escritas na memória"),
+    ("write_backs",  "Write-backs"),
+    ("bus_bytes",    "Bytes no barramento"),
+]
+# Mostrados só com prefetcher ligado
+PREFETCH_FIELDS = [
+    ("prefetch_issued",    "Prefetches emitidos"),
+    ("prefetch_useful",    "Prefetches úteis"),
+    ("prefetch_late",      "Prefetches atrasados"),
+    ("prefetch_polluting", "Faltas por poluição"),
+]
+
+
+def build_config(args):
+    """Configuração completa (chaves de cpu_edusim.sweep.DEFAULTS) a partir dos argumentos."""
+    from cpu_edusim.sweep import DEFAULTS
+
+    config = dict(DEFAULTS)
+    if args.config:
+        if os.path.exists(args.config):
+            with open(args.config, encoding="utf-8") as f:
+                extra = json.load(f)
+        else:
+            extra = json.loads(args.config)
+        unknown = set(extra) - set(DEFAULTS)
+        if unknown:
+            raise ValueError("Parâmetros desconhecidos: " + ", ".join(sorted(unknown)))
+        config.update(extra)
+
+    options = {
+        "mem_words":     args.mem,
+        "cache_lines":   args.lines,
+        "block_words":   args.block,
+        "policy":        args.policy,
+        "seed":          args.seed,
+        "write_policy":  args.write_policy,
+        "pipeline":      args.pipeline,
+        "max_steps":     args.max_steps,
+        "prefetcher":    args.prefetch,
+        "prefetch_degree":   args.prefetch_degree,
+        "prefetch_distance": args.prefetch_distance,
+    }
+    config.update({k: v for k, v in options.items() if v is not None})
+    if args.no_write_allocate:
+        config["write_allocate"] = 0
+    if args.mapping is not None:
+        config["associativity"] = MAPPINGS[args.mapping]
+        if args.mapping == "set":
+            config["associativity"] = args.ways
+    return config
+
+
+def run(args):
+    from cpu_edusim.backend import Machine
+    from cpu_edusim.sweep import simulate
+
+    try:
+        config = build_config(args)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    # Lido pelo backend: os erros de montagem citam as linhas do arquivo
+    with Machine() as machine:
+        try:
+            result = simulate(args.program, config, machine)
+        except OSError as e:
+            print(e, file=sys.stderr)
+            return 2
+        result["registers"] = list(machine.registers())
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        fields = SUMMARY_FIELDS
+        if str(result["prefetcher"]).upper() != "NONE":
+            fields = fields + PREFETCH_FIELDS
+        for key, label in fields:
+            if result[key] != "":
+                print("%-22s %s" % (label + ":", result[key]))
+        print("%-22s %s" % ("Registradores:", " ".join(
+            "R%d=%d" % (i + 1, v) for i, v in enumerate(result["registers"]))))
+    if result["error"]:
+        print("Erro: " + result["error"], file=sys.stderr)
+        return 1
+    return 0
+
+
+def gui(args):
+    # A interface fica na raiz do projeto, ao lado do pacote
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import cpu_frontend
+    cpu_frontend.main()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cpu_edusim",
+                                     description="Simulador didático de CPU com cache.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("run", help="executa um programa e mostra as estatísticas")
+    p.add_argument("program", help="arquivo com as instruções")
+    p.add_argument("--mapping", choices=list(MAPPINGS),
+                   help="direct (padrão), assoc (totalmente associativo) ou set (por conjunto)")
+    p.add_argument("--ways", type=int, default=2, help="vias no mapeamento set (padrão: 2)")
+    p.add_argument("--mem", type=int, help="palavras de memória")
+    p.add_argument("--lines", type=int, help="linhas da cache L1")
+    p.add_argument("--block", type=int, help="palavras por bloco")
+    p.add_argument("--policy", choices=["LRU", "FIFO", "RANDOM", "PLRU"],
+                   help="política de substituição")
+    p.add_argument("--seed", type=int, help="semente da política RANDOM")
+    p.add_argument("--write-policy", choices=["WT", "WB"], help="write-through ou write-back")
+    p.add_argument("--no-write-allocate", action="store_true",
+                   help="escritas com falta não trazem o bloco para a cache")
+    p.add_argument("--pipeline", type=int, choices=[0, 1], help="1 = modelo de 5 estágios")
+    p.add_argument("--prefetch", choices=["NONE", "NEXT_LINE", "STRIDE", "STREAM"],
+                   help="prefetcher da L1")
+    p.add_argument("--prefetch-degree", type=int, help="blocos buscados por disparo")
+    p.add_argument("--prefetch-distance", type=int, help="blocos (ou passos) à frente")
+    p.add_argument("--max-steps", type=int, help="limite de instruções (0 = sem limite)")
+    p.add_argument("--config", help="outros parâmetros em JSON (arquivo ou texto), "
+                                    "com as chaves da grade de cpu_edusim.sweep")
+    p.add_argument("--json", action="store_true", help="resultado em JSON numa linha")
+    p.set_defaults(func=run)
+
+    p = commands.add_parser("gui", help="abre a interface gráfica")
+    p.set_defaults(func=gui)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
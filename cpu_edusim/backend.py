@@ -0,0 +1,1148 @@
+"""Ligação (ctypes) com o backend em C do simulador.
+
+Este módulo não depende de interface gráfica: pode ser usado em scripts e
+em execuções em lote. Cada ``Machine`` é um ``CPUContext`` independente do
+backend, então várias simulações podem rodar ao mesmo tempo em threads
+diferentes (o ctypes libera o GIL durante as chamadas).
+"""
+import ctypes
+import os
+import sys
+
+# Biblioteca compilada de cada plataforma, procurada na raiz do projeto
+# (ver "Compilar backend" no README); CPU_EDUSIM_BACKEND indica outro arquivo
+if sys.platform == "win32":
+    LIB_NAMES = ["cpu_backend.dll"]
+elif sys.platform == "darwin":
+    LIB_NAMES = ["libcpu_backend.dylib", "libcpu_backend.so"]
+else:
+    LIB_NAMES = ["libcpu_backend.so"]
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _open_backend(path):
+    lib = ctypes.CDLL(path)
+    # Compilada de um cpu_backend.c antigo: faltariam as funções declaradas abaixo
+    if not hasattr(lib, "ctxRunUntilBreak"):
+        raise OSError("Backend desatualizado em %s; recompile cpu_backend.c" % path)
+    return lib
+
+
+def _load_backend():
+    path = os.environ.get("CPU_EDUSIM_BACKEND")
+    if path:
+        return _open_backend(path)
+    for name in LIB_NAMES:
+        path = os.path.join(_root_dir, name)
+        if os.path.exists(path):
+            return _open_backend(path)
+    raise OSError("Backend não encontrado em %s (%s); compile cpu_backend.c"
+                  % (_root_dir, " ou ".join(LIB_NAMES)))
+
+
+backend = _load_backend()
+
+# --------------- Estruturas compartilhadas com o backend ---------------
+class CacheLine(ctypes.Structure):
+    _fields_ = [
+        ("valid",   ctypes.c_int),
+        ("tag",     ctypes.c_int),
+        ("lastUse", ctypes.c_int),
+        ("dirty",   ctypes.c_int),   # Modificada (write-back)
+    ]
+
+class ExecEvent(ctypes.Structure):
+    _fields_ = [
+        ("seq",     ctypes.c_longlong),
+        ("step",    ctypes.c_int),
+        ("pc",      ctypes.c_int),
+        ("opcode",  ctypes.c_int),
+        ("rd",      ctypes.c_int),
+        ("rs1",     ctypes.c_int),
+        ("rs2",     ctypes.c_int),
+        ("address", ctypes.c_int),
+        ("hit",     ctypes.c_int),   # 1 acerto, 0 falta, -1 sem acesso à cache
+        ("cost",    ctypes.c_int),
+        ("value",   ctypes.c_int),   # Desvios: 1 = tomado
+        ("imm",     ctypes.c_int),
+        ("target",  ctypes.c_int),   # Linha de destino dos desvios, -1 nos demais
+    ]
+
+class TraceStats(ctypes.Structure):
+    _fields_ = [
+        ("accesses", ctypes.c_longlong),
+        ("hits",     ctypes.c_longlong),
+        ("misses",   ctypes.c_longlong),
+        ("cycles",   ctypes.c_longlong),
+        ("invalid",  ctypes.c_longlong),
+    ]
+
+class MemoryTraffic(ctypes.Structure):
+    _fields_ = [
+        ("reads",      ctypes.c_longlong),   # Blocos lidos da memória
+        ("writes",     ctypes.c_longlong),   # Palavras e blocos escritos na memória
+        ("writeBacks", ctypes.c_longlong),   # Parte de writes: linhas modificadas
+        ("busBytes",   ctypes.c_longlong),
+    ]
+
+class CacheLevelConfig(ctypes.Structure):
+    _fields_ = [
+        ("lines",         ctypes.c_int),
+        ("associativity", ctypes.c_int),   # 1 direto, 0 associativo, N vias
+        ("latency",       ctypes.c_int),
+        ("inclusion",     ctypes.c_int),   # INCL_*
+    ]
+
+class CacheLevelStats(ctypes.Structure):
+    _fields_ = [
+        ("hits",       ctypes.c_longlong),
+        ("misses",     ctypes.c_longlong),
+        ("writeBacks", ctypes.c_longlong),
+        ("amat",       ctypes.c_double),   # Tempo médio de acesso a partir do nível
+    ]
+
+class TimingModel(ctypes.Structure):
+    _fields_ = [
+        ("hitLatency",  ctypes.c_int),
+        ("missLatency", ctypes.c_int),   # Falta = hit + miss + mem
+        ("memLatency",  ctypes.c_int),
+        ("aluLatency",  ctypes.c_int),
+    ]
+
+class PipelineStats(ctypes.Structure):
+    _fields_ = [
+        ("instructions",  ctypes.c_longlong),
+        ("cycles",        ctypes.c_longlong),
+        ("rawStalls",     ctypes.c_longlong),
+        ("controlStalls", ctypes.c_longlong),
+        ("memStalls",     ctypes.c_longlong),
+        ("missStalls",    ctypes.c_longlong),
+        ("exStalls",      ctypes.c_longlong),
+    ]
+
+    @property
+    def cpi(self):
+        return self.cycles / self.instructions if self.instructions else 0.0
+
+class PcProfile(ctypes.Structure):
+    _fields_ = [
+        ("count",  ctypes.c_longlong),   # Execuções da instrução
+        ("cycles", ctypes.c_longlong),
+        ("hits",   ctypes.c_longlong),
+        ("misses", ctypes.c_longlong),
+    ]
+
+class AddressProfile(ctypes.Structure):
+    _fields_ = [
+        ("reads",  ctypes.c_longlong),
+        ("writes", ctypes.c_longlong),
+        ("hits",   ctypes.c_longlong),
+        ("misses", ctypes.c_longlong),
+    ]
+
+class MissClassStats(ctypes.Structure):
+    _fields_ = [
+        ("compulsory", ctypes.c_longlong),   # Primeira referência ao bloco
+        ("capacity",   ctypes.c_longlong),   # Falta também na totalmente associativa
+        ("conflict",   ctypes.c_longlong),   # Só por causa do mapeamento
+    ]
+
+class PrefetchConfig(ctypes.Structure):
+    _fields_ = [
+        ("kind",     ctypes.c_int),   # PREFETCH_*
+        ("degree",   ctypes.c_int),   # Blocos por disparo
+        ("distance", ctypes.c_int),   # Blocos (ou passos) à frente
+    ]
+
+class PrefetchStats(ctypes.Structure):
+    _fields_ = [
+        ("issued",    ctypes.c_longlong),   # Blocos trazidos por prefetch
+        ("useful",    ctypes.c_longlong),   # Usados antes de sair da L1
+        ("late",      ctypes.c_longlong),   # Usados antes de chegar (parte de useful)
+        ("polluting", ctypes.c_longlong),   # Faltas em blocos tirados por prefetch
+    ]
+
+    @property
+    def accuracy(self):
+        return self.useful / self.issued if self.issued else 0.0
+
+class CoherenceStats(ctypes.Structure):
+    _fields_ = [
+        ("busReads",        ctypes.c_longlong),   # BusRd emitidos (faltas de leitura)
+        ("busReadX",        ctypes.c_longlong),   # BusRdX emitidos (faltas de escrita)
+        ("busUpgrades",     ctypes.c_longlong),   # BusUpgr emitidos (escrita em linha S)
+        ("flushes",         ctypes.c_longlong),   # Linhas M escritas na memória a pedido de outro núcleo
+        ("invalidations",   ctypes.c_longlong),   # Cópias perdidas para escritas de outros núcleos
+        ("coherenceMisses", ctypes.c_longlong),   # Faltas em blocos perdidos por invalidação
+    ]
+
+    @property
+    def bus_transactions(self):
+        return self.busReads + self.busReadX + self.busUpgrades
+
+class Breakpoint(ctypes.Structure):
+    _fields_ = [
+        ("kind",    ctypes.c_int),        # BREAK_*
+        ("enabled", ctypes.c_int),
+        ("value",   ctypes.c_longlong),   # Linha, endereço, registrador ou ciclos
+        ("hits",    ctypes.c_longlong),   # Vezes que a condição foi satisfeita
+    ]
+
+class BreakInfo(ctypes.Structure):
+    _fields_ = [
+        ("id",       ctypes.c_int),       # Ponto que disparou, -1 = nenhum
+        ("kind",     ctypes.c_int),
+        ("step",     ctypes.c_int),       # Instruções executadas na parada
+        ("pc",       ctypes.c_int),       # Linha da última instrução executada
+        ("address",  ctypes.c_int),       # Endereço acessado por ela, -1 se nenhum
+        ("oldValue", ctypes.c_int),       # BREAK_REGISTER: valor anterior
+        ("newValue", ctypes.c_int),       # Valor novo do registrador, lido ou escrito
+        ("cycles",   ctypes.c_longlong),
+    ]
+
+# --------------- Declarações das funções do backend ---------------
+backend.initCPU.argtypes = []
+backend.initCPU.restype  = None
+
+backend.resetCPU.argtypes = []
+backend.resetCPU.restype  = None
+
+backend.nextInstruction.argtypes = []
+backend.nextInstruction.restype  = None
+
+backend.loadDefaultInstructions.argtypes = []
+backend.loadDefaultInstructions.restype  = None
+
+backend.setInstructions.argtypes = [ctypes.POINTER(ctypes.c_char_p), ctypes.c_int]
+backend.setInstructions.restype  = ctypes.c_int
+
+backend.loadProgramFile.argtypes = [ctypes.c_char_p]
+backend.loadProgramFile.restype  = ctypes.c_int
+
+backend.getRegistersString.argtypes = []
+backend.getRegistersString.restype  = ctypes.c_char_p
+
+backend.getMemoryString.argtypes = []
+backend.getMemoryString.restype  = ctypes.c_char_p
+
+backend.setMemoryValue.argtypes = [ctypes.c_int, ctypes.c_int]
+backend.setMemoryValue.restype  = None
+
+backend.getMemoryValue.argtypes = [ctypes.c_int]
+backend.getMemoryValue.restype  = ctypes.c_int
+
+backend.findMemoryValue.argtypes = [ctypes.c_int, ctypes.c_int]
+backend.findMemoryValue.restype  = ctypes.c_int
+
+backend.getMemorySize.argtypes = []
+backend.getMemorySize.restype  = ctypes.c_int
+
+backend.getMemoryArray.argtypes = []
+backend.getMemoryArray.restype  = ctypes.POINTER(ctypes.c_int)
+
+backend.getRegisterArray.argtypes = []
+backend.getRegisterArray.restype  = ctypes.POINTER(ctypes.c_int)
+
+backend.getRegisterCount.argtypes = []
+backend.getRegisterCount.restype  = ctypes.c_int
+
+backend.getExplanationMode.argtypes = []
+backend.getExplanationMode.restype  = ctypes.c_int
+
+backend.setExplanationMode.argtypes = [ctypes.c_int]
+backend.setExplanationMode.restype  = None
+
+backend.getLastOperationText.argtypes = []
+backend.getLastOperationText.restype  = ctypes.c_char_p
+
+backend.getLastExplanationText.argtypes = []
+backend.getLastExplanationText.restype  = ctypes.c_char_p
+
+backend.getTotalCycles.argtypes = []
+backend.getTotalCycles.restype  = ctypes.c_longlong
+
+backend.setTimingModel.argtypes = [ctypes.POINTER(TimingModel)]
+backend.setTimingModel.restype  = ctypes.c_int
+
+backend.getTimingModel.argtypes = [ctypes.POINTER(TimingModel)]
+backend.getTimingModel.restype  = None
+
+backend.setPipelineMode.argtypes = [ctypes.c_int]
+backend.setPipelineMode.restype  = None
+
+backend.getPipelineMode.argtypes = []
+backend.getPipelineMode.restype  = ctypes.c_int
+
+backend.setForwarding.argtypes = [ctypes.c_int]
+backend.setForwarding.restype  = None
+
+backend.getForwarding.argtypes = []
+backend.getForwarding.restype  = ctypes.c_int
+
+backend.getPipelineStats.argtypes = [ctypes.POINTER(PipelineStats)]
+backend.getPipelineStats.restype  = None
+
+backend.clearHistory.argtypes = []
+backend.clearHistory.restype  = None
+
+backend.getHistoryString.argtypes = []
+backend.getHistoryString.restype  = ctypes.c_char_p
+
+backend.setEventLogCapacity.argtypes = [ctypes.c_int]
+backend.setEventLogCapacity.restype  = ctypes.c_int
+
+backend.getEventLogCapacity.argtypes = []
+backend.getEventLogCapacity.restype  = ctypes.c_int
+
+backend.getEventSequence.argtypes = []
+backend.getEventSequence.restype  = ctypes.c_longlong
+
+backend.getEventsSince.argtypes = [ctypes.c_longlong, ctypes.POINTER(ExecEvent), ctypes.c_int]
+backend.getEventsSince.restype  = ctypes.c_int
+
+backend.getLastEvent.argtypes = [ctypes.POINTER(ExecEvent)]
+backend.getLastEvent.restype  = ctypes.c_int
+
+backend.formatEvent.argtypes = [ctypes.POINTER(ExecEvent)]
+backend.formatEvent.restype  = ctypes.c_char_p
+
+backend.getLastInstructionCost.argtypes = []
+backend.getLastInstructionCost.restype  = ctypes.c_int
+
+backend.getNumOpcodes.argtypes = []
+backend.getNumOpcodes.restype  = ctypes.c_int
+
+backend.getOpcodeName.argtypes = [ctypes.c_int]
+backend.getOpcodeName.restype  = ctypes.c_char_p
+
+backend.getOpcodeStats.argtypes = [ctypes.POINTER(ctypes.c_longlong), ctypes.POINTER(ctypes.c_longlong),
+                                   ctypes.c_int]
+backend.getOpcodeStats.restype  = ctypes.c_int
+
+backend.getCacheStatus.argtypes = [ctypes.POINTER(ctypes.c_longlong), ctypes.POINTER(ctypes.c_longlong)]
+backend.getCacheStatus.restype  = None
+
+backend.getMemoryTraffic.argtypes = [ctypes.POINTER(MemoryTraffic)]
+backend.getMemoryTraffic.restype  = None
+
+backend.flushCache.argtypes = []
+backend.flushCache.restype  = ctypes.c_int
+
+backend.setCacheLineData.argtypes = [ctypes.c_int, ctypes.c_int]
+backend.setCacheLineData.restype  = None
+
+backend.getCacheLineString.argtypes = [ctypes.c_int]
+backend.getCacheLineString.restype  = ctypes.c_char_p
+
+backend.getCacheSize.argtypes = []
+backend.getCacheSize.restype  = ctypes.c_int
+
+backend.getCacheLineArray.argtypes = []
+backend.getCacheLineArray.restype  = ctypes.POINTER(CacheLine)
+
+backend.getCacheLines.argtypes = [ctypes.POINTER(CacheLine), ctypes.c_int]
+backend.getCacheLines.restype  = ctypes.c_int
+
+backend.getCacheDataArray.argtypes = []
+backend.getCacheDataArray.restype  = ctypes.POINTER(ctypes.c_int)
+
+backend.getBlockWords.argtypes = []
+backend.getBlockWords.restype  = ctypes.c_int
+
+backend.setCacheWordData.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int]
+backend.setCacheWordData.restype  = None
+
+backend.getCacheLineOfAddress.argtypes = [ctypes.c_int]
+backend.getCacheLineOfAddress.restype  = ctypes.c_int
+
+backend.findCacheValue.argtypes = [ctypes.c_int, ctypes.c_int]
+backend.findCacheValue.restype  = ctypes.c_int
+
+# Configuração da máquina
+backend.configureMachine.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int]
+backend.configureMachine.restype  = ctypes.c_int
+
+backend.setRegisterValue.argtypes = [ctypes.c_char_p, ctypes.c_int]
+backend.setRegisterValue.restype  = None
+
+backend.getInstructionCount.argtypes = []
+backend.getInstructionCount.restype  = ctypes.c_int
+
+backend.getInstructionLine.argtypes = [ctypes.c_int]
+backend.getInstructionLine.restype  = ctypes.c_char_p
+
+backend.getAssembleErrorCount.argtypes = []
+backend.getAssembleErrorCount.restype  = ctypes.c_int
+
+backend.getAssembleErrors.argtypes = []
+backend.getAssembleErrors.restype  = ctypes.c_char_p
+
+# Mapeamento
+backend.setCacheMappingMode.argtypes = [ctypes.c_int]
+backend.setCacheMappingMode.restype  = None
+backend.getCacheMappingMode.argtypes = []
+backend.getCacheMappingMode.restype  = ctypes.c_int
+backend.setCacheAssociativity.argtypes = [ctypes.c_int]
+backend.setCacheAssociativity.restype  = ctypes.c_int
+backend.getCacheWays.argtypes = []
+backend.getCacheWays.restype  = ctypes.c_int
+
+# Política de substituição
+backend.setReplacementPolicy.argtypes = [ctypes.c_int]
+backend.setReplacementPolicy.restype  = None
+backend.getReplacementPolicy.argtypes = []
+backend.getReplacementPolicy.restype  = ctypes.c_int
+backend.setReplacementSeed.argtypes = [ctypes.c_uint]
+backend.setReplacementSeed.restype  = None
+
+# Política de escrita e alocação na escrita (valores de cpu_backend.h)
+WRITE_THROUGH = 0
+WRITE_BACK    = 1
+backend.setWritePolicy.argtypes = [ctypes.c_int, ctypes.c_int]
+backend.setWritePolicy.restype  = None
+backend.getWritePolicy.argtypes = []
+backend.getWritePolicy.restype  = ctypes.c_int
+backend.getWriteAllocate.argtypes = []
+backend.getWriteAllocate.restype  = ctypes.c_int
+
+# Hierarquia de cache (nível 0 = L1); inclusão dos níveis abaixo da L1
+MAX_CACHE_LEVELS = 3
+INCL_NINE        = 0
+INCL_INCLUSIVE   = 1
+INCL_EXCLUSIVE   = 2
+backend.setCacheLevels.argtypes = [ctypes.POINTER(CacheLevelConfig), ctypes.c_int]
+backend.setCacheLevels.restype  = ctypes.c_int
+backend.getCacheLevelCount.argtypes = []
+backend.getCacheLevelCount.restype  = ctypes.c_int
+backend.getCacheLevelConfig.argtypes = [ctypes.c_int, ctypes.POINTER(CacheLevelConfig)]
+backend.getCacheLevelConfig.restype  = ctypes.c_int
+backend.getCacheLevelStats.argtypes = [ctypes.c_int, ctypes.POINTER(CacheLevelStats)]
+backend.getCacheLevelStats.restype  = ctypes.c_int
+backend.getCacheLevelSize.argtypes = [ctypes.c_int]
+backend.getCacheLevelSize.restype  = ctypes.c_int
+backend.getCacheLevelLineArray.argtypes = [ctypes.c_int]
+backend.getCacheLevelLineArray.restype  = ctypes.POINTER(CacheLine)
+
+# Prefetch na L1
+PREFETCH_NONE      = 0
+PREFETCH_NEXT_LINE = 1
+PREFETCH_STRIDE    = 2
+PREFETCH_STREAM    = 3
+PREFETCH_MAX_DEGREE   = 16
+PREFETCH_MAX_DISTANCE = 64
+backend.setPrefetcher.argtypes = [ctypes.POINTER(PrefetchConfig)]
+backend.setPrefetcher.restype  = ctypes.c_int
+backend.getPrefetcher.argtypes = [ctypes.POINTER(PrefetchConfig)]
+backend.getPrefetcher.restype  = None
+backend.getPrefetchStats.argtypes = [ctypes.POINTER(PrefetchStats)]
+backend.getPrefetchStats.restype  = None
+
+# Multinúcleo: protocolo e estado de coerência de cada linha da L1
+MAX_CORES     = 8
+PROTOCOL_MSI  = 0
+PROTOCOL_MESI = 1
+COH_INVALID   = 0
+COH_SHARED    = 1
+COH_EXCLUSIVE = 2
+COH_MODIFIED  = 3
+backend.getCacheCoherenceArray.argtypes = []
+backend.getCacheCoherenceArray.restype  = ctypes.POINTER(ctypes.c_ubyte)
+
+# Execução em lote
+backend.runInstructions.argtypes = [ctypes.c_int]
+backend.runInstructions.restype  = ctypes.c_int
+backend.runUntilEnd.argtypes = []
+backend.runUntilEnd.restype  = ctypes.c_int
+backend.isProgramFinished.argtypes = []
+backend.isProgramFinished.restype  = ctypes.c_int
+
+# Checkpoints e volta no tempo
+backend.saveCheckpoint.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+backend.saveCheckpoint.restype  = ctypes.c_size_t
+backend.restoreCheckpoint.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+backend.restoreCheckpoint.restype  = ctypes.c_int
+for _name in ("setCheckpointInterval", "setUndoLogCapacity", "gotoStep"):
+    getattr(backend, _name).argtypes = [ctypes.c_int]
+    getattr(backend, _name).restype  = ctypes.c_int
+for _name in ("getCheckpointInterval", "getUndoLogCapacity", "getStepCount",
+              "getFirstReachableStep", "stepBack"):
+    getattr(backend, _name).argtypes = []
+    getattr(backend, _name).restype  = ctypes.c_int
+
+# Pontos de parada: o significado de value depende do tipo
+MAX_BREAKPOINTS = 64
+BREAK_PC        = 1   # Linha do programa (para antes dela)
+BREAK_READ      = 2   # Endereço lido por LOAD
+BREAK_WRITE     = 3   # Endereço escrito por STORE
+BREAK_REGISTER  = 4   # Registrador (0 = R1) que muda de valor
+BREAK_MISS      = 5   # Endereço cujo bloco falta na L1 (-1 = qualquer)
+BREAK_CYCLES    = 6   # Total de ciclos ultrapassado
+backend.addBreakpoint.argtypes = [ctypes.c_int, ctypes.c_longlong]
+backend.addBreakpoint.restype  = ctypes.c_int
+backend.removeBreakpoint.argtypes = [ctypes.c_int]
+backend.removeBreakpoint.restype  = ctypes.c_int
+backend.clearBreakpoints.argtypes = []
+backend.clearBreakpoints.restype  = None
+backend.setBreakpointEnabled.argtypes = [ctypes.c_int, ctypes.c_int]
+backend.setBreakpointEnabled.restype  = ctypes.c_int
+backend.getBreakpoint.argtypes = [ctypes.c_int, ctypes.POINTER(Breakpoint)]
+backend.getBreakpoint.restype  = ctypes.c_int
+backend.runUntilBreak.argtypes = [ctypes.c_int]
+backend.runUntilBreak.restype  = ctypes.c_int
+backend.getBreakInfo.argtypes = [ctypes.POINTER(BreakInfo)]
+backend.getBreakInfo.restype  = ctypes.c_int
+
+# Reprodução de traces (ponteiros passados como endereços, sem cópia)
+backend.replayTrace.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p]
+backend.replayTrace.restype  = ctypes.c_size_t
+
+_IntPtr = ctypes.POINTER(ctypes.c_int)
+backend.consumeDirty.argtypes = [_IntPtr, ctypes.c_int, _IntPtr, ctypes.c_int, _IntPtr, ctypes.c_int, _IntPtr]
+backend.consumeDirty.restype  = ctypes.c_int
+
+backend.getTraceStats.argtypes = [ctypes.POINTER(TraceStats)]
+backend.getTraceStats.restype  = None
+
+backend.resetTraceStats.argtypes = []
+backend.resetTraceStats.restype  = None
+
+# Perfil por instrução, por endereço e faltas 3C
+backend.setProfiling.argtypes = [ctypes.c_int]
+backend.setProfiling.restype  = ctypes.c_int
+backend.getProfiling.argtypes = []
+backend.getProfiling.restype  = ctypes.c_int
+backend.resetProfile.argtypes = []
+backend.resetProfile.restype  = None
+backend.getPcProfileArray.argtypes = []
+backend.getPcProfileArray.restype  = ctypes.POINTER(PcProfile)
+backend.getPcProfileSize.argtypes = []
+backend.getPcProfileSize.restype  = ctypes.c_int
+backend.getAddressProfileArray.argtypes = []
+backend.getAddressProfileArray.restype  = ctypes.POINTER(AddressProfile)
+backend.getAddressProfileSize.argtypes = []
+backend.getAddressProfileSize.restype  = ctypes.c_int
+backend.getMissClassStats.argtypes = [ctypes.POINTER(MissClassStats)]
+backend.getMissClassStats.restype  = None
+
+# --------------- Visões diretas do estado (sem cópia) ---------------
+# Os arrays retornados apontam para a memória do backend: leituras refletem
+# sempre o estado atual, sem formatação nem parsing de strings.
+def _array_view(ptr, ctype, count):
+    if not ptr:
+        return (ctype * 0)()   # Recurso desligado (ex.: perfil)
+    return ctypes.cast(ptr, ctypes.POINTER(ctype * count)).contents
+
+def registers_view():
+    return _array_view(backend.getRegisterArray(), ctypes.c_int, backend.getRegisterCount())
+
+def memory_view():
+    return _array_view(backend.getMemoryArray(), ctypes.c_int, backend.getMemorySize())
+
+def cache_view():
+    return _array_view(backend.getCacheLineArray(), CacheLine, backend.getCacheSize())
+
+def cache_level_view(level):
+    """Linhas do nível ``level`` da hierarquia (0 = L1)."""
+    return _array_view(backend.getCacheLevelLineArray(level), CacheLine, backend.getCacheLevelSize(level))
+
+def pc_profile_view():
+    """Perfil de cada linha do programa (vazio com o perfil desligado)."""
+    return _array_view(backend.getPcProfileArray(), PcProfile, backend.getPcProfileSize())
+
+def address_profile_view():
+    """Perfil de cada endereço de memória (vazio com o perfil desligado)."""
+    return _array_view(backend.getAddressProfileArray(), AddressProfile, backend.getAddressProfileSize())
+
+def cache_data_view():
+    """Dados da cache: linha i ocupa [i*blockWords, (i+1)*blockWords)."""
+    n = backend.getCacheSize() * backend.getBlockWords()
+    return _array_view(backend.getCacheDataArray(), ctypes.c_int, n)
+
+def copy_cache_lines():
+    """Cópia das linhas da cache numa única chamada (getCacheLines)."""
+    n   = backend.getCacheSize()
+    out = (CacheLine * n)()
+    backend.getCacheLines(out, n)
+    return out
+
+# --------------- Execução em lote (uso sem interface gráfica) ---------------
+def run_instructions(max_steps):
+    """Executa até max_steps instruções numa única chamada ao backend."""
+    return backend.runInstructions(max_steps)
+
+def run_until_end():
+    """Executa o programa até o fim numa única chamada ao backend."""
+    return backend.runUntilEnd()
+
+def run_until_break(max_steps=None):
+    """Executa até um ponto de parada (addBreakpoint), o fim ou max_steps instruções.
+
+    Retorna (instruções executadas, BreakInfo ou None se nenhum ponto disparou).
+    """
+    steps = backend.runUntilBreak(max_steps or 0)
+    info  = BreakInfo()
+    return steps, (info if backend.getBreakInfo(ctypes.byref(info)) else None)
+
+# --------------- Alterações desde a última consulta ---------------
+DIRTY_MAX = 256   # Acima disso é mais barato redesenhar tudo
+
+def _consume_dirty(func, max_items):
+    bufs   = [(ctypes.c_int * max_items)() for _ in range(3)]
+    counts = (ctypes.c_int * 3)()
+    func(bufs[0], max_items, bufs[1], max_items, bufs[2], max_items, counts)
+    return tuple(None if n < 0 else list(b[:n]) for b, n in zip(bufs, counts))
+
+def consume_dirty(max_items=DIRTY_MAX):
+    """(registradores, endereços, linhas de cache) alterados desde a última chamada.
+
+    Cada item é uma lista de índices, ou None quando tudo deve ser redesenhado.
+    """
+    return _consume_dirty(backend.consumeDirty, max_items)
+
+# --------------- Log de eventos de execução ---------------
+def events_since(seq, max_events=4096):
+    """Eventos com número de sequência >= seq (no máximo max_events)."""
+    out = (ExecEvent * max_events)()
+    n   = backend.getEventsSince(seq, out, max_events)
+    return out[:n]
+
+def last_event():
+    """Último evento executado, ou None se o log estiver vazio."""
+    ev = ExecEvent()
+    return ev if backend.getLastEvent(ctypes.byref(ev)) else None
+
+def format_event(ev):
+    return backend.formatEvent(ctypes.byref(ev)).decode("utf-8")
+
+# --------------- API com contexto (ctxXxx) ---------------
+backend.createCPUContext.argtypes = []
+backend.createCPUContext.restype  = ctypes.c_void_p
+
+backend.destroyCPUContext.argtypes = [ctypes.c_void_p]
+backend.destroyCPUContext.restype  = None
+
+backend.cloneCPUContext.argtypes = [ctypes.c_void_p]
+backend.cloneCPUContext.restype  = ctypes.c_void_p
+
+backend.getDefaultCPUContext.argtypes = []
+backend.getDefaultCPUContext.restype  = ctypes.c_void_p
+
+# Multinúcleo (o primeiro argumento é o MultiCore de createMultiCore)
+backend.createMultiCore.argtypes = [ctypes.c_int] * 6
+backend.createMultiCore.restype  = ctypes.c_void_p
+backend.destroyMultiCore.argtypes = [ctypes.c_void_p]
+backend.destroyMultiCore.restype  = None
+backend.mcGetCore.argtypes = [ctypes.c_void_p, ctypes.c_int]
+backend.mcGetCore.restype  = ctypes.c_void_p
+for _name in ("mcGetCoreCount", "mcGetProtocol", "mcGetInterleave", "mcGetCurrentCore",
+              "mcStep", "mcRunUntilEnd"):
+    getattr(backend, _name).argtypes = [ctypes.c_void_p]
+    getattr(backend, _name).restype  = ctypes.c_int
+for _name in ("mcSetInterleave", "mcRun"):
+    getattr(backend, _name).argtypes = [ctypes.c_void_p, ctypes.c_int]
+    getattr(backend, _name).restype  = ctypes.c_int
+backend.mcReset.argtypes = [ctypes.c_void_p]
+backend.mcReset.restype  = None
+backend.mcGetCoherenceStats.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.POINTER(CoherenceStats)]
+backend.mcGetCoherenceStats.restype  = ctypes.c_int
+
+# Cada função xxx declarada acima tem uma variante ctxXxx que recebe o
+# contexto como primeiro argumento e tem o mesmo retorno.
+_CONTEXT_FUNCTIONS = [
+    "initCPU", "resetCPU",
+    "loadDefaultInstructions", "setInstructions", "loadProgramFile", "getInstructionCount",
+    "getInstructionLine", "nextInstruction", "runInstructions", "runUntilEnd", "isProgramFinished",
+    "saveCheckpoint", "restoreCheckpoint", "setCheckpointInterval", "getCheckpointInterval",
+    "setUndoLogCapacity", "getUndoLogCapacity", "getStepCount", "getFirstReachableStep",
+    "gotoStep", "stepBack",
+    "addBreakpoint", "removeBreakpoint", "clearBreakpoints", "setBreakpointEnabled",
+    "getBreakpoint", "runUntilBreak", "getBreakInfo",
+    "replayTrace", "getTraceStats", "resetTraceStats", "consumeDirty",
+    "setProfiling", "getProfiling", "resetProfile", "getPcProfileArray", "getPcProfileSize",
+    "getAddressProfileArray", "getAddressProfileSize", "getMissClassStats",
+    "getAssembleErrorCount", "getAssembleErrors",
+    "getRegistersString", "getRegisterArray", "getRegisterCount", "setRegisterValue",
+    "getMemoryString", "getMemoryArray", "getMemorySize", "setMemoryValue", "getMemoryValue",
+    "findMemoryValue",
+    "getExplanationMode", "setExplanationMode",
+    "getLastOperationText", "getLastExplanationText",
+    "clearHistory", "getHistoryString",
+    "setEventLogCapacity", "getEventLogCapacity", "getEventSequence",
+    "getEventsSince", "getLastEvent", "formatEvent",
+    "getTotalCycles", "getLastInstructionCost", "getOpcodeStats",
+    "setTimingModel", "getTimingModel", "setPipelineMode", "getPipelineMode",
+    "setForwarding", "getForwarding", "getPipelineStats",
+    "getCacheSize", "getCacheStatus", "getMemoryTraffic", "flushCache",
+    "getCacheLineString", "getCacheLineArray",
+    "getCacheDataArray", "getCacheLines", "getBlockWords",
+    "setCacheLineData", "setCacheWordData", "getCacheLineOfAddress", "findCacheValue",
+    "setCacheMappingMode", "getCacheMappingMode", "setCacheAssociativity", "getCacheWays",
+    "setReplacementPolicy", "getReplacementPolicy", "setReplacementSeed",
+    "setWritePolicy", "getWritePolicy", "getWriteAllocate",
+    "setCacheLevels", "getCacheLevelCount", "getCacheLevelConfig", "getCacheLevelStats",
+    "getCacheLevelSize", "getCacheLevelLineArray",
+    "setPrefetcher", "getPrefetcher", "getPrefetchStats", "getCacheCoherenceArray",
+    "configureMachine",
+]
+
+for _name in _CONTEXT_FUNCTIONS:
+    _plain = getattr(backend, _name)
+    _ctx   = getattr(backend, "ctx" + _name[0].upper() + _name[1:])
+    _ctx.argtypes = [ctypes.c_void_p] + list(_plain.argtypes)
+    _ctx.restype  = _plain.restype
+
+
+def opcode_names():
+    return [opcode_name(i) for i in range(backend.getNumOpcodes())]
+
+def opcode_name(opcode):
+    return backend.getOpcodeName(opcode).decode("utf-8")
+
+
+class Machine:
+    """Uma CPU simulada independente (um CPUContext do backend).
+
+    Use ``Machine.default()`` para operar sobre o contexto padrão (o mesmo
+    usado pela interface gráfica e pelas funções sem contexto).
+    """
+
+    def __init__(self, _handle=None, _owned=True):
+        if _handle is None:
+            _handle = backend.createCPUContext()
+            if not _handle:
+                raise MemoryError("Não foi possível criar o contexto da CPU")
+        self._ctx   = ctypes.c_void_p(_handle)
+        self._owned = _owned
+
+    @classmethod
+    def default(cls):
+        return cls(backend.getDefaultCPUContext(), _owned=False)
+
+    def close(self):
+        if self._ctx and self._owned:
+            backend.destroyCPUContext(self._ctx)
+        self._ctx = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, "_ctx", None):
+            self.close()
+
+    def clone(self):
+        handle = backend.cloneCPUContext(self._ctx)
+        if not handle:
+            raise MemoryError("Não foi possível clonar o contexto da CPU")
+        return Machine(handle)
+
+    # ----- Configuração -----
+    def configure(self, mem_words, cache_lines, block_words=1, associativity=1):
+        if not backend.ctxConfigureMachine(self._ctx, mem_words, cache_lines, block_words, associativity):
+            raise ValueError("Configuração inválida")
+
+    def set_replacement_policy(self, policy, seed=None):
+        backend.ctxSetReplacementPolicy(self._ctx, policy)
+        if seed is not None:
+            backend.ctxSetReplacementSeed(self._ctx, seed)
+
+    def set_write_policy(self, policy, allocate=True):
+        """WRITE_THROUGH ou WRITE_BACK; allocate=False não traz o bloco em STORE com falta."""
+        backend.ctxSetWritePolicy(self._ctx, policy, int(allocate))
+
+    def write_policy(self):
+        """(política, alocação na escrita)."""
+        return (backend.ctxGetWritePolicy(self._ctx), bool(backend.ctxGetWriteAllocate(self._ctx)))
+
+    def set_cache_levels(self, levels):
+        """Níveis abaixo da L1: lista de (linhas, associatividade, latência, inclusão).
+
+        Lista vazia volta a ter só a L1. A L1 continua sendo configurada por
+        ``configure`` e sua latência é a de acerto do modelo de temporização.
+        """
+        arr = (CacheLevelConfig * max(len(levels), 1))(*[CacheLevelConfig(*lv) for lv in levels])
+        if not backend.ctxSetCacheLevels(self._ctx, arr, len(levels)):
+            raise ValueError("Hierarquia de cache inválida")
+
+    def cache_levels(self):
+        """Configuração de cada nível, da L1 para baixo (CacheLevelConfig)."""
+        out = []
+        for level in range(backend.ctxGetCacheLevelCount(self._ctx)):
+            cfg = CacheLevelConfig()
+            backend.ctxGetCacheLevelConfig(self._ctx, level, ctypes.byref(cfg))
+            out.append(cfg)
+        return out
+
+    def cache_level_stats(self):
+        """Acertos, faltas, write-backs e AMAT de cada nível (CacheLevelStats)."""
+        out = []
+        for level in range(backend.ctxGetCacheLevelCount(self._ctx)):
+            stats = CacheLevelStats()
+            backend.ctxGetCacheLevelStats(self._ctx, level, ctypes.byref(stats))
+            out.append(stats)
+        return out
+
+    def cache_level_lines(self, level):
+        return _array_view(backend.ctxGetCacheLevelLineArray(self._ctx, level), CacheLine,
+                           backend.ctxGetCacheLevelSize(self._ctx, level))
+
+    def set_prefetcher(self, kind, degree=1, distance=1):
+        """Prefetcher da L1 (PREFETCH_*); invalida a cache e zera os totais."""
+        if not backend.ctxSetPrefetcher(self._ctx, ctypes.byref(PrefetchConfig(kind, degree, distance))):
+            raise ValueError("Prefetcher inválido")
+
+    def prefetcher(self):
+        cfg = PrefetchConfig()
+        backend.ctxGetPrefetcher(self._ctx, ctypes.byref(cfg))
+        return cfg
+
+    def prefetch_stats(self):
+        """Prefetches emitidos, úteis, atrasados e poluidores (PrefetchStats)."""
+        stats = PrefetchStats()
+        backend.ctxGetPrefetchStats(self._ctx, ctypes.byref(stats))
+        return stats
+
+    def set_timing(self, hit=None, miss=None, mem=None, alu=None):
+        """Altera as latências dadas (ciclos); as omitidas ficam como estão."""
+        timing = self.timing()
+        for field, value in (("hitLatency", hit), ("missLatency", miss),
+                             ("memLatency", mem), ("aluLatency", alu)):
+            if value is not None:
+                setattr(timing, field, value)
+        if not backend.ctxSetTimingModel(self._ctx, ctypes.byref(timing)):
+            raise ValueError("Latências inválidas")
+
+    def timing(self):
+        timing = TimingModel()
+        backend.ctxGetTimingModel(self._ctx, ctypes.byref(timing))
+        return timing
+
+    def set_pipeline(self, enabled, forwarding=None):
+        backend.ctxSetPipelineMode(self._ctx, int(enabled))
+        if forwarding is not None:
+            backend.ctxSetForwarding(self._ctx, int(forwarding))
+
+    # ----- Programa -----
+    def load_program(self, lines):
+        """Carrega e monta as instruções; retorna o texto dos erros de montagem."""
+        arr = (ctypes.c_char_p * len(lines))(*[s.encode("utf-8") for s in lines])
+        if backend.ctxSetInstructions(self._ctx, arr, len(lines)) < 0:
+            raise MemoryError("Sem memória para o programa")
+        return backend.ctxGetAssembleErrors(self._ctx).decode("utf-8")
+
+    def load_program_file(self, path):
+        """Lê e monta um arquivo de programa direto no backend; retorna o texto dos erros."""
+        if backend.ctxLoadProgramFile(self._ctx, os.fsencode(path)) < 0:
+            raise OSError("Não foi possível carregar o programa: %s" % path)
+        return backend.ctxGetAssembleErrors(self._ctx).decode("utf-8")
+
+    def load_default_program(self):
+        backend.ctxLoadDefaultInstructions(self._ctx)
+
+    def reset(self):
+        backend.ctxResetCPU(self._ctx)
+
+    # ----- Execução -----
+    def step(self):
+        backend.ctxNextInstruction(self._ctx)
+
+    def run(self, max_steps=None):
+        """Executa até max_steps instruções (ou até o fim); retorna quantas executou."""
+        if max_steps is None:
+            return backend.ctxRunUntilEnd(self._ctx)
+        return backend.ctxRunInstructions(self._ctx, max_steps)
+
+    @property
+    def finished(self):
+        """True se o programa terminou (não há mais instruções a executar)."""
+        return bool(backend.ctxIsProgramFinished(self._ctx))
+
+    # ----- Checkpoints e volta no tempo -----
+    def save_checkpoint(self):
+        """Estado completo (registradores, memória, cache, contadores, PC) em bytes."""
+        size = backend.ctxSaveCheckpoint(self._ctx, None, 0)
+        buf  = ctypes.create_string_buffer(size)
+        backend.ctxSaveCheckpoint(self._ctx, buf, size)
+        return buf.raw
+
+    def restore_checkpoint(self, data):
+        """Volta ao estado de ``save_checkpoint`` (exige a mesma geometria)."""
+        if not backend.ctxRestoreCheckpoint(self._ctx, data, len(data)):
+            raise ValueError("Checkpoint inválido para esta configuração")
+
+    def set_checkpoint_interval(self, steps):
+        """Checkpoint automático a cada ``steps`` instruções (0 desliga)."""
+        if not backend.ctxSetCheckpointInterval(self._ctx, steps):
+            raise ValueError("Intervalo inválido")
+
+    def set_undo_log_capacity(self, nbytes):
+        """Memória do registro de desfazer (0 desliga); passos antigos saem quando enche."""
+        if not backend.ctxSetUndoLogCapacity(self._ctx, nbytes):
+            raise ValueError("Capacidade inválida")
+
+    def step_back(self):
+        """Desfaz a última instrução; retorna False se não há para onde voltar."""
+        return bool(backend.ctxStepBack(self._ctx))
+
+    def goto_step(self, step):
+        """Vai para o estado de antes da instrução ``step`` (para trás ou para frente).
+
+        Retorna o passo atingido: menor se o programa terminar antes, o
+        atual se ``step`` for anterior a ``first_reachable_step()``.
+        """
+        return backend.ctxGotoStep(self._ctx, step)
+
+    # ----- Pontos de parada -----
+    def add_breakpoint(self, kind, value):
+        """Ponto de parada BREAK_* avaliado por ``run_until_break``; retorna o id."""
+        bp_id = backend.ctxAddBreakpoint(self._ctx, kind, value)
+        if bp_id < 0:
+            raise ValueError("Ponto de parada inválido (ou todos os %d em uso)" % MAX_BREAKPOINTS)
+        return bp_id
+
+    def remove_breakpoint(self, bp_id):
+        return bool(backend.ctxRemoveBreakpoint(self._ctx, bp_id))
+
+    def clear_breakpoints(self):
+        backend.ctxClearBreakpoints(self._ctx)
+
+    def set_breakpoint_enabled(self, bp_id, enabled=True):
+        return bool(backend.ctxSetBreakpointEnabled(self._ctx, bp_id, int(enabled)))
+
+    def breakpoints(self):
+        """{id: Breakpoint} dos pontos definidos."""
+        out = {}
+        for bp_id in range(MAX_BREAKPOINTS):
+            bp = Breakpoint()
+            if backend.ctxGetBreakpoint(self._ctx, bp_id, ctypes.byref(bp)):
+                out[bp_id] = bp
+        return out
+
+    def run_until_break(self, max_steps=None):
+        """Executa no backend até um ponto de parada, o fim ou max_steps instruções.
+
+        Retorna o BreakInfo do ponto que disparou, ou None se parou por
+        outro motivo (``step_count`` diz onde).
+        """
+        backend.ctxRunUntilBreak(self._ctx, max_steps or 0)
+        info = BreakInfo()
+        return info if backend.ctxGetBreakInfo(self._ctx, ctypes.byref(info)) else None
+
+    @property
+    def step_count(self):
+        """Instruções executadas desde o início do programa."""
+        return backend.ctxGetStepCount(self._ctx)
+
+    def first_reachable_step(self):
+        return backend.ctxGetFirstReachableStep(self._ctx)
+
+    # ----- Estado -----
+    @property
+    def total_cycles(self):
+        return backend.ctxGetTotalCycles(self._ctx)
+
+    def consume_dirty(self, max_items=DIRTY_MAX):
+        return _consume_dirty(lambda *args: backend.ctxConsumeDirty(self._ctx, *args), max_items)
+
+    def set_event_log_capacity(self, capacity):
+        if not backend.ctxSetEventLogCapacity(self._ctx, capacity):
+            raise ValueError("Capacidade inválida")
+
+    @property
+    def event_sequence(self):
+        """Número de sequência do próximo evento."""
+        return backend.ctxGetEventSequence(self._ctx)
+
+    def events_since(self, seq, max_events=4096):
+        out = (ExecEvent * max_events)()
+        n   = backend.ctxGetEventsSince(self._ctx, seq, out, max_events)
+        return out[:n]
+
+    def last_event(self):
+        ev = ExecEvent()
+        return ev if backend.ctxGetLastEvent(self._ctx, ctypes.byref(ev)) else None
+
+    def format_event(self, ev):
+        return backend.ctxFormatEvent(self._ctx, ctypes.byref(ev)).decode("utf-8")
+
+    def trace_stats(self):
+        """Totais da reprodução de traces desde o último reset (TraceStats)."""
+        stats = TraceStats()
+        backend.ctxGetTraceStats(self._ctx, ctypes.byref(stats))
+        return stats
+
+    # ----- Perfil -----
+    def set_profiling(self, enabled=True):
+        """Liga (contadores zerados) ou desliga o perfil por instrução e por endereço."""
+        if not backend.ctxSetProfiling(self._ctx, int(enabled)):
+            raise MemoryError("Sem memória para o perfil")
+
+    def reset_profile(self):
+        backend.ctxResetProfile(self._ctx)
+
+    def pc_profile(self):
+        """PcProfile de cada linha do programa (visão direta, sem cópia)."""
+        return _array_view(backend.ctxGetPcProfileArray(self._ctx), PcProfile,
+                           backend.ctxGetPcProfileSize(self._ctx))
+
+    def address_profile(self):
+        """AddressProfile de cada endereço de memória (visão direta, sem cópia)."""
+        return _array_view(backend.ctxGetAddressProfileArray(self._ctx), AddressProfile,
+                           backend.ctxGetAddressProfileSize(self._ctx))
+
+    def miss_classes(self):
+        """Faltas da L1 em compulsórias, de capacidade e de conflito (MissClassStats)."""
+        stats = MissClassStats()
+        backend.ctxGetMissClassStats(self._ctx, ctypes.byref(stats))
+        return stats
+
+    def instruction_line(self, index):
+        return backend.ctxGetInstructionLine(self._ctx, index).decode("utf-8")
+
+    def pipeline_stats(self):
+        """Totais do pipeline (PipelineStats, com a propriedade cpi)."""
+        stats = PipelineStats()
+        backend.ctxGetPipelineStats(self._ctx, ctypes.byref(stats))
+        return stats
+
+    def opcode_stats(self):
+        """{opcode: (execuções, ciclos)} para cada opcode executado ao menos uma vez."""
+        n      = backend.getNumOpcodes()
+        counts = (ctypes.c_longlong * n)()
+        cycles = (ctypes.c_longlong * n)()
+        backend.ctxGetOpcodeStats(self._ctx, counts, cycles, n)
+        return {opcode_name(i): (counts[i], cycles[i]) for i in range(n) if counts[i]}
+
+    def cache_status(self):
+        hits   = ctypes.c_longlong()
+        misses = ctypes.c_longlong()
+        backend.ctxGetCacheStatus(self._ctx, ctypes.byref(hits), ctypes.byref(misses))
+        return hits.value, misses.value
+
+    def memory_traffic(self):
+        """Leituras, escritas e bytes no barramento desde a última invalidação (MemoryTraffic)."""
+        traffic = MemoryTraffic()
+        backend.ctxGetMemoryTraffic(self._ctx, ctypes.byref(traffic))
+        return traffic
+
+    def flush_cache(self):
+        """Escreve na memória as linhas modificadas (write-back); retorna quantas."""
+        return backend.ctxFlushCache(self._ctx)
+
+    def registers(self):
+        return _array_view(backend.ctxGetRegisterArray(self._ctx), ctypes.c_int,
+                           backend.ctxGetRegisterCount(self._ctx))
+
+    def memory(self):
+        return _array_view(backend.ctxGetMemoryArray(self._ctx), ctypes.c_int,
+                           backend.ctxGetMemorySize(self._ctx))
+
+    def cache_lines(self):
+        return _array_view(backend.ctxGetCacheLineArray(self._ctx), CacheLine,
+                           backend.ctxGetCacheSize(self._ctx))
+
+    def cache_data(self):
+        n = backend.ctxGetCacheSize(self._ctx) * backend.ctxGetBlockWords(self._ctx)
+        return _array_view(backend.ctxGetCacheDataArray(self._ctx), ctypes.c_int, n)
+
+    def cache_coherence(self):
+        """Estado COH_* de cada linha da L1 (só muda num ``MultiCore``)."""
+        return _array_view(backend.ctxGetCacheCoherenceArray(self._ctx), ctypes.c_ubyte,
+                           backend.ctxGetCacheSize(self._ctx))
+
+
+class MultiCore:
+    """Vários núcleos com L1 privada sobre uma única memória, coerentes por snooping.
+
+    Cada núcleo é uma ``Machine`` (``core(i)``) com seu próprio programa e
+    registradores; ``step``/``run`` revezam os núcleos a cada
+    ``interleave`` instruções. As L1 são write-back e os núcleos não têm
+    níveis abaixo da L1, checkpoints nem volta no tempo.
+    """
+
+    def __init__(self, cores=2, mem_words=64, cache_lines=4, block_words=4,
+                 associativity=1, protocol=PROTOCOL_MESI):
+        self._mc = None
+        handle = backend.createMultiCore(cores, mem_words, cache_lines, block_words,
+                                         associativity, protocol)
+        if not handle:
+            raise ValueError("Configuração multinúcleo inválida")
+        self._mc    = ctypes.c_void_p(handle)
+        self._cores = [Machine(backend.mcGetCore(self._mc, i), _owned=False) for i in range(cores)]
+
+    def close(self):
+        if self._mc:
+            for core in self._cores:
+                core._ctx = None
+            backend.destroyMultiCore(self._mc)
+        self._mc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, "_mc", None):
+            self.close()
+
+    def __len__(self):
+        return len(self._cores)
+
+    def core(self, index):
+        return self._cores[index]
+
+    @property
+    def cores(self):
+        return list(self._cores)
+
+    @property
+    def protocol(self):
+        return backend.mcGetProtocol(self._mc)
+
+    def set_interleave(self, steps):
+        """Instruções seguidas de cada núcleo antes de passar a vez (>= 1)."""
+        if not backend.mcSetInterleave(self._mc, steps):
+            raise ValueError("Intercalação inválida")
+
+    def interleave(self):
+        return backend.mcGetInterleave(self._mc)
+
+    @property
+    def current_core(self):
+        """Núcleo que executa a próxima instrução."""
+        return backend.mcGetCurrentCore(self._mc)
+
+    def load_programs(self, programs):
+        """Um programa (lista de linhas) por núcleo; retorna os erros de montagem de cada um."""
+        if len(programs) != len(self._cores):
+            raise ValueError("É preciso um programa por núcleo")
+        return [core.load_program(lines) for core, lines in zip(self._cores, programs)]
+
+    def reset(self):
+        backend.mcReset(self._mc)
+
+    def step(self):
+        """Executa uma instrução; retorna o núcleo que executou ou -1 se todos terminaram."""
+        return backend.mcStep(self._mc)
+
+    def run(self, max_steps=None):
+        """Executa até max_steps instruções no total (ou até todos terminarem)."""
+        if max_steps is None:
+            return backend.mcRunUntilEnd(self._mc)
+        return backend.mcRun(self._mc, max_steps)
+
+    def memory(self):
+        """Memória compartilhada (visão direta, sem cópia)."""
+        return self._cores[0].memory()
+
+    def coherence_stats(self, core=-1):
+        """CoherenceStats de um núcleo ou, com core=-1, a soma de todos."""
+        stats = CoherenceStats()
+        if not backend.mcGetCoherenceStats(self._mc, core, ctypes.byref(stats)):
+            raise IndexError("Núcleo inválido: %d" % core)
+        return stats
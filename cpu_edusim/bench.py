@@ -0,0 +1,302 @@
+"""Conjunto de benchmarks: cargas de trabalho canônicas para o modelo de cache.
+
+Cada carga é um programa gerado que exercita a cache de um jeito diferente:
+varredura sequencial, acesso com passo, acesso aleatório, soma de matriz
+por linhas e por colunas, e uma mistura de conjunto quente e frio. Para
+cada uma o executor mede as métricas simuladas (ciclos, CPI, taxa de
+acerto) e as do hospedeiro (instruções simuladas por segundo e ns por
+acesso à memória, medidos na execução em lote sem textos por instrução),
+em JSON. O relatório traz também o pico de memória residente do processo,
+que vale para o conjunto inteiro e não para cada carga.
+
+Um resultado salvo serve de referência: ``compare`` aponta mudanças nas
+métricas simuladas (o modelo mudou de comportamento) e quedas de
+velocidade acima da tolerância (o simulador ficou mais lento).
+
+Exemplo::
+
+    python -m cpu_edusim.bench --out base.json
+    python -m cpu_edusim.bench --baseline base.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+try:
+    import resource        # Indisponível no Windows: o pico de memória fica ausente
+except ImportError:
+    resource = None
+
+from cpu_edusim.backend import Machine
+from cpu_edusim.sweep import DEFAULTS, configure_machine
+
+# Máquina usada por todas as cargas (chaves e valores como na grade de cpu_edusim.sweep)
+BENCH_CONFIG = dict(DEFAULTS, mem_words=4096, cache_lines=64, block_words=4,
+                    associativity=4, max_steps=0)
+
+# Métricas simuladas: determinísticas, devem bater exatamente com a referência
+SIM_FIELDS  = ["steps", "total_cycles", "hits", "misses"]
+# Métricas do hospedeiro: (nome, maior é melhor)
+HOST_FIELDS = [("instructions_per_second", True), ("ns_per_access", False)]
+
+
+# --------------- Geradores de programas ---------------
+# Só há quatro registradores (R1..R4): os laços internos são desenrolados no
+# programa gerado e R1 é sempre o endereço, R2 o acumulador e R3 o valor lido.
+
+def _scan(label, start, end, step, unroll=1):
+    """Laço que soma Memória[start], Memória[start+step], ... até end (exclusivo)."""
+    body = []
+    for _ in range(unroll):
+        body += ["LOAD R3, [R1]", "ADD R2, R2, R3", "ADDI R1, R1, %d" % step]
+    return (["LI R1, %d" % start, "LI R4, %d" % end, label + ":"] + body
+            + ["BNE R1, R4, " + label])
+
+
+def sequential(words=4096, passes=4):
+    """Percorre o vetor inteiro palavra a palavra, ``passes`` vezes."""
+    program = []
+    for p in range(passes):
+        program += _scan("seq%d" % p, 0, words, 1)
+    return program
+
+
+def strided(words=4096, stride=16, passes=1):
+    """Percorre o vetor com passo ``stride`` (uma passada por deslocamento inicial)."""
+    program = []
+    for p in range(passes):
+        for offset in range(stride):
+            program += _scan("passo%d_%d" % (p, offset), offset, offset + words, stride)
+    return program
+
+
+def random_access(words=4096, accesses=16384, seed=1):
+    """Leituras em endereços sorteados (semente fixa: o programa é sempre o mesmo)."""
+    rng     = random.Random(seed)
+    program = []
+    for _ in range(accesses):
+        program += ["LOAD R3, %d" % rng.randrange(words), "ADD R2, R2, R3"]
+    return program
+
+
+def matrix(n=64, column_major=False, passes=1):
+    """Soma uma matriz n x n guardada por linhas, percorrendo-a por linhas ou por colunas.
+
+    As duas ordens executam o mesmo número de instruções; só o padrão de
+    endereços muda.
+    """
+    program = []
+    for p in range(passes):
+        if column_major:
+            # Desce uma coluna (passo n) e volta ao topo da próxima
+            label    = "coluna%d" % p
+            program += ["LI R1, 0", "LI R4, %d" % n, label + ":"]
+            program += ["LOAD R3, [R1]", "ADD R2, R2, R3", "ADDI R1, R1, %d" % n] * n
+            program += ["ADDI R1, R1, %d" % (1 - n * n), "BNE R1, R4, " + label]
+        else:
+            program += _scan("linha%d" % p, 0, n * n, 1, unroll=n)
+    return program
+
+
+def hot_cold(words=4096, hot_words=64, accesses=16384, hot_fraction=0.9, seed=1):
+    """Mistura de um conjunto quente pequeno (cabe na cache) com o resto do vetor."""
+    rng     = random.Random(seed)
+    program = []
+    for _ in range(accesses):
+        if rng.random() < hot_fraction:
+            address = rng.randrange(hot_words)
+        else:
+            address = rng.randrange(hot_words, words)
+        program += ["LOAD R3, %d" % address, "ADD R2, R2, R3"]
+    return program
+
+
+# Nome -> (gerador, parâmetros); ``scale`` multiplica o tamanho de cada carga
+WORKLOADS = {
+    "sequential":   (sequential,    {"passes": 16}),
+    "strided":      (strided,       {"stride": 16, "passes": 16}),
+    "random":       (random_access, {"accesses": 65536}),
+    "matrix_row":   (matrix,        {"column_major": False, "passes": 16}),
+    "matrix_col":   (matrix,        {"column_major": True, "passes": 16}),
+    "hot_cold":     (hot_cold,      {"accesses": 65536}),
+}
+_SCALED = ("passes", "accesses")
+
+
+def workload_params(name, scale=1):
+    _, params = WORKLOADS[name]
+    return {k: v * scale if k in _SCALED else v for k, v in params.items()}
+
+
+def build_workload(name, scale=1):
+    """Programa (lista de linhas) da carga ``name``."""
+    generator, _ = WORKLOADS[name]
+    return generator(**workload_params(name, scale))
+
+
+# --------------- Execução ---------------
+def peak_rss_kb():
+    """Pico de memória residente do processo em KiB (None se não disponível)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak   # macOS informa em bytes
+
+
+def run_workload(name, config=None, scale=1, repeat=3, machine=None):
+    """Executa uma carga ``repeat`` vezes e retorna o dict de métricas (melhor tempo)."""
+    config  = dict(BENCH_CONFIG, **(config or {}))
+    program = build_workload(name, scale)
+    own     = machine is None
+    if own:
+        machine = Machine()
+    try:
+        error = configure_machine(machine, config)
+        if error:
+            raise ValueError(error)
+        errors = machine.load_program(program)
+        if errors:
+            raise ValueError(errors.strip())
+        best = None
+        for _ in range(max(1, repeat)):
+            machine.reset()
+            # Execução em lote: só a última instrução monta os textos
+            start   = time.perf_counter()
+            steps   = machine.run(config["max_steps"] or None)
+            elapsed = time.perf_counter() - start
+            best    = elapsed if best is None else min(best, elapsed)
+        hits, misses = machine.cache_status()
+        cycles       = machine.total_cycles
+    finally:
+        if own:
+            machine.close()
+
+    accesses = hits + misses
+    return {
+        "name":         name,
+        "params":       workload_params(name, scale),
+        "steps":        steps,
+        "total_cycles": cycles,
+        "cpi":          round(cycles / steps, 6) if steps else 0.0,
+        "hits":         hits,
+        "misses":       misses,
+        "hit_rate":     round(hits / accesses, 6) if accesses else 0.0,
+        "seconds":      round(best, 6),
+        "instructions_per_second": round(steps / best) if best else 0,
+        "ns_per_access": round(best * 1e9 / accesses, 3) if accesses else 0.0,
+    }
+
+
+def run_suite(names=None, config=None, scale=1, repeat=3):
+    """Executa as cargas (todas por padrão) e retorna o relatório completo."""
+    names = list(names or WORKLOADS)
+    unknown = set(names) - set(WORKLOADS)
+    if unknown:
+        raise ValueError("Cargas desconhecidas: " + ", ".join(sorted(unknown)))
+    config = dict(BENCH_CONFIG, **(config or {}))
+    with Machine() as machine:
+        workloads = [run_workload(name, config, scale, repeat, machine) for name in names]
+    return {
+        "host": {
+            "python":    platform.python_version(),
+            "platform":  platform.platform(),
+            "processor": platform.machine(),
+            # Pico do processo inteiro (todas as cargas e o próprio Python)
+            "process_peak_rss_kb": peak_rss_kb(),
+        },
+        "config":    config,
+        "scale":     scale,
+        "repeat":    repeat,
+        "workloads": workloads,
+    }
+
+
+# --------------- Comparação com a referência ---------------
+def compare(report, baseline, tolerance=0.20):
+    """Lista as regressões de ``report`` em relação a ``baseline`` (lista vazia: nenhuma).
+
+    Métricas simuladas devem ser idênticas (só comparadas se a configuração e
+    os parâmetros da carga forem os mesmos); métricas do hospedeiro podem
+    piorar até ``tolerance`` (fração) antes de contar como regressão.
+    """
+    problems = []
+    previous = {w["name"]: w for w in baseline.get("workloads", [])}
+    same_config = report.get("config") == baseline.get("config")
+    for current in report["workloads"]:
+        name = current["name"]
+        old  = previous.get(name)
+        if old is None:
+            continue
+        if same_config and current["params"] == old["params"]:
+            for field in SIM_FIELDS:
+                if current[field] != old[field]:
+                    problems.append("%s: %s mudou de %s para %s"
+                                    % (name, field, old[field], current[field]))
+        for field, higher_is_better in HOST_FIELDS:
+            new_value, old_value = current[field], old[field]
+            if not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                problems.append("%s: %s piorou %.1f%% (%s -> %s)"
+                                % (name, field, abs(change) * 100, old_value, new_value))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cpu_edusim.bench",
+        description="Executa as cargas de referência e mede o modelo e o simulador.")
+    parser.add_argument("workloads", nargs="*", metavar="carga",
+                        help="cargas a executar (padrão: todas): " + ", ".join(WORKLOADS))
+    parser.add_argument("--config", help="configuração em JSON (arquivo ou texto), "
+                                         "com as chaves da grade de cpu_edusim.sweep")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="multiplica o tamanho das cargas (padrão: 1)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="execuções por carga; vale o melhor tempo (padrão: 3)")
+    parser.add_argument("--out", help="grava o relatório JSON neste arquivo")
+    parser.add_argument("--baseline", help="relatório anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="piora aceita nas métricas do hospedeiro (padrão: 0.20)")
+    args = parser.parse_args(argv)
+
+    config = None
+    if args.config:
+        if os.path.exists(args.config):
+            with open(args.config, encoding="utf-8") as f:
+                config = json.load(f)
+        else:
+            config = json.loads(args.config)
+        unknown = set(config) - set(DEFAULTS)
+        if unknown:
+            parser.error("Parâmetros desconhecidos: " + ", ".join(sorted(unknown)))
+
+    try:
+        report = run_suite(args.workloads, config, args.scale, args.repeat)
+    except ValueError as e:
+        parser.error(str(e))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        if problems:
+            return 1
+        print("Sem regressões em relação a " + args.baseline, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
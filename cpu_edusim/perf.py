@@ -0,0 +1,102 @@
+"""Séries de desempenho por instrução, agregadas para gráficos de execuções longas.
+
+``PerfSeries`` recebe o custo de cada instrução (e se houve acerto na cache)
+e guarda no máximo ``max_points`` janelas: quando esse limite é atingido,
+janelas vizinhas são fundidas e a largura dobra. Memória e custo de desenho
+ficam limitados mesmo com milhões de instruções.
+"""
+
+NAN = float("nan")
+
+
+class PerfSeries:
+    def __init__(self, max_points=1000):
+        self.max_points = max_points
+        self.clear()
+
+    def clear(self):
+        self.width        = 1      # Instruções por janela
+        self.instructions = 0
+        self.cycles       = 0
+        self.hits         = 0
+        self.accesses     = 0
+        # Uma entrada por janela
+        self._count    = []
+        self._cycles   = []
+        self._hits     = []
+        self._accesses = []
+        self._min      = []        # Menor e maior custo de uma instrução na janela
+        self._max      = []
+
+    def __len__(self):
+        return len(self._count)
+
+    def add(self, cost, hit=-1):
+        """Uma instrução: custo em ciclos e hit = 1 (acerto), 0 (falta) ou -1 (sem acesso)."""
+        self.add_chunk(1, cost, 1 if hit == 1 else 0, 1 if hit >= 0 else 0)
+
+    def add_chunk(self, count, cycles, hits, accesses):
+        """Várias instruções sem detalhe individual (ex.: eventos já descartados do log)."""
+        if count <= 0:
+            return
+        self.instructions += count
+        self.cycles       += cycles
+        self.hits         += hits
+        self.accesses     += accesses
+        avg = cycles / count
+
+        if self._count and self._count[-1] < self.width:
+            self._count[-1]    += count
+            self._cycles[-1]   += cycles
+            self._hits[-1]     += hits
+            self._accesses[-1] += accesses
+            self._min[-1]       = min(self._min[-1], avg)
+            self._max[-1]       = max(self._max[-1], avg)
+            return
+
+        self._count.append(count)
+        self._cycles.append(cycles)
+        self._hits.append(hits)
+        self._accesses.append(accesses)
+        self._min.append(avg)
+        self._max.append(avg)
+        if len(self._count) > self.max_points:
+            self._merge_pairs()
+
+    def _merge_pairs(self):
+        def pairs(values, combine):
+            merged = [combine(values[i], values[i + 1]) for i in range(0, len(values) - 1, 2)]
+            if len(values) % 2:
+                merged.append(values[-1])
+            return merged
+
+        add = lambda a, b: a + b
+        self._count    = pairs(self._count, add)
+        self._cycles   = pairs(self._cycles, add)
+        self._hits     = pairs(self._hits, add)
+        self._accesses = pairs(self._accesses, add)
+        self._min      = pairs(self._min, min)
+        self._max      = pairs(self._max, max)
+        self.width    *= 2
+
+    def series(self):
+        """Listas para o gráfico, uma entrada por janela.
+
+        x: instruções executadas ao fim da janela; cumulative: ciclos
+        acumulados; hit_rate: taxa de acerto na janela (nan sem acessos);
+        cpi: ciclos por instrução na janela; cpi_min/cpi_max: envoltória do
+        custo individual das instruções da janela.
+        """
+        x, cumulative, hit_rate, cpi = [], [], [], []
+        done = total = 0
+        for count, cycles, hits, accesses in zip(self._count, self._cycles, self._hits, self._accesses):
+            done  += count
+            total += cycles
+            x.append(done)
+            cumulative.append(total)
+            hit_rate.append(hits / accesses if accesses else NAN)
+            cpi.append(cycles / count)
+        return {
+            "x": x, "cumulative": cumulative, "hit_rate": hit_rate, "cpi": cpi,
+            "cpi_min": list(self._min), "cpi_max": list(self._max),
+        }
@@ -0,0 +1,59 @@
+"""Exportação do perfil de execução (por instrução, por endereço e 3C).
+
+O perfil é coletado pelo backend com ``Machine.set_profiling(True)``; aqui
+ele é convertido em colunas (uma lista por contador, indexada pela linha
+do programa ou pelo endereço) e gravado em JSON. As listas cabem direto em
+um DataFrame ou em ``numpy.array``.
+
+Exemplo::
+
+    m = Machine()
+    m.set_profiling(True)
+    m.load_program(programa)
+    m.run()
+    with open("perfil.json", "w") as f:
+        write_profile_json(m, f)
+    print(hot_instructions(m, 5))
+"""
+import json
+
+PC_FIELDS      = ["count", "cycles", "hits", "misses"]
+ADDRESS_FIELDS = ["reads", "writes", "hits", "misses"]
+CLASS_FIELDS   = ["compulsory", "capacity", "conflict"]
+
+
+def profile_dict(machine):
+    """Perfil completo: colunas por instrução e por endereço e as faltas 3C."""
+    pcs   = machine.pc_profile()
+    addrs = machine.address_profile()
+    classes = machine.miss_classes()
+    instructions = {"text": [machine.instruction_line(i) for i in range(len(pcs))]}
+    for name in PC_FIELDS:
+        instructions[name] = [getattr(p, name) for p in pcs]
+    addresses = {name: [getattr(a, name) for a in addrs] for name in ADDRESS_FIELDS}
+    return {
+        "instructions": instructions,
+        "addresses":    addresses,
+        "miss_classes": {name: getattr(classes, name) for name in CLASS_FIELDS},
+    }
+
+
+def write_profile_json(machine, stream):
+    json.dump(profile_dict(machine), stream, ensure_ascii=False)
+    stream.write("\n")
+
+
+def hot_instructions(machine, n=10, key="misses"):
+    """As n linhas do programa com mais ``key``: lista de (linha, texto, PcProfile)."""
+    pcs   = machine.pc_profile()
+    order = sorted((i for i in range(len(pcs)) if getattr(pcs[i], key)),
+                   key=lambda i: getattr(pcs[i], key), reverse=True)
+    return [(i, machine.instruction_line(i), pcs[i]) for i in order[:n]]
+
+
+def hot_addresses(machine, n=10, key="misses"):
+    """Os n endereços com mais ``key``: lista de (endereço, AddressProfile)."""
+    addrs = machine.address_profile()
+    order = sorted((i for i in range(len(addrs)) if getattr(addrs[i], key)),
+                   key=lambda i: getattr(addrs[i], key), reverse=True)
+    return [(i, addrs[i]) for i in order[:n]]
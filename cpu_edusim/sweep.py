@@ -0,0 +1,320 @@
+"""Varredura de parâmetros: executa um programa em uma grade de configurações.
+
+Cada combinação da grade (produto cartesiano dos valores de cada parâmetro)
+é simulada num processo separado, com sua própria ``Machine``. Os resultados
+são entregues à medida que cada execução termina e podem ser gravados em
+CSV ou JSON Lines (um objeto por linha) sem esperar o fim da varredura.
+
+Exemplo::
+
+    grid = {"cache_lines": [4, 8, 16], "associativity": [1, 2, 0],
+            "policy": ["LRU", "FIFO"]}
+    with open("resultados.csv", "w", newline="") as f:
+        run_sweep("prog.asm", grid, out=f, fmt="csv")   # Ou uma lista de linhas
+
+Pela linha de comando::
+
+    python -m cpu_edusim.sweep prog.asm --grid grade.json --out resultados.csv
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cpu_edusim.backend import (
+    Machine, opcode_names, WRITE_THROUGH, WRITE_BACK,
+    INCL_NINE, INCL_INCLUSIVE, INCL_EXCLUSIVE,
+    PREFETCH_NONE, PREFETCH_NEXT_LINE, PREFETCH_STRIDE, PREFETCH_STREAM,
+)
+
+# Parâmetros aceitos na grade e seus valores padrão.
+# associativity: 1 = direto, 0 = totalmente associativo, N = N vias
+# Latências em ciclos; pipeline = 1 usa o modelo de 5 estágios
+# write_policy: "WT" (write-through) ou "WB" (write-back); write_allocate: 0/1
+# l2_*/l3_*: níveis abaixo da L1 (l2_lines = 0: sem L2; l3 exige L2);
+# inclusion: "NINE" (não inclusiva), "INCLUSIVE" ou "EXCLUSIVE"
+# prefetcher: prefetch na L1, "NONE", "NEXT_LINE", "STRIDE" ou "STREAM"
+# max_steps: limite de instruções por execução (programas com laços), 0 = sem limite
+DEFAULTS = {
+    "mem_words":     10,
+    "cache_lines":   4,
+    "block_words":   1,
+    "associativity": 1,
+    "policy":        "LRU",
+    "seed":          0,
+    "write_policy":  "WT",
+    "write_allocate": 1,
+    "l2_lines":      0,
+    "l2_associativity": 0,
+    "l2_latency":    10,
+    "l2_inclusion":  "NINE",
+    "l3_lines":      0,
+    "l3_associativity": 0,
+    "l3_latency":    30,
+    "l3_inclusion":  "NINE",
+    "prefetcher":    "NONE",
+    "prefetch_degree": 1,
+    "prefetch_distance": 1,
+    "hit_latency":   5,
+    "miss_latency":  0,
+    "mem_latency":   5,
+    "alu_latency":   2,
+    "pipeline":      0,
+    "forwarding":    1,
+    "max_steps":     10_000_000,
+}
+
+POLICIES = {"LRU": 0, "FIFO": 1, "RANDOM": 2, "PLRU": 3}
+WRITE_POLICIES = {"WT": WRITE_THROUGH, "WB": WRITE_BACK}
+INCLUSIONS     = {"NINE": INCL_NINE, "INCLUSIVE": INCL_INCLUSIVE, "EXCLUSIVE": INCL_EXCLUSIVE}
+PREFETCHERS    = {"NONE": PREFETCH_NONE, "NEXT_LINE": PREFETCH_NEXT_LINE,
+                  "STRIDE": PREFETCH_STRIDE, "STREAM": PREFETCH_STREAM}
+
+RESULT_FIELDS = ["steps", "total_cycles", "cpi", "hits", "misses", "hit_rate", "amat",
+                 "l2_hits", "l2_misses", "l2_amat", "l3_hits", "l3_misses", "l3_amat",
+                 "mem_reads", "mem_writes", "write_backs", "bus_bytes",
+                 "prefetch_issued", "prefetch_useful", "prefetch_late", "prefetch_polluting",
+                 "error"]
+
+
+def expand_grid(grid):
+    """Lista de configurações (dicts completos) do produto cartesiano da grade."""
+    unknown = set(grid) - set(DEFAULTS)
+    if unknown:
+        raise ValueError("Parâmetros desconhecidos na grade: " + ", ".join(sorted(unknown)))
+    keys   = list(DEFAULTS)
+    values = [_as_list(grid.get(k, DEFAULTS[k])) for k in keys]
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def result_fields():
+    """Nomes das colunas de cada resultado, na ordem usada no CSV."""
+    fields = list(DEFAULTS) + RESULT_FIELDS
+    for name in opcode_names():
+        fields += ["count_" + name, "cycles_" + name]
+    return fields
+
+
+# --------------- Execução nos processos de trabalho ---------------
+# Cada processo cria uma única Machine e a reconfigura a cada tarefa.
+_worker_machine = None
+
+def _init_worker():
+    global _worker_machine
+    _worker_machine = Machine()
+
+
+def configure_machine(machine, config):
+    """Aplica uma configuração completa (dict como DEFAULTS); retorna o erro ou ""."""
+    policy = config["policy"]
+    if isinstance(policy, str):
+        if policy.upper() not in POLICIES:
+            return "Política desconhecida: " + policy
+        policy = POLICIES[policy.upper()]
+    write_policy = config["write_policy"]
+    if isinstance(write_policy, str):
+        if write_policy.upper() not in WRITE_POLICIES:
+            return "Política de escrita desconhecida: " + write_policy
+        write_policy = WRITE_POLICIES[write_policy.upper()]
+    prefetcher = config["prefetcher"]
+    if isinstance(prefetcher, str):
+        if prefetcher.upper() not in PREFETCHERS:
+            return "Prefetcher desconhecido: " + prefetcher
+        prefetcher = PREFETCHERS[prefetcher.upper()]
+
+    try:
+        machine.configure(config["mem_words"], config["cache_lines"],
+                          config["block_words"], config["associativity"])
+    except ValueError as e:
+        return str(e)
+    machine.set_replacement_policy(policy, config["seed"])
+    machine.set_write_policy(write_policy, config["write_allocate"])
+    levels = []
+    for name in ("l2", "l3"):
+        lines = config[name + "_lines"]
+        if not lines:
+            break
+        inclusion = config[name + "_inclusion"]
+        if isinstance(inclusion, str):
+            if inclusion.upper() not in INCLUSIONS:
+                return "Inclusão desconhecida: " + inclusion
+            inclusion = INCLUSIONS[inclusion.upper()]
+        levels.append((lines, config[name + "_associativity"], config[name + "_latency"], inclusion))
+    try:
+        machine.set_cache_levels(levels)
+        machine.set_prefetcher(prefetcher, config["prefetch_degree"], config["prefetch_distance"])
+        machine.set_timing(config["hit_latency"], config["miss_latency"],
+                           config["mem_latency"], config["alu_latency"])
+    except ValueError as e:
+        return str(e)
+    machine.set_pipeline(config["pipeline"], config["forwarding"])
+    return ""
+
+
+def simulate(program, config, machine=None):
+    """Executa o programa numa configuração e retorna o dict de resultados.
+
+    ``program`` é uma lista de linhas ou o caminho de um arquivo, lido pelo
+    backend (loadProgramFile) com a numeração de linhas do arquivo.
+    """
+    if machine is None:
+        machine = _worker_machine or Machine()
+    result = dict(config)
+    result.update({name: "" for name in RESULT_FIELDS})
+
+    error = configure_machine(machine, config)
+    if error:
+        result["error"] = error
+        return result
+
+    if isinstance(program, (str, bytes, os.PathLike)):
+        errors = machine.load_program_file(program)
+    else:
+        errors = machine.load_program(program)
+    if errors:
+        result["error"] = errors.strip().replace("\n", "; ")
+        return result
+
+    steps        = machine.run(config["max_steps"] or None)
+    if config["max_steps"] and steps == config["max_steps"] and not machine.finished:
+        result["error"] = "Limite de instruções atingido: %d" % steps
+    hits, misses = machine.cache_status()
+    accesses     = hits + misses
+    level_stats  = machine.cache_level_stats()
+    prefetch     = machine.prefetch_stats()
+    for name, stats in zip(("l2", "l3"), level_stats[1:]):
+        result[name + "_hits"]   = stats.hits
+        result[name + "_misses"] = stats.misses
+        result[name + "_amat"]   = round(stats.amat, 6)
+    # Linhas ainda modificadas ao fim entram no tráfego (comparação justa com write-through)
+    machine.flush_cache()
+    traffic      = machine.memory_traffic()
+    result.update({
+        "steps":        steps,
+        "total_cycles": machine.total_cycles,
+        "cpi":          round(machine.total_cycles / steps, 6) if steps else 0.0,
+        "hits":         hits,
+        "misses":       misses,
+        "hit_rate":     round(hits / accesses, 6) if accesses else 0.0,
+        "amat":         round(level_stats[0].amat, 6),
+        "mem_reads":    traffic.reads,
+        "mem_writes":   traffic.writes,
+        "write_backs":  traffic.writeBacks,
+        "bus_bytes":    traffic.busBytes,
+        "prefetch_issued":    prefetch.issued,
+        "prefetch_useful":    prefetch.useful,
+        "prefetch_late":      prefetch.late,
+        "prefetch_polluting": prefetch.polluting,
+    })
+    stats = machine.opcode_stats()
+    for name in opcode_names():
+        count, cycles = stats.get(name, (0, 0))
+        result["count_" + name]  = count
+        result["cycles_" + name] = cycles
+    return result
+
+
+# --------------- Varredura ---------------
+def iter_sweep(program, grid, workers=None):
+    """Gera os resultados na ordem em que as execuções terminam.
+
+    workers=1 executa tudo no processo atual (útil para depuração).
+    ``program`` é uma lista de linhas ou o caminho de um arquivo (ver simulate).
+    """
+    configs = expand_grid(grid)
+    if not isinstance(program, (str, bytes, os.PathLike)):
+        program = list(program)
+    if workers == 1:
+        machine = Machine()
+        try:
+            for config in configs:
+                yield simulate(program, config, machine)
+        finally:
+            machine.close()
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(simulate, program, config) for config in configs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+class ResultWriter:
+    """Grava resultados um a um em CSV ou JSON Lines ("csv" ou "jsonl")."""
+
+    def __init__(self, stream, fmt="csv"):
+        if fmt not in ("csv", "jsonl"):
+            raise ValueError("Formato desconhecido: " + fmt)
+        self.stream = stream
+        self.fmt    = fmt
+        self._csv   = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(stream, fieldnames=result_fields())
+            self._csv.writeheader()
+
+    def write(self, result):
+        if self._csv is not None:
+            self._csv.writerow(result)
+        else:
+            self.stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+def run_sweep(program, grid, out=None, fmt="csv", workers=None):
+    """Executa a varredura completa; grava em ``out`` (se dado) e retorna a lista de resultados."""
+    writer  = ResultWriter(out, fmt) if out is not None else None
+    results = []
+    for result in iter_sweep(program, grid, workers):
+        if writer:
+            writer.write(result)
+        results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cpu_edusim.sweep",
+        description="Executa um programa em uma grade de configurações de cache.")
+    parser.add_argument("program", help="arquivo com as instruções")
+    parser.add_argument("--grid", required=True,
+                        help="grade em JSON (arquivo ou texto), ex.: '{\"cache_lines\": [4, 8]}'")
+    parser.add_argument("--out", help="arquivo de saída (padrão: saída padrão)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None,
+                        help="formato de saída (padrão: pela extensão de --out, senão csv)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="número de processos (padrão: número de CPUs)")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.grid):
+        with open(args.grid, encoding="utf-8") as f:
+            grid = json.load(f)
+    else:
+        grid = json.loads(args.grid)
+
+    fmt = args.format
+    if fmt is None:
+        fmt = "jsonl" if args.out and args.out.endswith((".jsonl", ".json")) else "csv"
+
+    # Lido pelo backend em cada execução: os erros citam as linhas do arquivo
+    if not os.path.exists(args.program):
+        parser.error("Programa não encontrado: " + args.program)
+    program = os.path.abspath(args.program)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            run_sweep(program, grid, f, fmt, args.workers)
+    else:
+        run_sweep(program, grid, sys.stdout, fmt, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Reprodução de traces de endereços direto no modelo de cache.
+
+Para estudos só de cache, a camada de instruções é desnecessária: cada
+acesso do trace vai direto para ``replayTrace`` no backend. O arquivo é
+mapeado em memória (``mmap``) e passado ao backend em blocos de tamanho
+fixo, por ponteiro, sem cópia; o uso de memória não depende do tamanho do
+trace.
+
+Formato do arquivo (little-endian)::
+
+    cabeçalho  "CPUTRACE", versão (uint32), flags (uint32), n (uint64)
+    endereços  n x int32
+    escritas   n x uint8 (0/1), presente se flags & FLAG_WRITES
+
+Um arquivo "cru" (só int32, sem cabeçalho) também pode ser lido com
+``TraceFile(path, raw=True)``; todos os acessos são tratados como leituras.
+
+Exemplo::
+
+    m = Machine()
+    m.configure(1 << 20, 256, 4, 4)
+    hits = bytearray()
+    with TraceFile("trace.bin") as t:
+        stats = replay(m, t, bitmap=hits)
+    print(stats.hits, stats.misses, stats.cycles)
+"""
+import ctypes
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from cpu_edusim.backend import backend
+
+MAGIC         = b"CPUTRACE"
+VERSION       = 1
+FLAG_WRITES   = 1
+HEADER        = struct.Struct("<8sIIQ")
+DEFAULT_CHUNK = 1 << 20        # Acessos por chamada ao backend (múltiplo de 8)
+
+
+class TraceFile:
+    """Trace mapeado em memória; ``chunks()`` devolve ponteiros para o mapeamento."""
+
+    def __init__(self, path, raw=False):
+        self._file   = open(path, "rb")
+        self._mm     = None
+        self._buf    = None
+        size         = os.fstat(self._file.fileno()).st_size
+        self.count   = 0
+        self._addrs  = 0
+        self._writes = None
+
+        if raw:
+            self.count = size // 4
+        else:
+            if size < HEADER.size:
+                self.close()
+                raise ValueError("Arquivo de trace sem cabeçalho: " + path)
+            magic, version, flags, count = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                self.close()
+                raise ValueError("Arquivo de trace inválido: " + path)
+            expected = HEADER.size + count * (5 if flags & FLAG_WRITES else 4)
+            if size < expected:
+                self.close()
+                raise ValueError("Arquivo de trace truncado: " + path)
+            self.count  = count
+            self._addrs = HEADER.size
+            if flags & FLAG_WRITES:
+                self._writes = HEADER.size + count * 4
+
+        if self.count:
+            # ACCESS_COPY dá um buffer gravável (exigido pelo ctypes) sem copiar o arquivo
+            self._mm   = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_COPY)
+            self._buf  = (ctypes.c_char * size).from_buffer(self._mm)
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._buf = None      # Libera a referência ao mmap antes de fechá-lo
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def chunks(self, chunk_size=DEFAULT_CHUNK):
+        """Gera (ponteiro_endereços, ponteiro_escritas ou None, n) para cada bloco."""
+        base = ctypes.addressof(self._buf) if self._buf is not None else 0
+        for start in range(0, self.count, chunk_size):
+            n      = min(chunk_size, self.count - start)
+            addrs  = base + self._addrs + start * 4
+            writes = base + self._writes + start if self._writes is not None else None
+            yield addrs, writes, n
+
+
+def replay(machine, trace, chunk_size=DEFAULT_CHUNK, bitmap=None):
+    """Reproduz um TraceFile na cache da máquina e retorna os totais (TraceStats).
+
+    Os totais de trace são zerados no início; o conteúdo da cache é mantido
+    (a cache continua "aquecida" entre traces). ``bitmap`` pode ser um
+    bytearray (estendido) ou um arquivo binário aberto para escrita: recebe
+    um bit por acesso (bit i%8 do byte i/8), 1 = acerto.
+    """
+    if chunk_size <= 0 or chunk_size % 8:
+        raise ValueError("chunk_size deve ser um múltiplo positivo de 8")
+    backend.ctxResetTraceStats(machine._ctx)
+    bits = (ctypes.c_uint8 * (chunk_size // 8))() if bitmap is not None else None
+
+    for addrs, writes, n in trace.chunks(chunk_size):
+        backend.ctxReplayTrace(machine._ctx, addrs, writes, n, bits)
+        if bits is not None:
+            chunk_bits = memoryview(bits)[:(n + 7) // 8]
+            if isinstance(bitmap, bytearray):
+                bitmap += chunk_bits
+            else:
+                bitmap.write(chunk_bits)
+    return machine.trace_stats()
+
+
+def replay_buffer(machine, addrs, writes=None, bitmap=None):
+    """Reproduz acessos já em memória (ex.: array('i'), numpy int32) sem cópia.
+
+    ``bitmap``, se dado, deve ser um buffer gravável de (n+7)//8 bytes.
+    Os totais acumulam sobre os anteriores; retorna os acertos deste bloco.
+    """
+    addr_view = memoryview(addrs)
+    # Outros tipos seriam lidos errado sem aviso: o backend espera int32
+    if addr_view.itemsize != 4 or addr_view.format[-1:] not in ("i", "I", "l", "L"):
+        raise ValueError("addrs deve ter inteiros de 4 bytes (formato %r, %d bytes por item)"
+                         % (addr_view.format, addr_view.itemsize))
+    n = addr_view.nbytes // 4
+    if writes is not None and (memoryview(writes).itemsize != 1 or memoryview(writes).nbytes < n):
+        raise ValueError("writes deve ter um byte por acesso")
+    if bitmap is not None and memoryview(bitmap).nbytes < (n + 7) // 8:
+        raise ValueError("bitmap deve ter (n+7)//8 bytes")
+    return backend.ctxReplayTrace(machine._ctx, _address_of(addrs), _address_of(writes),
+                                  n, _address_of(bitmap))
+
+
+def _address_of(obj):
+    if obj is None:
+        return None
+    nbytes = memoryview(obj).nbytes
+    return ctypes.addressof((ctypes.c_char * nbytes).from_buffer(obj))
+
+
+def write_trace(path, addresses, writes=None, chunk_size=DEFAULT_CHUNK):
+    """Grava um trace no formato CPUTRACE a partir de iteráveis (lidos em blocos).
+
+    ``writes`` (opcional) deve ter o mesmo número de itens que ``addresses``.
+    """
+    flags = FLAG_WRITES if writes is not None else 0
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, flags, 0))
+        count = _write_chunked(f, "i", addresses, chunk_size)
+        if writes is not None:
+            if _write_chunked(f, "B", writes, chunk_size) != count:
+                raise ValueError("addresses e writes têm tamanhos diferentes")
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, flags, count))
+    return count
+
+
+def _write_chunked(f, typecode, values, chunk_size):
+    count = 0
+    buf   = array(typecode)
+    for v in values:
+        buf.append(v)
+        if len(buf) == chunk_size:
+            count += _flush(f, buf)
+            buf    = array(typecode)
+    return count + _flush(f, buf)
+
+
+def _flush(f, buf):
+    if sys.byteorder == "big":
+        buf.byteswap()
+    buf.tofile(f)
+    return len(buf)
@@ -1,94 +1,153 @@
 import tkinter as tk
+import os
 import time
-from tkinter import font
-import matplotlib.pyplot as plt
+from collections import deque
+from tkinter import font, filedialog
 import ctypes
-import os
-
-lib_name = "cpu_backend.dll" #Compilação do backend
-backend = ctypes.CDLL(os.path.join(os.path.dirname(__file__), lib_name))
-
-# --------------- Declarações das funções do backend ---------------
-backend.initCPU.argtypes = []
-backend.initCPU.restype  = None
-
-backend.resetCPU.argtypes = []
-backend.resetCPU.restype  = None
-
-backend.nextInstruction.argtypes = []
-backend.nextInstruction.restype  = None
-
-backend.loadDefaultInstructions.argtypes = []
-backend.loadDefaultInstructions.restype  = None
-
-backend.setInstructions.argtypes = [ctypes.POINTER(ctypes.c_char_p), ctypes.c_int]
-backend.setInstructions.restype  = None
-
-backend.getRegistersString.argtypes = []
-backend.getRegistersString.restype  = ctypes.c_char_p
-
-backend.getMemoryString.argtypes = []
-backend.getMemoryString.restype  = ctypes.c_char_p
-
-backend.setMemoryValue.argtypes = [ctypes.c_int, ctypes.c_int]
-backend.setMemoryValue.restype  = None
-
-backend.getMemoryValue.argtypes = [ctypes.c_int]
-backend.getMemoryValue.restype  = ctypes.c_int
-
-backend.getMemorySize.argtypes = []
-backend.getMemorySize.restype  = ctypes.c_int
-
-backend.getExplanationMode.argtypes = []
-backend.getExplanationMode.restype  = ctypes.c_int
-
-backend.setExplanationMode.argtypes = [ctypes.c_int]
-backend.setExplanationMode.restype  = None
-
-backend.getLastOperationText.argtypes = []
-backend.getLastOperationText.restype  = ctypes.c_char_p
-
-backend.getLastExplanationText.argtypes = []
-backend.getLastExplanationText.restype  = ctypes.c_char_p
-
-backend.getTotalCycles.argtypes = []
-backend.getTotalCycles.restype  = ctypes.c_int
-
-backend.clearHistory.argtypes = []
-backend.clearHistory.restype  = None
-
-backend.getHistoryString.argtypes = []
-backend.getHistoryString.restype  = ctypes.c_char_p
-
-backend.getLastInstructionCost.argtypes = []
-backend.getLastInstructionCost.restype  = ctypes.c_int
-
-backend.getCacheStatus.argtypes = [ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)]
-backend.getCacheStatus.restype  = None
-
-backend.setCacheLineData.argtypes = [ctypes.c_int, ctypes.c_int]
-backend.setCacheLineData.restype  = None
-
-backend.getCacheLineString.argtypes = [ctypes.c_int]
-backend.getCacheLineString.restype  = ctypes.c_char_p
 
-backend.getCacheSize.argtypes = []
-backend.getCacheSize.restype  = ctypes.c_int
-
-backend.setRegisterValue.argtypes = [ctypes.c_char_p, ctypes.c_int]
-backend.setRegisterValue.restype  = None
-
-backend.getInstructionCount.argtypes = []
-backend.getInstructionCount.restype  = ctypes.c_int
-
-backend.getInstructionLine.argtypes = [ctypes.c_int]
-backend.getInstructionLine.restype  = ctypes.c_char_p
+from cpu_edusim.backend import (
+    backend, registers_view, memory_view, cache_view, cache_data_view,
+    cache_level_view, run_until_break, events_since, last_event, format_event, opcode_name,
+    consume_dirty, TimingModel, PipelineStats, MemoryTraffic, CacheLevelConfig, CacheLevelStats,
+    WRITE_BACK, MAX_CACHE_LEVELS, Machine, MissClassStats, address_profile_view,
+    PrefetchConfig, PrefetchStats, PREFETCH_NONE, MultiCore, MAX_CORES,
+    BREAK_PC, BREAK_READ, BREAK_WRITE, BREAK_REGISTER, BREAK_MISS, BREAK_CYCLES,
+)
+from cpu_edusim.perf import PerfSeries
+from cpu_edusim.profiling import hot_instructions
+
+# Nomes exibidos para os modos de mapeamento (índice = modo) e políticas (REPL_*)
+MAPPING_NAMES = ["Direto", "Associativo", "Associativo por Conjunto"]
+POLICY_NAMES  = ["LRU", "FIFO", "Aleatória", "PLRU"]
+WRITE_NAMES   = ["Write-through", "Write-back"]   # Índice = WRITE_THROUGH / WRITE_BACK
+INCLUSION_NAMES = ["NINE", "Inclusiva", "Exclusiva"] # Índice = INCL_*
+PREFETCH_NAMES  = ["Nenhum", "Próxima linha", "Passo (RPT)", "Sequência"]  # Índice = PREFETCH_*
+
+# Quantas linhas de memória/cache cabem nas caixas do canvas
+MEM_VISIBLE_ROWS   = 10
+CACHE_VISIBLE_ROWS = 4
+# Máximo de campos nos diálogos de edição
+MAX_EDIT_ROWS      = 64
+# Programas maiores que isso são editados no arquivo e abertos com "Abrir Programa…"
+MAX_EDIT_LINES     = 20000
+
+# Animação do caminho de dados e execução contínua
+DEFAULT_ARROW_MS   = 1000   # Tempo de exibição de cada seta
+DEFAULT_RUN_RATE   = 10     # Instruções por segundo na execução contínua
+RUN_TICK_MS        = 16     # Intervalo mínimo entre atualizações da tela
+RUN_ALL_MAX_STEPS  = 10_000_000   # "Executar Tudo" para aqui (programas com laço infinito)
+CHECKPOINT_INTERVAL = 1000      # Instruções entre checkpoints automáticos ("Voltar" longe)
+UNDO_LOG_BYTES     = 8 << 20    # Registro de desfazer ("Voltar" instrução a instrução)
+
+# Janela da hierarquia de cache: células por linha de cada nível
+LEVEL_CELL_SIZE    = 12
+LEVEL_MAX_CELLS    = 512    # Níveis maiores mostram só as primeiras linhas
+
+# Mapa de calor da memória (perfil por endereço)
+HEAT_CELL_SIZE     = 16
+HEAT_MAX_CELLS     = 1024   # Acima disso cada célula agrupa uma faixa de endereços
+HEAT_METRICS       = ["Faltas", "Acessos", "Taxa de falta"]
+HEAT_TOP_INSTRUCTIONS = 10
+
+# Janela multinúcleo: estado MESI de cada linha (índice = COH_*) e programa
+# inicial de cada núcleo (incrementa a palavra {addr}: com endereços no mesmo
+# bloco, compartilhamento falso)
+PROTOCOL_NAMES   = ["MSI", "MESI"]                 # Índice = PROTOCOL_*
+COHERENCE_NAMES  = ["I", "S", "E", "M"]
+COHERENCE_COLORS = ["gray85", "lightblue", "lightgreen", "orange"]
+MC_DEFAULT_CORES = 2
+MC_DEFAULT_PROGRAM = ["LI R4, 0", "LI R3, 10", "laco:", "LOAD R1, {addr}", "ADDI R1, R1, 1",
+                      "STORE R1, {addr}", "ADDI R4, R4, 1", "BNE R4, R3, laco"]
+MC_COLUMN_WIDTH  = 290
+
+# Pontos de parada
+BREAK_NAMES = ["", "Linha", "Leitura", "Escrita", "Registrador", "Falta na L1", "Ciclos >"]  # Índice = BREAK_*
+
+# Gráfico de desempenho ao vivo
+PERF_MAX_POINTS    = 1000   # Janelas (pontos) no máximo por série
+PERF_FRAME_MS      = 200    # Intervalo mínimo entre redesenhos (5 quadros/s)
+
+class VirtualList:
+    """Lista rolável desenhada no canvas que só cria textos para as linhas visíveis.
+
+    format_row(i) devolve o texto da linha i. A lista pode ter milhões de
+    itens: apenas ``rows`` textos existem no canvas e são reaproveitados ao
+    rolar.
+    """
+
+    def __init__(self, canvas, x, y, row_height, rows, font, format_row):
+        self.canvas     = canvas
+        self.x          = x
+        self.y          = y
+        self.row_height = row_height
+        self.rows       = rows
+        self.font       = font
+        self.format_row = format_row
+        self.total      = 0
+        self.offset     = 0          # Índice da primeira linha visível
+        self.items      = []
+        self.marked     = None       # Linha destacada (busca ou último acesso)
+        self.scrollbar  = None
+
+    def resize(self, total):
+        for item in self.items:
+            self.canvas.delete(item)
+        self.total  = total
+        self.offset = 0
+        self.marked = None
+        self.items  = [
+            self.canvas.create_text(self.x, self.y + i*self.row_height, text="", font=self.font)
+            for i in range(min(self.rows, total))
+        ]
+        self.refresh()
+
+    def visible(self, index):
+        return self.offset <= index < self.offset + len(self.items)
+
+    def refresh(self, indices=None):
+        """Redesenha as linhas visíveis (ou só as de indices que estiverem visíveis)."""
+        if indices is None:
+            indices = range(self.offset, self.offset + len(self.items))
+            if self.scrollbar is not None and self.total:
+                self.scrollbar.set(self.offset / self.total,
+                                   (self.offset + len(self.items)) / self.total)
+        for i in indices:
+            if self.visible(i):
+                self.canvas.itemconfig(
+                    self.items[i - self.offset], text=self.format_row(i),
+                    fill="red" if i == self.marked else "black"
+                )
+
+    def set_offset(self, offset):
+        offset = max(0, min(offset, self.total - len(self.items)))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    def show(self, index):
+        """Rola o mínimo necessário para que a linha index fique visível."""
+        if index < self.offset:
+            self.set_offset(index)
+        elif index >= self.offset + len(self.items):
+            self.set_offset(index - len(self.items) + 1)
+
+    def mark(self, index):
+        old, self.marked = self.marked, index
+        self.refresh([i for i in (old, index) if i is not None])
+
+    def yview(self, *args):
+        """Comando do Scrollbar: ("moveto", fração) ou ("scroll", n, "units"/"pages")."""
+        if args[0] == "moveto":
+            self.set_offset(int(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            step = len(self.items) if args[2] == "pages" else 1
+            self.set_offset(self.offset + int(args[1]) * step)
+
+    def coords_for(self, index):
+        if self.visible(index):
+            return tuple(self.canvas.coords(self.items[index - self.offset])[:2])
+        return None
 
-# Mapeamento
-backend.setCacheMappingMode.argtypes = [ctypes.c_int]
-backend.setCacheMappingMode.restype  = None
-backend.getCacheMappingMode.argtypes = []
-backend.getCacheMappingMode.restype  = ctypes.c_int
 
 class CPUVisualizer:
     def __init__(self, root):
@@ -144,42 +203,77 @@ class CPUVisualizer:
             command=lambda: self.show_component_info(
                 "Cache",
                 "Memória mais rápida e menor que a principal,\n"
-                "usada para acelerar o acesso (4 linhas).\n"
-                "Mapeamento Direto ou Associativo.\n\n"
+                f"usada para acelerar o acesso ({backend.getCacheSize()} linhas de "
+                f"{backend.getBlockWords()} palavra(s)).\n"
+                "Mapeamento Direto, Associativo ou por Conjunto\n"
+                "(substituição LRU, FIFO, Aleatória ou PLRU).\n\n"
                 "V=Valid, T=Tag, D=Data"
             )
         )
         self.cache_button.place(x=500, y=400)
 
-        self.cache_size = backend.getCacheSize()
-        self.cache_labels = []
-        for i in range(self.cache_size):
-            label_id = self.canvas.create_text(715, 420 + i*50, text="", font=self.medium_font)
-            self.cache_labels.append(label_id)
+        # Linhas da cache: lista virtual com barra de rolagem, ir para linha e busca
+        self.cache_list = VirtualList(self.canvas, 715, 420, 50, CACHE_VISIBLE_ROWS,
+                                      self.medium_font, self.format_cache_row)
+        self.cache_list.scrollbar = tk.Scrollbar(self.root, orient="vertical", command=self.cache_list.yview)
+        self.cache_list.scrollbar.place(x=955, y=405, height=195)
+
+        cache_tools = tk.Frame(self.root)
+        cache_tools.place(x=500, y=318)
+        tk.Label(cache_tools, text="Linha:", font=self.medium_font).pack(side="left")
+        self.cache_goto_entry = tk.Entry(cache_tools, width=7, font=self.medium_font)
+        self.cache_goto_entry.pack(side="left")
+        tk.Button(cache_tools, text="Ir", font=self.medium_font,
+                  command=lambda: self.goto_row(self.cache_list, self.cache_goto_entry)).pack(side="left", padx=5)
+        tk.Label(cache_tools, text="Valor:", font=self.medium_font).pack(side="left")
+        self.cache_search_entry = tk.Entry(cache_tools, width=7, font=self.medium_font)
+        self.cache_search_entry.pack(side="left")
+        tk.Button(cache_tools, text="Buscar", font=self.medium_font,
+                  command=lambda: self.search_value(self.cache_list, self.cache_search_entry,
+                                                    backend.findCacheValue)).pack(side="left", padx=5)
 
         # Memória Principal
         self.memory_box = self.canvas.create_rectangle(1100,50,1350,600, fill="lightgray", tags="memory")
         self.canvas.create_text(1225,25, text="Memória Principal (RAM)", font=self.large_font)
         self.memory_button = tk.Button(
             self.root, text="?", font=self.medium_font,
-            command=lambda: self.show_component_info("Memória","Armazena 10 posições de dados.")
+            command=lambda: self.show_component_info("Memória",f"Armazena {backend.getMemorySize()} posições de dados.")
         )
         self.memory_button.place(x=1095,y=45)
 
-        self.memory_labels = []
-        mem_size = backend.getMemorySize()
-        for i in range(mem_size):
-            lbl_id = self.canvas.create_text(1225,70 + i*50, text=f"[{i}]: 0", font=self.large_font)
-            self.memory_labels.append(lbl_id)
+        # RAM: lista virtual com barra de rolagem, ir para endereço, busca e
+        # acompanhamento do último acesso
+        self.memory_list = VirtualList(self.canvas, 1225, 70, 50, MEM_VISIBLE_ROWS,
+                                       self.large_font, self.format_memory_row)
+        self.memory_list.scrollbar = tk.Scrollbar(self.root, orient="vertical", command=self.memory_list.yview)
+        self.memory_list.scrollbar.place(x=1355, y=55, height=545)
+
+        memory_tools = tk.Frame(self.root)
+        memory_tools.place(x=1100, y=610)
+        tk.Label(memory_tools, text="Endereço:", font=self.medium_font).grid(row=0, column=0, sticky="e")
+        self.memory_goto_entry = tk.Entry(memory_tools, width=9, font=self.medium_font)
+        self.memory_goto_entry.grid(row=0, column=1)
+        tk.Button(memory_tools, text="Ir", font=self.medium_font,
+                  command=lambda: self.goto_row(self.memory_list, self.memory_goto_entry)).grid(row=0, column=2, padx=5)
+        tk.Label(memory_tools, text="Valor:", font=self.medium_font).grid(row=1, column=0, sticky="e")
+        self.memory_search_entry = tk.Entry(memory_tools, width=9, font=self.medium_font)
+        self.memory_search_entry.grid(row=1, column=1)
+        tk.Button(memory_tools, text="Buscar", font=self.medium_font,
+                  command=lambda: self.search_value(self.memory_list, self.memory_search_entry,
+                                                    backend.findMemoryValue)).grid(row=1, column=2, padx=5)
+        self.follow_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(memory_tools, text="Seguir último acesso", font=self.medium_font,
+                       variable=self.follow_var).grid(row=2, column=0, columnspan=3, sticky="w")
+
+        # Roda do mouse sobre a RAM ou a cache rola a lista correspondente
+        self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.canvas.bind("<Button-4>",   self.on_mouse_wheel)
+        self.canvas.bind("<Button-5>",   self.on_mouse_wheel)
 
         # Box Vermelho (Esforço Computacional)
         self.computation_box = self.canvas.create_rectangle(500,670,950,760, outline="red", width=3, tags="computation_box")
         self.computation_info_button = tk.Button(
-            self.root, text="?", font=self.medium_font,
-            command=lambda: self.show_component_info(
-                "Ciclos de Clock",
-                "LOAD/STORE(HIT)=5\nLOAD/STORE(MISS)=10\nADD/SUB=2\nReflete custo de HIT/MISS."
-            )
+            self.root, text="?", font=self.medium_font, command=self.show_cycle_info
         )
         self.computation_info_button.place(x=500, y=660)
 
@@ -191,6 +285,8 @@ class CPUVisualizer:
         # Cache Status
         self.cache_status_label = tk.Label(self.root, text="Cache Hits: 0 | Misses: 0", font=self.medium_font)
         self.cache_status_label.place(x=610, y=620)
+        self.memory_traffic_label = tk.Label(self.root, text="Memória L/E: 0/0 | Barramento: 0 B", font=self.medium_font)
+        self.memory_traffic_label.place(x=610, y=645)
 
         # Botões no topo (linha 1)
         self.next_button = tk.Button(self.root, text="Próxima Instrução", font=self.medium_font, command=self.next_instruction)
@@ -208,26 +304,84 @@ class CPUVisualizer:
         self.reset_button = tk.Button(self.root, text="Resetar", font=self.medium_font, command=self.reset)
         self.reset_button.grid(row=1, column=2, pady=10, padx=10)
 
-        self.mapping_var = tk.StringVar(value="Direto")
-        if backend.getCacheMappingMode() == 1:
-            self.mapping_var.set("Associativo")
+        self.run_all_button = tk.Button(self.root, text="Executar Tudo", font=self.medium_font, command=self.run_all)
+        self.run_all_button.grid(row=2, column=3, pady=10, padx=10)
+
+        # Execução contínua (linha 4): agendada com after(), sem bloquear a janela
+        self.run_job = None
+        self.continuous_button = tk.Button(
+            self.root, text="Executar Contínuo", font=self.medium_font, command=self.toggle_continuous_run
+        )
+        self.continuous_button.grid(row=4, column=0, pady=10, padx=10)
+
+        self.run_rate_var = tk.IntVar(value=DEFAULT_RUN_RATE)
+        tk.Scale(
+            self.root, label="Instruções por segundo", from_=1, to=5000, orient="horizontal",
+            length=250, variable=self.run_rate_var, font=self.medium_font
+        ).grid(row=4, column=1, padx=10)
+
+        # Animação das setas: velocidade e liga/desliga
+        self.anim_queue = deque()
+        self.anim_job   = None
+        self.arrow_ms_var = tk.IntVar(value=DEFAULT_ARROW_MS)
+        tk.Scale(
+            self.root, label="Duração da seta (ms)", from_=50, to=2000, resolution=50,
+            orient="horizontal", length=250, variable=self.arrow_ms_var, font=self.medium_font
+        ).grid(row=4, column=2, padx=10)
+
+        self.animations_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            self.root, text="Animações", font=self.medium_font, variable=self.animations_var,
+            command=self.toggle_animations
+        ).grid(row=4, column=3, padx=10)
+
+        self.mapping_var = tk.StringVar(value=MAPPING_NAMES[backend.getCacheMappingMode()])
 
         # Cria OptionMenu
         self.mapping_menu = tk.OptionMenu(
             self.root,
             self.mapping_var,
-            "Direto",
-            "Associativo",
+            *MAPPING_NAMES,
             command=self.update_mapping_mode
         )
         self.mapping_menu.config(font=self.medium_font)
 
+        # Política de substituição (abaixo do mapeamento)
+        self.policy_var = tk.StringVar(value=POLICY_NAMES[backend.getReplacementPolicy()])
+        self.policy_menu = tk.OptionMenu(
+            self.root,
+            self.policy_var,
+            *POLICY_NAMES,
+            command=self.update_replacement_policy
+        )
+        self.policy_menu.config(font=self.medium_font)
+        self.policy_menu.grid(row=2, column=4, padx=10, pady=10)
+
         # Label do Mapeamento (coluna 3), OptionMenu (coluna 4)
         self.mapping_label = tk.Label(self.root, text="Mapeamento da Cache:", font=self.medium_font)
         self.mapping_label.grid(row=1, column=3, sticky="e", padx=5)
         self.mapping_menu.grid(row=1, column=4, padx=10, pady=10)
 
+        # Política de escrita (linha 5): write-through/write-back e alocação na escrita
+        self.write_policy_var   = tk.StringVar(value=WRITE_NAMES[backend.getWritePolicy()])
+        self.write_allocate_var = tk.BooleanVar(value=bool(backend.getWriteAllocate()))
+        tk.Checkbutton(
+            self.root, text="Alocar na escrita", font=self.medium_font,
+            variable=self.write_allocate_var, command=self.update_write_policy
+        ).grid(row=5, column=2, padx=10)
+        tk.Label(self.root, text="Política de Escrita:", font=self.medium_font).grid(
+            row=5, column=3, sticky="e", padx=5)
+        self.write_policy_menu = tk.OptionMenu(
+            self.root, self.write_policy_var, *WRITE_NAMES,
+            command=lambda _: self.update_write_policy()
+        )
+        self.write_policy_menu.config(font=self.medium_font)
+        self.write_policy_menu.grid(row=5, column=4, padx=10, pady=10)
+
         # Demais botões
+        self.config_button = tk.Button(self.root,text="Configurar Máquina",font=self.medium_font,command=self.configure_machine)
+        self.config_button.grid(row=3,column=3,pady=10, padx=10)
+
         self.history_button = tk.Button(self.root,text="Exibir Histórico",font=self.medium_font,command=self.show_history)
         self.history_button.grid(row=3,column=1,pady=10, padx=10)
 
@@ -246,6 +400,27 @@ class CPUVisualizer:
         self.performance_button = tk.Button(self.root,text="Gráfico de Desempenho",font=self.medium_font,command=self.show_performance)
         self.performance_button.grid(row=3,column=2,pady=10, padx=10)
 
+        self.timing_button = tk.Button(self.root,text="Temporização",font=self.medium_font,command=self.configure_timing)
+        self.timing_button.grid(row=3,column=4,pady=10, padx=10)
+
+        self.open_program_button = tk.Button(self.root,text="Abrir Programa…",font=self.medium_font,command=self.open_program)
+        self.open_program_button.grid(row=4,column=4,pady=10, padx=10)
+
+        self.hierarchy_button = tk.Button(self.root,text="Hierarquia de Cache",font=self.medium_font,command=self.show_hierarchy)
+        self.hierarchy_button.grid(row=5,column=0,pady=10, padx=10)
+
+        self.step_back_button = tk.Button(self.root,text="Voltar",font=self.medium_font,command=self.step_back)
+        self.step_back_button.grid(row=5,column=1,pady=10, padx=10)
+
+        self.heatmap_button = tk.Button(self.root,text="Mapa de Calor",font=self.medium_font,command=self.show_heatmap)
+        self.heatmap_button.grid(row=6,column=0,pady=10, padx=10)
+
+        self.multicore_button = tk.Button(self.root,text="Multinúcleo",font=self.medium_font,command=self.show_multicore)
+        self.multicore_button.grid(row=6,column=1,pady=10, padx=10)
+
+        self.breakpoints_button = tk.Button(self.root,text="Pontos de Parada",font=self.medium_font,command=self.show_breakpoints)
+        self.breakpoints_button.grid(row=6,column=2,pady=10, padx=10)
+
         # Label Instrução Atual / Histórico
         self.current_instruction_label = tk.Label(
             self.root,
@@ -274,26 +449,89 @@ class CPUVisualizer:
         self.history_title_label.place(x=1450,y=200)
 
         self.dynamic_history_labels = []
-        self.execution_times        = []
+
+        # Série de desempenho (alimentada pelo log de eventos) e janela do gráfico
+        self.perf_series    = PerfSeries(PERF_MAX_POINTS)
+        self.perf_seq       = 0
+        self.perf_canvas    = None
+        self.perf_job       = None
+        self.perf_last_draw = 0.0
+
+        # Janela de histórico (lê só os eventos novos a cada atualização)
+        self.history_text = None
+        self.history_seq  = 0
+
+        # Janela da hierarquia de cache (redesenhada a cada atualização enquanto aberta)
+        self.hierarchy_canvas = None
+
+        # Janela do mapa de calor (idem); heatmap_cells guarda as faixas desenhadas
+        self.heatmap_canvas = None
+        self.heatmap_info   = None
+        self.heatmap_cells  = []
+
+        # Janela multinúcleo: um MultiCore próprio, independente da máquina principal
+        self.multicore        = None
+        self.multicore_canvas = None
+
+        # Janela dos pontos de parada (a lista mostra os disparos de cada um)
+        self.breakpoint_list   = None
+        self.breakpoint_status = None
 
         # Inicializa CPU e Carrega Instruções
         backend.initCPU()
+        backend.setCheckpointInterval(CHECKPOINT_INTERVAL)
+        backend.setUndoLogCapacity(UNDO_LOG_BYTES)
+        backend.setProfiling(1)
         backend.loadDefaultInstructions()
+        # Os menus foram criados antes do initCPU: sincroniza com os padrões do backend
+        self.write_policy_var.set(WRITE_NAMES[backend.getWritePolicy()])
+        self.write_allocate_var.set(bool(backend.getWriteAllocate()))
+        self.refresh_views()
         self.updateAll()
 
+    def refresh_views(self):
+        """Obtém as visões diretas do backend e recria os textos de memória e cache.
+
+        Deve ser chamado sempre que a geometria da máquina mudar.
+        """
+        self.registers   = registers_view()
+        self.memory      = memory_view()
+        self.cache       = cache_view()
+        self.cache_data  = cache_data_view()
+        self.block_words = backend.getBlockWords()
+
+        self.memory_list.resize(len(self.memory))
+        self.cache_list.resize(len(self.cache))
+
     def updateAll(self):
-        self.update_registers()
-        self.update_memory()
-        self.update_cache_labels()
+        # Só redesenha o que mudou desde a última atualização (None = tudo)
+        regs, mem, lines = consume_dirty()
+        self.update_registers(regs)
+        self.update_memory(mem)
+        self.update_cache_labels(lines)
+        if self.follow_var.get():
+            self.follow_last_access()
         self.update_cache_status_label()
         self.update_total_cost_label()
+        self.update_history()
+        self.update_hierarchy()
+        self.update_heatmap()
+        self.update_breakpoints()
+        self.update_perf_series()
 
     def update_mapping_mode(self, selected_mode_str):
-        if selected_mode_str == "Direto":
-            backend.setCacheMappingMode(0)
-        else:
-            backend.setCacheMappingMode(1)
+        backend.setCacheMappingMode(MAPPING_NAMES.index(selected_mode_str))
         self.updateAll()
+
+    def update_replacement_policy(self, selected_policy_str):
+        backend.setReplacementPolicy(POLICY_NAMES.index(selected_policy_str))
+        self.updateAll()
+
+    def update_write_policy(self):
+        backend.setWritePolicy(WRITE_NAMES.index(self.write_policy_var.get()),
+                               int(self.write_allocate_var.get()))
+        self.updateAll()
+
     def show_component_info(self, comp, info):
         """Mostra uma janela com informações sobre um componente."""
         w = tk.Toplevel(self.root)
@@ -310,34 +548,34 @@ class CPUVisualizer:
         self.explanation_button.config(text=f"Modo Explicação: {st}")
 
     def reset(self):
+        self.stop_continuous_run()
         backend.resetCPU()
-        self.canvas.delete("data_path_temp")
+        self.stop_animation()
         self.canvas.delete("data_path")
         self.updateAll()
         self.current_instruction_label.config(text="Instrução Atual:")
         self.canvas.itemconfig("control_text", text="Unidade de Controle")
         backend.clearHistory()
+        if self.history_text is not None:
+            self.history_text.config(state="normal")
+            self.history_text.delete("1.0", "end")
+            self.history_text.config(state="disabled")
+            self.history_seq = backend.getEventSequence()
         for lbl in self.dynamic_history_labels:
             lbl.destroy()
         self.dynamic_history_labels.clear()
-        self.execution_times.clear()
+        self.perf_series.clear()
+        self.perf_seq = backend.getEventSequence()
+        self.schedule_perf_redraw()
 
     def next_instruction(self):
+        seq = backend.getEventSequence()
         backend.nextInstruction()
         self.updateAll()
 
         op_text = backend.getLastOperationText().decode("utf-8")
         self.canvas.itemconfig("control_text", text=op_text)
 
-        cost = backend.getLastInstructionCost()
-        if cost > 0:
-            splitted = op_text.split(":")
-            if splitted:
-                opcode = splitted[0].strip()
-            else:
-                opcode = "Instr"
-            self.execution_times.append((cost, opcode))
-
         if self.explanation_mode:
             exp = backend.getLastExplanationText().decode("utf-8")
             if exp:
@@ -346,89 +584,149 @@ class CPUVisualizer:
             else:
                 self.current_instruction_label.config(text="Instrução Atual:")
 
-        self.parse_and_draw_data_path(op_text)
+        # Sem evento novo (fim do programa): nada a animar
+        self.animate_event(last_event() if backend.getEventSequence() > seq else None)
 
-    def parse_and_draw_data_path(self, operation_text):
-        self.canvas.delete("data_path")
-
-        op = operation_text.strip()
-        if not op:
+    def step_back(self):
+        """Desfaz a última instrução executada."""
+        self.stop_continuous_run()
+        self.stop_animation()
+        if not backend.stepBack():
             return
+        self.rewind_views()
+        self.updateAll()
 
-        exp_text = backend.getLastExplanationText().decode("utf-8")
-        isHit = ("(HIT)" in exp_text) or ("HIT" in exp_text.upper())
-
-        if op.startswith("LOAD:"):
-            import re
-            matchMem = re.search(r"Memória\[(\d+)\]", op)
-            matchReg = re.search(r"->\s*(R[1-4])", op)
-            addr = 0
-            if matchMem:
-                addr = int(matchMem.group(1))
-            reg = "R1"
-            if matchReg:
-                reg = matchReg.group(1)
-
-            if isHit:
-                cCoord = self.get_coords_for("cache_box")
-                rCoord = self.get_coords_for(reg)
-                self.draw_data_path(cCoord, rCoord)
-            else:
-                mCoord = self.get_coords_for_memory(addr)
-                cCoord = self.get_coords_for("cache_box")
-                rCoord = self.get_coords_for(reg)
-                self.draw_data_path(mCoord, cCoord)
-                self.draw_data_path(cCoord, rCoord)
-
-        elif op.startswith("STORE:"):
-            import re
-            matchReg = re.search(r"STORE:\s*(R[1-4])", op)
-            matchMem = re.search(r"Memória\[(\d+)\]", op)
-            reg = "R1"
-            if matchReg:
-                reg = matchReg.group(1)
-            addr = 0
-            if matchMem:
-                addr = int(matchMem.group(1))
-
-            if isHit:
-                rCoord = self.get_coords_for(reg)
-                cCoord = self.get_coords_for("cache_box")
-                self.draw_data_path(rCoord, cCoord)
-            else:
-                rCoord = self.get_coords_for(reg)
-                cCoord = self.get_coords_for("cache_box")
-                mCoord = self.get_coords_for_memory(addr)
-                self.draw_data_path(rCoord, cCoord)
-                self.draw_data_path(cCoord, mCoord)
-
-        elif op.startswith("ADD:") or op.startswith("SUB:"):
-            splitted = op.split(":")
-            if len(splitted) > 1:
-                line = splitted[1].strip()
-            else:
-                line = op
-            if "->" not in line:
-                return
-            left_part, right_part = line.split("->")
-            left_part  = left_part.strip()
-            right_part = right_part.strip()
+        op_text = backend.getLastOperationText().decode("utf-8")
+        self.canvas.itemconfig("control_text", text=op_text or "Unidade de Controle")
+        exp = backend.getLastExplanationText().decode("utf-8")
+        if self.explanation_mode and exp:
+            self.current_instruction_label.config(text=f"Instrução Atual:\n{exp}")
+        else:
+            self.current_instruction_label.config(text="Instrução Atual:")
+
+    def rewind_views(self):
+        """Refaz histórico e gráfico a partir do log, que perdeu os eventos desfeitos."""
+        if self.history_text is not None:
+            self.history_text.config(state="normal")
+            self.history_text.delete("1.0", "end")
+            self.history_text.config(state="disabled")
+            self.history_seq = 0
+        self.perf_series.clear()
+        self.perf_seq = 0
+        self.schedule_perf_redraw()
+
+    def run_all(self):
+        """Executa até o fim ou até um ponto de parada (avaliados no backend)."""
+        self.stop_continuous_run()
+        steps, info = run_until_break(RUN_ALL_MAX_STEPS)
+        self.updateAll()
+        if info is not None:
+            self.show_break(info)
+        else:
+            self.current_instruction_label.config(text="Instrução Atual:")
+            if steps == RUN_ALL_MAX_STEPS:
+                self.show_component_info(
+                    "Executar Tudo",
+                    f"O programa não terminou após {RUN_ALL_MAX_STEPS} instruções (laço infinito?). "
+                    "Clique de novo para continuar ou use a execução contínua."
+                )
+        if steps > 0:
+            op_text = backend.getLastOperationText().decode("utf-8")
+            self.canvas.itemconfig("control_text", text=op_text)
+            self.animate_event(last_event())
+
+    # ----- Execução contínua -----
+    def toggle_continuous_run(self):
+        if self.run_job is not None:
+            self.stop_continuous_run()
+        else:
+            self.continuous_button.config(text="Pausar")
+            self.run_job = self.root.after(0, self.continuous_step)
+
+    def stop_continuous_run(self):
+        if self.run_job is not None:
+            self.root.after_cancel(self.run_job)
+            self.run_job = None
+        self.continuous_button.config(text="Executar Contínuo")
+
+    def continuous_step(self):
+        """Executa um lote de instruções e reagenda; a tela é atualizada uma vez por lote."""
+        rate     = max(1, self.run_rate_var.get())
+        interval = max(RUN_TICK_MS, 1000 // rate)
+        batch    = max(1, rate * interval // 1000)
+
+        steps, info = run_until_break(batch)
+        self.updateAll()
+        if steps > 0:
+            op_text = format_event(last_event())
+            self.canvas.itemconfig("control_text", text=op_text)
+            self.animate_event(last_event())
+
+        if info is not None:
+            self.show_break(info)
+        if info is not None or steps < batch:
+            self.run_job = None
+            self.stop_continuous_run()
+        else:
+            self.run_job = self.root.after(interval, self.continuous_step)
+
+    # ----- Animação do caminho de dados -----
+    def toggle_animations(self):
+        if not self.animations_var.get():
+            self.stop_animation()
+
+    def stop_animation(self):
+        if self.anim_job is not None:
+            self.root.after_cancel(self.anim_job)
+            self.anim_job = None
+        self.anim_queue.clear()
+        self.canvas.delete("data_path_temp")
+        self.canvas.delete("data_path")
 
-            if "+" in left_part:
-                regs = left_part.split("+")
-            else:
-                regs = left_part.split("-")
-            regs = [r.strip() for r in regs]
+    def animate_event(self, ev):
+        """Agenda as setas do evento.
 
-            aluC = self.get_coords_for("alu_box")
-            for s in regs:
-                sC = self.get_coords_for(s)
-                if sC and aluC:
-                    self.draw_data_path(sC, aluC)
+        Setas ainda não exibidas de eventos anteriores são descartadas: se a
+        execução estiver à frente da animação, só o evento mais recente é
+        mostrado.
+        """
+        if ev is None or not self.animations_var.get():
+            self.stop_animation()
+            return
+        self.anim_queue = deque(self.data_path_for(ev))
+        if self.anim_job is None:
+            self.play_next_arrow()
 
-            dC = self.get_coords_for(right_part)
-            if aluC and dC:
-                self.draw_data_path(aluC, dC)
+    def play_next_arrow(self):
+        self.anim_job = None
+        if not self.anim_queue:
+            return
+        start, end = self.anim_queue.popleft()
+        self.draw_data_path(start, end)
+        self.anim_job = self.root.after(max(1, self.arrow_ms_var.get()), self.play_next_arrow)
+
+    def data_path_for(self, ev):
+        """Lista de setas (início, fim) do caminho de dados de um evento."""
+        op    = opcode_name(ev.opcode)
+        cache = self.get_coords_for("cache_box")
+        if op in ("LOAD", "STORE"):
+            if ev.hit < 0:
+                return []   # Endereço inválido: não houve acesso
+            reg = self.get_coords_for(self.register_names[ev.rd])
+            mem = self.get_coords_for_memory(ev.address)
+            if op == "LOAD":
+                path = [(cache, reg)] if ev.hit else [(mem, cache), (cache, reg)]
+            else:
+                path = [(reg, cache)] if ev.hit else [(reg, cache), (cache, mem)]
+        elif op in ("ADD", "SUB", "ADDI", "LI", "BEQ", "BNE"):
+            # Operandos em registradores vão para a ULA; o resultado volta para rd
+            alu  = self.get_coords_for("alu_box")
+            path = [(self.get_coords_for(self.register_names[r]), alu) for r in (ev.rs1, ev.rs2) if r >= 0]
+            if ev.rd >= 0:
+                path.append((alu, self.get_coords_for(self.register_names[ev.rd])))
+        else:
+            return []
+        return [(s, e) for s, e in path if s and e]
 
     def get_coords_for(self, name):
         if name in self.register_boxes:
@@ -447,10 +745,7 @@ class CPUVisualizer:
         return None
 
     def get_coords_for_memory(self, index):
-        if 0 <= index < len(self.memory_labels):
-            x, y = self.canvas.coords(self.memory_labels[index])[:2]
-            return (x, y)
-        return self.get_coords_for("memory_box")
+        return self.memory_list.coords_for(index) or self.get_coords_for("memory_box")
 
     def draw_data_path(self, start, end):
         self.canvas.delete("data_path_temp")
@@ -463,8 +758,6 @@ class CPUVisualizer:
             tags="data_path_temp",
             arrowshape=(30, 35, 12)
         )
-        self.root.update()
-        time.sleep(1)
 
     def add_to_dynamic_history(self, explanation_text):
         label = tk.Label(
@@ -476,136 +769,811 @@ class CPUVisualizer:
         label.place(x=1450,y=y_pos)
         self.dynamic_history_labels.append(label)
 
-    def update_registers(self):
-        r_str = backend.getRegistersString().decode("utf-8")
-        parts = r_str.split(",")
-        d = {}
-        for p in parts:
-            if "=" in p:
-                k,v = p.split("=")
-                d[k.strip()] = v.strip()
-        for reg,(box_id,text_id) in self.register_boxes.items():
-            val = d.get(reg,"0")
-            self.canvas.itemconfig(text_id, text=f"{reg}: {val}")
-
-    def update_memory(self):
-        mem_str = backend.getMemoryString().decode("utf-8")
-        parts   = mem_str.split(",")
-        for i,part in enumerate(parts):
-            if i< len(self.memory_labels):
-                self.canvas.itemconfig(self.memory_labels[i], text=part)
-
-    def update_cache_labels(self):
-        sz = backend.getCacheSize()
-        for i in range(sz):
-            line_str = backend.getCacheLineString(i).decode("utf-8")
-            self.canvas.itemconfig(self.cache_labels[i], text=line_str)
+    def update_registers(self, indices=None):
+        for i,(reg,(box_id,text_id)) in enumerate(self.register_boxes.items()):
+            if indices is None or i in indices:
+                self.canvas.itemconfig(text_id, text=f"{reg}: {self.registers[i]}")
+
+    def update_memory(self, indices=None):
+        self.memory_list.refresh(indices)
+
+    def format_memory_row(self, i):
+        return f"[{i}]: {self.memory[i]}"
+
+    def cache_line_words(self, i):
+        bw = self.block_words
+        return self.cache_data[i*bw:(i+1)*bw]
+
+    def update_cache_labels(self, indices=None):
+        self.cache_list.refresh(indices)
+
+    def format_cache_row(self, i):
+        c = self.cache[i]
+        words = self.cache_line_words(i)
+        if self.block_words == 1:
+            data = str(words[0])
+        else:
+            data = "[" + " ".join(str(v) for v in words[:8]) + (" ...]" if len(words) > 8 else "]")
+        if self.write_policy_var.get() == WRITE_NAMES[WRITE_BACK]:
+            return f"[{i}] V={c.valid} M={c.dirty} T={c.tag} D={data}"
+        return f"[{i}] V={c.valid} T={c.tag} D={data}"
+
+    # ----- Navegação nas listas de memória e cache -----
+    def follow_last_access(self):
+        """Rola RAM e cache até o endereço do último acesso e o destaca."""
+        ev = last_event()
+        if ev is None or ev.hit < 0:
+            return
+        self.memory_list.show(ev.address)
+        self.memory_list.mark(ev.address)
+        line = backend.getCacheLineOfAddress(ev.address)
+        if line >= 0:
+            self.cache_list.show(line)
+            self.cache_list.mark(line)
+
+    def goto_row(self, view, entry):
+        try:
+            index = int(entry.get(), 0)
+        except ValueError:
+            return
+        if not 0 <= index < view.total:
+            self.show_component_info("Fora do intervalo", f"Use um índice entre 0 e {view.total - 1}.")
+            return
+        view.set_offset(index)
+        view.mark(index)
+
+    def search_value(self, view, entry, find):
+        """Procura o valor a partir da linha após a destacada (buscas repetidas avançam)."""
+        try:
+            value = int(entry.get(), 0)
+        except ValueError:
+            return
+        start = view.marked + 1 if view.marked is not None else view.offset
+        index = find(value, start)
+        if index < 0:
+            self.show_component_info("Busca", f"Valor {value} não encontrado.")
+            return
+        view.show(index)
+        view.mark(index)
+
+    def on_mouse_wheel(self, event):
+        x1, y1, x2, y2 = self.canvas.coords(self.memory_box)
+        if x1 <= event.x <= x2 and y1 <= event.y <= y2:
+            view = self.memory_list
+        else:
+            x1, y1, x2, y2 = self.canvas.coords(self.cache_box)
+            if not (x1 <= event.x <= x2 and y1 <= event.y <= y2):
+                return
+            view = self.cache_list
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        view.set_offset(view.offset + (-3 if up else 3))
 
     def update_cache_status_label(self):
-        hits   = ctypes.c_int()
-        misses = ctypes.c_int()
+        hits   = ctypes.c_longlong()
+        misses = ctypes.c_longlong()
         backend.getCacheStatus(ctypes.byref(hits), ctypes.byref(misses))
-        self.cache_status_label.config(text=f"Cache Hits: {hits.value} | Misses: {misses.value}")
+        text = f"Cache Hits: {hits.value} | Misses: {misses.value}"
+        cfg = PrefetchConfig()
+        backend.getPrefetcher(ctypes.byref(cfg))
+        if cfg.kind != PREFETCH_NONE:
+            stats = PrefetchStats()
+            backend.getPrefetchStats(ctypes.byref(stats))
+            text += f" | Prefetch úteis: {stats.useful}/{stats.issued}"
+        self.cache_status_label.config(text=text)
+        traffic = MemoryTraffic()
+        backend.getMemoryTraffic(ctypes.byref(traffic))
+        self.memory_traffic_label.config(
+            text=f"Memória L/E: {traffic.reads}/{traffic.writes} | Barramento: {traffic.busBytes} B")
 
     def update_total_cost_label(self):
         total = backend.getTotalCycles()
         cost  = backend.getLastInstructionCost()
-        self.total_cycles_label.config(text=f"Ciclos de Clock (Total): {total}")
+        text  = f"Ciclos de Clock (Total): {total}"
+        if backend.getPipelineMode():
+            stats = PipelineStats()
+            backend.getPipelineStats(ctypes.byref(stats))
+            text += f" | CPI: {stats.cpi:.2f}"
+        self.total_cycles_label.config(text=text)
         self.current_cost_label.config(text=f"Custo da Instrução Atual: {cost}")
 
     def show_history(self):
+        if self.history_text is not None:
+            self.history_text.winfo_toplevel().lift()
+            return
         w = tk.Toplevel(self.root)
         w.title("Histórico de Instruções")
         w.geometry("600x400")
         txt = tk.Text(w, wrap="word", font=self.medium_font)
         txt.pack(expand=True, fill="both", padx=10, pady=10)
-        hist_str = backend.getHistoryString().decode("utf-8")
-        txt.insert("end", hist_str)
         txt.config(state="disabled")
 
+        def close():
+            self.history_text = None
+            w.destroy()
+
+        w.protocol("WM_DELETE_WINDOW", close)
+        self.history_text = txt
+        self.history_seq  = 0
+        self.update_history()
+
+    def update_history(self):
+        """Acrescenta à janela de histórico só os eventos novos desde a última leitura."""
+        if self.history_text is None:
+            return
+        lines = []
+        while True:
+            events = events_since(self.history_seq)
+            if not events:
+                break
+            if events[0].step == 0:
+                # CPU reiniciada: o histórico recomeça
+                lines = []
+                self.history_text.config(state="normal")
+                self.history_text.delete("1.0", "end")
+                self.history_text.config(state="disabled")
+            elif events[0].seq > self.history_seq:
+                lines.append(f"... {events[0].seq - self.history_seq} eventos descartados ...")
+            for ev in events:
+                text = format_event(ev)
+                if text:
+                    lines.append(text)
+            self.history_seq = events[-1].seq + 1
+        if not lines:
+            return
+
+        txt = self.history_text
+        txt.config(state="normal")
+        txt.insert("end", "\n".join(lines) + "\n")
+        # Mantém no máximo a capacidade do log de linhas na janela
+        extra = int(txt.index("end-1c").split(".")[0]) - 1 - backend.getEventLogCapacity()
+        if extra > 0:
+            txt.delete("1.0", f"{extra + 1}.0")
+        txt.config(state="disabled")
+        txt.see("end")
+
+    # ----- Hierarquia de cache -----
+    def show_hierarchy(self):
+        if self.hierarchy_canvas is not None:
+            self.hierarchy_canvas.winfo_toplevel().lift()
+            return
+        w = tk.Toplevel(self.root)
+        w.title("Hierarquia de Cache")
+        w.geometry("900x700")
+
+        canvas = tk.Canvas(w, bg="white", height=520)
+        canvas.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # Configuração dos níveis abaixo da L1 (linhas 0 = nível ausente)
+        form = tk.Frame(w)
+        form.pack(pady=5)
+        for col, name in enumerate(["Nível", "Linhas", "Associatividade", "Latência", "Inclusão"]):
+            tk.Label(form, text=name).grid(row=0, column=col, padx=5)
+        configs = [CacheLevelConfig() for _ in range(backend.getCacheLevelCount())]
+        for level, cfg in enumerate(configs):
+            backend.getCacheLevelConfig(level, ctypes.byref(cfg))
+        rows = []
+        for level in range(1, MAX_CACHE_LEVELS):
+            cfg = configs[level] if level < len(configs) else CacheLevelConfig(0, 0, 10 * level, 0)
+            tk.Label(form, text=f"L{level + 1}").grid(row=level, column=0, padx=5)
+            entries = []
+            for col, value in enumerate((cfg.lines, cfg.associativity, cfg.latency), start=1):
+                e = tk.Entry(form, width=8)
+                e.grid(row=level, column=col, padx=5, pady=2)
+                e.insert(0, str(value))
+                entries.append(e)
+            inclusion_var = tk.StringVar(value=INCLUSION_NAMES[cfg.inclusion])
+            tk.OptionMenu(form, inclusion_var, *INCLUSION_NAMES).grid(row=level, column=4, padx=5)
+            rows.append((entries, inclusion_var))
+
+        # Prefetcher da L1
+        pf = PrefetchConfig()
+        backend.getPrefetcher(ctypes.byref(pf))
+        pf_frame = tk.Frame(form)
+        pf_frame.grid(row=MAX_CACHE_LEVELS, column=0, columnspan=5, pady=5)
+        tk.Label(pf_frame, text="Prefetch na L1:").pack(side="left", padx=5)
+        pf_kind_var = tk.StringVar(value=PREFETCH_NAMES[pf.kind])
+        tk.OptionMenu(pf_frame, pf_kind_var, *PREFETCH_NAMES).pack(side="left", padx=5)
+        pf_entries = []
+        for name, value in (("Grau:", pf.degree), ("Distância:", pf.distance)):
+            tk.Label(pf_frame, text=name).pack(side="left", padx=5)
+            e = tk.Entry(pf_frame, width=5)
+            e.pack(side="left")
+            e.insert(0, str(value))
+            pf_entries.append(e)
+
+        def apply():
+            levels = []
+            try:
+                for entries, inclusion_var in rows:
+                    lines, assoc, latency = [int(e.get()) for e in entries]
+                    if lines <= 0:
+                        break
+                    levels.append(CacheLevelConfig(lines, assoc, latency,
+                                                   INCLUSION_NAMES.index(inclusion_var.get())))
+            except ValueError:
+                levels = None
+            arr = (CacheLevelConfig * max(len(levels or []), 1))(*(levels or []))
+            if levels is None or not backend.setCacheLevels(arr, len(levels)):
+                self.show_component_info("Hierarquia de Cache",
+                                          "Configuração inválida (linhas > 0, latência >= 1, "
+                                          "associatividade compatível com o número de linhas).")
+                return
+            try:
+                degree, distance = [int(e.get()) for e in pf_entries]
+            except ValueError:
+                degree = distance = 0
+            config = PrefetchConfig(PREFETCH_NAMES.index(pf_kind_var.get()), degree, distance)
+            if not backend.setPrefetcher(ctypes.byref(config)):
+                self.show_component_info("Hierarquia de Cache",
+                                          "Prefetcher inválido (grau de 1 a 16, distância de 1 a 64).")
+            self.updateAll()
+
+        tk.Button(form, text="Aplicar", command=apply).grid(
+            row=MAX_CACHE_LEVELS + 1, column=0, columnspan=5, pady=5)
+
+        def close():
+            self.hierarchy_canvas = None
+            w.destroy()
+
+        w.protocol("WM_DELETE_WINDOW", close)
+        self.hierarchy_canvas = canvas
+        self.update_hierarchy()
+
+    def update_hierarchy(self):
+        """Redesenha a janela da hierarquia: uma caixa por nível e a memória principal."""
+        canvas = self.hierarchy_canvas
+        if canvas is None:
+            return
+        canvas.delete("all")
+        width = max(canvas.winfo_width(), 860)
+        per_row = (width - 40) // LEVEL_CELL_SIZE
+        y = 10
+        for level in range(backend.getCacheLevelCount()):
+            cfg   = CacheLevelConfig()
+            stats = CacheLevelStats()
+            backend.getCacheLevelConfig(level, ctypes.byref(cfg))
+            backend.getCacheLevelStats(level, ctypes.byref(stats))
+            lines = cache_level_view(level)
+            shown = min(len(lines), LEVEL_MAX_CELLS)
+            cell_rows = (shown + per_row - 1) // per_row
+            height = 50 + cell_rows * LEVEL_CELL_SIZE
+
+            assoc = {1: "direto", 0: "associativo"}.get(cfg.associativity, f"{cfg.associativity} vias")
+            title = (f"L{level + 1}: {cfg.lines} linhas, {assoc}, {cfg.latency} ciclos"
+                     + (f", {INCLUSION_NAMES[cfg.inclusion]}" if level else ""))
+            info  = (f"Hits: {stats.hits} | Misses: {stats.misses} | "
+                     f"Write-backs: {stats.writeBacks} | AMAT: {stats.amat:.2f} ciclos")
+            if level == 0:
+                pf = PrefetchConfig()
+                backend.getPrefetcher(ctypes.byref(pf))
+                if pf.kind != PREFETCH_NONE:
+                    pstats = PrefetchStats()
+                    backend.getPrefetchStats(ctypes.byref(pstats))
+                    title += f", prefetch {PREFETCH_NAMES[pf.kind]} (grau {pf.degree}, distância {pf.distance})"
+                    info  += (f" | Prefetch: {pstats.issued} emitidos, {pstats.useful} úteis, "
+                              f"{pstats.late} atrasados, {pstats.polluting} faltas por poluição")
+            canvas.create_rectangle(10, y, width - 10, y + height, fill="lightgreen")
+            canvas.create_text(20, y + 12, text=title, anchor="w", font=self.medium_font)
+            canvas.create_text(20, y + 32, text=info, anchor="w")
+            # Uma célula por linha: cinza = inválida, verde = válida, laranja = modificada
+            for i in range(shown):
+                x0 = 20 + (i % per_row) * LEVEL_CELL_SIZE
+                y0 = y + 45 + (i // per_row) * LEVEL_CELL_SIZE
+                line = lines[i]
+                color = "orange" if line.valid and line.dirty else "green" if line.valid else "gray85"
+                canvas.create_rectangle(x0, y0, x0 + LEVEL_CELL_SIZE - 2, y0 + LEVEL_CELL_SIZE - 2,
+                                        fill=color, outline="")
+            if shown < len(lines):
+                canvas.create_text(width - 20, y + 12, anchor="e",
+                                   text=f"(primeiras {shown} de {len(lines)} linhas)")
+            y += height + 15
+
+        t = TimingModel()
+        backend.getTimingModel(ctypes.byref(t))
+        traffic = MemoryTraffic()
+        backend.getMemoryTraffic(ctypes.byref(traffic))
+        canvas.create_rectangle(10, y, width - 10, y + 50, fill="lightgray")
+        canvas.create_text(20, y + 12, anchor="w", font=self.medium_font,
+                           text=f"Memória principal: {backend.getMemorySize()} palavras, {t.memLatency} ciclos")
+        canvas.create_text(20, y + 32, anchor="w",
+                           text=f"Leituras: {traffic.reads} | Escritas: {traffic.writes} | "
+                                f"Write-backs: {traffic.writeBacks} | Barramento: {traffic.busBytes} B")
+        canvas.config(scrollregion=(0, 0, width, y + 60))
+
+    # ----- Mapa de calor -----
+    def show_heatmap(self):
+        if self.heatmap_canvas is not None:
+            self.heatmap_canvas.winfo_toplevel().lift()
+            return
+        w = tk.Toplevel(self.root)
+        w.title("Mapa de Calor")
+        w.geometry("900x800")
+
+        top = tk.Frame(w)
+        top.pack(pady=5)
+        tk.Label(top, text="Métrica:", font=self.medium_font).pack(side="left")
+        self.heatmap_metric_var = tk.StringVar(value=HEAT_METRICS[0])
+        tk.OptionMenu(top, self.heatmap_metric_var, *HEAT_METRICS,
+                      command=lambda _: self.update_heatmap()).pack(side="left", padx=5)
+        self.heatmap_hover = tk.Label(top, text="", font=self.medium_font, width=60, anchor="w")
+        self.heatmap_hover.pack(side="left", padx=10)
+
+        canvas = tk.Canvas(w, bg="white", height=480)
+        canvas.pack(fill="both", expand=True, padx=10, pady=5)
+        canvas.bind("<Motion>", self.heatmap_motion)
+
+        info = tk.Text(w, height=16, font=self.medium_font, wrap="none")
+        info.pack(fill="x", padx=10, pady=5)
+        info.config(state="disabled")
+
+        def close():
+            self.heatmap_canvas = None
+            self.heatmap_info   = None
+            w.destroy()
+
+        w.protocol("WM_DELETE_WINDOW", close)
+        self.heatmap_canvas = canvas
+        self.heatmap_info   = info
+        self.update_heatmap()
+
+    def update_heatmap(self):
+        """Redesenha o mapa (uma célula por endereço ou faixa) e o resumo das faltas."""
+        canvas = self.heatmap_canvas
+        if canvas is None:
+            return
+        addrs = address_profile_view()
+        n     = len(addrs)
+        group = max(1, -(-n // HEAT_MAX_CELLS))   # Endereços por célula
+        # Leituras, escritas, acertos e faltas lado a lado: uma visão plana sem objetos por endereço
+        flat  = memoryview(addrs).cast("B").cast("q") if n else []
+        cells = []
+        for start in range(0, n, group):
+            end = min(start + group, n)
+            cells.append((start, end - 1) + tuple(sum(flat[4 * start + k:4 * end:4]) for k in range(4)))
+        self.heatmap_cells = cells
+
+        metric = self.heatmap_metric_var.get()
+        def value(cell):
+            reads, writes, hits, misses = cell[2:]
+            if metric == "Faltas":
+                return misses
+            if metric == "Acessos":
+                return reads + writes
+            return misses / (hits + misses) if hits + misses else 0.0
+        values = [value(cell) for cell in cells]
+        peak   = max(values, default=0) or 1
+
+        canvas.delete("all")
+        width   = max(canvas.winfo_width(), 860)
+        per_row = max(1, (width - 20) // HEAT_CELL_SIZE)
+        for i, v in enumerate(values):
+            x0 = 10 + (i % per_row) * HEAT_CELL_SIZE
+            y0 = 10 + (i // per_row) * HEAT_CELL_SIZE
+            # Branco (zero) a vermelho (máximo)
+            shade = 255 - int(255 * v / peak)
+            canvas.create_rectangle(x0, y0, x0 + HEAT_CELL_SIZE - 1, y0 + HEAT_CELL_SIZE - 1,
+                                    fill=f"#ff{shade:02x}{shade:02x}", outline="gray85")
+        rows = -(-len(values) // per_row)
+        canvas.config(scrollregion=(0, 0, width, 20 + rows * HEAT_CELL_SIZE))
+
+        # Resumo: faltas 3C e instruções com mais faltas
+        if not backend.getProfiling():
+            text = "Perfil desligado (sem memória para os contadores)."
+        else:
+            c = MissClassStats()
+            backend.getMissClassStats(ctypes.byref(c))
+            total = c.compulsory + c.capacity + c.conflict
+            pct   = lambda k: f"{100 * k / total:.1f}%" if total else "-"
+            lines = [
+                f"Faltas na L1: {total} (compulsórias {c.compulsory} {pct(c.compulsory)}, "
+                f"capacidade {c.capacity} {pct(c.capacity)}, conflito {c.conflict} {pct(c.conflict)})",
+                f"Cada célula: {group} endereço(s); cor proporcional a \"{metric}\" (máximo {peak:g})",
+                "",
+                "Instruções com mais faltas:",
+            ]
+            for index, text, p in hot_instructions(Machine.default(), HEAT_TOP_INSTRUCTIONS):
+                lines.append(f"  {index:6d}  {text:<28} execuções {p.count:<8} faltas {p.misses:<8} "
+                             f"ciclos {p.cycles}")
+            text = "\n".join(lines)
+        info = self.heatmap_info
+        info.config(state="normal")
+        info.delete("1.0", "end")
+        info.insert("end", text)
+        info.config(state="disabled")
+
+    def heatmap_motion(self, event):
+        """Mostra os contadores da célula sob o mouse."""
+        canvas  = self.heatmap_canvas
+        width   = max(canvas.winfo_width(), 860)
+        per_row = max(1, (width - 20) // HEAT_CELL_SIZE)
+        x = canvas.canvasx(event.x) - 10
+        y = canvas.canvasy(event.y) - 10
+        i = int(y // HEAT_CELL_SIZE) * per_row + int(x // HEAT_CELL_SIZE)
+        if x < 0 or y < 0 or x >= per_row * HEAT_CELL_SIZE or i >= len(self.heatmap_cells):
+            self.heatmap_hover.config(text="")
+            return
+        first, last, reads, writes, hits, misses = self.heatmap_cells[i]
+        where = f"Endereço {first}" if first == last else f"Endereços {first}–{last}"
+        self.heatmap_hover.config(
+            text=f"{where}: leituras {reads}, escritas {writes}, acertos {hits}, faltas {misses}")
+
+    # ----- Multinúcleo -----
+    def show_multicore(self):
+        if self.multicore_canvas is not None:
+            self.multicore_canvas.winfo_toplevel().lift()
+            return
+        w = tk.Toplevel(self.root)
+        w.title("Multinúcleo")
+        w.geometry("1200x850")
+
+        # Configuração: núcleos, protocolo, intercalação e L1 de cada núcleo
+        form = tk.Frame(w)
+        form.pack(pady=5)
+        entries = {}
+        for col, (name, value) in enumerate((("Núcleos", MC_DEFAULT_CORES), ("Memória", 32),
+                                             ("Linhas da L1", 4), ("Palavras/bloco", 4),
+                                             ("Intercalação", 1))):
+            tk.Label(form, text=name + ":").grid(row=0, column=2 * col, padx=2)
+            e = tk.Entry(form, width=5)
+            e.grid(row=0, column=2 * col + 1, padx=2)
+            e.insert(0, str(value))
+            entries[name] = e
+        protocol_var = tk.StringVar(value=PROTOCOL_NAMES[-1])
+        tk.Label(form, text="Protocolo:").grid(row=0, column=10, padx=2)
+        tk.OptionMenu(form, protocol_var, *PROTOCOL_NAMES).grid(row=0, column=11, padx=2)
+
+        # Um editor de programa por núcleo
+        programs_frame = tk.Frame(w)
+        programs_frame.pack(fill="x", padx=10)
+        program_texts = []
+
+        def build_editors(count):
+            old = [t.get("1.0", "end-1c") for t in program_texts]
+            for child in programs_frame.winfo_children():
+                child.destroy()
+            program_texts.clear()
+            for i in range(count):
+                tk.Label(programs_frame, text=f"Núcleo {i}").grid(row=0, column=i)
+                text = tk.Text(programs_frame, width=24, height=9, font=self.medium_font)
+                text.grid(row=1, column=i, padx=3)
+                text.insert("1.0", old[i] if i < len(old) else
+                            "\n".join(MC_DEFAULT_PROGRAM).replace("{addr}", str(i)))
+                program_texts.append(text)
+
+        def create():
+            try:
+                cores, mem, lines, block, interleave = [int(entries[k].get()) for k in
+                    ("Núcleos", "Memória", "Linhas da L1", "Palavras/bloco", "Intercalação")]
+                mc = MultiCore(cores, mem, lines, block, 1, PROTOCOL_NAMES.index(protocol_var.get()))
+            except ValueError:
+                self.show_component_info("Multinúcleo",
+                                          f"Configuração inválida (1 a {MAX_CORES} núcleos, memória "
+                                          "múltipla das palavras por bloco).")
+                return
+            try:
+                mc.set_interleave(interleave)
+            except ValueError:
+                mc.close()
+                self.show_component_info("Multinúcleo", "Intercalação inválida (>= 1 instrução).")
+                return
+            if self.multicore is not None:
+                self.multicore.close()
+            self.multicore = mc
+            build_editors(cores)
+            load()
+
+        def load():
+            programs = []
+            for text in program_texts:
+                lines = text.get("1.0", "end-1c").split("\n")
+                while lines and not lines[-1].strip():
+                    lines.pop()
+                programs.append(lines or [""])
+            errors = self.multicore.load_programs(programs)
+            self.multicore.reset()
+            self.update_multicore()
+            report = "".join(f"Núcleo {i}:\n{e}" for i, e in enumerate(errors) if e)
+            if report:
+                self.show_component_info("Erros de Montagem", report)
+
+        def step():
+            self.multicore.step()
+            self.update_multicore()
+
+        def run():
+            self.multicore.run(RUN_ALL_MAX_STEPS)
+            self.update_multicore()
+
+        buttons = tk.Frame(w)
+        buttons.pack(pady=5)
+        for text, command in (("Criar", create), ("Carregar Programas", load),
+                              ("Passo", step), ("Executar Tudo", run)):
+            tk.Button(buttons, text=text, font=self.medium_font, command=command).pack(side="left", padx=5)
+
+        canvas = tk.Canvas(w, bg="white")
+        canvas.pack(fill="both", expand=True, padx=10, pady=5)
+
+        def close():
+            self.multicore_canvas = None
+            if self.multicore is not None:
+                self.multicore.close()
+                self.multicore = None
+            w.destroy()
+
+        w.protocol("WM_DELETE_WINDOW", close)
+        self.multicore_canvas = canvas
+        create()
+
+    def update_multicore(self):
+        """Redesenha as L1 (uma coluna por núcleo, linhas coloridas pelo estado MESI) e os totais."""
+        canvas, mc = self.multicore_canvas, self.multicore
+        if canvas is None or mc is None:
+            return
+        canvas.delete("all")
+        current = mc.current_core
+        bottom  = 0
+        for i, core in enumerate(mc.cores):
+            x = 10 + i * MC_COLUMN_WIDTH
+            lines, data, states = core.cache_lines(), core.cache_data(), core.cache_coherence()
+            words = len(data) // len(lines)
+            s = mc.coherence_stats(i)
+            hits, misses = core.cache_status()
+            header = [
+                f"Núcleo {i}" + (" (próximo)" if i == current else ""),
+                " ".join(f"R{r + 1}={v}" for r, v in enumerate(core.registers())),
+                f"Acertos {hits} | Faltas {misses} | Ciclos {core.total_cycles}",
+                f"BusRd {s.busReads} | BusRdX {s.busReadX} | BusUpgr {s.busUpgrades}",
+                f"Invalidações {s.invalidations} | Faltas de coerência {s.coherenceMisses}",
+            ]
+            canvas.create_rectangle(x, 10, x + MC_COLUMN_WIDTH - 10, 20 + 16 * len(header),
+                                    fill="lightyellow" if i == current else "white")
+            for k, text in enumerate(header):
+                canvas.create_text(x + 5, 20 + 16 * k, anchor="w", text=text,
+                                   font=self.medium_font if k == 0 else None)
+            y = 30 + 16 * len(header)
+            for j, line in enumerate(lines):
+                state = states[j] if line.valid else 0
+                canvas.create_rectangle(x, y, x + MC_COLUMN_WIDTH - 10, y + 20,
+                                        fill=COHERENCE_COLORS[state], outline="gray60")
+                text = f"L{j} {COHERENCE_NAMES[state]}"
+                if line.valid:
+                    text += f" bloco {line.tag} {list(data[j * words:(j + 1) * words])}"
+                canvas.create_text(x + 5, y + 10, anchor="w", text=text)
+                y += 22
+            bottom = max(bottom, y)
+
+        total = mc.coherence_stats()
+        memory = mc.memory()
+        canvas.create_text(10, bottom + 15, anchor="w", font=self.medium_font,
+                           text=f"{PROTOCOL_NAMES[mc.protocol]}, intercalação {mc.interleave()} | "
+                                f"Transações no barramento: {total.bus_transactions} | "
+                                f"Invalidações: {total.invalidations} | Flushes: {total.flushes} | "
+                                f"Faltas de coerência: {total.coherenceMisses}")
+        canvas.create_text(10, bottom + 35, anchor="w",
+                           text="Memória: " + " ".join(str(v) for v in memory[:32])
+                                + (" …" if len(memory) > 32 else ""))
+        canvas.config(scrollregion=(0, 0, 10 + len(mc.cores) * MC_COLUMN_WIDTH, bottom + 50))
+
+    # ----- Pontos de parada -----
+    def show_breakpoints(self):
+        if self.breakpoint_list is not None:
+            self.breakpoint_list.winfo_toplevel().lift()
+            return
+        w = tk.Toplevel(self.root)
+        w.title("Pontos de Parada")
+        w.geometry("640x480")
+        machine = Machine.default()
+
+        form = tk.Frame(w)
+        form.pack(pady=5)
+        kind_var = tk.StringVar(value=BREAK_NAMES[BREAK_PC])
+        tk.Label(form, text="Tipo:").grid(row=0, column=0, padx=2)
+        tk.OptionMenu(form, kind_var, *BREAK_NAMES[1:]).grid(row=0, column=1, padx=2)
+        tk.Label(form, text="Valor:").grid(row=0, column=2, padx=2)
+        value_entry = tk.Entry(form, width=12)
+        value_entry.grid(row=0, column=3, padx=2)
+        tk.Label(form, text="Linha, endereço (-1 = qualquer falta), R1..R4 ou ciclos").grid(
+            row=1, column=0, columnspan=4)
+
+        listbox = tk.Listbox(w, font=self.medium_font, height=14)
+        listbox.pack(fill="both", expand=True, padx=10, pady=5)
+        status = tk.Label(w, text="", font=self.medium_font, wraplength=600, justify="left")
+        status.pack(padx=10, pady=5)
+
+        def selected():
+            sel = listbox.curselection()
+            if not sel:
+                return None
+            return int(listbox.get(sel[0]).split()[0])
+
+        def add():
+            kind = BREAK_NAMES.index(kind_var.get())
+            text = value_entry.get().strip().upper()
+            try:
+                if kind == BREAK_REGISTER and text.startswith("R"):
+                    value = int(text[1:]) - 1
+                else:
+                    value = int(text)
+                machine.add_breakpoint(kind, value)
+            except ValueError:
+                status.config(text=f"Valor inválido para \"{kind_var.get()}\": {text or '(vazio)'}")
+                return
+            status.config(text="")
+            self.update_breakpoints()
+
+        def remove():
+            bp_id = selected()
+            if bp_id is not None:
+                machine.remove_breakpoint(bp_id)
+                self.update_breakpoints()
+
+        def toggle():
+            bp_id = selected()
+            if bp_id is not None:
+                bp = machine.breakpoints()[bp_id]
+                machine.set_breakpoint_enabled(bp_id, not bp.enabled)
+                self.update_breakpoints()
+
+        def clear():
+            machine.clear_breakpoints()
+            self.update_breakpoints()
+
+        buttons = tk.Frame(w)
+        buttons.pack(pady=5)
+        for text, command in (("Adicionar", add), ("Remover", remove), ("Ativar/Desativar", toggle),
+                              ("Limpar", clear), ("Executar até Parar", self.run_all)):
+            tk.Button(buttons, text=text, font=self.medium_font, command=command).pack(side="left", padx=5)
+
+        def close():
+            self.breakpoint_list   = None
+            self.breakpoint_status = None
+            w.destroy()
+
+        w.protocol("WM_DELETE_WINDOW", close)
+        self.breakpoint_list   = listbox
+        self.breakpoint_status = status
+        self.update_breakpoints()
+
+    def update_breakpoints(self):
+        """Relista os pontos de parada com os disparos de cada um."""
+        listbox = self.breakpoint_list
+        if listbox is None:
+            return
+        listbox.delete(0, "end")
+        for bp_id, bp in Machine.default().breakpoints().items():
+            value = f"R{bp.value + 1}" if bp.kind == BREAK_REGISTER else bp.value
+            listbox.insert("end", f"{bp_id:3d}  {BREAK_NAMES[bp.kind]:<12} {value!s:<10} "
+                                  f"{'ativo' if bp.enabled else 'inativo':<8} disparos {bp.hits}")
+
+    def show_break(self, info):
+        """Mostra por que a execução parou no ponto info (BreakInfo)."""
+        bp    = Machine.default().breakpoints().get(info.id)
+        value = bp.value if bp is not None else 0
+        where = {
+            BREAK_PC:       f"antes da linha {value}",
+            BREAK_READ:     f"LOAD leu {info.newValue} de Memória[{info.address}]",
+            BREAK_WRITE:    f"STORE escreveu {info.newValue} em Memória[{info.address}]",
+            BREAK_REGISTER: f"R{value + 1} mudou de {info.oldValue} para {info.newValue}",
+            BREAK_MISS:     f"falta na L1 ao acessar Memória[{info.address}]",
+            BREAK_CYCLES:   f"{info.cycles} ciclos (limite {value})",
+        }[info.kind]
+        text = f"Ponto de parada {info.id} ({BREAK_NAMES[info.kind]}) na instrução {info.step}: {where}."
+        self.current_instruction_label.config(text=f"Instrução Atual:\n{text}")
+        if self.breakpoint_status is not None:
+            self.breakpoint_status.config(text=text)
+
     def edit_memory(self):
         w = tk.Toplevel(self.root)
         w.title("Editar Memória")
         w.geometry("400x600")
-        size = backend.getMemorySize()
+        # Edita a partir do primeiro endereço visível na lista
+        first = self.memory_list.offset
+        size  = min(backend.getMemorySize() - first, MAX_EDIT_ROWS)
         entries = []
 
         def save():
             for i,e in enumerate(entries):
                 try:
                     val = int(e.get())
-                    backend.setMemoryValue(i,val)
+                    backend.setMemoryValue(first + i,val)
                 except:
                     pass
             self.update_memory()
             w.destroy()
 
         for i in range(size):
-            tk.Label(w,text=f"Endereço {i}:").grid(row=i,column=0,padx=5,pady=5)
+            tk.Label(w,text=f"Endereço {first + i}:").grid(row=i,column=0,padx=5,pady=5)
             e = tk.Entry(w)
             e.grid(row=i,column=1,padx=5,pady=5)
-            cur = backend.getMemoryValue(i)
+            cur = backend.getMemoryValue(first + i)
             e.insert(0,str(cur))
             entries.append(e)
 
         tk.Button(w,text="Salvar",command=save).grid(row=size,column=0,columnspan=2,pady=10)
 
     def edit_instructions(self):
+        count = backend.getInstructionCount()
+        if count > MAX_EDIT_LINES:
+            self.show_component_info(
+                "Editar Instruções",
+                f"O programa tem {count} linhas. Edite o arquivo e carregue-o com “Abrir Programa…”."
+            )
+            return
+
         w = tk.Toplevel(self.root)
         w.title("Editar Instruções")
         w.geometry("600x600")
 
-        count   = backend.getInstructionCount()
-        entries = []
+        # Um editor de texto só (uma instrução por linha) em vez de um campo por linha
+        frame = tk.Frame(w)
+        frame.pack(fill="both", expand=True, padx=5, pady=5)
+        scrollbar = tk.Scrollbar(frame)
+        scrollbar.pack(side="right", fill="y")
+        text = tk.Text(frame, font=self.medium_font, undo=True, yscrollcommand=scrollbar.set)
+        text.pack(side="left", fill="both", expand=True)
+        scrollbar.config(command=text.yview)
+        text.insert("1.0", "\n".join(backend.getInstructionLine(i).decode("utf-8") for i in range(count)))
 
         def save():
-            new_insts = []
-            for e in entries:
-                line = e.get().strip()
-                if line:
-                    new_insts.append(line)
+            new_insts = text.get("1.0", "end-1c").split("\n")
+            while new_insts and not new_insts[-1].strip():
+                new_insts.pop()
             if new_insts:
                 arr_type = ctypes.c_char_p * len(new_insts)
                 arr = arr_type(*[s.encode("utf-8") for s in new_insts])
                 backend.setInstructions(arr, len(new_insts))
             w.destroy()
+            self.show_assemble_errors()
 
-        for i in range(count):
-            line_str = backend.getInstructionLine(i).decode("utf-8")
-            tk.Label(w,text=f"Instrução {i}:").grid(row=i,column=0,padx=5,pady=5)
-            e = tk.Entry(w,width=50)
-            e.grid(row=i,column=1,padx=5,pady=5)
-            e.insert(0,line_str)
-            entries.append(e)
+        tk.Button(w,text="Salvar",command=save).pack(pady=10)
 
-        tk.Button(w,text="Salvar",command=save).grid(row=count,column=0,columnspan=2,pady=10)
+    def open_program(self):
+        path = filedialog.askopenfilename(
+            parent=self.root, title="Abrir Programa",
+            filetypes=[("Programas", "*.asm *.txt"), ("Todos os arquivos", "*.*")]
+        )
+        if not path:
+            return
+        if backend.loadProgramFile(os.fsencode(path)) < 0:
+            self.show_component_info("Abrir Programa", f"Não foi possível carregar {path}.")
+            return
+        self.reset()
+        self.show_assemble_errors()
+
+    def show_assemble_errors(self):
+        count = backend.getAssembleErrorCount()
+        if count > 0:
+            errors = backend.getAssembleErrors().decode("utf-8")
+            if errors.count("\n") < count:
+                errors += f"... ({count} erros no total)"
+            self.show_component_info("Erros de Montagem", errors)
 
     def edit_cache(self):
         w = tk.Toplevel(self.root)
         w.title("Editar Cache")
         w.geometry("400x600")
-        size = backend.getCacheSize()
+        # Edita a partir da primeira linha visível na lista
+        first = self.cache_list.offset
+        size  = min(backend.getCacheSize() - first, MAX_EDIT_ROWS)
         entries = []
 
+        # Blocos de várias palavras: valores separados por espaço
         def save():
             for i,e in enumerate(entries):
                 try:
-                    val = int(e.get())
-                    backend.setCacheLineData(i,val)
+                    vals = [int(v) for v in e.get().split()]
+                    for off,val in enumerate(vals[:self.block_words]):
+                        backend.setCacheWordData(first + i,off,val)
                 except:
                     pass
             self.update_cache_labels()
             w.destroy()
 
         for i in range(size):
-            tk.Label(w,text=f"Linha {i} Data:").grid(row=i,column=0)
+            tk.Label(w,text=f"Linha {first + i} Data:").grid(row=i,column=0)
             e = tk.Entry(w)
             e.grid(row=i,column=1)
-            line_str = backend.getCacheLineString(i).decode("utf-8")
-            pos = line_str.find("D=")
-            if pos!=-1:
-                d_val=line_str[pos+2:].strip()
-                e.insert(0,d_val)
+            e.insert(0," ".join(str(v) for v in self.cache_line_words(first + i)))
             entries.append(e)
 
         tk.Button(w,text="Salvar",command=save).grid(row=size,column=0,columnspan=2,pady=10)
@@ -615,21 +1583,12 @@ class CPUVisualizer:
         w.title("Editar Registradores")
         w.geometry("400x300")
 
-        r_str = backend.getRegistersString().decode("utf-8")
-        parts = r_str.split(",")
-        reg_map = {}
-        for p in parts:
-            if "=" in p:
-                k,v = p.split("=")
-                reg_map[k.strip()] = v.strip()
-
         entries = []
         for i,reg in enumerate(self.register_names):
             tk.Label(w,text=reg,font=self.medium_font).grid(row=i,column=0)
             e = tk.Entry(w)
             e.grid(row=i,column=1)
-            cur = reg_map.get(reg,"0")
-            e.insert(0,cur)
+            e.insert(0,str(self.registers[i]))
             entries.append((reg,e))
 
         def save():
@@ -644,35 +1603,228 @@ class CPUVisualizer:
 
         tk.Button(w,text="Salvar",command=save).grid(row=len(self.register_names),column=0,columnspan=2,pady=10)
 
-    def show_performance(self):
-        if not self.execution_times:
-            return
+    def current_associativity(self):
+        mode = backend.getCacheMappingMode()
+        if mode == 0:
+            return 1
+        if mode == 1:
+            return 0
+        return backend.getCacheWays()
+
+    def configure_machine(self):
+        w = tk.Toplevel(self.root)
+        w.title("Configurar Máquina")
+        w.geometry("400x250")
+
+        fields = [
+            ("Palavras de memória", backend.getMemorySize()),
+            ("Linhas de cache", backend.getCacheSize()),
+            ("Palavras por bloco", backend.getBlockWords()),
+            ("Associatividade (1=direto, 0=associativo, N=vias)", self.current_associativity()),
+        ]
+        entries = []
+        for i,(name,cur) in enumerate(fields):
+            tk.Label(w,text=name).grid(row=i,column=0,padx=5,pady=5,sticky="w")
+            e = tk.Entry(w)
+            e.grid(row=i,column=1,padx=5,pady=5)
+            e.insert(0,str(cur))
+            entries.append(e)
+
+        def save():
+            try:
+                values = [int(e.get()) for e in entries]
+            except ValueError:
+                values = None
+            if values is None or not backend.configureMachine(*values):
+                self.show_component_info("Configurar Máquina", "Configuração inválida.")
+                return
+            w.destroy()
+            self.mapping_var.set(MAPPING_NAMES[backend.getCacheMappingMode()])
+            self.refresh_views()
+            self.reset()
+
+        tk.Button(w,text="Salvar",command=save).grid(row=len(fields),column=0,columnspan=2,pady=10)
+
+    def show_cycle_info(self):
+        t = TimingModel()
+        backend.getTimingModel(ctypes.byref(t))
+        miss = t.hitLatency + t.missLatency + t.memLatency
+        info = (f"LOAD/STORE(HIT)={t.hitLatency}\nLOAD/STORE(MISS)={miss}\nADD/SUB={t.aluLatency}\n"
+                "Reflete custo de HIT/MISS.")
+        if backend.getPipelineMode():
+            stats = PipelineStats()
+            backend.getPipelineStats(ctypes.byref(stats))
+            fwd = "com" if backend.getForwarding() else "sem"
+            info += (f"\n\nPipeline de 5 estágios ({fwd} forwarding): as latências acima "
+                     f"são o tempo nos estágios MEM e EX.\n"
+                     f"Instruções: {stats.instructions} | Ciclos: {stats.cycles} | CPI: {stats.cpi:.2f}\n"
+                     f"Bolhas RAW: {stats.rawStalls}\n"
+                     f"Ciclos extras no MEM: {stats.memStalls} ({stats.missStalls} por faltas)\n"
+                     f"Ciclos extras no EX: {stats.exStalls}")
+        self.show_component_info("Ciclos de Clock", info)
+
+    def configure_timing(self):
+        w = tk.Toplevel(self.root)
+        w.title("Temporização")
+
+        t = TimingModel()
+        backend.getTimingModel(ctypes.byref(t))
+        fields = [
+            ("Acerto na cache (ciclos)", "hitLatency"),
+            ("Tratamento da falta (ciclos)", "missLatency"),
+            ("Memória principal (ciclos)", "memLatency"),
+            ("ULA - ADD/SUB (ciclos)", "aluLatency"),
+        ]
+        entries = []
+        for i,(name,field) in enumerate(fields):
+            tk.Label(w,text=name).grid(row=i,column=0,padx=5,pady=5,sticky="w")
+            e = tk.Entry(w)
+            e.grid(row=i,column=1,padx=5,pady=5)
+            e.insert(0,str(getattr(t, field)))
+            entries.append(e)
 
-        labels  = []
-        efforts = []
-        for cost, op in self.execution_times:
-            labels.append(op)
-            efforts.append(cost)
+        pipeline_var   = tk.BooleanVar(value=bool(backend.getPipelineMode()))
+        forwarding_var = tk.BooleanVar(value=bool(backend.getForwarding()))
+        row = len(fields)
+        tk.Checkbutton(w,text="Pipeline de 5 estágios",variable=pipeline_var).grid(
+            row=row,column=0,columnspan=2,sticky="w",padx=5)
+        tk.Checkbutton(w,text="Forwarding",variable=forwarding_var).grid(
+            row=row+1,column=0,columnspan=2,sticky="w",padx=5)
 
-        plt.figure(figsize=(12, 6))
-        plt.bar(range(1, len(efforts)+1), efforts, tick_label=labels, color="blue", alpha=0.7)
+        def save():
+            try:
+                new = TimingModel(*[int(e.get()) for e in entries])
+            except ValueError:
+                new = None
+            if new is None or not backend.setTimingModel(ctypes.byref(new)):
+                self.show_component_info("Temporização", "Latências inválidas (acerto e ULA >= 1, demais >= 0).")
+                return
+            backend.setPipelineMode(int(pipeline_var.get()))
+            backend.setForwarding(int(forwarding_var.get()))
+            w.destroy()
+            self.update_total_cost_label()
+
+        tk.Button(w,text="Salvar",command=save).grid(row=row+2,column=0,columnspan=2,pady=10)
+
+    # ----- Gráfico de desempenho ao vivo -----
+    def update_perf_series(self):
+        """Acrescenta à série de desempenho as instruções executadas desde a última leitura."""
+        events = []
+        while True:
+            chunk = events_since(self.perf_seq)
+            if not chunk:
+                break
+            events.extend(chunk)
+            self.perf_seq = chunk[-1].seq + 1
+        if not events:
+            return
 
-        plt.gca().spines["top"].set_visible(False)
-        plt.gca().spines["right"].set_visible(False)
-        plt.gca().spines["left"].set_visible(True)
-        plt.gca().spines["bottom"].set_visible(True)
+        series = self.perf_series
+        if events[0].step < series.instructions:
+            series.clear()   # CPU reiniciada
+        missing = events[0].step - series.instructions
+        if missing > 0:
+            # Eventos já descartados do log: entram agregados, pelos contadores do backend
+            hits   = ctypes.c_longlong()
+            misses = ctypes.c_longlong()
+            backend.getCacheStatus(ctypes.byref(hits), ctypes.byref(misses))
+            series.add_chunk(
+                missing,
+                backend.getTotalCycles() - series.cycles - sum(ev.cost for ev in events),
+                hits.value - series.hits - sum(ev.hit == 1 for ev in events),
+                hits.value + misses.value - series.accesses - sum(ev.hit >= 0 for ev in events),
+            )
+        for ev in events:
+            series.add(ev.cost, ev.hit)
+        self.schedule_perf_redraw()
 
-        plt.xlabel("Instrução", fontsize=14)
-        plt.ylabel("Esforço Computacional (Ciclos de Clock)", fontsize=14)
-        plt.title("Esforço Computacional por Instrução", fontsize=16, pad=30)
-        plt.grid(axis="y", linestyle="--", alpha=0.7)
+    def schedule_perf_redraw(self):
+        """Agenda um redesenho do gráfico respeitando o limite de quadros por segundo."""
+        if self.perf_canvas is None or self.perf_job is not None:
+            return
+        elapsed = (time.monotonic() - self.perf_last_draw) * 1000
+        self.perf_job = self.root.after(max(0, int(PERF_FRAME_MS - elapsed)), self.redraw_perf)
 
-        for i, value in enumerate(efforts):
-            plt.text(i+1, value+0.5, str(value), fontsize=10, ha="center")
+    def show_performance(self):
+        if self.perf_canvas is not None:
+            self.perf_canvas.get_tk_widget().winfo_toplevel().lift()
+            return
+        w = tk.Toplevel(self.root)
+        w.title("Desempenho")
+        w.geometry("1000x750")
+
+        # matplotlib só é carregado quando o gráfico é aberto (início mais rápido)
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        fig = Figure(figsize=(10, 7.5), dpi=100)
+        ax_cycles, ax_hits, ax_cpi = fig.subplots(3, 1, sharex=True)
+        ax_cycles.set_ylabel("Ciclos acumulados")
+        ax_hits.set_ylabel("Taxa de acerto")
+        ax_hits.set_ylim(0, 1.05)
+        ax_cpi.set_ylabel("Ciclos por instrução")
+        ax_cpi.set_xlabel("Instruções executadas")
+        for ax in (ax_cycles, ax_hits, ax_cpi):
+            ax.grid(axis="y", linestyle="--", alpha=0.7)
+            ax.spines["top"].set_visible(False)
+            ax.spines["right"].set_visible(False)
+
+        self.perf_axes  = (ax_cycles, ax_hits, ax_cpi)
+        self.perf_lines = {
+            "cumulative": ax_cycles.plot([], [], color="blue")[0],
+            "hit_rate":   ax_hits.plot([], [], color="green")[0],
+            "cpi":        ax_cpi.plot([], [], color="red")[0],
+        }
+        self.perf_envelope = None
+        self.perf_figure   = fig
+
+        canvas = FigureCanvasTkAgg(fig, master=w)
+        canvas.get_tk_widget().pack(fill="both", expand=True)
+
+        def close():
+            if self.perf_job is not None:
+                self.root.after_cancel(self.perf_job)
+                self.perf_job = None
+            self.perf_canvas = None
+            w.destroy()
 
-        plt.show()
+        w.protocol("WM_DELETE_WINDOW", close)
+        self.perf_canvas = canvas
+        self.redraw_perf()
 
-if __name__=="__main__":
+    def redraw_perf(self):
+        self.perf_job = None
+        if self.perf_canvas is None:
+            return
+        self.perf_last_draw = time.monotonic()
+
+        s = self.perf_series.series()
+        for name, line in self.perf_lines.items():
+            line.set_data(s["x"], s[name])
+
+        # Envoltória mín./máx. do custo individual quando cada ponto agrega várias instruções
+        ax_cycles, ax_hits, ax_cpi = self.perf_axes
+        if self.perf_envelope is not None:
+            self.perf_envelope.remove()
+            self.perf_envelope = None
+        if self.perf_series.width > 1:
+            self.perf_envelope = ax_cpi.fill_between(s["x"], s["cpi_min"], s["cpi_max"],
+                                                     color="red", alpha=0.2, linewidth=0)
+        for ax in self.perf_axes:
+            ax.relim()
+            ax.autoscale_view(scalex=True, scaley=(ax is not ax_hits))
+
+        width = self.perf_series.width
+        self.perf_figure.suptitle(
+            f"{self.perf_series.instructions} instruções, {self.perf_series.cycles} ciclos"
+            + (f" (pontos = janelas de {width} instruções)" if width > 1 else "")
+        )
+        self.perf_canvas.draw_idle()
+
+def main():
     root = tk.Tk()
-    app = CPUVisualizer(root)
+    CPUVisualizer(root)
     root.mainloop()
+
+if __name__=="__main__":
+    main()
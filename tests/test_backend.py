@@ -0,0 +1,155 @@
+"""Testes de regressão do backend (requerem a biblioteca compilada; ver README).
+
+Execute da raiz do projeto com ``python -m unittest discover tests``.
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from cpu_edusim.backend import backend    # noqa: F401  (só confirma que a biblioteca carrega)
+except OSError:
+    backend = None
+
+
+def run_python(code):
+    """Executa code num processo novo (defaultContext ainda sem initCPU)."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=60)
+
+
+@unittest.skipIf(backend is None, "backend não compilado")
+class DefaultContextWithoutInitTest(unittest.TestCase):
+    """A API sem contexto não pode depender de uma chamada anterior a initCPU."""
+
+    def test_plain_api(self):
+        result = run_python(
+            "from cpu_edusim.backend import backend\n"
+            "backend.loadDefaultInstructions()\n"
+            "print(backend.runUntilEnd())\n"
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertGreater(int(result.stdout), 0)
+
+    def test_default_machine(self):
+        result = run_python(
+            "from cpu_edusim.backend import Machine\n"
+            "m = Machine.default()\n"
+            "m.load_program(['LI R1, 3', 'ADDI R2, R1, 4'])\n"
+            "print(m.run(), m.registers()[1])\n"
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), ["2", "7"])
+
+
+@unittest.skipIf(backend is None, "backend não compilado")
+class BatchRunTest(unittest.TestCase):
+    """Execução em lote: estado e textos finais iguais aos do passo a passo."""
+
+    PROGRAM = ["LI R4, 0", "LI R3, 5", "laco:", "LOAD R1, 2", "ADDI R1, R1, 1", "STORE R1, 2",
+               "ADDI R4, R4, 1", "BNE R4, R3, laco", "; fim"]
+
+    def final_state(self, machine):
+        texts = (backend.ctxGetLastOperationText(machine._ctx),
+                 backend.ctxGetLastExplanationText(machine._ctx))
+        return (list(machine.registers()), list(machine.memory()), machine.total_cycles, texts)
+
+    def test_batch_matches_steps(self):
+        from cpu_edusim.backend import Machine
+        with Machine() as stepped, Machine() as batch, Machine() as limited:
+            for m in (stepped, batch, limited):
+                self.assertFalse(m.load_program(self.PROGRAM))
+            while stepped.run(1):
+                pass
+            self.assertEqual(batch.run(), stepped.step_count)
+            self.assertEqual(self.final_state(batch), self.final_state(stepped))
+
+            # Com limite: para no meio do laço com os textos da última instrução
+            stepped.reset()
+            for _ in range(7):
+                stepped.run(1)
+            self.assertEqual(limited.run(7), 7)
+            self.assertEqual(self.final_state(limited), self.final_state(stepped))
+
+
+@unittest.skipIf(backend is None, "backend não compilado")
+class WideCountersTest(unittest.TestCase):
+    """Ciclos e contadores em 64 bits: não dão a volta em 2^31."""
+
+    def test_cycles_past_int_range(self):
+        from cpu_edusim.backend import Machine
+        with Machine() as m:
+            m.set_timing(alu=1 << 20)
+            self.assertFalse(m.load_program(["LI R1, 0", "LI R4, 4096", "laco:", "ADD R2, R2, R1",
+                                             "ADDI R1, R1, 1", "BNE R1, R4, laco"]))
+            m.run()
+            adds, cycles = m.opcode_stats()["ADD"]
+            self.assertEqual(adds, 4096)
+            self.assertEqual(cycles, 4096 << 20)
+            self.assertGreater(m.total_cycles, 1 << 32)
+
+
+@unittest.skipIf(backend is None, "backend não compilado")
+class SweepLimitTest(unittest.TestCase):
+    """O limite de instruções só é erro se o programa não terminou."""
+
+    def test_program_ending_on_limit(self):
+        from cpu_edusim.sweep import DEFAULTS, simulate
+        program = ["LI R1, 1", "LI R2, 2", "; fim"]
+        self.assertEqual(simulate(program, dict(DEFAULTS, max_steps=2))["error"], "")
+        self.assertIn("Limite", simulate(program, dict(DEFAULTS, max_steps=1))["error"])
+
+
+@unittest.skipIf(backend is None, "backend não compilado")
+class CliTest(unittest.TestCase):
+    """``python -m cpu_edusim run`` lê o arquivo no backend, com as linhas originais."""
+
+    def test_error_line_matches_file(self):
+        import contextlib
+        import io
+        import tempfile
+        from cpu_edusim.__main__ import main
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "prog.asm")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("; comentário\n\nLI R1, 1\nFOO R2\n")
+            stderr = io.StringIO()
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr):
+                self.assertEqual(main(["run", path]), 1)
+        # Índice da linha no arquivo (0 = primeira), como no restante do backend
+        self.assertIn("Linha 3 (FOO R2)", stderr.getvalue())
+
+    def test_sweep_accepts_path(self):
+        import tempfile
+        from cpu_edusim.sweep import run_sweep
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "prog.asm")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("; comentário\n\nLI R1, 1\nLOAD R2, 1\n")
+            results = run_sweep(path, {"cache_lines": [2, 4]}, workers=1)
+        self.assertEqual([r["error"] for r in results], ["", ""])
+        self.assertEqual([r["steps"] for r in results], [2, 2])
+
+
+@unittest.skipIf(backend is None, "backend não compilado")
+class ReplayBufferTest(unittest.TestCase):
+    """replay_buffer só aceita endereços int32 (outros tamanhos seriam lidos errado)."""
+
+    def test_rejects_other_item_sizes(self):
+        from array import array
+        from cpu_edusim.backend import Machine
+        from cpu_edusim.trace import replay_buffer
+        with Machine() as m:
+            m.configure(64, 4, 1, 1)
+            self.assertEqual(replay_buffer(m, array("i", [1, 2, 1, 3])), 1)
+            for typecode in ("q", "h", "f"):
+                with self.assertRaises(ValueError):
+                    replay_buffer(m, array(typecode, [1, 2]))
+
+
+if __name__ == "__main__":
+    unittest.main()